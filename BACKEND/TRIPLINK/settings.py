@@ -16,6 +16,7 @@ import os
 from urllib.parse import urlparse
 
 import dj_database_url
+from corsheaders.defaults import default_headers
 from decouple import Csv, config
 from dotenv import load_dotenv
 
@@ -87,6 +88,7 @@ if _render_url:
 CSRF_COOKIE_SAMESITE = 'Lax'
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Security (HTTPS termination on Render uses X-Forwarded-Proto)
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -261,6 +263,12 @@ else:
         'staticfiles': _staticfiles_storage,
     }
 
+# Local-disk media and itinerary PDFs can be handed to the front server instead of streamed by Django:
+# "x-accel-redirect" (nginx; map FILE_DELIVERY_ACCEL_PREFIX to MEDIA_ROOT as an internal location)
+# or "x-sendfile" (Apache mod_xsendfile / lighttpd). Empty streams from Django.
+FILE_DELIVERY_OFFLOAD = os.environ.get('FILE_DELIVERY_OFFLOAD', '').strip().lower()
+FILE_DELIVERY_ACCEL_PREFIX = os.environ.get('FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -361,6 +369,25 @@ CACHES = {
     }
 }
 
+# Public agent profile responses are cached per agent and invalidated on review/package/booking writes.
+# With the per-process LocMemCache other workers may serve a copy up to this many seconds old.
+PUBLIC_AGENT_PROFILE_CACHE_SECONDS = int(os.environ.get('PUBLIC_AGENT_PROFILE_CACHE_SECONDS', '300'))
+
+# Admin dashboard metrics snapshot TTL; the dashboard's Refresh button rebuilds it immediately.
+ADMIN_DASHBOARD_CACHE_SECONDS = int(os.environ.get('ADMIN_DASHBOARD_CACHE_SECONDS', '120'))
+
+# Console tables (admin users/reviews/refunds) count exactly up to this many rows; above it they show
+# the PostgreSQL planner estimate ("About N results") instead of running COUNT(*).
+CONSOLE_TABLE_EXACT_COUNT_LIMIT = int(os.environ.get('CONSOLE_TABLE_EXACT_COUNT_LIMIT', '10000'))
+
+# Itinerary PDF rendering (accounts/itinerary_pdf_jobs.py): "pool" renders in a bounded process pool
+# owned by the web process, "worker" leaves jobs for `python manage.py run_itinerary_pdf_worker`,
+# "inline" renders on the submitting thread (tests / debugging).
+ITINERARY_PDF_RENDER_MODE = os.environ.get('ITINERARY_PDF_RENDER_MODE', 'pool')
+ITINERARY_PDF_WORKERS = int(os.environ.get('ITINERARY_PDF_WORKERS', '2'))
+# Jobs queued/rendering longer than this are requeued (up to 3 attempts).
+ITINERARY_PDF_JOB_STALE_SECONDS = int(os.environ.get('ITINERARY_PDF_JOB_STALE_SECONDS', '300'))
+
 # eSewa (UAT defaults; override in .env for production/live credentials)
 ESEWA_PRODUCT_CODE = os.environ.get('ESEWA_PRODUCT_CODE', 'EPAYTEST')
 ESEWA_SECRET_KEY = os.environ.get('ESEWA_SECRET_KEY', '8gBm/:&EnhH.1/q')
@@ -369,3 +396,50 @@ ESEWA_STATUS_URL = os.environ.get('ESEWA_STATUS_URL', 'https://rc.esewa.com.np/a
 # Optional: eSewa merchant refund endpoint (JSON POST). Obtain the exact URL and contract from eSewa for your merchant account.
 ESEWA_REFUND_URL = os.environ.get('ESEWA_REFUND_URL', '')
 ESEWA_REFUND_TIMEOUT = int(os.environ.get('ESEWA_REFUND_TIMEOUT', '30'))
+# Minutes seats stay reserved for a traveler after starting an eSewa payment (accounts/seat_inventory.py).
+SEAT_HOLD_MINUTES = float(os.environ.get('SEAT_HOLD_MINUTES', '30'))
+# Status API calls (verify view + reconciliation worker): pooled session with bounded timeouts.
+ESEWA_STATUS_CONNECT_TIMEOUT = float(os.environ.get('ESEWA_STATUS_CONNECT_TIMEOUT', '5'))
+ESEWA_STATUS_READ_TIMEOUT = float(os.environ.get('ESEWA_STATUS_READ_TIMEOUT', '15'))
+# Parallel status checks per reconciliation run.
+ESEWA_RECONCILE_WORKERS = int(os.environ.get('ESEWA_RECONCILE_WORKERS', '8'))
+# Circuit breaker: fail fast for RESET_SECONDS after this many consecutive status API failures.
+ESEWA_BREAKER_FAILURES = int(os.environ.get('ESEWA_BREAKER_FAILURES', '5'))
+ESEWA_BREAKER_RESET_SECONDS = float(os.environ.get('ESEWA_BREAKER_RESET_SECONDS', '60'))
+
+# Notification retention (python manage.py prune_notifications)
+# Read recipient rows older than this many days are moved to NotificationRecipientArchive.
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', '90'))
+# Rows per archive/delete batch; each batch is its own short transaction.
+NOTIFICATION_RETENTION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_RETENTION_BATCH_SIZE', '1000'))
+
+# Background job runner (python manage.py run_scheduler)
+# Per-job interval overrides in seconds, e.g. SCHEDULER_TRIP_REMINDERS_INTERVAL=120.
+SCHEDULER_JOB_INTERVALS = {
+    name: float(os.environ[env])
+    for name, env in (
+        ('trip_reminders', 'SCHEDULER_TRIP_REMINDERS_INTERVAL'),
+        ('package_expiry', 'SCHEDULER_PACKAGE_EXPIRY_INTERVAL'),
+        ('reward_awarding', 'SCHEDULER_REWARD_AWARDING_INTERVAL'),
+        ('payment_reconciliation', 'SCHEDULER_PAYMENT_RECONCILIATION_INTERVAL'),
+        ('deal_digest', 'SCHEDULER_DEAL_DIGEST_INTERVAL'),
+        ('idempotency_cleanup', 'SCHEDULER_IDEMPOTENCY_CLEANUP_INTERVAL'),
+        ('seat_hold_expiry', 'SCHEDULER_SEAT_HOLD_EXPIRY_INTERVAL'),
+        ('leaderboard_refresh', 'SCHEDULER_LEADERBOARD_REFRESH_INTERVAL'),
+        ('daily_rollups', 'SCHEDULER_DAILY_ROLLUPS_INTERVAL'),
+        ('itinerary_pdf_recovery', 'SCHEDULER_ITINERARY_PDF_RECOVERY_INTERVAL'),
+    )
+    if os.environ.get(env)
+}
+# Leader lock file used when the database is not PostgreSQL (advisory locks are used on PostgreSQL).
+SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE', '')
+
+# Deal notifications (accounts/deal_notifications.py)
+# Max promotion notifications a traveler gets per window; further deals go to their digest.
+DEAL_NOTIFICATION_CAP = int(os.environ.get('DEAL_NOTIFICATION_CAP', '2'))
+DEAL_NOTIFICATION_CAP_WINDOW_HOURS = float(os.environ.get('DEAL_NOTIFICATION_CAP_WINDOW_HOURS', '24'))
+# A traveler's digest is sent once their oldest queued deal has waited this long.
+DEAL_DIGEST_DELAY_HOURS = float(os.environ.get('DEAL_DIGEST_DELAY_HOURS', '12'))
+
+# Idempotency-Key header on booking / payment / publish / notification-send endpoints (accounts/idempotency.py)
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
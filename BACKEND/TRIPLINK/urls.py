@@ -17,17 +17,16 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
-from django.views.static import serve
+from accounts.file_delivery import serve_media
 from accounts.views import (
     login_view, logout_view, admin_dashboard_view, admin_users_view, admin_packages_view, admin_package_detail_view,
-    admin_notifications_view, admin_refunds_view, admin_bookings_view, admin_reviews_view, agent_dashboard_view, agent_notifications_view, agent_refunds_view,
+    admin_notifications_view, admin_refunds_view, admin_bookings_view, admin_bookings_export_view, admin_reviews_view, agent_dashboard_view, agent_notifications_view, agent_refunds_view,
     admin_forgot_password_view, agent_forgot_password_view,
     admin_verify_otp_view, agent_verify_otp_view,
     admin_reset_password_view, agent_reset_password_view,
     agent_profile_view, agent_packages_view, agent_add_package_view,
     agent_edit_package_view, agent_delete_package_view,
-    agent_package_detail_view, agent_travelers_view, agent_bookings_view, agent_booking_detail_view, agent_calendar_view,
+    agent_package_detail_view, agent_travelers_view, agent_bookings_view, agent_bookings_export_view, agent_booking_detail_view, agent_calendar_view,
     agent_custom_packages_view, agent_custom_package_detail_view, agent_custom_package_publish_view,
     agent_chat_view, agent_reviews_view, agent_deals_view, agent_settings_view,
 )
@@ -45,6 +44,7 @@ urlpatterns = [
     path('notifications/admin/', admin_notifications_view, name='admin_notifications'),
     path('refunds/admin/', admin_refunds_view, name='admin_refunds'),
     path('bookings/admin/', admin_bookings_view, name='admin_bookings'),
+    path('bookings/admin/export/', admin_bookings_export_view, name='admin_bookings_export'),
     path('reviews/admin/', admin_reviews_view, name='admin_reviews'),
     path('dashboard/agent/', agent_dashboard_view, name='agent_dashboard'),
     path('refunds/agent/', agent_refunds_view, name='agent_refunds'),
@@ -59,6 +59,7 @@ urlpatterns = [
     path('packages/agent/delete/<int:package_id>/', agent_delete_package_view, name='agent_delete_package'),
     path('travelers/agent/', agent_travelers_view, name='agent_travelers'),
     path('bookings/agent/', agent_bookings_view, name='agent_bookings'),
+    path('bookings/agent/export/', agent_bookings_export_view, name='agent_bookings_export'),
     path('bookings/agent/<int:booking_id>/', agent_booking_detail_view, name='agent_booking_detail'),
     path('calendar/agent/', agent_calendar_view, name='agent_calendar'),
     path('custom-packages/agent/', agent_custom_packages_view, name='agent_custom_packages'),
@@ -79,15 +80,10 @@ urlpatterns = [
 ]
 
 # User uploads: serve from disk when not using S3 (USE_S3_MEDIA → files are at bucket URLs).
+# serve_media streams with Range / conditional support and can hand off to nginx or Apache
+# (FILE_DELIVERY_OFFLOAD).
 if not getattr(settings, 'USE_S3_MEDIA', False):
-    if settings.DEBUG:
-        urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    else:
-        media_url = settings.MEDIA_URL.lstrip("/").rstrip("/")
-        urlpatterns += [
-            re_path(
-                rf"^{media_url}/(?P<path>.*)$",
-                serve,
-                {"document_root": settings.MEDIA_ROOT},
-            ),
-        ]
+    media_url = settings.MEDIA_URL.lstrip("/").rstrip("/")
+    urlpatterns += [
+        re_path(rf"^{media_url}/(?P<path>.*)$", serve_media),
+    ]
@@ -11,17 +11,24 @@ from .models import (
     Package,
     PackageFeature,
     Deal,
+    DealDigestEntry,
+    SeatHold,
     CustomPackage,
     Booking,
     BookingTripReminder,
+    ScheduledReminder,
     RefundRequest,
     AgentReview,
     Notification,
     NotificationRecipient,
+    NotificationRecipientArchive,
     ExpoPushToken,
+    IdempotencyKey,
+    RewardPointsEntry,
     Roles,
 )
 from .mail_utils import send_agent_credentials_email
+from .rewards import adjust_reward_points
 
 
 @admin.register(User)
@@ -86,18 +93,20 @@ class UserAdmin(DjangoUserAdmin):
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'full_name', 'phone_number', 'location', 'created_at']
+    list_display = ['user', 'full_name', 'phone_number', 'location', 'reward_points', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__email', 'first_name', 'last_name', 'phone_number']
-    readonly_fields = ['created_at', 'updated_at']
+    # Balance changes go through the reward points ledger (add an adjustment entry there).
+    readonly_fields = ['reward_points', 'created_at', 'updated_at']
 
 
 @admin.register(AgentProfile)
 class AgentProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'full_name', 'phone_number', 'location', 'rating', 'created_at']
+    list_display = ['user', 'full_name', 'phone_number', 'location', 'rating', 'rating_count', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__email', 'first_name', 'last_name', 'phone_number']
-    readonly_fields = ['created_at', 'updated_at']
+    # Maintained from reviews (accounts.agent_ratings); repair with manage.py recompute_agent_ratings.
+    readonly_fields = [*AgentProfile.RATING_AGGREGATE_FIELDS, 'created_at', 'updated_at']
 
 
 @admin.register(PackageFeature)
@@ -109,10 +118,11 @@ class PackageFeatureAdmin(admin.ModelAdmin):
 
 @admin.register(Package)
 class PackageAdmin(admin.ModelAdmin):
-    list_display = ['title', 'location', 'country', 'latitude', 'longitude', 'agent', 'price_per_person', 'status', 'created_at']
+    list_display = ['title', 'location', 'country', 'latitude', 'longitude', 'agent', 'price_per_person', 'capacity', 'participants_count', 'status', 'created_at']
     list_filter = ['status', 'country', 'created_at']
     search_fields = ['title', 'location', 'country', 'agent__email']
-    readonly_fields = ['created_at', 'updated_at']
+    # Maintained by accounts.seat_inventory; Package.save() never writes them back, so edits would be lost.
+    readonly_fields = [*Package.SEAT_COUNTER_FIELDS, 'created_at', 'updated_at']
     filter_horizontal = ['features']
 
 
@@ -149,6 +159,30 @@ class BookingTripReminderAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 
+@admin.register(ScheduledReminder)
+class ScheduledReminderAdmin(admin.ModelAdmin):
+    list_display = ['booking', 'kind', 'due_at', 'sent_at']
+    list_filter = ['kind', 'sent_at']
+    search_fields = ['booking__user__email', 'booking__package__title']
+    readonly_fields = ['created_at']
+
+
+@admin.register(DealDigestEntry)
+class DealDigestEntryAdmin(admin.ModelAdmin):
+    list_display = ['deal', 'user', 'reason', 'created_at', 'sent_at']
+    list_filter = ['reason', 'sent_at']
+    search_fields = ['user__email', 'deal__package__title']
+    readonly_fields = ['created_at']
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ['package', 'payment_session', 'seats', 'status', 'expires_at']
+    list_filter = ['status']
+    search_fields = ['package__title', 'payment_session__transaction_uuid']
+    readonly_fields = ['created_at', 'updated_at']
+
+
 @admin.register(RefundRequest)
 class RefundRequestAdmin(admin.ModelAdmin):
     list_display = ['id', 'status', 'traveler', 'package_title', 'total_amount', 'created_at']
@@ -180,6 +214,14 @@ class NotificationRecipientAdmin(admin.ModelAdmin):
     search_fields = ['notification__title', 'user__email']
 
 
+@admin.register(NotificationRecipientArchive)
+class NotificationRecipientArchiveAdmin(admin.ModelAdmin):
+    list_display = ['title', 'user', 'notification_type', 'delivered_at', 'archived_at']
+    list_filter = ['notification_type', 'archived_at']
+    search_fields = ['title', 'user__email']
+    readonly_fields = ['archived_at']
+
+
 @admin.register(ExpoPushToken)
 class ExpoPushTokenAdmin(admin.ModelAdmin):
     list_display = ['user', 'token_preview', 'updated_at']
@@ -190,3 +232,36 @@ class ExpoPushTokenAdmin(admin.ModelAdmin):
     @admin.display(description='Token')
     def token_preview(self, obj):
         return (obj.token[:48] + '…') if len(obj.token) > 48 else obj.token
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['key', 'user', 'method', 'path', 'status', 'response_status', 'created_at']
+    list_filter = ['status', 'method']
+    search_fields = ['key', 'user__email', 'path']
+    readonly_fields = ['created_at', 'completed_at']
+
+
+@admin.register(RewardPointsEntry)
+class RewardPointsEntryAdmin(admin.ModelAdmin):
+    """Append-only: new entries are applied to the traveler's balance; existing ones cannot be edited."""
+    list_display = ['user', 'kind', 'points', 'booking', 'note', 'created_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['user__email', 'booking__booking_code', 'note']
+    raw_id_fields = ['user', 'booking']
+    readonly_fields = ['created_at']
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ['user', 'booking', 'kind', 'points', 'note', 'created_at']
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            return
+        entry = adjust_reward_points(obj.user_id, obj.points, obj.kind, booking=obj.booking, note=obj.note)
+        if entry is not None:
+            obj.pk, obj.created_at = entry.pk, entry.created_at
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,304 @@
+"""
+Metrics snapshot for the admin dashboard.
+
+Every count on the dashboard comes from one conditional-aggregation query per table
+(COUNT(*) FILTER (WHERE ...) / SUM(CASE ...)): users, packages, bookings, custom packages, chat
+messages. The six-month growth series (and this/last-month momentum) are read from the
+PlatformDailyStats rollup (accounts.daily_rollups). The assembled snapshot is cached for
+ADMIN_DASHBOARD_CACHE_SECONDS; the dashboard's "Refresh" button brings the rollups up to date and
+rebuilds it on demand.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .daily_rollups import PLATFORM_COLUMNS, ensure_daily_rollups, monthly_totals, refresh_daily_rollups
+from .models import (
+    AgentProfile,
+    Booking,
+    BookingStatus,
+    ChatMessage,
+    ChatRoom,
+    CustomPackage,
+    Package,
+    PackageStatus,
+    PlatformDailyStats,
+    Roles,
+    User,
+)
+
+CACHE_KEY = "admin_dashboard_snapshot"
+DEFAULT_CACHE_SECONDS = 120
+TREND_MONTHS = 6
+
+
+def _cache_seconds() -> int:
+    return int(getattr(settings, "ADMIN_DASHBOARD_CACHE_SECONDS", DEFAULT_CACHE_SECONDS))
+
+
+def shift_month(month_start, delta):
+    """Shift a first-of-month date by delta months."""
+    month_index = (month_start.year * 12 + month_start.month - 1) + delta
+    year = month_index // 12
+    month = month_index % 12 + 1
+    return month_start.replace(year=year, month=month, day=1)
+
+
+def safe_pct(numerator, denominator):
+    if not denominator:
+        return 0.0
+    return round((numerator / denominator) * 100, 1)
+
+
+def pct_change(current, previous):
+    if previous == 0:
+        return 100.0 if current > 0 else 0.0
+    return round(((current - previous) / previous) * 100, 1)
+
+
+def _month_windows(today):
+    """[(label, first_day, next_month_first_day)] for the last TREND_MONTHS months, oldest first."""
+    current = today.replace(day=1)
+    windows = []
+    for offset in range(-(TREND_MONTHS - 1), 1):
+        start = shift_month(current, offset)
+        windows.append((start.strftime("%b %Y"), start, shift_month(start, 1)))
+    return windows
+
+
+def build_admin_dashboard_snapshot(now=None) -> dict:
+    now = now or timezone.now()
+    windows = _month_windows(timezone.localdate(now))
+    confirmed = Q(status=BookingStatus.CONFIRMED)
+    cancelled = Q(status=BookingStatus.CANCELLED)
+    custom_status = CustomPackage.CustomPackageStatus
+
+    users = User.objects.aggregate(
+        total=Count("id"),
+        admins=Count("id", filter=Q(role=Roles.ADMIN)),
+        travelers=Count("id", filter=Q(role=Roles.TRAVELER)),
+        agents=Count("id", filter=Q(role=Roles.AGENT)),
+    )
+    packages = Package.objects.aggregate(
+        total=Count("id"),
+        active=Count("id", filter=Q(status=PackageStatus.ACTIVE)),
+        completed=Count("id", filter=Q(status=PackageStatus.COMPLETED)),
+        draft=Count("id", filter=Q(status=PackageStatus.DRAFT)),
+    )
+    bookings = Booking.objects.aggregate(
+        total=Count("id"),
+        confirmed=Count("id", filter=confirmed),
+        cancelled=Count("id", filter=cancelled),
+        revenue=Sum("package__price_per_person", filter=confirmed),
+    )
+    customs = CustomPackage.objects.aggregate(
+        total=Count("id"),
+        open=Count("id", filter=Q(status=custom_status.OPEN)),
+        claimed=Count("id", filter=Q(status=custom_status.CLAIMED)),
+        completed=Count("id", filter=Q(status=custom_status.COMPLETED)),
+        cancelled=Count("id", filter=Q(status=custom_status.CANCELLED)),
+    )
+    chat = ChatMessage.objects.aggregate(
+        total=Count("id"),
+        last_30_days=Count("id", filter=Q(created_at__gte=now - timedelta(days=30))),
+    )
+    total_chat_rooms = ChatRoom.objects.count()
+    avg_agent_rating = AgentProfile.objects.filter(user__role=Roles.AGENT).aggregate(avg=Avg("rating"))["avg"] or 0
+
+    ensure_daily_rollups()
+    series = monthly_totals(
+        PlatformDailyStats.objects.all(),
+        [(start, end) for _, start, end in windows],
+        PLATFORM_COLUMNS,
+    )
+    monthly_trends = {
+        "labels": [label for label, _, _ in windows],
+        "travelers": series["new_travelers"],
+        "bookings": series["bookings"],
+        "packages": series["new_packages"],
+        "custom_requests": series["custom_requests"],
+    }
+
+    top_agents_qs = (
+        User.objects.filter(role=Roles.AGENT)
+        .select_related("agent_profile")
+        .annotate(
+            confirmed_bookings=Count(
+                "packages__bookings",
+                filter=Q(packages__bookings__status=BookingStatus.CONFIRMED),
+                distinct=True,
+            ),
+            active_packages=Count(
+                "packages",
+                filter=Q(packages__status=PackageStatus.ACTIVE),
+                distinct=True,
+            ),
+            estimated_revenue=Sum(
+                "packages__price_per_person",
+                filter=Q(packages__bookings__status=BookingStatus.CONFIRMED),
+            ),
+        )
+        .order_by("-confirmed_bookings", "-estimated_revenue", "email")[:5]
+    )
+    top_agents = []
+    for agent in top_agents_qs:
+        try:
+            profile = agent.agent_profile
+            display_name = profile.full_name
+            rating = float(profile.rating)
+        except AgentProfile.DoesNotExist:
+            display_name = agent.email.split("@")[0]
+            rating = 0.0
+        top_agents.append(
+            {
+                "name": display_name,
+                "email": agent.email,
+                "confirmed_bookings": agent.confirmed_bookings or 0,
+                "active_packages": agent.active_packages or 0,
+                "estimated_revenue": agent.estimated_revenue or 0,
+                "rating": rating,
+            }
+        )
+
+    top_destinations_rows = list(
+        Booking.objects.filter(confirmed)
+        .values("package__country")
+        .annotate(bookings=Count("id"))
+        .order_by("-bookings", "package__country")[:6]
+    )
+    max_destination_bookings = max((row["bookings"] for row in top_destinations_rows), default=0)
+    top_destinations = [
+        {
+            "country": row["package__country"] or "Unknown",
+            "bookings": row["bookings"],
+            "percent_of_top": safe_pct(row["bookings"], max_destination_bookings),
+        }
+        for row in top_destinations_rows
+    ]
+
+    recent_signups = [
+        {"email": email, "role": Roles(role).label, "joined_at": joined_at}
+        for email, role, joined_at in User.objects.exclude(role=Roles.ADMIN)
+        .order_by("-date_joined")
+        .values_list("email", "role", "date_joined")[:8]
+    ]
+
+    total_packages = packages["total"]
+    total_bookings = bookings["total"]
+    total_custom = customs["total"]
+    confirmed_bookings = bookings["confirmed"]
+    cancelled_bookings = bookings["cancelled"]
+
+    def _status_rows(rows, total):
+        return [
+            {"label": label, "count": count, "percent": safe_pct(count, total), "css_class": css}
+            for label, count, css in rows
+        ]
+
+    booking_confirmed_pct = safe_pct(confirmed_bookings, total_bookings)
+    if total_bookings:
+        booking_donut = (
+            f"conic-gradient(#166534 0% {booking_confirmed_pct}%, "
+            f"#dc2626 {booking_confirmed_pct}% 100%)"
+        )
+    else:
+        booking_donut = "conic-gradient(#cbd5e1 0% 100%)"
+
+    bookings_series = monthly_trends["bookings"]
+    travelers_series = monthly_trends["travelers"]
+    packages_series = monthly_trends["packages"]
+    booking_growth_delta = pct_change(bookings_series[-1], bookings_series[-2])
+    insights = []
+    if booking_growth_delta > 0:
+        insights.append(f"Bookings are up {booking_growth_delta}% versus last month.")
+    elif booking_growth_delta < 0:
+        insights.append(f"Bookings are down {abs(booking_growth_delta)}% versus last month.")
+    else:
+        insights.append("Bookings are flat compared to last month.")
+    if top_destinations:
+        insights.append(
+            f"Highest demand destination is {top_destinations[0]['country']} with {top_destinations[0]['bookings']} confirmed bookings."
+        )
+
+    total_agents = users["agents"]
+    return {
+        "stats": {
+            "total_users": users["total"],
+            "total_admins": users["admins"],
+            "travelers": users["travelers"],
+            "agents": total_agents,
+            "packages": total_packages,
+            "bookings": total_bookings,
+            "confirmed_bookings": confirmed_bookings,
+            "cancelled_bookings": cancelled_bookings,
+            "custom_packages": total_custom,
+            "custom_open": customs["open"],
+            "custom_claimed": customs["claimed"],
+            "custom_completed": customs["completed"],
+            "custom_cancelled": customs["cancelled"],
+            "chat_rooms": total_chat_rooms,
+            "messages": chat["total"],
+            "messages_last_30_days": chat["last_30_days"],
+            "estimated_revenue": bookings["revenue"] or 0,
+            "avg_agent_rating": round(float(avg_agent_rating), 1) if avg_agent_rating else 0.0,
+            "booking_conversion_rate": safe_pct(confirmed_bookings, users["travelers"]),
+            "booking_cancellation_rate": safe_pct(cancelled_bookings, total_bookings),
+            "custom_resolution_rate": safe_pct(customs["completed"], total_custom),
+            "avg_bookings_per_agent": round(confirmed_bookings / total_agents, 1) if total_agents else 0.0,
+        },
+        "momentum": {
+            "travelers_this_month": travelers_series[-1],
+            "travelers_change_pct": pct_change(travelers_series[-1], travelers_series[-2]),
+            "bookings_this_month": bookings_series[-1],
+            "bookings_change_pct": booking_growth_delta,
+            "packages_this_month": packages_series[-1],
+            "packages_change_pct": pct_change(packages_series[-1], packages_series[-2]),
+        },
+        "monthly_trends": monthly_trends,
+        "top_agents": top_agents,
+        "top_destinations": top_destinations,
+        "recent_signups": recent_signups,
+        "package_status": _status_rows(
+            [
+                ("Active", packages["active"], "status-active"),
+                ("Completed", packages["completed"], "status-completed"),
+                ("Draft", packages["draft"], "status-draft"),
+            ],
+            total_packages,
+        ),
+        "custom_status": _status_rows(
+            [
+                ("Open", customs["open"], "status-open"),
+                ("Claimed", customs["claimed"], "status-claimed"),
+                ("Completed", customs["completed"], "status-finished"),
+                ("Cancelled", customs["cancelled"], "status-cancelled"),
+            ],
+            total_custom,
+        ),
+        "booking_status": _status_rows(
+            [
+                ("Confirmed", confirmed_bookings, "status-confirmed"),
+                ("Cancelled", cancelled_bookings, "status-cancelled"),
+            ],
+            total_bookings,
+        ),
+        "booking_donut": booking_donut,
+        "insights": insights,
+        "generated_at": now,
+    }
+
+
+def get_admin_dashboard_snapshot(refresh: bool = False) -> dict:
+    """Cached snapshot; ``refresh`` updates the daily rollups and rebuilds it immediately."""
+    if refresh:
+        refresh_daily_rollups()
+    snapshot = None if refresh else cache.get(CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_admin_dashboard_snapshot()
+        cache.set(CACHE_KEY, snapshot, timeout=_cache_seconds())
+    return snapshot
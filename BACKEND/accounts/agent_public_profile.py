@@ -0,0 +1,94 @@
+"""
+Public (traveler-facing) agent profile, opened from every package detail screen.
+
+The payload is built from one AgentProfile query with the package / confirmed-booking counts as
+subquery annotations (review count and histogram come from the profile's rating aggregates), plus
+one query for the first page of reviews with reviewer profiles joined in. The assembled response is
+cached per agent and dropped whenever one of the agent's reviews, packages or bookings (or the profile
+itself) is saved or deleted; PUBLIC_AGENT_PROFILE_CACHE_SECONDS bounds staleness from writes that
+bypass model signals (queryset.update()).
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+
+from .models import AgentProfile, AgentReview, Booking, BookingStatus, Package
+
+CACHE_KEY = "public_agent_profile:{}"
+DEFAULT_CACHE_SECONDS = 300
+REVIEWS_PAGE_SIZE = 10
+
+
+def _cache_seconds() -> int:
+    return int(getattr(settings, "PUBLIC_AGENT_PROFILE_CACHE_SECONDS", DEFAULT_CACHE_SECONDS))
+
+
+def _count_subquery(queryset, field):
+    counts = queryset.filter(**{field: OuterRef("user_id")}).order_by().values(field).annotate(n=Count("id")).values("n")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def public_agent_profiles():
+    """AgentProfile queryset annotated with total_packages_created and total_bookings_handled."""
+    return AgentProfile.objects.select_related("user").annotate(
+        total_packages_created=_count_subquery(Package.objects.all(), "agent"),
+        total_bookings_handled=_count_subquery(
+            Booking.objects.filter(status=BookingStatus.CONFIRMED), "package__agent"
+        ),
+    )
+
+
+def agent_reviews(agent_id):
+    """Reviews for an agent, newest first, with reviewer and reviewer profile joined."""
+    return (
+        AgentReview.objects.filter(agent_id=agent_id)
+        .select_related("user", "user__user_profile")
+        .order_by("-created_at", "-id")
+    )
+
+
+def get_cached_public_profile(agent_id):
+    return cache.get(CACHE_KEY.format(agent_id))
+
+
+def set_cached_public_profile(agent_id, data) -> None:
+    cache.set(CACHE_KEY.format(agent_id), data, timeout=_cache_seconds())
+
+
+def invalidate_public_agent_profile(agent_id) -> None:
+    if agent_id:
+        cache.delete(CACHE_KEY.format(agent_id))
+
+
+def _review_changed(sender, instance, **kwargs):
+    invalidate_public_agent_profile(instance.agent_id)
+
+
+def _package_changed(sender, instance, **kwargs):
+    invalidate_public_agent_profile(instance.agent_id)
+
+
+def _booking_changed(sender, instance, **kwargs):
+    agent_id = Package.objects.filter(pk=instance.package_id).values_list("agent_id", flat=True).first()
+    invalidate_public_agent_profile(agent_id)
+
+
+def _profile_changed(sender, instance, **kwargs):
+    invalidate_public_agent_profile(instance.user_id)
+
+
+def connect_signals() -> None:
+    """Called from AccountsConfig.ready() so writes from commands and the scheduler also invalidate."""
+    for model, handler in (
+        (AgentReview, _review_changed),
+        (Package, _package_changed),
+        (Booking, _booking_changed),
+        (AgentProfile, _profile_changed),
+    ):
+        uid = f"public_agent_profile_{model.__name__}"
+        post_save.connect(handler, sender=model, dispatch_uid=f"{uid}_save")
+        post_delete.connect(handler, sender=model, dispatch_uid=f"{uid}_delete")
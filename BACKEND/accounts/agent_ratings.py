@@ -0,0 +1,88 @@
+"""
+Agent rating aggregates.
+
+AgentProfile keeps rating_sum, rating_count and a per-star histogram (rating_1_count ... rating_5_count)
+that are adjusted with F() increments when a review is created, changed or deleted, instead of running
+AVG(rating) over all of the agent's reviews on every write. rating (the 0-5 average shown everywhere)
+is derived from sum/count in the same transaction. Review pages read the histogram from the profile.
+
+recompute_agent_ratings() rebuilds the aggregates from AgentReview (management command
+``recompute_agent_ratings``) in case they ever drift, e.g. after raw SQL edits.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+from .models import AgentProfile, AgentReview
+
+RATING_VALUES = range(1, 6)
+
+
+def _average_expression():
+    return Coalesce(
+        Round(Cast(F("rating_sum"), FloatField()) / NullIf(F("rating_count"), 0), 1),
+        Value(0.0),
+    )
+
+
+def apply_review_change(agent_id, old_rating=None, new_rating=None) -> None:
+    """Move one review's contribution on ``agent_id``: remove ``old_rating`` and/or add ``new_rating``."""
+    deltas = defaultdict(int)
+    if old_rating is not None:
+        deltas["rating_sum"] -= old_rating
+        deltas["rating_count"] -= 1
+        deltas[f"rating_{old_rating}_count"] -= 1
+    if new_rating is not None:
+        deltas["rating_sum"] += new_rating
+        deltas["rating_count"] += 1
+        deltas[f"rating_{new_rating}_count"] += 1
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    profiles = AgentProfile.objects.filter(user_id=agent_id)
+    with transaction.atomic():
+        if profiles.update(**changes):
+            # Second statement reads the values written above (row stays locked until commit).
+            profiles.update(rating=_average_expression())
+
+
+def recompute_agent_ratings(agent_ids=None) -> int:
+    """Rebuild rating aggregates from AgentReview. Returns the number of profiles whose values changed."""
+    reviews = AgentReview.objects.all()
+    profiles = AgentProfile.objects.all()
+    if agent_ids is not None:
+        reviews = reviews.filter(agent_id__in=agent_ids)
+        profiles = profiles.filter(user_id__in=agent_ids)
+    stats = {
+        row["agent_id"]: row
+        for row in reviews.values("agent_id").annotate(
+            total=Sum("rating"),
+            count=Count("id"),
+            **{f"stars_{n}": Count("id", filter=Q(rating=n)) for n in RATING_VALUES},
+        )
+    }
+
+    changed = []
+    for profile in profiles.only("pk", "user_id", *AgentProfile.RATING_AGGREGATE_FIELDS):
+        row = stats.get(profile.user_id, {})
+        values = {
+            "rating_sum": row.get("total") or 0,
+            "rating_count": row.get("count") or 0,
+            **{f"rating_{n}_count": row.get(f"stars_{n}") or 0 for n in RATING_VALUES},
+        }
+        values["rating"] = (
+            (Decimal(values["rating_sum"]) / values["rating_count"]).quantize(Decimal("0.1"), ROUND_HALF_UP)
+            if values["rating_count"]
+            else Decimal("0.0")
+        )
+        if any(Decimal(getattr(profile, field)) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(profile, field, value)
+            changed.append(profile)
+    AgentProfile.objects.bulk_update(changed, list(AgentProfile.RATING_AGGREGATE_FIELDS), batch_size=500)
+    return len(changed)
@@ -0,0 +1,60 @@
+"""
+Traveler directory for the agent dashboard, scoped to travelers the agent actually works with.
+
+The old page listed every traveler on the platform with four Count(distinct=True) joins each, so it
+grew with every signup. Here the directory only contains travelers related to the agent (a booking on
+one of their packages, a chat room with them, or a custom request they claimed). Per-agent stats are
+correlated COUNT subqueries, and pages are fetched with console_tables.keyset_page on (-date_joined, -id),
+so each page is one LIMIT query with no OFFSET scan or COUNT.
+"""
+from __future__ import annotations
+
+from django.db.models import Q
+
+from .console_tables import PAGE_SIZE, keyset_page, related_count
+from .models import AgentReview, Booking, ChatRoom, CustomPackage, Roles, User
+
+ORDERING = ("-date_joined", "-id")
+
+
+def related_travelers(agent):
+    """Travelers with a booking on one of ``agent``'s packages, a chat with them, or a claimed custom request."""
+    bookings = Booking.objects.filter(package__agent=agent)
+    chats = ChatRoom.objects.filter(agent=agent)
+    claims = CustomPackage.objects.filter(claimed_by=agent)
+    return User.objects.filter(role=Roles.TRAVELER).filter(
+        Q(pk__in=bookings.values("user_id"))
+        | Q(pk__in=chats.values("traveler_id"))
+        | Q(pk__in=claims.values("user_id"))
+    )
+
+
+def with_agent_stats(queryset, agent):
+    """Annotate travelers with bookings, claimed custom requests, reviews and chats involving ``agent``."""
+    return queryset.annotate(
+        bookings_count=related_count(Booking.objects.filter(package__agent=agent), "user"),
+        custom_packages_count=related_count(CustomPackage.objects.filter(claimed_by=agent), "user"),
+        reviews_written_count=related_count(AgentReview.objects.filter(agent=agent), "user"),
+        traveler_chats_count=related_count(ChatRoom.objects.filter(agent=agent), "traveler"),
+    )
+
+
+def search_travelers(queryset, term):
+    """
+    Case-insensitive prefix match on email, first / last name or phone number, like the admin console
+    searches: each term is served by an UPPER(col) text_pattern_ops index (migrations 0053 and 0055).
+    """
+    term = (term or "").strip()
+    if not term:
+        return queryset
+    return queryset.filter(
+        Q(email__istartswith=term)
+        | Q(user_profile__first_name__istartswith=term)
+        | Q(user_profile__last_name__istartswith=term)
+        | Q(user_profile__phone_number__istartswith=term)
+    )
+
+
+def travelers_page(queryset, after=None, before=None, page_size=PAGE_SIZE):
+    """One (-date_joined, -id) keyset page; returns (rows, next_cursor, prev_cursor)."""
+    return keyset_page(queryset, ORDERING, after=after, before=before, page_size=page_size)
@@ -17,8 +17,11 @@ from .models import (
     PaymentStatus,
     RefundRequest,
     RefundRequestStatus,
+    RewardPointsEntry,
     UserProfile,
 )
+from .rewards import adjust_reward_points
+from .seat_inventory import release_seats
 
 logger = logging.getLogger(__name__)
 
@@ -37,13 +40,10 @@ def _restore_reward_points(booking: Booking) -> None:
     rp = int(booking.reward_points_used or 0)
     if rp <= 0:
         return
-    try:
-        profile = UserProfile.objects.select_for_update().get(user_id=booking.user_id)
-    except UserProfile.DoesNotExist:
+    if not UserProfile.objects.filter(user_id=booking.user_id).exists():
         logger.warning("UserProfile missing for user %s; cannot restore reward points.", booking.user_id)
         return
-    profile.reward_points = int(profile.reward_points or 0) + rp
-    profile.save(update_fields=["reward_points", "updated_at"])
+    adjust_reward_points(booking.user_id, rp, RewardPointsEntry.Kind.RESTORED, booking=booking)
 
 
 def _needs_manual_refund_queue(booking: Booking) -> bool:
@@ -89,6 +89,26 @@ def _create_refund_request(booking: Booking, profile: UserProfile) -> RefundRequ
     return rr
 
 
+def release_booking_seats(booking: Booking) -> None:
+    """Give a cancelled booking's travelers back to the package's seat inventory."""
+    release_seats(booking.package_id, max(int(getattr(booking, "traveler_count", 1) or 1), 1))
+
+
+def force_cancel_booking(booking: Booking):
+    """
+    Admin force-cancel: mark the booking cancelled and release its seats (refunds and reward points
+    are handled separately by the admin). Returns the booking, or None if it was already cancelled.
+    """
+    with transaction.atomic():
+        booking = Booking.objects.select_for_update().get(pk=booking.pk)
+        if booking.status == BookingStatus.CANCELLED:
+            return None
+        booking.status = BookingStatus.CANCELLED
+        release_booking_seats(booking)
+        booking.save(update_fields=["status"])
+    return booking
+
+
 def cancel_traveler_booking(booking: Booking) -> Booking:
     """
     Cancel a confirmed booking: seats, reward points, optional manual RefundRequest.
@@ -132,10 +152,7 @@ def cancel_traveler_booking(booking: Booking) -> Booking:
             booking.refunded_at = timezone.now()
 
         booking.status = BookingStatus.CANCELLED
-        package = booking.package
-        decrement_by = max(int(getattr(booking, "traveler_count", 1) or 1), 1)
-        package.participants_count = max((package.participants_count or 0) - decrement_by, 0)
-        package.save(update_fields=["participants_count"])
+        release_booking_seats(booking)
 
         booking.save(
             update_fields=[
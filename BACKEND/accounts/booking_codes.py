@@ -0,0 +1,120 @@
+"""
+Booking code allocation.
+
+Booking codes used to be random 5-digit strings checked with one exists() query per attempt (up to
+500 attempts), which slows down as the range fills and can still race between the check and the insert.
+
+Codes are now a keyed permutation of a counter: allocation index i is mapped to a code length and an
+offset inside that length's range, and the offset is run through a small Feistel network over
+[0, 10**length) (cycle-walking keeps the result inside the range). Distinct indexes always give
+distinct codes, so a booking needs one counter bump and its own INSERT - no lookups, no retries -
+while consecutive bookings still get unrelated-looking codes.
+
+Widening: only the first CODE_SPACE_FILL share of each length is handed out, then allocation moves on
+to the next length (5 digits -> 6 -> ... -> MAX_CODE_LENGTH), so a mistyped or guessed code is more
+likely to miss than to hit someone else's booking. Codes of different lengths never collide because
+they are compared as strings.
+
+The counter is the PostgreSQL sequence accounts_booking_code_seq (non-transactional, so allocating
+never blocks on another open booking transaction); other databases use BookingCodeCounter.next_index.
+The permutation key lives in the BookingCodeCounter row and must never change once codes exist.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import secrets
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import BookingCodeCounter
+
+MIN_CODE_LENGTH = 5
+MAX_CODE_LENGTH = 8
+# Share of each length's range handed out before moving to the next length.
+CODE_SPACE_FILL = 0.5
+FEISTEL_ROUNDS = 6
+SEQUENCE_NAME = "accounts_booking_code_seq"
+
+_key_cache: bytes | None = None
+
+
+def band_size(length: int) -> int:
+    """Number of codes of ``length`` digits that are handed out."""
+    return int(10**length * CODE_SPACE_FILL)
+
+
+def first_index_of_length(length: int) -> int:
+    """Allocation index at which codes of ``length`` digits start."""
+    return sum(band_size(n) for n in range(MIN_CODE_LENGTH, length))
+
+
+def is_complete_code(digits: str) -> bool:
+    """True when ``digits`` has the length of a full booking code (as opposed to a prefix)."""
+    return digits.isdigit() and MIN_CODE_LENGTH <= len(digits) <= MAX_CODE_LENGTH
+
+
+def _counter_row() -> BookingCodeCounter:
+    row = BookingCodeCounter.objects.filter(pk=1).first()
+    if row is None:
+        # Normally created by migration 0046; recreate defensively (e.g. table truncated in dev).
+        row, _ = BookingCodeCounter.objects.get_or_create(pk=1, defaults={"key": secrets.token_hex(32)})
+    return row
+
+
+def _permutation_key() -> bytes:
+    global _key_cache
+    if _key_cache is None:
+        _key_cache = _counter_row().key.encode("ascii")
+    return _key_cache
+
+
+def _round(key: bytes, length: int, rnd: int, value: int, bits: int) -> int:
+    digest = hmac.new(key, f"{length}:{rnd}:{value}".encode("ascii"), hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], "big") & ((1 << bits) - 1)
+
+
+def permute(offset: int, length: int, key: bytes) -> int:
+    """Keyed bijection on [0, 10**length): balanced Feistel on the enclosing even bit width + cycle-walking."""
+    limit = 10**length
+    if not 0 <= offset < limit:
+        raise ValueError(f"offset {offset} outside the {length}-digit range")
+    half = (limit.bit_length() + 1) // 2
+    mask = (1 << half) - 1
+    value = offset
+    while True:
+        left, right = value >> half, value & mask
+        for rnd in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ _round(key, length, rnd, right, half)
+        value = (left << half) | right
+        if value < limit:
+            return value
+
+
+def code_for_index(index: int, key: bytes) -> str:
+    """Booking code for allocation ``index`` (pure function; distinct indexes give distinct codes)."""
+    offset = index
+    for length in range(MIN_CODE_LENGTH, MAX_CODE_LENGTH + 1):
+        size = band_size(length)
+        if offset < size:
+            return str(permute(offset, length, key)).zfill(length)
+        offset -= size
+    raise RuntimeError("Booking code space exhausted; raise MAX_CODE_LENGTH.")
+
+
+def _next_index() -> int:
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval(%s)", [SEQUENCE_NAME])
+            return cursor.fetchone()[0]
+    with transaction.atomic():
+        if not BookingCodeCounter.objects.filter(pk=1).update(next_index=F("next_index") + 1):
+            _counter_row()
+            BookingCodeCounter.objects.filter(pk=1).update(next_index=F("next_index") + 1)
+        return BookingCodeCounter.objects.values_list("next_index", flat=True).get(pk=1) - 1
+
+
+def allocate_booking_code() -> str:
+    """Hand out the next unused booking code."""
+    return code_for_index(_next_index(), _permutation_key())
@@ -0,0 +1,262 @@
+"""
+Booking list filters and streaming CSV / XLSX exports for the admin and agent booking pages.
+
+apply_booking_filters() is shared by the HTML lists and the exports so a download always matches what
+the page shows. Exports walk the filtered queryset with iterator(chunk_size=EXPORT_CHUNK_SIZE) (traveler,
+agent and eSewa session joined, no prefetches) and stream rows through streaming.StreamingResponse, which
+also pulls them chunk by chunk under ASGI, so memory stays flat however many bookings match. XLSX is
+written as a minimal SpreadsheetML package with inline strings (no shared-strings table to accumulate),
+deflated chunk by chunk into a non-seekable zip stream. CSV text cells that start like a formula are
+prefixed with an apostrophe so spreadsheet apps show them as text.
+"""
+from __future__ import annotations
+
+import csv
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .booking_codes import is_complete_code
+from .models import AgentProfile, BookingStatus, PaymentStatus, UserProfile
+from .refund_display import get_refund_payment_breakdown
+from .streaming import StreamingResponse, ZipSink
+
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    "Booking code",
+    "Created at",
+    "Status",
+    "Payment status",
+    "Payment method",
+    "Traveler name",
+    "Traveler email",
+    "Package",
+    "Package location",
+    "Agent name",
+    "Agent email",
+    "Travelers",
+    "List price per person",
+    "Booked price per person",
+    "Subtotal after deal",
+    "Deal savings",
+    "Reward points used",
+    "Amount paid via eSewa",
+    "Payment reference",
+    "Transaction UUID",
+    "Refunded at",
+    "eSewa refund reference",
+)
+
+
+def apply_booking_filters(queryset, params, allow_agent_filter=False):
+    """
+    Apply the booking list filters from ``params`` (request.GET): status, payment_status, package,
+    booking_code (exact when complete, prefix otherwise) and, for admins, agent. Returns
+    (queryset, filters) where filters holds the cleaned values for re-rendering the form.
+    """
+    filters = {
+        "status_filter": params.get("status", "").strip(),
+        "payment_status_filter": params.get("payment_status", "").strip(),
+        "package_id_filter": params.get("package", "").strip(),
+        "agent_id_filter": params.get("agent", "").strip() if allow_agent_filter else "",
+        "booking_code_filter": params.get("booking_code", "").strip(),
+    }
+    if filters["status_filter"] in dict(BookingStatus.choices):
+        queryset = queryset.filter(status=filters["status_filter"])
+    if filters["payment_status_filter"] in dict(PaymentStatus.choices):
+        queryset = queryset.filter(payment_status=filters["payment_status_filter"])
+    for key, lookup in (("package_id_filter", "package_id"), ("agent_id_filter", "package__agent_id")):
+        if filters[key]:
+            try:
+                queryset = queryset.filter(**{lookup: int(filters[key])})
+            except ValueError:
+                filters[key] = ""
+    if filters["booking_code_filter"]:
+        digits_only = "".join(c for c in filters["booking_code_filter"] if c.isdigit())
+        if is_complete_code(digits_only):
+            queryset = queryset.filter(booking_code=digits_only)
+        elif digits_only:
+            queryset = queryset.filter(booking_code__startswith=digits_only)
+    return queryset, filters
+
+
+def export_queryset(queryset):
+    """Restrict a filtered booking queryset to what one export row needs."""
+    return queryset.select_related(
+        "user__user_profile",
+        "package__agent__agent_profile",
+        "esewa_payment_session",
+    ).order_by("-created_at", "-id")
+
+
+def _display_name(user, profile_attr):
+    try:
+        return getattr(user, profile_attr).full_name
+    except (UserProfile.DoesNotExist, AgentProfile.DoesNotExist):
+        return user.email.split("@")[0]
+
+
+def _local(value):
+    return timezone.localtime(value).strftime("%Y-%m-%d %H:%M") if value else ""
+
+
+def export_row(booking):
+    package = booking.package
+    agent = package.agent
+    refund = get_refund_payment_breakdown(booking, package)
+    return [
+        booking.booking_code,
+        _local(booking.created_at),
+        booking.get_status_display(),
+        booking.get_payment_status_display(),
+        booking.get_payment_method_display(),
+        _display_name(booking.user, "user_profile"),
+        booking.user.email,
+        package.title,
+        f"{package.location}, {package.country}",
+        _display_name(agent, "agent_profile"),
+        agent.email,
+        refund["traveler_count"],
+        refund["list_price_per_person"],
+        refund["booked_price_per_person"],
+        refund["subtotal_after_deal"],
+        refund["deal_savings_from_list"],
+        refund["reward_points_used"],
+        refund["amount_paid_esewa"],
+        refund["payment_reference"],
+        refund["transaction_uuid"],
+        _local(booking.refunded_at),
+        booking.esewa_refund_reference,
+    ]
+
+
+def _rows(queryset):
+    for booking in export_queryset(queryset).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield export_row(booking)
+
+
+# Leading characters that make spreadsheet apps treat a CSV cell as a formula.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_safe(value):
+    """Quote text cells that would otherwise be evaluated as formulas (CSV injection)."""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """File-like object whose write() hands the value back, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_stream(queryset):
+    writer = csv.writer(_Echo())
+    yield "\ufeff"  # BOM so Excel opens UTF-8 names correctly
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in _rows(queryset):
+        yield writer.writerow([_csv_safe(value) for value in row])
+
+
+_XLSX_STATIC_PARTS = (
+    (
+        "[Content_Types].xml",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>",
+    ),
+    (
+        "_rels/.rels",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>",
+    ),
+    (
+        "xl/workbook.xml",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Bookings" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>",
+    ),
+    (
+        "xl/_rels/workbook.xml.rels",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        "</Relationships>",
+    ),
+)
+
+
+# Control characters are not allowed in XML 1.0 text.
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    text = _XML_ILLEGAL.sub("", "" if value is None else str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+def _xlsx_stream(queryset):
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS:
+            archive.writestr(name, content)
+        yield sink.drain()
+        with archive.open("xl/worksheets/sheet1.xml", mode="w") as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(EXPORT_COLUMNS).encode("utf-8"))
+            pending = []
+            for row in _rows(queryset):
+                pending.append(_xlsx_row(row))
+                if len(pending) >= EXPORT_CHUNK_SIZE:
+                    sheet.write("".join(pending).encode("utf-8"))
+                    pending = []
+                    yield sink.drain()
+            sheet.write("".join(pending).encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+def streaming_booking_export(queryset, export_format, filename_prefix):
+    """Streaming response with every booking in ``queryset`` as CSV or XLSX."""
+    stamp = timezone.localtime().strftime("%Y%m%d-%H%M")
+    if export_format == "xlsx":
+        response = StreamingResponse(
+            _xlsx_stream(queryset),
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+    else:
+        export_format = "csv"
+        response = StreamingResponse(_csv_stream(queryset), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename_prefix}-{stamp}.{export_format}"'
+    response["Cache-Control"] = "no-store"
+    return response
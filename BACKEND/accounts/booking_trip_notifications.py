@@ -6,6 +6,11 @@ Automated in-app + Expo push notifications for confirmed bookings:
 
 Run periodically via: python manage.py send_booking_trip_reminders
 (Recommend every 10–15 minutes so 24h/1h windows are hit reliably.)
+
+Due times are precomputed into ScheduledReminder when a booking is confirmed (Booking.save) and
+re-planned when a package's trip dates change (Package.save). Each run reads only pending rows with
+due_at <= now, then bulk-inserts reminders, notifications and recipients and queues pushes in batches
+after commit. Cost per run scales with the number of due reminders, not with the number of bookings.
 """
 from __future__ import annotations
 
@@ -13,11 +18,11 @@ import logging
 from datetime import date, datetime, time, timedelta
 
 from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 
 from .models import (
-    AgentProfile,
     AgentReview,
     Booking,
     BookingStatus,
@@ -29,14 +34,17 @@ from .models import (
     Package,
     PackageStatus,
     Roles,
+    ScheduledReminder,
     User,
 )
-from .push_notifications import send_expo_push_for_notification
+from .push_notifications import send_expo_push_batch
 
 logger = logging.getLogger(__name__)
 
 SYSTEM_NOTIFICATION_EMAIL = "triplink-system@notifications.local"
 DEFAULT_TRIP_START_TIME = time(9, 0)
+# Rows fetched / inserted per round trip when selecting and recording due reminders.
+REMINDER_BATCH_SIZE = 2000
 
 
 def get_system_notification_sender() -> User:
@@ -69,137 +77,233 @@ def _trip_start_datetime(trip_start_date, trip_start_time) -> datetime:
     return timezone.make_aware(naive, tz)
 
 
-def _create_notification_for_user(sender: User, title: str, message: str, notif_type: str, user_id: int):
-    with transaction.atomic():
-        notification = Notification.objects.create(
-            title=title,
-            message=message,
-            notification_type=notif_type,
-            sender=sender,
+def _reminder_texts(kind: str, pkg: dict, start_dt: datetime) -> tuple[str, str, str]:
+    """(title, message, notification_type) for a pre-trip reminder; pkg is a values() row."""
+    if kind == BookingTripReminderKind.H24:
+        loc = f"{pkg['package__location']}, {pkg['package__country']}" if pkg["package__country"] else pkg["package__location"]
+        title = f"Your trip starts in 24 hours — {pkg['package__title']}"
+        message = (
+            f"Get ready for {pkg['package__title']} in {loc}. "
+            f"Departure is scheduled for {start_dt.strftime('%b %d, %Y at %I:%M %p')} ({settings.TIME_ZONE}). "
+            "Check your itinerary and travel documents."
         )
-        NotificationRecipient.objects.create(notification=notification, user_id=user_id)
-    send_expo_push_for_notification(notification, [user_id])
+        return title, message, NotificationType.TRIP_REMINDER_24H
+    loc = f"{pkg['package__location']}" + (f", {pkg['package__country']}" if pkg["package__country"] else "")
+    title = f"Starting soon: {pkg['package__title']}"
+    message = (
+        f"Your trip to {loc} begins in about an hour "
+        f"({start_dt.strftime('%I:%M %p')}). Have a great journey!"
+    )
+    return title, message, NotificationType.TRIP_REMINDER_1H
 
 
-def process_booking_trip_reminders() -> dict:
+def _review_texts(pkg: dict) -> tuple[str, str, str]:
+    first = (pkg["package__agent__agent_profile__first_name"] or "").strip()
+    last = (pkg["package__agent__agent_profile__last_name"] or "").strip()
+    agent_label = " ".join(x for x in (first, last) if x) or pkg["package__agent__email"].split("@")[0]
+    title = f"How was {pkg['package__title']}?"
+    message = (
+        f"You have finished your trip to {pkg['package__location']}. "
+        f"Please take a moment to review your agent ({agent_label}) on TRIPLINK — it helps other travelers."
+    )
+    return title, message, NotificationType.TRIP_REVIEW_REQUEST
+
+
+def _reminder_schedule(row: dict):
+    """Yield (kind, due_at, expires_at) for a confirmed booking values() row."""
+    start_date = row["package__trip_start_date"]
+    if start_date:
+        start_dt = _trip_start_datetime(start_date, row["package__trip_start_time"])
+        yield BookingTripReminderKind.H24, start_dt - timedelta(hours=24), start_dt
+        yield BookingTripReminderKind.H1, start_dt - timedelta(hours=1), start_dt
+    end_date = row["package__trip_end_date"]
+    if end_date:
+        # Review prompt becomes due at the start of the trip end date.
+        yield BookingTripReminderKind.REVIEW, _trip_start_datetime(end_date, time(0, 0)), None
+
+
+def schedule_booking_reminders(booking_ids=None, package_ids=None) -> int:
     """
-    Send due reminders. Idempotent via BookingTripReminder rows.
-    Returns counts for logging.
+    (Re)plan ScheduledReminder rows for the given bookings / packages' bookings (all when both None).
+
+    Pending rows are replaced; kinds already sent (BookingTripReminder) are never planned again.
+    Cancelled bookings simply end up with no pending rows. Returns the number of rows planned.
     """
-    mark_overdue_packages_completed()
-    sender = get_system_notification_sender()
-    now = timezone.now()
+    bookings = Booking.objects.all()
+    if booking_ids is not None:
+        bookings = bookings.filter(pk__in=list(booking_ids))
+    if package_ids is not None:
+        bookings = bookings.filter(package_id__in=list(package_ids))
 
-    counts = {"h24": 0, "h1": 0, "review": 0}
+    planned = 0
+    with transaction.atomic():
+        ScheduledReminder.objects.filter(booking__in=bookings, sent_at__isnull=True).delete()
+        sent = set(
+            BookingTripReminder.objects.filter(booking__in=bookings).values_list("booking_id", "kind")
+        )
+        rows = (
+            bookings.filter(status=BookingStatus.CONFIRMED)
+            .values("pk", "package__trip_start_date", "package__trip_start_time", "package__trip_end_date")
+            .order_by("pk")
+        )
+        batch = []
+        for row in rows.iterator(chunk_size=REMINDER_BATCH_SIZE):
+            for kind, due_at, expires_at in _reminder_schedule(row):
+                if (row["pk"], kind) in sent:
+                    continue
+                batch.append(ScheduledReminder(booking_id=row["pk"], kind=kind, due_at=due_at, expires_at=expires_at))
+            if len(batch) >= REMINDER_BATCH_SIZE:
+                ScheduledReminder.objects.bulk_create(batch, ignore_conflicts=True)
+                planned += len(batch)
+                batch = []
+        if batch:
+            ScheduledReminder.objects.bulk_create(batch, ignore_conflicts=True)
+            planned += len(batch)
+    return planned
 
-    base_qs = (
-        Booking.objects.filter(status=BookingStatus.CONFIRMED)
-        .select_related("package", "package__agent")
-        .filter(package__trip_start_date__isnull=False)
-    )
 
-    # --- Pre-trip: 24h and 1h ---
-    for booking in base_qs.filter(
-        package__status=PackageStatus.ACTIVE,
-    ).iterator(chunk_size=200):
-        pkg = booking.package
-        start_dt = _trip_start_datetime(pkg.trip_start_date, pkg.trip_start_time)
+def _deliver_reminders(sender: User, kind: str, groups: dict, scheduled_ids) -> int:
+    """
+    Record reminders and in-app notifications for many bookings in one transaction, then queue pushes.
 
-        if now >= start_dt:
-            continue
+    ``groups`` maps (title, message, notification_type) -> list of (booking_id, user_id). Bookings that
+    share the same text (same package) share one Notification row with many recipients.
+    ``scheduled_ids`` are the ScheduledReminder rows being fulfilled; they are marked sent.
 
-        # 24 hours before start (first run after this instant)
-        if (
-            now >= start_dt - timedelta(hours=24)
-            and not BookingTripReminder.objects.filter(
-                booking=booking, kind=BookingTripReminderKind.H24
-            ).exists()
-        ):
-            loc = f"{pkg.location}, {pkg.country}" if pkg.country else pkg.location
-            title = f"Your trip starts in 24 hours — {pkg.title}"
-            message = (
-                f"Get ready for {pkg.title} in {loc}. "
-                f"Departure is scheduled for {start_dt.strftime('%b %d, %Y at %I:%M %p')} ({settings.TIME_ZONE}). "
-                "Check your itinerary and travel documents."
+    BookingTripReminder's unique (booking, kind) makes this safe against a concurrent run: the whole
+    batch rolls back on conflict and the remaining due rows are picked up by the next run.
+    Returns the number of bookings reminded.
+    """
+    if not groups:
+        return 0
+    pushes = []
+    try:
+        with transaction.atomic():
+            BookingTripReminder.objects.bulk_create(
+                [
+                    BookingTripReminder(booking_id=booking_id, kind=kind)
+                    for pairs in groups.values()
+                    for booking_id, _ in pairs
+                ],
+                batch_size=REMINDER_BATCH_SIZE,
             )
-            with transaction.atomic():
-                BookingTripReminder.objects.create(booking=booking, kind=BookingTripReminderKind.H24)
-                _create_notification_for_user(
-                    sender,
-                    title,
-                    message,
-                    NotificationType.TRIP_REMINDER_24H,
-                    booking.user_id,
-                )
-            counts["h24"] += 1
-
-        # 1 hour before start
-        if (
-            now >= start_dt - timedelta(hours=1)
-            and not BookingTripReminder.objects.filter(
-                booking=booking, kind=BookingTripReminderKind.H1
-            ).exists()
-        ):
-            loc = f"{pkg.location}" + (f", {pkg.country}" if pkg.country else "")
-            title = f"Starting soon: {pkg.title}"
-            message = (
-                f"Your trip to {loc} begins in about an hour "
-                f"({start_dt.strftime('%I:%M %p')}). Have a great journey!"
+            notifications = Notification.objects.bulk_create(
+                [
+                    Notification(title=title[:200], message=message, notification_type=notif_type, sender=sender)
+                    for (title, message, notif_type) in groups
+                ]
             )
-            with transaction.atomic():
-                BookingTripReminder.objects.create(booking=booking, kind=BookingTripReminderKind.H1)
-                _create_notification_for_user(
-                    sender,
-                    title,
-                    message,
-                    NotificationType.TRIP_REMINDER_1H,
-                    booking.user_id,
-                )
-            counts["h1"] += 1
-
-    # --- Post-trip review (same eligibility idea as AgentReviewSerializer) ---
-    review_qs = (
-        Booking.objects.filter(status=BookingStatus.CONFIRMED)
-        .select_related("package", "package__agent")
-        .filter(
-            package__trip_end_date__isnull=False,
-            package__trip_end_date__lte=date.today(),
-        )
+            recipients = []
+            for notification, pairs in zip(notifications, groups.values()):
+                user_ids = sorted({user_id for _, user_id in pairs})
+                recipients.extend(NotificationRecipient(notification=notification, user_id=uid) for uid in user_ids)
+                pushes.append((notification, user_ids))
+            NotificationRecipient.objects.bulk_create(recipients, batch_size=REMINDER_BATCH_SIZE)
+            ScheduledReminder.objects.filter(pk__in=list(scheduled_ids)).update(sent_at=timezone.now())
+            transaction.on_commit(lambda: send_expo_push_batch(pushes))
+    except IntegrityError:
+        logger.warning("Trip reminders (%s): batch conflicted with a concurrent run; will retry next run.", kind)
+        return 0
+    return sum(len(pairs) for pairs in groups.values())
+
+
+def _pending_due(kind: str, now: datetime):
+    """Rows served by the partial (due_at WHERE sent_at IS NULL) index."""
+    return ScheduledReminder.objects.filter(kind=kind, sent_at__isnull=True, due_at__lte=now)
+
+
+def _drop_unsendable(due, eligible) -> None:
+    """Due rows that can no longer be sent (trip started, booking cancelled, already reviewed...)."""
+    due.exclude(pk__in=eligible.values("pk")).delete()
+
+
+def _due_pre_trip_reminders(kind: str, now: datetime) -> tuple[dict, list]:
+    """Due 24h/1h reminders: pending rows for confirmed bookings on active packages, before trip start."""
+    due = _pending_due(kind, now)
+    eligible = due.filter(
+        booking__status=BookingStatus.CONFIRMED,
+        booking__package__status=PackageStatus.ACTIVE,
+        expires_at__gt=now,
     )
+    groups = {}
+    scheduled_ids = []
+    rows = eligible.values(
+        "pk",
+        "booking_id",
+        "booking__user_id",
+        "expires_at",
+        "booking__package__title",
+        "booking__package__location",
+        "booking__package__country",
+    ).order_by("due_at", "pk")
+    for row in rows.iterator(chunk_size=REMINDER_BATCH_SIZE):
+        pkg = {k.replace("booking__", "", 1): v for k, v in row.items()}
+        start_dt = timezone.localtime(row["expires_at"], timezone.get_current_timezone())
+        groups.setdefault(_reminder_texts(kind, pkg, start_dt), []).append((row["booking_id"], row["booking__user_id"]))
+        scheduled_ids.append(row["pk"])
+    _drop_unsendable(due, eligible)
+    return groups, scheduled_ids
 
-    for booking in review_qs.iterator(chunk_size=200):
-        pkg = booking.package
-        agent = pkg.agent
-        if AgentReview.objects.filter(user=booking.user, agent=agent).exists():
-            continue
-        # One review prompt per traveler+agent (not per booking)
-        if BookingTripReminder.objects.filter(
-            kind=BookingTripReminderKind.REVIEW,
-            booking__user_id=booking.user_id,
-            booking__package__agent_id=agent.id,
-        ).exists():
+
+def _due_review_prompts(now: datetime) -> tuple[dict, list]:
+    """
+    Due review prompts, one per traveler+agent (not per booking): NOT EXISTS a review for that agent
+    and NOT EXISTS an earlier prompt for that traveler+agent.
+    """
+    due = _pending_due(BookingTripReminderKind.REVIEW, now)
+    reviewed = AgentReview.objects.filter(
+        user_id=OuterRef("booking__user_id"),
+        agent_id=OuterRef("booking__package__agent_id"),
+    )
+    prompted = BookingTripReminder.objects.filter(
+        kind=BookingTripReminderKind.REVIEW,
+        booking__user_id=OuterRef("booking__user_id"),
+        booking__package__agent_id=OuterRef("booking__package__agent_id"),
+    )
+    eligible = due.filter(booking__status=BookingStatus.CONFIRMED).filter(~Exists(reviewed), ~Exists(prompted))
+    rows = eligible.values(
+        "pk",
+        "booking_id",
+        "booking__user_id",
+        "booking__package__agent_id",
+        "booking__package__title",
+        "booking__package__location",
+        "booking__package__agent__email",
+        "booking__package__agent__agent_profile__first_name",
+        "booking__package__agent__agent_profile__last_name",
+    ).order_by("booking_id")
+    groups = {}
+    scheduled_ids = []
+    seen = set()
+    for row in rows.iterator(chunk_size=REMINDER_BATCH_SIZE):
+        pair = (row["booking__user_id"], row["booking__package__agent_id"])
+        if pair in seen:
+            # A sibling booking with the same agent is prompted this run; this row is dropped next run.
             continue
+        seen.add(pair)
+        pkg = {k.replace("booking__", "", 1): v for k, v in row.items()}
+        groups.setdefault(_review_texts(pkg), []).append((row["booking_id"], row["booking__user_id"]))
+        scheduled_ids.append(row["pk"])
+    _drop_unsendable(due, eligible)
+    return groups, scheduled_ids
 
-        title = f"How was {pkg.title}?"
-        try:
-            agent_label = agent.agent_profile.full_name
-        except AgentProfile.DoesNotExist:
-            agent_label = agent.email.split("@")[0]
 
-        message = (
-            f"You have finished your trip to {pkg.location}. "
-            f"Please take a moment to review your agent ({agent_label}) on TRIPLINK — it helps other travelers."
-        )
+def process_booking_trip_reminders() -> dict:
+    """
+    Send due reminders. Idempotent via BookingTripReminder rows.
+    Returns counts for logging.
+    """
+    mark_overdue_packages_completed()
+    sender = get_system_notification_sender()
+    now = timezone.now()
 
-        with transaction.atomic():
-            BookingTripReminder.objects.create(booking=booking, kind=BookingTripReminderKind.REVIEW)
-            _create_notification_for_user(
-                sender,
-                title,
-                message,
-                NotificationType.TRIP_REVIEW_REQUEST,
-                booking.user_id,
-            )
-        counts["review"] += 1
+    groups, scheduled_ids = _due_pre_trip_reminders(BookingTripReminderKind.H24, now)
+    h24 = _deliver_reminders(sender, BookingTripReminderKind.H24, groups, scheduled_ids)
+
+    groups, scheduled_ids = _due_pre_trip_reminders(BookingTripReminderKind.H1, now)
+    h1 = _deliver_reminders(sender, BookingTripReminderKind.H1, groups, scheduled_ids)
+
+    groups, scheduled_ids = _due_review_prompts(now)
+    review = _deliver_reminders(sender, BookingTripReminderKind.REVIEW, groups, scheduled_ids)
 
-    return counts
+    return {"h24": h24, "h1": h1, "review": review}
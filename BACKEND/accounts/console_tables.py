@@ -0,0 +1,284 @@
+"""
+Server-side tables for the admin / agent HTML consoles (users, reviews, refunds, traveler directory).
+
+A ConsoleTable declares its choice filters (exact matches on indexed columns), a search callable
+(anchored prefix matches rather than leading-wildcard icontains) and named sort orders. Pages are
+fetched with keyset pagination: the cursor carries the sort key of the last row shown, so "Next"
+is a single WHERE (key) < (cursor) ... LIMIT query whatever the depth, instead of an OFFSET scan.
+
+Totals use count-estimate mode: on PostgreSQL the planner's row estimate (EXPLAIN) is shown as
+"about N" once it is above CONSOLE_TABLE_EXACT_COUNT_LIMIT, and smaller result sets are counted
+exactly. Other databases get a COUNT capped at the same limit, so no page runs an unbounded
+COUNT(*) over a large table.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+PAGE_SIZE = 25
+DEFAULT_EXACT_COUNT_LIMIT = 10000
+
+
+def exact_count_limit() -> int:
+    return int(getattr(settings, "CONSOLE_TABLE_EXACT_COUNT_LIMIT", DEFAULT_EXACT_COUNT_LIMIT))
+
+
+def related_count(queryset, outer_field):
+    """Correlated COUNT(*) of ``queryset`` rows whose ``outer_field`` is the outer row, 0 when none."""
+    rows = queryset.filter(**{outer_field: OuterRef("pk")}).order_by().values(outer_field)
+    return Coalesce(
+        Subquery(rows.annotate(value=Count("pk")).values("value"), output_field=IntegerField()),
+        Value(0),
+    )
+
+
+# --- keyset pagination -------------------------------------------------------------------------
+
+
+def _cursor_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()  # full precision; DjangoJSONEncoder would drop microseconds
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(row, ordering, tag=""):
+    values = [_cursor_value(getattr(row, term.lstrip("-"))) for term in ordering]
+    raw = json.dumps([tag, values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, ordering, tag=""):
+    """Sort-key values from a cursor, or None when it is missing, malformed or from another sort."""
+    if not cursor:
+        return None
+    try:
+        cursor_tag, values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if cursor_tag != tag or not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    return values
+
+
+def _beyond(ordering, values, backwards=False):
+    """Rows after ``values`` in ``ordering`` (before them when ``backwards``), as a row-value comparison."""
+    conditions = []
+    for index, term in enumerate(ordering):
+        descending = term.startswith("-") != backwards
+        name = term.lstrip("-")
+        condition = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[index]})
+        for earlier, value in zip(ordering[:index], values[:index]):
+            condition &= Q(**{earlier.lstrip("-"): value})
+        conditions.append(condition)
+    return reduce(or_, conditions)
+
+
+def _reversed(ordering):
+    return tuple(term[1:] if term.startswith("-") else f"-{term}" for term in ordering)
+
+
+def keyset_page(queryset, ordering, after=None, before=None, page_size=PAGE_SIZE, tag=""):
+    """
+    One page of ``queryset`` in ``ordering`` starting after (or ending before) a cursor.
+
+    ``ordering`` holds non-null local fields and must end in a unique one (normally "id"/"-id").
+    Returns (rows, next_cursor, prev_cursor); a cursor is None when there is nothing further that way.
+    """
+    after_key = decode_cursor(after, ordering, tag)
+    before_key = None if after_key else decode_cursor(before, ordering, tag)
+    if before_key:
+        rows = list(
+            queryset.filter(_beyond(ordering, before_key, backwards=True))
+            .order_by(*_reversed(ordering))[: page_size + 1]
+        )
+        has_prev = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        if after_key:
+            queryset = queryset.filter(_beyond(ordering, after_key))
+        rows = list(queryset.order_by(*ordering)[: page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_prev = after_key is not None
+    next_cursor = encode_cursor(rows[-1], ordering, tag) if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0], ordering, tag) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+# --- counts ------------------------------------------------------------------------------------
+
+
+def _planner_estimate(queryset):
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_count(queryset, limit=None):
+    """
+    (count, is_estimate) for ``queryset``. Exact up to ``limit`` rows; above it the PostgreSQL
+    planner estimate (or, elsewhere, ``limit`` itself) is returned with is_estimate=True.
+    """
+    limit = exact_count_limit() if limit is None else limit
+    if connection.vendor == "postgresql":
+        estimate = _planner_estimate(queryset)
+        if estimate > limit:
+            return estimate, True
+    capped = queryset.order_by().values("pk")[: limit + 1].count()
+    if capped > limit:
+        return limit, True
+    return capped, False
+
+
+# --- table declaration -------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ChoiceFilter:
+    """Exact-match filter: ``?<param>=<value>`` becomes ``.filter(<lookup>=value)`` for known values."""
+
+    param: str
+    label: str
+    lookup: str
+    choices: tuple = ()  # ((value, label), ...); values compared as strings
+    cast: object = str
+
+    def apply(self, queryset, raw, choices=None):
+        raw = (raw or "").strip()
+        allowed = {str(value) for value, _ in (self.choices if choices is None else choices)}
+        if not raw or raw not in allowed:
+            return queryset, ""
+        return queryset.filter(**{self.lookup: self.cast(raw)}), raw
+
+
+@dataclass(frozen=True)
+class SortOption:
+    label: str
+    ordering: tuple
+
+
+@dataclass
+class TablePage:
+    """Everything a template needs to render one table page and its controls."""
+
+    rows: list
+    next_cursor: str | None
+    prev_cursor: str | None
+    total: int | None
+    total_is_estimate: bool
+    search: str
+    sort: str
+    sort_options: list
+    filters: list
+    params: dict
+    page_query: str
+    search_placeholder: str = "Search"
+    hidden_params: list = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class ConsoleTable:
+    """
+    Declarative server-side table. ``prefix`` namespaces the GET parameters so two tables can share
+    a page (e.g. "t_" for travelers, "a_" for agents); single-table pages use "".
+    """
+
+    sorts: dict  # key -> SortOption; the first key is the default
+    filters: tuple = ()
+    search: object = None  # callable(queryset, term) -> queryset
+    search_placeholder: str = "Search"
+    prefix: str = ""
+    page_size: int = PAGE_SIZE
+
+    def param(self, name):
+        return f"{self.prefix}{name}"
+
+    def apply(self, queryset, params, choices=None):
+        """
+        Filter and search ``queryset`` from ``params`` (request.GET). ``choices`` maps a filter param
+        to choices computed per request (e.g. the agent list). Returns (queryset, state).
+        """
+        choices = choices or {}
+        state = {"filters": {}, "choices": choices}
+        for choice_filter in self.filters:
+            queryset, state["filters"][choice_filter.param] = choice_filter.apply(
+                queryset,
+                params.get(self.param(choice_filter.param)),
+                choices.get(choice_filter.param),
+            )
+        state["search"] = (params.get(self.param("q")) or "").strip() if self.search else ""
+        if state["search"]:
+            queryset = self.search(queryset, state["search"])
+        sort = (params.get(self.param("sort")) or "").strip()
+        state["sort"] = sort if sort in self.sorts else next(iter(self.sorts))
+        return queryset, state
+
+    def paginate(self, queryset, state, params, total=None):
+        """Keyset page of an ``apply()``-ed queryset. ``total`` skips the count when already known."""
+        ordering = self.sorts[state["sort"]].ordering
+        rows, next_cursor, prev_cursor = keyset_page(
+            queryset,
+            ordering,
+            after=params.get(self.param("after")),
+            before=params.get(self.param("before")),
+            page_size=self.page_size,
+            tag=state["sort"],
+        )
+        total_is_estimate = False
+        if total is None:
+            total, total_is_estimate = estimate_count(queryset)
+        page_query = params.copy()
+        for name in ("after", "before"):
+            page_query.pop(self.param(name), None)
+        own = {self.param(name) for name in ("q", "sort", "after", "before")}
+        own.update(self.param(f.param) for f in self.filters)
+        return TablePage(
+            rows=rows,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            total=total,
+            total_is_estimate=total_is_estimate,
+            search=state["search"],
+            sort=state["sort"],
+            sort_options=[(key, option.label) for key, option in self.sorts.items()],
+            filters=[
+                {
+                    "name": self.param(f.param),
+                    "label": f.label,
+                    "choices": state["choices"].get(f.param, f.choices),
+                    "selected": state["filters"][f.param],
+                }
+                for f in self.filters
+            ],
+            params={
+                "q": self.param("q") if self.search else "",
+                "sort": self.param("sort"),
+                "after": self.param("after"),
+                "before": self.param("before"),
+            },
+            page_query=page_query.urlencode(),
+            search_placeholder=self.search_placeholder,
+            hidden_params=[(key, value) for key, values in params.lists() if key not in own for value in values],
+        )
+
+    def page(self, queryset, params, choices=None):
+        queryset, state = self.apply(queryset, params, choices)
+        return self.paginate(queryset, state, params)
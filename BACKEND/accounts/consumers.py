@@ -164,3 +164,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def chat_message(self, event):
         """Send message to WebSocket."""
         await self.send(text_data=json.dumps(event))
+
+    async def itinerary_pdf_job(self, event):
+        """Itinerary PDF render finished (accounts/itinerary_pdf_jobs.py)."""
+        await self.send(text_data=json.dumps(event))
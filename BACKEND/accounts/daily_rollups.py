@@ -0,0 +1,184 @@
+"""
+Daily analytics rollups for the admin and agent dashboards.
+
+PlatformDailyStats (one row per local day) and AgentDailyStats (one row per agent per day) hold the
+counts the dashboards chart, so six-month series are read from at most a few hundred rollup rows instead
+of grouping the full User / Package / Booking / CustomPackage / AgentReview history on every request.
+
+refresh_daily_rollups() is incremental: it collects the days touched by rows created or updated since the
+watermark (bookings and reviews carry updated_at, so cancellations and rating edits are picked up),
+recomputes just those days from the source tables and moves the watermark forward. Runs as the scheduler
+job "daily_rollups" (every 10 minutes by default). Deleted rows are not seen by the watermark;
+``python manage.py refresh_daily_rollups --rebuild`` recomputes every day.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    AgentDailyStats,
+    AgentReview,
+    Booking,
+    BookingStatus,
+    CustomPackage,
+    DailyRollupWatermark,
+    Package,
+    PlatformDailyStats,
+    Roles,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+# Rows committed by transactions that started before the previous run may carry slightly older timestamps.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+PLATFORM_COLUMNS = ("new_travelers", "new_packages", "bookings", "custom_requests")
+AGENT_COLUMNS = (
+    "bookings",
+    "confirmed_bookings",
+    "confirmed_travelers",
+    "confirmed_revenue",
+    "reviews",
+    "rating_sum",
+)
+
+
+def _day_bounds(day):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(day, time.min), tz),
+        timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz),
+    )
+
+
+def _on_days(field, days):
+    """Index-friendly filter: ``field`` falls on one of ``days`` (local dates)."""
+    condition = Q(pk__in=[])
+    for day in days:
+        start, end = _day_bounds(day)
+        condition |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+    return condition
+
+
+def _by_day(queryset, field, days, *keys):
+    if days is not None:
+        queryset = queryset.filter(_on_days(field, days))
+    return queryset.annotate(day=TruncDate(field)).order_by().values("day", *keys)
+
+
+def _touched_days(since):
+    """Local days holding rows created (or, for bookings and reviews, updated) at or after ``since``."""
+    sources = (
+        (User.objects.filter(date_joined__gte=since), "date_joined"),
+        (Package.objects.filter(created_at__gte=since), "created_at"),
+        (CustomPackage.objects.filter(created_at__gte=since), "created_at"),
+        (Booking.objects.filter(Q(created_at__gte=since) | Q(updated_at__gte=since)), "created_at"),
+        (AgentReview.objects.filter(Q(created_at__gte=since) | Q(updated_at__gte=since)), "created_at"),
+    )
+    days = set()
+    for queryset, field in sources:
+        days.update(queryset.annotate(day=TruncDate(field)).order_by().values_list("day", flat=True).distinct())
+    return days
+
+
+def _platform_rows(days):
+    totals = defaultdict(dict)
+    for column, queryset, field in (
+        ("new_travelers", User.objects.filter(role=Roles.TRAVELER), "date_joined"),
+        ("new_packages", Package.objects.all(), "created_at"),
+        ("bookings", Booking.objects.all(), "created_at"),
+        ("custom_requests", CustomPackage.objects.all(), "created_at"),
+    ):
+        for row in _by_day(queryset, field, days).annotate(n=Count("id")):
+            totals[row["day"]][column] = row["n"]
+    return [PlatformDailyStats(day=day, **values) for day, values in totals.items()]
+
+
+def _agent_rows(days):
+    confirmed = Q(status=BookingStatus.CONFIRMED)
+    totals = defaultdict(dict)
+    for row in _by_day(Booking.objects.all(), "created_at", days, "package__agent").annotate(
+        bookings=Count("id"),
+        confirmed_bookings=Count("id", filter=confirmed),
+        confirmed_travelers=Sum("traveler_count", filter=confirmed),
+        confirmed_revenue=Sum("total_amount", filter=confirmed),
+    ):
+        totals[(row["package__agent"], row["day"])].update(
+            bookings=row["bookings"],
+            confirmed_bookings=row["confirmed_bookings"],
+            confirmed_travelers=row["confirmed_travelers"] or 0,
+            confirmed_revenue=row["confirmed_revenue"] or 0,
+        )
+    for row in _by_day(AgentReview.objects.all(), "created_at", days, "agent").annotate(
+        reviews=Count("id"),
+        rating_sum=Sum("rating"),
+    ):
+        totals[(row["agent"], row["day"])].update(reviews=row["reviews"], rating_sum=row["rating_sum"] or 0)
+    return [AgentDailyStats(agent_id=agent_id, day=day, **values) for (agent_id, day), values in totals.items()]
+
+
+def refresh_daily_rollups(rebuild: bool = False) -> int:
+    """
+    Bring the daily rollups up to date. Returns the number of days recomputed. The first run (no
+    watermark yet) and ``rebuild=True`` recompute every day.
+    """
+    started = timezone.now()
+    watermark = DailyRollupWatermark.objects.first()
+    if rebuild or watermark is None:
+        days = None
+    else:
+        days = _touched_days(watermark.processed_until - WATERMARK_OVERLAP)
+
+    if days is not None and not days:
+        DailyRollupWatermark.objects.filter(pk=watermark.pk).update(processed_until=started)
+        return 0
+
+    platform_rows = _platform_rows(days)
+    agent_rows = _agent_rows(days)
+    with transaction.atomic():
+        platform = PlatformDailyStats.objects.all()
+        agents = AgentDailyStats.objects.all()
+        if days is not None:
+            platform = platform.filter(day__in=days)
+            agents = agents.filter(day__in=days)
+        platform.delete()
+        agents.delete()
+        PlatformDailyStats.objects.bulk_create(platform_rows, batch_size=BATCH_SIZE)
+        AgentDailyStats.objects.bulk_create(agent_rows, batch_size=BATCH_SIZE)
+        if watermark is None:
+            DailyRollupWatermark.objects.create(processed_until=started)
+        else:
+            DailyRollupWatermark.objects.filter(pk=watermark.pk).update(processed_until=started)
+
+    recomputed = len(days) if days is not None else len({row.day for row in [*platform_rows, *agent_rows]})
+    logger.info("Daily rollups refreshed: %s day(s) recomputed%s.", recomputed, " (full rebuild)" if days is None else "")
+    return recomputed
+
+
+def ensure_daily_rollups() -> None:
+    """Build the rollups on first use (before the scheduler has run once)."""
+    if not DailyRollupWatermark.objects.exists():
+        refresh_daily_rollups()
+
+
+def monthly_totals(queryset, months, columns):
+    """
+    Sum rollup ``columns`` per month in one query. ``months`` is a list of (first_day, next_month_first_day)
+    date pairs; returns {column: [total per month]}.
+    """
+    aggregates = {}
+    for i, (start, end) in enumerate(months):
+        in_month = Q(day__gte=start, day__lt=end)
+        for column in columns:
+            aggregates[f"{column}_{i}"] = Sum(column, filter=in_month)
+    row = queryset.filter(day__gte=months[0][0], day__lt=months[-1][1]).aggregate(**aggregates)
+    return {column: [row[f"{column}_{i}"] or 0 for i in range(len(months))] for column in columns}
@@ -0,0 +1,247 @@
+"""
+Audience-targeted deal notifications.
+
+A new deal is no longer broadcast to every traveler. Recipients are resolved from signals we already
+store, strongest first:
+- bookmark          travelers who bookmarked the deal's package
+- past_booker       travelers with a confirmed booking on any of the agent's packages
+- country_interest  travelers who bookmarked, booked or requested a custom trip in the same country
+
+Bookmark and past-booker travelers are notified right away unless they already received
+DEAL_NOTIFICATION_CAP promotion notifications within DEAL_NOTIFICATION_CAP_WINDOW_HOURS; capped
+travelers and country-interest travelers get a DealDigestEntry instead. send_deal_digests() (run by
+the scheduler) later folds each traveler's queued deals into a single notification.
+Travelers who already booked the package are never targeted.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .booking_trip_notifications import get_system_notification_sender
+from .models import (
+    Booking,
+    BookingStatus,
+    CustomPackage,
+    DealAudienceReason,
+    DealDigestEntry,
+    Notification,
+    NotificationRecipient,
+    NotificationType,
+    PackageBookmark,
+    Roles,
+    User,
+)
+from .push_notifications import send_expo_push_batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NOTIFICATION_CAP = 2
+DEFAULT_CAP_WINDOW_HOURS = 24
+DEFAULT_DIGEST_DELAY_HOURS = 12
+DIGEST_USER_BATCH_SIZE = 500
+DIGEST_MAX_LISTED_DEALS = 5
+
+IMMEDIATE_REASONS = (DealAudienceReason.BOOKMARK, DealAudienceReason.PAST_BOOKER)
+
+
+def _notification_cap() -> int:
+    return int(getattr(settings, "DEAL_NOTIFICATION_CAP", DEFAULT_NOTIFICATION_CAP))
+
+
+def _cap_window() -> timedelta:
+    return timedelta(hours=float(getattr(settings, "DEAL_NOTIFICATION_CAP_WINDOW_HOURS", DEFAULT_CAP_WINDOW_HOURS)))
+
+
+def _digest_delay() -> timedelta:
+    return timedelta(hours=float(getattr(settings, "DEAL_DIGEST_DELAY_HOURS", DEFAULT_DIGEST_DELAY_HOURS)))
+
+
+def resolve_deal_audience(deal) -> dict[int, str]:
+    """Map traveler id -> strongest DealAudienceReason for the deal's package."""
+    package = deal.package
+    audience: dict[int, str] = {}
+
+    def add(user_ids, reason):
+        for user_id in user_ids:
+            audience.setdefault(user_id, reason)
+
+    add(
+        PackageBookmark.objects.filter(package_id=package.pk).values_list("user_id", flat=True),
+        DealAudienceReason.BOOKMARK,
+    )
+    add(
+        Booking.objects.filter(package__agent_id=deal.agent_id, status=BookingStatus.CONFIRMED)
+        .values_list("user_id", flat=True)
+        .distinct(),
+        DealAudienceReason.PAST_BOOKER,
+    )
+    country = (package.country or "").strip()
+    if country:
+        add(
+            PackageBookmark.objects.filter(package__country__iexact=country).values_list("user_id", flat=True).distinct(),
+            DealAudienceReason.COUNTRY_INTEREST,
+        )
+        add(
+            Booking.objects.filter(package__country__iexact=country, status=BookingStatus.CONFIRMED)
+            .values_list("user_id", flat=True)
+            .distinct(),
+            DealAudienceReason.COUNTRY_INTEREST,
+        )
+        add(
+            CustomPackage.objects.filter(country__iexact=country).values_list("user_id", flat=True).distinct(),
+            DealAudienceReason.COUNTRY_INTEREST,
+        )
+
+    if not audience:
+        return audience
+    already_booked = set(
+        Booking.objects.filter(package_id=package.pk, status=BookingStatus.CONFIRMED).values_list("user_id", flat=True)
+    )
+    eligible = set(
+        User.objects.filter(pk__in=list(audience), role=Roles.TRAVELER, is_active=True).values_list("pk", flat=True)
+    )
+    return {uid: reason for uid, reason in audience.items() if uid in eligible and uid not in already_booked}
+
+
+def _capped_user_ids(user_ids, now) -> set[int]:
+    """Travelers who already received the maximum number of promotion notifications in the cap window."""
+    cap = _notification_cap()
+    if not user_ids:
+        return set()
+    if cap <= 0:
+        return set(user_ids)
+    return set(
+        NotificationRecipient.objects.filter(
+            user_id__in=list(user_ids),
+            created_at__gte=now - _cap_window(),
+            notification__notification_type=NotificationType.PROMOTION,
+        )
+        .values("user_id")
+        .annotate(n=Count("id"))
+        .filter(n__gte=cap)
+        .values_list("user_id", flat=True)
+    )
+
+
+def _deal_texts(deal):
+    package = deal.package
+    valid_until_str = deal.valid_until.strftime("%b %d, %Y") if deal.valid_until else ""
+    title = f"Hot Deal: {package.title}"
+    message = f"{deal.discount_percent}% off! Book before {valid_until_str}."
+    return title[:200], message
+
+
+def create_and_send_deal_notification(deal) -> dict:
+    """
+    Notify the deal's audience: immediate in-app + push for strong signals under the cap, digest
+    entries for everyone else. Pushes are sent after commit. Returns {"notified", "queued"}.
+
+    :param deal: Deal model instance (must have package and agent populated)
+    """
+    now = timezone.now()
+    audience = resolve_deal_audience(deal)
+    if not audience:
+        logger.info("No interested travelers to notify for deal %s", deal.id)
+        return {"notified": 0, "queued": 0}
+
+    strong = {uid for uid, reason in audience.items() if reason in IMMEDIATE_REASONS}
+    immediate = strong - _capped_user_ids(strong, now)
+    queued = {uid: reason for uid, reason in audience.items() if uid not in immediate}
+
+    title, message = _deal_texts(deal)
+    with transaction.atomic():
+        if immediate:
+            notification = Notification.objects.create(
+                title=title,
+                message=message,
+                notification_type=NotificationType.PROMOTION,
+                sender=deal.agent,
+            )
+            NotificationRecipient.objects.bulk_create(
+                [NotificationRecipient(notification=notification, user_id=uid) for uid in sorted(immediate)]
+            )
+            transaction.on_commit(lambda: send_expo_push_batch([(notification, immediate)]))
+        DealDigestEntry.objects.bulk_create(
+            [DealDigestEntry(user_id=uid, deal=deal, reason=reason) for uid, reason in sorted(queued.items())],
+            ignore_conflicts=True,
+        )
+
+    logger.info("Deal %s: notified %s traveler(s), queued %s for digest", deal.id, len(immediate), len(queued))
+    return {"notified": len(immediate), "queued": len(queued)}
+
+
+def _digest_texts(deals):
+    count = len(deals)
+    title = "A new deal picked for you" if count == 1 else f"{count} new deals picked for you"
+    lines = [f"{d.package.title}: {d.discount_percent}% off" for d in deals[:DIGEST_MAX_LISTED_DEALS]]
+    if count > DIGEST_MAX_LISTED_DEALS:
+        lines.append(f"and {count - DIGEST_MAX_LISTED_DEALS} more")
+    return title, "\n".join(lines)
+
+
+def send_deal_digests(now=None) -> dict:
+    """
+    Send one digest notification per traveler whose oldest queued deal has waited DEAL_DIGEST_DELAY_HOURS.
+    Deals that expired while queued are dropped. Returns {"digests", "deals"}.
+    """
+    now = now or timezone.now()
+    pending = DealDigestEntry.objects.filter(sent_at__isnull=True)
+    ready_user_ids = list(
+        pending.values("user_id")
+        .annotate(first_queued=Min("created_at"))
+        .filter(first_queued__lte=now - _digest_delay())
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+    )
+    counts = {"digests": 0, "deals": 0}
+    if not ready_user_ids:
+        return counts
+
+    sender = get_system_notification_sender()
+
+    for i in range(0, len(ready_user_ids), DIGEST_USER_BATCH_SIZE):
+        user_ids = ready_user_ids[i : i + DIGEST_USER_BATCH_SIZE]
+        with transaction.atomic():
+            entries = list(
+                pending.select_for_update()
+                .filter(user_id__in=user_ids)
+                .select_related("deal", "deal__package")
+                .order_by("user_id", "-deal__discount_percent", "deal_id")
+            )
+            deals_by_user: dict[int, list] = {}
+            for entry in entries:
+                if entry.deal.valid_until and entry.deal.valid_until < now:
+                    continue
+                deals_by_user.setdefault(entry.user_id, []).append(entry.deal)
+
+            users_by_text: dict[tuple, set] = {}
+            for user_id, deals in deals_by_user.items():
+                users_by_text.setdefault(_digest_texts(deals), set()).add(user_id)
+
+            push_items = []
+            for (title, message), text_user_ids in users_by_text.items():
+                notification = Notification.objects.create(
+                    title=title,
+                    message=message,
+                    notification_type=NotificationType.PROMOTION,
+                    sender=sender,
+                )
+                NotificationRecipient.objects.bulk_create(
+                    [NotificationRecipient(notification=notification, user_id=uid) for uid in sorted(text_user_ids)]
+                )
+                push_items.append((notification, text_user_ids))
+
+            DealDigestEntry.objects.filter(pk__in=[e.pk for e in entries]).update(sent_at=now)
+            if push_items:
+                transaction.on_commit(lambda items=push_items: send_expo_push_batch(items))
+        counts["digests"] += len(deals_by_user)
+        counts["deals"] += sum(len(d) for d in deals_by_user.values())
+
+    logger.info("Deal digests: sent %s digest(s) covering %s deal(s)", counts["digests"], counts["deals"])
+    return counts
@@ -0,0 +1,401 @@
+"""
+eSewa payment status checks and booking confirmation.
+
+Shared by EsewaPaymentVerifyView (traveler taps "Verify") and the background reconciliation job,
+which confirms sessions whose client never called verify (app closed after paying, network drop).
+Confirmation is idempotent: a session is turned into at most one booking, and reward points are
+deducted only when that booking is created.
+
+Status lookups go through one pooled requests.Session (keep-alive, bounded connect/read timeouts) and a
+circuit breaker: after ESEWA_BREAKER_FAILURES consecutive transport failures further calls fail fast
+for ESEWA_BREAKER_RESET_SECONDS instead of tying up request threads and workers. The reconciliation
+worker fetches statuses in parallel threads; all database writes stay on the calling thread.
+
+Sessions leave the worker's queue once they are settled: VERIFIED, CLOSED (canceled, expired or
+refunded at eSewa) or NEEDS_REFUND (paid while the traveler already had a booking). Sessions still
+pending are re-checked with a backoff that grows with their age, least recently checked first.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import (
+    Booking,
+    BookingAgentType,
+    BookingStatus,
+    EsewaPaymentSession,
+    EsewaPaymentSessionStatus,
+    PaymentMethod,
+    PaymentStatus,
+    RewardPointsEntry,
+    UserProfile,
+    mark_custom_package_completed_if_booked,
+)
+from .rewards import adjust_reward_points
+from .seat_inventory import convert_hold
+
+logger = logging.getLogger(__name__)
+
+# Sessions younger than this are left to the traveler's own verify call.
+RECONCILE_MIN_AGE = timedelta(minutes=2)
+# Sessions older than this are no longer checked (eSewa UAT/live status lookups expire).
+RECONCILE_MAX_AGE = timedelta(hours=24)
+# Re-check interval: a quarter of the session's age, between RECONCILE_MIN_AGE and this.
+RECONCILE_MAX_BACKOFF = timedelta(hours=1)
+RECONCILE_BATCH_SIZE = 100
+RECONCILE_WORKERS = 8
+
+RECONCILE_STATUSES = (
+    EsewaPaymentSessionStatus.INITIATED,
+    EsewaPaymentSessionStatus.SUCCESS_REDIRECTED,
+    EsewaPaymentSessionStatus.VERIFY_FAILED,
+)
+# eSewa statuses after which the payment can no longer complete.
+ESEWA_TERMINAL_STATUSES = ("CANCELED", "NOT_FOUND", "FULL_REFUND", "PARTIAL_REFUND")
+
+
+class EsewaAlreadyBooked(Exception):
+    """The traveler already holds a confirmed booking for this package."""
+
+
+class EsewaUnavailable(RuntimeError):
+    """Status call not attempted because the circuit breaker is open."""
+
+
+def _money(value):
+    return Decimal(str(value or "0")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _money_str(value):
+    return format(_money(value), ".2f")
+
+
+def _esewa_product_code():
+    return getattr(settings, "ESEWA_PRODUCT_CODE", "EPAYTEST")
+
+
+def _esewa_status_url():
+    return getattr(settings, "ESEWA_STATUS_URL", "https://rc.esewa.com.np/api/epay/transaction/status/")
+
+
+def _esewa_status_params(payment_session):
+    return {
+        "product_code": payment_session.product_code or _esewa_product_code(),
+        # Must match the amount sent to eSewa when initiating the payment
+        "total_amount": _money_str(payment_session.payable_amount or payment_session.total_amount),
+        "transaction_uuid": payment_session.transaction_uuid,
+    }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. Open after ``threshold`` failures; after ``reset_after``
+    seconds one trial call is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = max(int(threshold), 1)
+        self.reset_after = float(reset_after)
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+_breaker = CircuitBreaker(
+    threshold=getattr(settings, "ESEWA_BREAKER_FAILURES", 5),
+    reset_after=getattr(settings, "ESEWA_BREAKER_RESET_SECONDS", 60),
+)
+
+
+def _status_http_session() -> requests.Session:
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=max(RECONCILE_WORKERS, int(getattr(settings, "ESEWA_RECONCILE_WORKERS", RECONCILE_WORKERS))),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["Accept"] = "application/json"
+                _http_session = session
+    return _http_session
+
+
+def _status_timeout():
+    return (
+        float(getattr(settings, "ESEWA_STATUS_CONNECT_TIMEOUT", 5)),
+        float(getattr(settings, "ESEWA_STATUS_READ_TIMEOUT", 15)),
+    )
+
+
+def _verify_esewa_transaction(payment_session):
+    if not _breaker.allow():
+        raise EsewaUnavailable("Unable to verify eSewa payment right now: eSewa is not responding, please retry shortly.")
+    try:
+        res = _status_http_session().get(
+            _esewa_status_url(),
+            params=_esewa_status_params(payment_session),
+            timeout=_status_timeout(),
+        )
+        if res.status_code >= 500:
+            raise requests.HTTPError(f"HTTP {res.status_code}", response=res)
+    except requests.RequestException as exc:
+        _breaker.record_failure()
+        raise RuntimeError(f"Unable to verify eSewa payment right now: {exc}") from exc
+    # eSewa answered; 4xx (e.g. unknown transaction) is a business answer, not an outage.
+    _breaker.record_success()
+    if res.status_code >= 400:
+        raise RuntimeError(f"Unable to verify eSewa payment right now: HTTP {res.status_code}")
+
+    try:
+        payload = res.json()
+    except ValueError as exc:
+        raise RuntimeError("Invalid response received from eSewa verification API.") from exc
+
+    return payload
+
+
+def _status_fields(verification_payload):
+    payload = verification_payload if isinstance(verification_payload, dict) else {}
+    esewa_status_value = str(payload.get("status") or "").upper()
+    ref_id = str(payload.get("ref_id") or payload.get("transaction_code") or "").strip()
+    return payload, esewa_status_value, ref_id
+
+
+def _store_status(payment_session, verification_payload, status) -> str:
+    payload, esewa_status_value, ref_id = _status_fields(verification_payload)
+    payment_session.verification_payload = payload
+    payment_session.esewa_status = esewa_status_value
+    payment_session.payment_reference = ref_id
+    payment_session.status = status
+    payment_session.save(update_fields=["verification_payload", "esewa_status", "payment_reference", "status", "updated_at"])
+    return esewa_status_value
+
+
+def mark_esewa_session_unverified(payment_session, verification_payload) -> str:
+    """
+    Store a non-COMPLETE status response on the session (CLOSED when the status is terminal at eSewa,
+    VERIFY_FAILED otherwise). Returns the eSewa status.
+    """
+    _, esewa_status_value, _ = _status_fields(verification_payload)
+    if esewa_status_value in ESEWA_TERMINAL_STATUSES:
+        status = EsewaPaymentSessionStatus.CLOSED
+    else:
+        status = EsewaPaymentSessionStatus.VERIFY_FAILED
+    return _store_status(payment_session, verification_payload, status)
+
+
+def mark_esewa_session_needs_refund(payment_session, verification_payload) -> None:
+    """A COMPLETE payment that could not become a booking (EsewaAlreadyBooked): park it for a manual refund."""
+    _store_status(payment_session, verification_payload, EsewaPaymentSessionStatus.NEEDS_REFUND)
+    logger.warning(
+        "eSewa %s: paid but traveler already booked package %s; needs manual refund.",
+        payment_session.transaction_uuid,
+        payment_session.package_id,
+    )
+
+
+def confirm_esewa_session(payment_session_pk, verification_payload):
+    """
+    Turn a COMPLETE eSewa session into a confirmed booking (idempotent).
+
+    Returns (payment_session, booking, remaining_reward_points, created). remaining_reward_points is
+    None unless points were deducted now. Raises EsewaAlreadyBooked when the traveler already has a
+    confirmed booking for the package from another session.
+    """
+    payload, esewa_status_value, ref_id = _status_fields(verification_payload)
+    remaining_reward_points = None
+    with transaction.atomic():
+        payment_session = (
+            EsewaPaymentSession.objects.select_for_update()
+            .select_related("package", "booking", "user")
+            .get(pk=payment_session_pk)
+        )
+        if payment_session.booking_id:
+            return payment_session, payment_session.booking, None, False
+
+        if Booking.objects.filter(
+            user_id=payment_session.user_id,
+            package_id=payment_session.package_id,
+            status=BookingStatus.CONFIRMED,
+        ).exists():
+            raise EsewaAlreadyBooked("You have already booked this package.")
+
+        reward_points_used = int(payment_session.reward_points_used or 0)
+        booking = Booking.objects.create(
+            user_id=payment_session.user_id,
+            package=payment_session.package,
+            status=BookingStatus.CONFIRMED,
+            traveler_count=max(int(payment_session.traveler_count or 1), 1),
+            agent_type=payment_session.agent_type or BookingAgentType.REGULAR,
+            price_per_person_snapshot=payment_session.price_per_person_snapshot,
+            total_amount=payment_session.total_amount,
+            payment_method=PaymentMethod.ESEWA,
+            payment_status=PaymentStatus.PAID,
+            payment_reference=ref_id,
+            transaction_uuid=payment_session.transaction_uuid,
+            reward_points_used=reward_points_used,
+        )
+
+        convert_hold(payment_session, booking.traveler_count)
+        mark_custom_package_completed_if_booked(payment_session.package)
+
+        # Deduct any reward points used for this payment session (only once, when the booking is created)
+        if reward_points_used > 0:
+            profile = UserProfile.objects.select_for_update().filter(user_id=payment_session.user_id).first()
+            if profile is not None:
+                current_points = int(profile.reward_points or 0)
+                # Points may have been spent elsewhere since initiation; never go below zero.
+                deducted = min(current_points, reward_points_used)
+                adjust_reward_points(
+                    payment_session.user_id, -deducted, RewardPointsEntry.Kind.REDEEMED, booking=booking
+                )
+                remaining_reward_points = current_points - deducted
+
+        payment_session.booking = booking
+        payment_session.verification_payload = payload
+        payment_session.esewa_status = esewa_status_value
+        payment_session.payment_reference = ref_id
+        payment_session.status = EsewaPaymentSessionStatus.VERIFIED
+        payment_session.save(
+            update_fields=[
+                "booking",
+                "verification_payload",
+                "esewa_status",
+                "payment_reference",
+                "status",
+                "updated_at",
+            ]
+        )
+    return payment_session, booking, remaining_reward_points, True
+
+
+def _pending_sessions(now):
+    return (
+        EsewaPaymentSession.objects.filter(
+            Q(next_check_at__isnull=True) | Q(next_check_at__lte=now),
+            status__in=RECONCILE_STATUSES,
+            booking__isnull=True,
+            created_at__gte=now - RECONCILE_MAX_AGE,
+            created_at__lte=now - RECONCILE_MIN_AGE,
+        )
+        .order_by(F("last_checked_at").asc(nulls_first=True), "created_at")
+    )
+
+
+def _next_check_at(payment_session, now):
+    backoff = min(max((now - payment_session.created_at) / 4, RECONCILE_MIN_AGE), RECONCILE_MAX_BACKOFF)
+    return now + backoff
+
+
+def _fetch_status(payment_session):
+    try:
+        return payment_session, _verify_esewa_transaction(payment_session), None
+    except RuntimeError as exc:
+        return payment_session, None, exc
+
+
+def reconcile_pending_esewa_sessions(limit: int = RECONCILE_BATCH_SIZE, workers=None) -> dict:
+    """
+    Check pending sessions against the eSewa status API and confirm the completed ones.
+    Status calls run in parallel; confirmations run here, one short transaction each.
+    Sessions still pending at eSewa are only re-scheduled (last_checked_at / next_check_at).
+    Returns counts.
+    """
+    counts = {"checked": 0, "confirmed": 0, "unverified": 0, "refund": 0, "errors": 0, "skipped": 0}
+    now = timezone.now()
+    sessions = list(_pending_sessions(now)[:limit])
+    if not sessions:
+        return counts
+    results = []
+    if _breaker.is_open:
+        # Half-open: probe with a single call before fanning out again.
+        results.append(_fetch_status(sessions[0]))
+        sessions = sessions[1:]
+        if _breaker.is_open:
+            counts["skipped"] += len(sessions)
+            sessions = []
+
+    if sessions:
+        workers = workers or int(getattr(settings, "ESEWA_RECONCILE_WORKERS", RECONCILE_WORKERS))
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sessions)))) as pool:
+            results.extend(pool.map(_fetch_status, sessions))
+
+    # Back off every session eSewa was actually asked about (answered or failed), not the skipped ones.
+    attempted = [s for s, _, error in results if not isinstance(error, EsewaUnavailable)]
+    for payment_session in attempted:
+        payment_session.last_checked_at = now
+        payment_session.next_check_at = _next_check_at(payment_session, now)
+    EsewaPaymentSession.objects.bulk_update(attempted, ["last_checked_at", "next_check_at"])
+
+    for payment_session, payload, error in results:
+        if error is not None:
+            if isinstance(error, EsewaUnavailable):
+                counts["skipped"] += 1
+            else:
+                counts["errors"] += 1
+                logger.warning("eSewa reconcile %s: %s", payment_session.transaction_uuid, error)
+            continue
+        counts["checked"] += 1
+        _, esewa_status_value, _ = _status_fields(payload)
+        if esewa_status_value != "COMPLETE":
+            # PENDING means the traveler may still be paying; other states are stored once for visibility,
+            # terminal ones always (they close the session).
+            changed = payment_session.esewa_status != esewa_status_value
+            if esewa_status_value not in ("", "PENDING") and (changed or esewa_status_value in ESEWA_TERMINAL_STATUSES):
+                mark_esewa_session_unverified(payment_session, payload)
+                counts["unverified"] += 1
+            continue
+        try:
+            _, _, _, created = confirm_esewa_session(payment_session.pk, payload)
+        except EsewaAlreadyBooked:
+            mark_esewa_session_needs_refund(payment_session, payload)
+            counts["refund"] += 1
+            continue
+        if created:
+            counts["confirmed"] += 1
+    logger.info("eSewa reconcile: %s", counts)
+    return counts
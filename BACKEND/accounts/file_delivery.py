@@ -0,0 +1,185 @@
+"""
+File delivery from the default (media) storage: itinerary PDF previews and /media/ uploads.
+
+serve_storage_file() streams the stored file through streaming.StreamingFileResponse in BLOCK_SIZE
+chunks (block by block under ASGI as well), so nothing is read into Python memory up front, and
+answers HTTP caching and partial-content requests itself:
+If-None-Match / If-Modified-Since (304), If-Match / If-Unmodified-Since (412), and a single
+"Range: bytes=..." (206, 416 when unsatisfiable; If-Range is honoured, multi-range requests get
+the whole file). With FILE_DELIVERY_OFFLOAD set and local-disk storage, the body is left to the
+front server instead: "x-accel-redirect" (nginx, internal location FILE_DELIVERY_ACCEL_PREFIX
+aliased to MEDIA_ROOT) or "x-sendfile" (Apache mod_xsendfile, lighttpd). The front server then
+also handles Range. Remote storages (S3/R2) are always streamed.
+"""
+from __future__ import annotations
+
+import mimetypes
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .streaming import StreamingFileResponse
+
+BLOCK_SIZE = 64 * 1024
+OFFLOAD_MODES = ("x-accel-redirect", "x-sendfile")
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _RangeReader:
+    """Read at most ``length`` bytes of ``fh`` from ``start``; deliberately not seekable, so
+    FileResponse does not try to size it (Content-Length is set by the caller)."""
+
+    def __init__(self, fh, start, length):
+        fh.seek(start)
+        self._fh = fh
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._fh.close()
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive for a single satisfiable range, None to ignore the header, or "unsatisfiable"."""
+    match = _RANGE.match(header.strip().replace(" ", ""))
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if size == 0:  # no byte of an empty file can be addressed
+        return "unsatisfiable"
+    if not first:  # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return etag is not None and if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and last_modified is not None and int(last_modified) <= since
+
+
+def _offload_mode(storage):
+    mode = (getattr(settings, "FILE_DELIVERY_OFFLOAD", "") or "").lower()
+    if mode not in OFFLOAD_MODES:
+        return None
+    try:
+        storage.path("")
+    except NotImplementedError:  # remote storage: nothing on the front server's disk
+        return None
+    return mode
+
+
+def _offloaded(mode, storage, name, content_type):
+    response = HttpResponse(content_type=content_type)
+    if mode == "x-accel-redirect":
+        prefix = getattr(settings, "FILE_DELIVERY_ACCEL_PREFIX", "/protected-media/").rstrip("/")
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(name)}"
+    else:
+        response["X-Sendfile"] = storage.path(name)
+    return response
+
+
+def serve_storage_file(
+    request,
+    name,
+    *,
+    storage=None,
+    content_type=None,
+    filename="",
+    as_attachment=False,
+    etag=None,
+    cache_control=None,
+):
+    """
+    Response for stored file ``name``. ``etag`` (quoted) defaults to one derived from size and
+    modification time; pass a content hash when the caller has one.
+    """
+    storage = storage or default_storage
+    try:
+        if not storage.exists(name):
+            raise Http404("File not found.")
+        size = storage.size(name)
+        try:
+            last_modified = storage.get_modified_time(name).timestamp()
+        except NotImplementedError:
+            last_modified = None
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("File not found.")
+    if etag is None:
+        etag = f'"{size:x}-{int(last_modified or 0):x}"'
+    content_type = content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        response = conditional
+    elif (mode := _offload_mode(storage)) is not None:
+        response = _offloaded(mode, storage, name, content_type)
+    else:
+        byte_range = None
+        if request.method in ("GET", "HEAD") and "HTTP_RANGE" in request.META:
+            if _if_range_matches(request, etag, last_modified):
+                byte_range = _byte_range(request.META["HTTP_RANGE"], size)
+        if byte_range == "unsatisfiable":
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        else:
+            fh = storage.open(name, "rb")
+            if byte_range:
+                start, end = byte_range
+                body = _RangeReader(fh, start, end - start + 1)
+            else:
+                body = fh
+            response = StreamingFileResponse(
+                body, content_type=content_type, as_attachment=as_attachment, filename=filename
+            )
+            response.block_size = BLOCK_SIZE
+            if byte_range:
+                response.status_code = 206
+                response["Content-Range"] = f"bytes {start}-{end}/{size}"
+                response["Content-Length"] = str(end - start + 1)
+            else:
+                response["Content-Length"] = str(size)
+            response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    if cache_control:
+        response["Cache-Control"] = cache_control
+    if filename and "Content-Disposition" not in response and response.status_code < 300:
+        disposition = "attachment" if as_attachment else "inline"
+        response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    return response
+
+
+def serve_media(request, path):
+    """/media/<path> for local-disk storage (replaces django.views.static.serve)."""
+    name = posixpath.normpath(path).lstrip("/")
+    if not name or name == "." or name.startswith("..") or path.endswith("/"):
+        raise Http404("File not found.")
+    return serve_storage_file(request, name)
@@ -0,0 +1,175 @@
+"""
+Idempotency-Key support for write API endpoints.
+
+Mobile clients retry on flaky networks; without a key every retry books again, opens another eSewa
+payment session or re-sends a notification. Decorate a DRF view method with @idempotent and clients
+may send an ``Idempotency-Key`` header (any unique string per logical action, e.g. a UUID):
+
+- first request: the key is reserved with a fingerprint of the method, path and body, then the view
+  runs; a successful (2xx) response is stored with the key.
+- retry with the same key and body: the stored response is replayed (header Idempotent-Replayed: true).
+- same key while the first request is still running: 409 with code "idempotency_in_progress" and
+  Retry-After, retry shortly (other 409s from the view are final answers).
+- same key with a different body/endpoint: 422.
+- error responses (4xx/5xx) and exceptions release the key, so a corrected retry runs normally.
+
+Requests without the header behave exactly as before. Keys expire after IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import response, status
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL_HOURS = 24
+# An in-progress reservation older than this is assumed abandoned (worker killed mid-request).
+IN_PROGRESS_TIMEOUT = timedelta(minutes=2)
+IN_PROGRESS_CODE = "idempotency_in_progress"
+IN_PROGRESS_RETRY_AFTER_SECONDS = 1
+
+
+def _ttl() -> timedelta:
+    return timedelta(hours=float(getattr(settings, "IDEMPOTENCY_KEY_TTL_HOURS", DEFAULT_TTL_HOURS)))
+
+
+def _canonical_body(request):
+    data = request.data
+    if hasattr(data, "lists"):
+        body = {key: [str(v) for v in values] for key, values in data.lists()}
+    else:
+        body = data
+    files = {
+        name: [(f.name, f.size) for f in request.FILES.getlist(name)]
+        for name in getattr(request, "FILES", {})
+    }
+    return {"body": body, "files": files}
+
+
+def request_fingerprint(request, kwargs) -> str:
+    payload = {
+        "method": request.method,
+        "path": request.path,
+        "kwargs": kwargs,
+        **_canonical_body(request),
+    }
+    raw = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _error(detail, code):
+    return response.Response({"detail": detail}, status=code)
+
+
+def _replay(record):
+    res = response.Response(record.response_body, status=record.response_status)
+    res["Idempotent-Replayed"] = "true"
+    return res
+
+
+def _reserve(request, key, fingerprint):
+    """Return (record, created). Expired or abandoned reservations are taken over."""
+    now = timezone.now()
+    defaults = {"method": request.method, "path": request.path[:255], "request_hash": fingerprint}
+    try:
+        with transaction.atomic():
+            record, created = IdempotencyKey.objects.get_or_create(user=request.user, key=key, defaults=defaults)
+    except IntegrityError:
+        record, created = IdempotencyKey.objects.get(user=request.user, key=key), False
+    if created:
+        return record, True
+
+    stale = record.created_at < now - _ttl() or (
+        record.status == IdempotencyKey.KeyStatus.IN_PROGRESS and record.created_at < now - IN_PROGRESS_TIMEOUT
+    )
+    if stale:
+        # Conditional update so only one concurrent retry takes the stale reservation over.
+        taken = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).update(
+            created_at=now,
+            status=IdempotencyKey.KeyStatus.IN_PROGRESS,
+            response_status=None,
+            response_body=None,
+            completed_at=None,
+            **defaults,
+        )
+        if taken:
+            record.refresh_from_db()
+            return record, True
+        record.refresh_from_db()
+    return record, False
+
+
+def idempotent(view_method):
+    """Decorator for APIView.post/create: honours the Idempotency-Key request header."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = (request.headers.get(IDEMPOTENCY_HEADER) or "").strip()
+        if not key or not getattr(request.user, "is_authenticated", False):
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters.", status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request, kwargs)
+        record, created = _reserve(request, key, fingerprint)
+        if not created:
+            if record.request_hash != fingerprint:
+                return _error(
+                    f"{IDEMPOTENCY_HEADER} was already used for a different request.",
+                    status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status == IdempotencyKey.KeyStatus.COMPLETED:
+                return _replay(record)
+            res = response.Response(
+                {
+                    "detail": "A request with this Idempotency-Key is still being processed. Please retry shortly.",
+                    "code": IN_PROGRESS_CODE,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+            res["Retry-After"] = str(IN_PROGRESS_RETRY_AFTER_SECONDS)
+            return res
+
+        try:
+            res = view_method(self, request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+
+        if 200 <= res.status_code < 300 and hasattr(res, "data"):
+            try:
+                body = json.loads(json.dumps(res.data, cls=DjangoJSONEncoder))
+            except (TypeError, ValueError):
+                logger.warning("Idempotency: response for %s is not JSON-serializable; key released.", request.path)
+                IdempotencyKey.objects.filter(pk=record.pk).delete()
+                return res
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                status=IdempotencyKey.KeyStatus.COMPLETED,
+                response_status=res.status_code,
+                response_body=body,
+                completed_at=timezone.now(),
+            )
+        else:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+        return res
+
+    return wrapper
+
+
+def purge_expired_idempotency_keys() -> int:
+    """Delete keys older than the TTL. Returns the number deleted."""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - _ttl()).delete()
+    return deleted
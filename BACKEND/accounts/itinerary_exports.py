@@ -0,0 +1,110 @@
+"""
+Batch export of itinerary PDFs as one streamed ZIP (every trip in a chat room, or every booked trip
+of a package) for agents handling group tours.
+
+The download itself never renders or waits. prepare_export() sorts the trips: those already in the
+render cache (itinerary_pdf_cache) are ready; the rest are submitted as ItineraryPdfJobs, which run
+in parallel on whatever ITINERARY_PDF_RENDER_MODE provides (process pool or worker command). While
+any job is pending the export view answers 202 with the jobs and the client asks again; once every
+trip is rendered the ZIP streams from storage ("inline" mode renders inside the stream instead, for
+tests and local debugging). Entries are stored uncompressed (reportlab already deflates page
+streams) through streaming.ZipSink and copied in BLOCK_SIZE chunks via StreamingResponse, so no
+whole PDF or archive is held in memory under WSGI or ASGI. Trips whose latest render failed within
+ITINERARY_PDF_JOB_STALE_SECONDS are listed in a MISSING.txt entry instead of blocking the download;
+after that window the next export retries them.
+"""
+from __future__ import annotations
+
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .file_delivery import BLOCK_SIZE
+from .itinerary_pdf_cache import is_itinerary_pdf_cached, itinerary_pdf_name
+from .itinerary_pdf_jobs import DEFAULT_STALE_SECONDS, recover_stale_jobs, render_mode, submit_pdf_job
+from .models import ItineraryPdfJob
+from .streaming import StreamingResponse, ZipSink
+
+MAX_EXPORT_TRIPS = 200
+RETRY_AFTER_SECONDS = 5
+
+_UNFINISHED = (ItineraryPdfJob.Status.QUEUED, ItineraryPdfJob.Status.RENDERING)
+
+
+def export_trips(queryset):
+    """Trips of ``queryset`` with everything the archive names and the render need, oldest first."""
+    return queryset.select_related("room__traveler", "room__agent", "booking__package").order_by("start_date", "pk")
+
+
+def trip_archive_name(trip) -> str:
+    prefix = trip.booking.booking_code if trip.booking_id and trip.booking else slugify(trip.room.traveler.email)
+    return f"{prefix}_{trip.start_date}_{trip.days_count}d{trip.nights_count}n_trip{trip.pk}.pdf"
+
+
+def prepare_export(trips, user):
+    """
+    Split ``trips`` for an export: (ready, missing, pending_jobs). Ready trips are cached (every trip
+    in "inline" mode), missing ones failed to render recently, and pending_jobs are the queued or
+    rendering ItineraryPdfJobs for the rest (submitted here when there was none).
+    """
+    if render_mode() == "inline":
+        return list(trips), [], []
+    failed_since = timezone.now() - timedelta(
+        seconds=int(getattr(settings, "ITINERARY_PDF_JOB_STALE_SECONDS", DEFAULT_STALE_SECONDS))
+    )
+    latest = {}
+    for job in ItineraryPdfJob.objects.filter(trip__in=trips, send_to_chat=False).order_by("trip_id", "-created_at"):
+        latest.setdefault(job.trip_id, job)
+    ready, missing, pending = [], [], []
+    for trip in trips:
+        job = latest.get(trip.pk)
+        if is_itinerary_pdf_cached(trip):
+            ready.append(trip)
+        elif job and job.status == ItineraryPdfJob.Status.FAILED and job.finished_at and job.finished_at > failed_since:
+            missing.append(trip)
+        else:
+            pending.append(submit_pdf_job(trip, user))
+    pending_ids = [job.pk for job in pending if job.status in _UNFINISHED]
+    if pending_ids:
+        recover_stale_jobs(ItineraryPdfJob.objects.filter(pk__in=pending_ids))
+    # A job can finish during submit (PDF cached meanwhile); those trips are ready.
+    for job in pending:
+        if job.status == ItineraryPdfJob.Status.DONE:
+            ready.append(job.trip)
+    ready.sort(key=lambda trip: (trip.start_date, trip.pk))
+    return ready, missing, [job for job in pending if job.pk in pending_ids]
+
+
+def _zip_stream(trips, missing):
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for trip in trips:
+            pdf_name = itinerary_pdf_name(trip)
+            with archive.open(trip_archive_name(trip), mode="w") as entry, default_storage.open(pdf_name, "rb") as fh:
+                for chunk in iter(lambda: fh.read(BLOCK_SIZE), b""):
+                    entry.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+        if missing:
+            archive.writestr(
+                "MISSING.txt",
+                "These itineraries could not be rendered; download them individually or retry:\n"
+                + "".join(f"- {trip_archive_name(trip)}\n" for trip in missing),
+            )
+    yield sink.drain()
+
+
+def streaming_itinerary_export(trips, missing, filename_prefix):
+    """
+    Streaming response with a ZIP of the itinerary PDF of every trip in ``trips`` (see prepare_export)
+    and a MISSING.txt entry naming ``missing``.
+    """
+    stamp = timezone.localtime().strftime("%Y%m%d-%H%M")
+    response = StreamingResponse(_zip_stream(trips, missing), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename_prefix}-{stamp}.zip"'
+    response["Cache-Control"] = "no-store"
+    return response
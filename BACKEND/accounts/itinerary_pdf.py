@@ -1,6 +1,15 @@
-"""Generate premium itinerary PDF using reportlab."""
+"""
+Generate premium itinerary PDF using reportlab.
+
+Everything that does not depend on the trip is built once per process: the paragraph styles, the
+shared table styles and the logo, which is decoded and downscaled to LOGO_DPI a single time and kept
+as an in-memory PNG (the source file is ~1000px wide for a one-inch slot). A logo change therefore
+needs a restart, like any other deploy. ``python manage.py benchmark_itinerary_pdf`` tracks render
+time and peak memory.
+"""
 
 from datetime import timedelta
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
 
@@ -9,7 +18,6 @@ from reportlab.lib.enums import TA_LEFT
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
 from reportlab.platypus import Image, SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 
 from .models import ItineraryTrip
@@ -21,6 +29,13 @@ BORDER = colors.HexColor("#dbe3ed")
 TEXT_DARK = colors.HexColor("#0f172a")
 TEXT_MUTED = colors.HexColor("#475569")
 
+# Part of the render cache key (itinerary_pdf_cache): bump when the layout or wording changes.
+RENDER_VERSION = 2
+
+LOGO_WIDTH = 1.0 * inch
+# Resolution the logo is resampled to for its printed width.
+LOGO_DPI = 300
+
 # Standard wording for all travelers (section 8).
 STANDARD_TRAVEL_INSTRUCTIONS = (
     "Please follow your confirmed itinerary closely, including scheduled timings and meeting or pickup points, and arrive "
@@ -36,61 +51,50 @@ def _safe(v, default="Not provided"):
     return s or default
 
 
+@lru_cache(maxsize=1)
 def _logo_path():
     root = Path(__file__).resolve().parents[2]
     p = root / "FRONTEND" / "TRIPLINK" / "src" / "Assets" / "Logo.png"
     return p if p.exists() else None
 
 
-def _logo_flowable(max_width=1.0 * inch):
-    """Logo image with natural aspect ratio, left-aligned (above TRIPLINK title)."""
+@lru_cache(maxsize=1)
+def _logo_asset():
+    """(png_bytes, width_pt, height_pt) of the logo resampled for LOGO_WIDTH, or None when unavailable."""
     path = _logo_path()
     if not path:
         return None
     try:
-        reader = ImageReader(str(path))
-        iw, ih = reader.getSize()
-        if iw <= 0 or ih <= 0:
-            return None
-        w = float(max_width)
-        h = w * (float(ih) / float(iw))
-        return Image(str(path), width=w, height=h, hAlign="LEFT")
+        from PIL import Image as PILImage
+
+        with PILImage.open(path) as im:
+            iw, ih = im.size
+            if iw <= 0 or ih <= 0:
+                return None
+            target = max(1, round(LOGO_WIDTH / inch * LOGO_DPI))
+            im = im.convert("RGBA") if im.mode not in ("RGB", "RGBA") else im
+            if iw > target:
+                im = im.resize((target, max(1, round(ih * target / iw))), PILImage.LANCZOS)
+            out = BytesIO()
+            im.save(out, format="PNG", optimize=True)
     except Exception:
         return None
+    return out.getvalue(), float(LOGO_WIDTH), float(LOGO_WIDTH) * ih / iw
 
 
-def _section_title(text, styles):
-    return Paragraph(f"<b>{text}</b>", styles["section"])
-
-
-def _kv_table(rows):
-    table = Table(rows, colWidths=[2.1 * inch, 4.9 * inch])
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, -1), colors.white),
-                ("GRID", (0, 0), (-1, -1), 0.5, BORDER),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("TEXTCOLOR", (0, 0), (-1, -1), TEXT_DARK),
-                ("TEXTCOLOR", (0, 0), (0, -1), TEXT_MUTED),
-                ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, -1), 9),
-                ("LEFTPADDING", (0, 0), (-1, -1), 6),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-                ("TOPPADDING", (0, 0), (-1, -1), 5),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
-            ]
-        )
-    )
-    return table
+def _logo_flowable():
+    """Logo image with natural aspect ratio, left-aligned (above TRIPLINK title)."""
+    asset = _logo_asset()
+    if not asset:
+        return None
+    png, w, h = asset
+    return Image(BytesIO(png), width=w, height=h, hAlign="LEFT")
 
 
-def build_itinerary_pdf(trip: ItineraryTrip) -> BytesIO:
-    """Build branded, detailed PDF buffer for an ItineraryTrip."""
-    buf = BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=42, leftMargin=42, topMargin=42, bottomMargin=44)
+@lru_cache(maxsize=1)
+def _styles():
     sample = getSampleStyleSheet()
-    styles = {
+    return {
         "title": ParagraphStyle(
             "Title", parent=sample["Heading1"], fontSize=20, textColor=TEXT_DARK, spaceAfter=4, alignment=TA_LEFT
         ),
@@ -102,6 +106,61 @@ def build_itinerary_pdf(trip: ItineraryTrip) -> BytesIO:
         "note": ParagraphStyle("Note", parent=sample["Normal"], fontSize=9, textColor=TEXT_MUTED, leading=12),
     }
 
+
+KV_TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, -1), colors.white),
+        ("GRID", (0, 0), (-1, -1), 0.5, BORDER),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("TEXTCOLOR", (0, 0), (-1, -1), TEXT_DARK),
+        ("TEXTCOLOR", (0, 0), (0, -1), TEXT_MUTED),
+        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("LEFTPADDING", (0, 0), (-1, -1), 6),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+        ("TOPPADDING", (0, 0), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+    ]
+)
+
+TIMELINE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, -1), colors.white),
+        ("GRID", (0, 0), (-1, -1), 0.5, BORDER),
+        ("LEFTPADDING", (0, 0), (-1, -1), 8),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+        ("TOPPADDING", (0, 0), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ]
+)
+
+ACTIVITY_TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), LIGHT_BG),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("GRID", (0, 0), (-1, -1), 0.5, BORDER),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ]
+)
+
+
+def _section_title(text, styles):
+    return Paragraph(f"<b>{text}</b>", styles["section"])
+
+
+def _kv_table(rows):
+    table = Table(rows, colWidths=[2.1 * inch, 4.9 * inch])
+    table.setStyle(KV_TABLE_STYLE)
+    return table
+
+
+def build_itinerary_pdf(trip: ItineraryTrip) -> BytesIO:
+    """Build branded, detailed PDF buffer for an ItineraryTrip."""
+    buf = BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=42, leftMargin=42, topMargin=42, bottomMargin=44)
+    styles = _styles()
+
     profile = getattr(trip, "profile", None)
     traveler_name = _safe(getattr(profile, "traveler_full_names", None), "Traveler")
     booking_ref = _safe(
@@ -209,19 +268,7 @@ def build_itinerary_pdf(trip: ItineraryTrip) -> BytesIO:
             tm = _safe(item.time_label, "Time")
             row_text = f"{tm}  |  {act} @ {pl}" if pl else f"{tm}  |  {act}"
             timeline = Table([[row_text]], colWidths=[7.0 * inch])
-            timeline.setStyle(
-                TableStyle(
-                    [
-                        ("BACKGROUND", (0, 0), (-1, -1), colors.white),
-                        ("GRID", (0, 0), (-1, -1), 0.5, BORDER),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-                        ("TOPPADDING", (0, 0), (-1, -1), 5),
-                        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
-                        ("FONTSIZE", (0, 0), (-1, -1), 9),
-                    ]
-                )
-            )
+            timeline.setStyle(TIMELINE_STYLE)
             flow.append(timeline)
             if item.food_name:
                 flow.append(Paragraph(f"Meal: {_safe(item.food_name)}", styles["note"]))
@@ -258,16 +305,7 @@ def build_itinerary_pdf(trip: ItineraryTrip) -> BytesIO:
                 ]
             )
         act_table = Table(act_rows, colWidths=[3.4 * inch, 3.6 * inch])
-        act_table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), LIGHT_BG),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("GRID", (0, 0), (-1, -1), 0.5, BORDER),
-                    ("FONTSIZE", (0, 0), (-1, -1), 8),
-                ]
-            )
-        )
+        act_table.setStyle(ACTIVITY_TABLE_STYLE)
         flow.append(act_table)
     flow.append(Spacer(1, 0.1 * inch))
 
@@ -0,0 +1,139 @@
+"""
+Render cache for itinerary PDFs.
+
+build_itinerary_pdf() runs the full reportlab layout on every call, and the chat preview is opened
+repeatedly while the send flow renders the same document again. Rendered bytes are stored in the
+default (media) storage under itinerary_pdf_cache/trip_<id>/<sha256>.pdf, keyed by a hash of
+everything the PDF shows: the trip row, its profile, every child row (transport, hotels, activities,
+carry items, documents, timeline items), the room / booking fields used as fallbacks, RENDER_VERSION
+and the logo file. Any edit produces a new key, so a stale PDF is never served; the trip views also
+call invalidate_itinerary_pdf() on writes so superseded files do not pile up in storage. reportlab is
+imported lazily, as in the views, so invalidation never loads it. itinerary_pdf_name() returns the
+stored file itself so callers can stream it (file_delivery) rather than load the bytes.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+
+from .models import (
+    Booking,
+    ChatRoom,
+    ItineraryActivityPlan,
+    ItineraryCarryItem,
+    ItineraryDocumentItem,
+    ItineraryHotelStay,
+    ItineraryItem,
+    ItineraryTransportSegment,
+    ItineraryTrip,
+    ItineraryTripProfile,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "itinerary_pdf_cache"
+
+_IGNORED_FIELDS = {"created_at", "updated_at"}
+_CHILD_MODELS = (
+    ItineraryTransportSegment,
+    ItineraryHotelStay,
+    ItineraryActivityPlan,
+    ItineraryCarryItem,
+    ItineraryDocumentItem,
+    ItineraryItem,
+)
+
+
+def _rows(model, **filters):
+    fields = [f.attname for f in model._meta.concrete_fields if f.name not in _IGNORED_FIELDS]
+    return list(model.objects.filter(**filters).order_by("pk").values_list(*fields))
+
+
+def _logo_fingerprint():
+    from .itinerary_pdf import _logo_path
+
+    path = _logo_path()
+    if not path:
+        return None
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def trip_content_hash(trip) -> str:
+    """sha256 over every value the itinerary PDF is rendered from."""
+    from .itinerary_pdf import RENDER_VERSION
+
+    # Everything is read back from the database, so the key does not depend on how the caller's
+    # instances were loaded (e.g. an unsaved Decimal scale on a freshly created booking).
+    payload = {
+        "version": RENDER_VERSION,
+        "logo": _logo_fingerprint(),
+        "trip": _rows(ItineraryTrip, pk=trip.pk),
+        "room": list(ChatRoom.objects.filter(pk=trip.room_id).values_list("traveler__email", "agent__email")),
+        "booking": list(
+            Booking.objects.filter(pk=trip.booking_id).values_list(
+                "booking_code", "total_amount", "payment_method", "package__title"
+            )
+        ),
+        "profile": _rows(ItineraryTripProfile, trip=trip),
+    }
+    for model in _CHILD_MODELS:
+        payload[model._meta.model_name] = _rows(model, trip=trip)
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _trip_dir(trip_id) -> str:
+    return f"{CACHE_DIR}/trip_{trip_id}"
+
+
+def invalidate_itinerary_pdf(trip_id, keep=None) -> int:
+    """Delete cached renders for a trip (except the file named ``keep``); returns how many were removed."""
+    try:
+        _, files = default_storage.listdir(_trip_dir(trip_id))
+    except (FileNotFoundError, NotADirectoryError):
+        return 0
+    removed = 0
+    for filename in files:
+        if filename == keep:
+            continue
+        default_storage.delete(f"{_trip_dir(trip_id)}/{filename}")
+        removed += 1
+    return removed
+
+
+def is_itinerary_pdf_cached(trip) -> bool:
+    """True when the current version of ``trip`` has already been rendered (get_itinerary_pdf will not render)."""
+    return default_storage.exists(f"{_trip_dir(trip.pk)}/{trip_content_hash(trip)}.pdf")
+
+
+def itinerary_pdf_name(trip) -> str:
+    """Storage name of the current render of ``trip``, rendering and storing it first when missing."""
+    filename = f"{trip_content_hash(trip)}.pdf"
+    name = f"{_trip_dir(trip.pk)}/{filename}"
+    if default_storage.exists(name):
+        return name
+    from .itinerary_pdf import build_itinerary_pdf
+
+    buf = build_itinerary_pdf(trip)
+    invalidate_itinerary_pdf(trip.pk, keep=filename)
+    if not default_storage.exists(name):
+        default_storage.save(name, File(buf, name=filename))
+    return name
+
+
+def get_itinerary_pdf(trip) -> bytes:
+    """PDF bytes for ``trip``: read from storage when the content hash matches, rendered otherwise."""
+    name = itinerary_pdf_name(trip)
+    try:
+        with default_storage.open(name, "rb") as fh:
+            return fh.read()
+    except OSError:
+        logger.warning("Cached itinerary PDF %s unreadable; re-rendering", name, exc_info=True)
+    default_storage.delete(name)
+    with default_storage.open(itinerary_pdf_name(trip), "rb") as fh:
+        return fh.read()
@@ -0,0 +1,302 @@
+"""
+Off-request rendering of itinerary PDFs.
+
+build_itinerary_pdf() is CPU-bound reportlab work; run on the ASGI/WSGI request thread it holds a
+worker (and the GIL) for the whole layout, so under load PDF requests starve chat and catalog
+requests. Clients instead submit an ItineraryPdfJob and get its id back straight away; the render
+runs elsewhere and the result lands in the render cache (itinerary_pdf_cache), from where the
+existing /pdf/ preview URL serves it without rendering. send_to_chat jobs also attach the PDF to a
+new chat message, as the synchronous send endpoint used to.
+
+Where the render runs is ITINERARY_PDF_RENDER_MODE:
+- pool    a bounded ProcessPoolExecutor (ITINERARY_PDF_WORKERS processes) owned by the web process
+- worker  nothing in the web process; ``python manage.py run_itinerary_pdf_worker`` drains the queue
+- inline  on the submitting thread after commit (tests / local debugging)
+
+A submit whose PDF is already cached finishes immediately. Clients poll the job status endpoint;
+room members connected to the chat WebSocket also get an ``itinerary_pdf_job`` event when the job
+finishes (across processes this needs a shared channel layer, e.g. Redis). Jobs left queued or
+rendering for ITINERARY_PDF_JOB_STALE_SECONDS (a pool process died, the web process restarted) are
+requeued by the worker command, the scheduler's itinerary_pdf_recovery job, and whenever their
+status is polled or a submit would reuse them.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+import django
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .itinerary_pdf_cache import is_itinerary_pdf_cached, itinerary_pdf_name
+from .models import ChatMessage, CustomPackage, ItineraryPdfJob
+
+logger = logging.getLogger(__name__)
+
+RENDER_MODES = ("pool", "worker", "inline")
+DEFAULT_WORKERS = 2
+DEFAULT_STALE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+_PENDING = (ItineraryPdfJob.Status.QUEUED, ItineraryPdfJob.Status.RENDERING)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def render_mode() -> str:
+    mode = getattr(settings, "ITINERARY_PDF_RENDER_MODE", "pool")
+    return mode if mode in RENDER_MODES else "pool"
+
+
+def _stale_after() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "ITINERARY_PDF_JOB_STALE_SECONDS", DEFAULT_STALE_SECONDS)))
+
+
+# --- chat delivery -----------------------------------------------------------------------------
+
+
+def attach_itinerary_to_chat(trip, sender, pdf_name: str) -> ChatMessage:
+    """Post the stored PDF ``pdf_name`` to the trip's chat room as a new message from ``sender``."""
+    room = trip.room
+    custom_pkg_for_thread = (
+        CustomPackage.objects.filter(user=room.traveler, claimed_by=room.agent)
+        .exclude(status=CustomPackage.CustomPackageStatus.CANCELLED)
+        .order_by("-updated_at")
+        .first()
+    )
+    filename = f"itinerary_{trip.start_date}_{trip.days_count}d{trip.nights_count}n.pdf"
+    msg = ChatMessage.objects.create(
+        room=room,
+        sender=sender,
+        text=f"Your trip itinerary ({trip.start_date}, {trip.days_count} Days / {trip.nights_count} Nights) is attached.",
+        custom_package=custom_pkg_for_thread,
+    )
+    with default_storage.open(pdf_name, "rb") as fh:
+        msg.attachment.save(filename, File(fh), save=True)
+    room.updated_at = msg.created_at
+    room.save(update_fields=["updated_at"])
+    return msg
+
+
+def _deliver_to_chat(job, pdf_name: str) -> None:
+    """
+    Attach the PDF for a send_to_chat job exactly once. The message id is stored on the (locked) job
+    row in the same transaction as the message, so a rerun of the job (requeued as stale while the
+    first run was still going, or after a worker died before saving the result) does not post a
+    second itinerary message.
+    """
+    with transaction.atomic():
+        message_id = ItineraryPdfJob.objects.select_for_update().values_list("message_id", flat=True).get(pk=job.pk)
+        if message_id is None:
+            job.message = attach_itinerary_to_chat(job.trip, job.requested_by, pdf_name)
+            ItineraryPdfJob.objects.filter(pk=job.pk).update(message=job.message)
+        else:
+            job.message_id = message_id
+
+
+def job_payload(job, build_uri=None) -> dict:
+    """JSON body for a job (status endpoint, submit responses and the WebSocket event)."""
+    build_uri = build_uri or (lambda url: url)
+    trip = job.trip
+    done = job.status == ItineraryPdfJob.Status.DONE
+    message = job.message if done else None
+    return {
+        "job_id": job.pk,
+        "trip_id": trip.pk,
+        "status": job.status,
+        "send_to_chat": job.send_to_chat,
+        "status_url": build_uri(reverse("chat_itinerary_trip_pdf_job", args=[trip.room_id, trip.pk, job.pk])),
+        "pdf_url": build_uri(reverse("chat_itinerary_trip_pdf", args=[trip.room_id, trip.pk])) if done else None,
+        "message_id": message.pk if message else None,
+        "attachment_url": build_uri(message.attachment.url) if message and message.attachment else None,
+        "error": job.error or None,
+    }
+
+
+def notify_pdf_job(job) -> None:
+    """Push the finished job to the room's chat WebSocket group; polling still works if this fails."""
+    try:
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        async_to_sync(layer.group_send)(
+            f"chat_{job.trip.room_id}",
+            {"type": "itinerary_pdf_job", **job_payload(job)},
+        )
+    except Exception:
+        logger.warning("Could not publish itinerary PDF job %s to the chat group", job.pk, exc_info=True)
+
+
+# --- running jobs ------------------------------------------------------------------------------
+
+
+def run_pdf_job(job_id, notify=True):
+    """
+    Claim a queued job, render (or fetch from the render cache) its PDF and deliver it.
+    Returns the finished job, or None when another runner already claimed it.
+    """
+    now = timezone.now()
+    claimed = ItineraryPdfJob.objects.filter(pk=job_id, status=ItineraryPdfJob.Status.QUEUED).update(
+        status=ItineraryPdfJob.Status.RENDERING, started_at=now, attempts=F("attempts") + 1
+    )
+    if not claimed:
+        return None
+    job = (
+        ItineraryPdfJob.objects.select_related("trip__room__traveler", "trip__room__agent", "requested_by")
+        .filter(pk=job_id)
+        .first()
+    )
+    if job is None:  # trip deleted while queued
+        return None
+    try:
+        pdf_name = itinerary_pdf_name(job.trip)
+        if job.send_to_chat:
+            _deliver_to_chat(job, pdf_name)
+        job.status = ItineraryPdfJob.Status.DONE
+        job.error = ""
+    except Exception as exc:
+        logger.exception("Itinerary PDF job %s failed", job_id)
+        job.status = ItineraryPdfJob.Status.FAILED
+        job.error = str(exc)[:500] or exc.__class__.__name__
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "message", "error", "finished_at"])
+    if notify:
+        notify_pdf_job(job)
+    return job
+
+
+def _run_in_pool_worker(job_id):
+    close_old_connections()
+    try:
+        job = run_pdf_job(job_id, notify=False)
+        return job.pk if job else None
+    finally:
+        close_old_connections()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(getattr(settings, "ITINERARY_PDF_WORKERS", DEFAULT_WORKERS))
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, workers),
+                mp_context=multiprocessing.get_context("spawn"),
+                # Spawned children import only django until setup() has run; this module (and its
+                # models) is unpickled with the first task, after the app registry is ready.
+                initializer=django.setup,
+            )
+        return _executor
+
+
+def _reset_pool(broken):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _pool_job_finished(job_id, executor, future):
+    """Runs in the web process: publish the result (the channel layer lives here) or record a crash."""
+    close_old_connections()
+    try:
+        error = future.exception()
+        if error is not None:
+            logger.error("Itinerary PDF worker crashed on job %s: %r", job_id, error)
+            ItineraryPdfJob.objects.filter(pk=job_id, status__in=_PENDING).update(
+                status=ItineraryPdfJob.Status.FAILED, error="Render worker crashed.", finished_at=timezone.now()
+            )
+            _reset_pool(executor)
+        job = ItineraryPdfJob.objects.select_related("trip", "message").filter(pk=job_id).first()
+        if job and job.status not in _PENDING:
+            notify_pdf_job(job)
+    finally:
+        close_old_connections()
+
+
+def dispatch_pdf_job(job_id) -> None:
+    mode = render_mode()
+    if mode == "inline":
+        run_pdf_job(job_id)
+    elif mode == "pool":
+        executor = _pool()
+        future = executor.submit(_run_in_pool_worker, job_id)
+        future.add_done_callback(partial(_pool_job_finished, job_id, executor))
+    # "worker": left queued for run_itinerary_pdf_worker
+
+
+def submit_pdf_job(trip, user, send_to_chat=False):
+    """
+    Queue a render of ``trip`` for ``user``. A preview job already pending for the trip is reused
+    (requeued first if it is stale, replaced if that failed it); when the PDF is already in the
+    render cache the job completes before this returns.
+    """
+    if not send_to_chat:
+        pending = trip.pdf_jobs.filter(send_to_chat=False, status__in=_PENDING).order_by("-created_at").first()
+        if pending:
+            recover_stale_jobs(ItineraryPdfJob.objects.filter(pk=pending.pk))
+            pending.refresh_from_db()
+            if pending.status in _PENDING:
+                return pending
+    job = ItineraryPdfJob.objects.create(trip=trip, requested_by=user, send_to_chat=send_to_chat)
+    if is_itinerary_pdf_cached(trip):
+        return run_pdf_job(job.pk) or job
+    transaction.on_commit(partial(dispatch_pdf_job, job.pk))
+    return job
+
+
+def recover_stale_jobs(queryset=None, dispatch=True) -> int:
+    """
+    Requeue jobs stuck queued/rendering past the stale timeout (failing them after MAX_ATTEMPTS)
+    and, with ``dispatch``, hand them to the configured runner again. Returns how many were requeued.
+    """
+    queryset = ItineraryPdfJob.objects.all() if queryset is None else queryset
+    cutoff = timezone.now() - _stale_after()
+    stale = queryset.filter(
+        Q(status=ItineraryPdfJob.Status.RENDERING, started_at__lt=cutoff)
+        | Q(status=ItineraryPdfJob.Status.QUEUED, created_at__lt=cutoff, started_at__isnull=True)
+        | Q(status=ItineraryPdfJob.Status.QUEUED, started_at__lt=cutoff)
+    )
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ItineraryPdfJob.Status.FAILED, error="Rendering timed out.", finished_at=timezone.now()
+    )
+    job_ids = list(stale.filter(attempts__lt=MAX_ATTEMPTS).values_list("pk", flat=True))
+    # started_at is bumped so a requeued job gets a full timeout before it counts as stale again.
+    ItineraryPdfJob.objects.filter(pk__in=job_ids).update(
+        status=ItineraryPdfJob.Status.QUEUED, started_at=timezone.now()
+    )
+    if dispatch and render_mode() != "worker":
+        for job_id in job_ids:
+            transaction.on_commit(partial(dispatch_pdf_job, job_id))
+    return len(job_ids)
+
+
+def run_next_pdf_job():
+    """Claim and run the oldest queued job (worker mode). Returns the job, or None when the queue is empty."""
+    while True:
+        job_id = (
+            ItineraryPdfJob.objects.filter(status=ItineraryPdfJob.Status.QUEUED)
+            .order_by("created_at", "pk")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        job = run_pdf_job(job_id)
+        if job is not None:
+            return job
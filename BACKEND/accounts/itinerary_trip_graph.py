@@ -0,0 +1,218 @@
+"""
+Whole-trip read and bulk write for the itinerary editor.
+
+The editor used to load and save a trip through one list/create/detail endpoint per child collection
+(transport, hotels, activities, carry items, documents, timeline items) plus the profile: dozens of
+requests for a 10-day trip, each re-checking room access. load_trip_graph() fetches the trip, its
+profile and every collection in one select_related + prefetch pass; apply_trip_graph() validates a
+whole document with the existing per-collection serializers and writes it in one transaction with
+bulk_update / bulk_create (and one DELETE per replaced collection).
+
+Body shape (GET returns the same, with ids): {"profile": {...}, "transport": [...], "hotels": [...],
+"activities": [...], "carry_items": [...], "documents": [...], "items": [...]}. Rows with an "id"
+update that row, rows without one are created. Collections missing from the body are left alone.
+PUT replaces each collection it sends (rows not listed are deleted) and validates rows and the
+profile in full; PATCH only upserts and accepts partial rows.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import serializers
+
+from .itinerary_pdf_cache import invalidate_itinerary_pdf
+from .models import (
+    ItineraryActivityPlan,
+    ItineraryCarryItem,
+    ItineraryDocumentItem,
+    ItineraryHotelStay,
+    ItineraryItem,
+    ItineraryTransportSegment,
+    ItineraryTrip,
+    ItineraryTripProfile,
+)
+from .serializers import (
+    ItineraryActivityPlanSerializer,
+    ItineraryCarryItemSerializer,
+    ItineraryDocumentItemSerializer,
+    ItineraryHotelStaySerializer,
+    ItineraryItemSerializer,
+    ItineraryTransportSegmentSerializer,
+    ItineraryTripProfileSerializer,
+)
+
+MAX_ROWS_PER_COLLECTION = 500
+
+
+@dataclass(frozen=True)
+class TripCollection:
+    key: str
+    model: type
+    serializer_class: type
+    related_name: str
+    ordering: tuple = ("display_order", "id")
+    select_related: tuple = ()
+
+
+COLLECTIONS = (
+    TripCollection("transport", ItineraryTransportSegment, ItineraryTransportSegmentSerializer, "transport_segments"),
+    TripCollection("hotels", ItineraryHotelStay, ItineraryHotelStaySerializer, "hotel_stays"),
+    TripCollection("activities", ItineraryActivityPlan, ItineraryActivityPlanSerializer, "activity_plans"),
+    TripCollection("carry_items", ItineraryCarryItem, ItineraryCarryItemSerializer, "carry_items"),
+    TripCollection("documents", ItineraryDocumentItem, ItineraryDocumentItemSerializer, "document_items"),
+    TripCollection(
+        "items",
+        ItineraryItem,
+        ItineraryItemSerializer,
+        "items",
+        ordering=("day_number", "is_night", "time_label", "created_at", "id"),
+        select_related=("created_by__user_profile", "created_by__agent_profile"),
+    ),
+)
+
+
+def load_trip_graph(trip_id):
+    """The trip with its profile and every child collection loaded (one query per collection)."""
+    return (
+        ItineraryTrip.objects.select_related("profile")
+        .prefetch_related(
+            *(
+                Prefetch(
+                    c.related_name,
+                    queryset=c.model.objects.select_related(*c.select_related).order_by(*c.ordering),
+                )
+                for c in COLLECTIONS
+            )
+        )
+        .get(pk=trip_id)
+    )
+
+
+def _profile(trip):
+    try:
+        return trip.profile
+    except ItineraryTripProfile.DoesNotExist:
+        return None
+
+
+def serialize_trip_graph(trip, context=None) -> dict:
+    profile = _profile(trip)
+    data = {
+        "id": trip.pk,
+        "room": trip.room_id,
+        "start_date": trip.start_date,
+        "days_count": trip.days_count,
+        "nights_count": trip.nights_count,
+        "booking": trip.booking_id,
+        "created_at": trip.created_at,
+        "profile": ItineraryTripProfileSerializer(profile).data if profile else None,
+    }
+    for c in COLLECTIONS:
+        data[c.key] = c.serializer_class(getattr(trip, c.related_name).all(), many=True, context=context).data
+    return data
+
+
+def _validate_collection(collection, rows, existing, replace, context):
+    """(updates, creates, row_errors) for one collection; updates are (instance, validated_data)."""
+    if not isinstance(rows, list):
+        return [], [], ["Expected a list."]
+    if len(rows) > MAX_ROWS_PER_COLLECTION:
+        return [], [], [f"At most {MAX_ROWS_PER_COLLECTION} rows per collection."]
+    updates, creates, row_errors, seen = [], [], [], set()
+    for row in rows:
+        if not isinstance(row, dict):
+            row_errors.append({"non_field_errors": ["Expected an object."]})
+            continue
+        row_id = row.get("id")
+        if row_id is None:
+            serializer = collection.serializer_class(data=row, context=context)
+        else:
+            instance = existing.get(row_id) if isinstance(row_id, int) else None
+            if instance is None or row_id in seen:
+                row_errors.append({"id": ["Not a row of this trip (or listed twice)."]})
+                continue
+            seen.add(row_id)
+            serializer = collection.serializer_class(instance, data=row, partial=not replace, context=context)
+        if not serializer.is_valid():
+            row_errors.append(serializer.errors)
+            continue
+        row_errors.append({})
+        validated = dict(serializer.validated_data)
+        validated.pop("trip", None)  # rows always stay on this trip
+        if row_id is None:
+            creates.append(validated)
+        else:
+            updates.append((serializer.instance, validated))
+    return updates, creates, row_errors if any(row_errors) else []
+
+
+def _write_collection(collection, trip, user, existing, updates, creates, replace):
+    model = collection.model
+    changed, objs = set(), []
+    for instance, validated in updates:
+        for field, value in validated.items():
+            if getattr(instance, field) != value:
+                setattr(instance, field, value)
+                changed.add(field)
+        objs.append(instance)
+    if changed:
+        if any(f.name == "updated_at" for f in model._meta.concrete_fields):
+            now = timezone.now()
+            for instance in objs:
+                instance.updated_at = now
+            changed.add("updated_at")
+        model.objects.bulk_update(objs, sorted(changed))
+    if replace:
+        kept = [instance.pk for instance, _ in updates]
+        model.objects.filter(pk__in=[pk for pk in existing if pk not in kept]).delete()
+    if creates:
+        defaults = {"trip": trip}
+        if model is ItineraryItem:
+            defaults.update(room=trip.room, created_by=user)
+        model.objects.bulk_create([model(**defaults, **validated) for validated in creates])
+
+
+def apply_trip_graph(trip, data, *, user, room, replace=False):
+    """
+    Validate and write ``data`` (see module docstring) for ``trip``. Raises ValidationError with
+    per-collection, per-row errors and writes nothing unless the whole document is valid.
+    Returns the reloaded trip graph.
+    """
+    if not isinstance(data, dict):
+        raise serializers.ValidationError({"non_field_errors": ["Expected an object."]})
+    trip = load_trip_graph(trip.pk)
+    context = {"room": room}
+    errors = {}
+
+    profile_serializer = None
+    if "profile" in data:
+        profile_serializer = ItineraryTripProfileSerializer(
+            _profile(trip), data=data["profile"] or {}, partial=not replace
+        )
+        if not profile_serializer.is_valid():
+            errors["profile"] = profile_serializer.errors
+
+    plans = []
+    for collection in COLLECTIONS:
+        if collection.key not in data:
+            continue
+        existing = {obj.pk: obj for obj in getattr(trip, collection.related_name).all()}
+        updates, creates, row_errors = _validate_collection(
+            collection, data[collection.key], existing, replace, context
+        )
+        if row_errors:
+            errors[collection.key] = row_errors
+        plans.append((collection, existing, updates, creates))
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    with transaction.atomic():
+        if profile_serializer is not None:
+            profile_serializer.save(trip=trip)
+        for collection, existing, updates, creates in plans:
+            _write_collection(collection, trip, user, existing, updates, creates, replace)
+    invalidate_itinerary_pdf(trip.pk)
+    return load_trip_graph(trip.pk)
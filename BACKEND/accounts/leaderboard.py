@@ -0,0 +1,110 @@
+"""
+Materialized traveler leaderboard.
+
+Ranking every traveler on each request (ORDER BY reward_points over all profiles, full profile
+serializer, no pagination) does not scale and cannot answer "what is my rank". refresh_leaderboard()
+computes ranks once with window functions and stores them in LeaderboardEntry; the API then reads
+top-N pages by the unique position index and a single traveler's rank through the user index, with
+neighbours fetched as a position range.
+
+Refreshed by the scheduler job "leaderboard_refresh" (every 5 minutes by default), so ranks may lag
+reward changes by that much.
+"""
+from __future__ import annotations
+
+import logging
+
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import Rank, RowNumber
+from django.utils import timezone
+
+from .models import LeaderboardEntry, Roles, UserProfile
+
+logger = logging.getLogger(__name__)
+
+REFRESH_BATCH_SIZE = 1000
+DEFAULT_NEIGHBOURS = 2
+MAX_NEIGHBOURS = 10
+
+
+def _display_name(first_name, last_name, email) -> str:
+    name = f"{first_name} {last_name}".strip()
+    return name or (email or "").split("@")[0] or "Traveler"
+
+
+def refresh_leaderboard() -> int:
+    """Rebuild the leaderboard from UserProfile.reward_points. Returns the number of ranked travelers."""
+    order = [F("reward_points").desc(), F("id").asc()]
+    rows = (
+        UserProfile.objects.filter(user__role=Roles.TRAVELER, user__is_active=True)
+        .annotate(
+            rank_value=Window(Rank(), order_by=F("reward_points").desc()),
+            position_value=Window(RowNumber(), order_by=order),
+        )
+        .order_by(*order)
+        .values_list(
+            "user_id",
+            "reward_points",
+            "first_name",
+            "last_name",
+            "user__email",
+            "profile_picture",
+            "rank_value",
+            "position_value",
+        )
+    )
+    now = timezone.now()
+    total = 0
+    # One transaction: readers keep seeing the previous ranking until the new one is committed.
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        batch = []
+        for user_id, points, first_name, last_name, email, picture, rank, position in rows.iterator(
+            chunk_size=REFRESH_BATCH_SIZE
+        ):
+            batch.append(
+                LeaderboardEntry(
+                    user_id=user_id,
+                    position=position,
+                    rank=rank,
+                    reward_points=points,
+                    display_name=_display_name(first_name, last_name, email)[:201],
+                    profile_picture=picture or "",
+                    refreshed_at=now,
+                )
+            )
+            if len(batch) >= REFRESH_BATCH_SIZE:
+                LeaderboardEntry.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            LeaderboardEntry.objects.bulk_create(batch)
+            total += len(batch)
+    logger.info("Leaderboard refreshed: %s traveler(s) ranked.", total)
+    return total
+
+
+def ensure_leaderboard() -> None:
+    """Build the leaderboard on first use (before the scheduler has run once)."""
+    if not LeaderboardEntry.objects.exists():
+        refresh_leaderboard()
+
+
+def leaderboard_position(user, neighbours: int = DEFAULT_NEIGHBOURS):
+    """
+    Return (entry, nearby_entries, total) for ``user``; entry is None when the user is not ranked yet
+    (e.g. registered after the last refresh). Uses the user and position indexes only.
+    """
+    neighbours = max(0, min(int(neighbours), MAX_NEIGHBOURS))
+    last = LeaderboardEntry.objects.order_by("-position").values_list("position", flat=True).first() or 0
+    entry = LeaderboardEntry.objects.filter(user=user).first()
+    if entry is None:
+        return None, [], last
+    nearby = list(
+        LeaderboardEntry.objects.filter(
+            position__gte=entry.position - neighbours,
+            position__lte=entry.position + neighbours,
+        ).order_by("position")
+    )
+    return entry, nearby, last
@@ -0,0 +1,32 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from accounts.rewards import award_completed_trip_rewards, reward_balance_discrepancies
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that every traveler's reward_points balance equals the sum of their reward points ledger "
+        "entries. With --award, first credit pending completed-trip rewards (normally done by run_scheduler)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--award", action="store_true", help="Run the batch reward awarding job first.")
+
+    def handle(self, *args, **options):
+        if options["award"]:
+            rewarded = award_completed_trip_rewards()
+            self.stdout.write(f"Rewarded {rewarded} booking(s).")
+        mismatches = reward_balance_discrepancies()
+        for user_id, balance, ledger_total in mismatches:
+            self.stdout.write(
+                self.style.WARNING(f"user {user_id}: balance {balance} != ledger {ledger_total}")
+            )
+        if mismatches:
+            logger.warning("Reward points audit: %s profile(s) out of sync with the ledger.", len(mismatches))
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} profile(s) out of sync."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All reward point balances match the ledger."))
@@ -0,0 +1,149 @@
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.itinerary_pdf import build_itinerary_pdf
+from accounts.models import (
+    ChatRoom,
+    ItineraryActivityPlan,
+    ItineraryCarryItem,
+    ItineraryDocumentItem,
+    ItineraryHotelStay,
+    ItineraryItem,
+    ItineraryTrip,
+    ItineraryTripProfile,
+    Roles,
+    User,
+)
+
+DEFAULT_DAYS = "1,3,7,14,21,30"
+ITEMS_PER_DAY = 5
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark itinerary PDF rendering: median wall time and peak Python memory (tracemalloc) for "
+        "synthetic trips of 1 to 30 days. Fixture rows are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            default=DEFAULT_DAYS,
+            help=f"Comma-separated trip lengths in days (default {DEFAULT_DAYS}).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Renders per trip length; the median time is reported (default 5).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            lengths = [int(d) for d in options["days"].split(",") if d.strip()]
+        except ValueError:
+            raise CommandError("--days must be a comma-separated list of integers.")
+        if not lengths or min(lengths) < 1:
+            raise CommandError("--days needs at least one length of 1 or more.")
+        repeat = max(1, options["repeat"])
+
+        try:
+            with transaction.atomic():
+                self._run(lengths, repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, lengths, repeat):
+        agent = User.objects.create(email="pdf-benchmark-agent@example.invalid", role=Roles.AGENT)
+        traveler = User.objects.create(email="pdf-benchmark-traveler@example.invalid", role=Roles.TRAVELER)
+        room = ChatRoom.objects.create(traveler=traveler, agent=agent)
+
+        # The first render in a process also builds the cached styles and logo; report it separately.
+        started = time.perf_counter()
+        build_itinerary_pdf(self._trip(room, agent, 1))
+        self.stdout.write(f"cold first render: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        self.stdout.write(f"{'days':>5} {'items':>6} {'median ms':>10} {'min ms':>8} {'peak KiB':>9} {'pdf KiB':>8}")
+        for days in lengths:
+            trip = self._trip(room, agent, days)
+            timings = []
+            size = 0
+            for _ in range(repeat):
+                started = time.perf_counter()
+                size = len(build_itinerary_pdf(trip).getbuffer())
+                timings.append(time.perf_counter() - started)
+            tracemalloc.start()
+            try:
+                build_itinerary_pdf(trip)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.stdout.write(
+                f"{days:>5} {days * ITEMS_PER_DAY:>6} {statistics.median(timings) * 1000:>10.1f} "
+                f"{min(timings) * 1000:>8.1f} {peak / 1024:>9.0f} {size / 1024:>8.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark finished (fixture rows rolled back)."))
+
+    def _trip(self, room, agent, days):
+        start = date(2030, 1, 1)
+        trip = ItineraryTrip.objects.create(
+            room=room, created_by=agent, start_date=start, days_count=days, nights_count=max(0, days - 1)
+        )
+        ItineraryTripProfile.objects.create(
+            trip=trip,
+            traveler_full_names="Benchmark Traveler",
+            destinations="Kathmandu, Pokhara, Chitwan",
+            meal_breakfast="Hotel buffet",
+            meal_lunch="Local restaurants",
+            meal_dinner="Hotel",
+        )
+        ItineraryItem.objects.bulk_create(
+            ItineraryItem(
+                room=room,
+                trip=trip,
+                created_by=agent,
+                day_number=day,
+                travel_date=start + timedelta(days=day - 1),
+                time_label=f"{8 + 2 * slot:02d}:00",
+                place="Lakeside",
+                activity=f"Day {day} stop {slot + 1}: guided walk and sightseeing",
+                food_name="Dal bhat" if slot == 2 else "",
+                notes="Bring water and sun protection." if slot == 0 else "",
+            )
+            for day in range(1, days + 1)
+            for slot in range(ITEMS_PER_DAY)
+        )
+        ItineraryHotelStay.objects.bulk_create(
+            ItineraryHotelStay(
+                trip=trip,
+                hotel_name=f"Hotel {n + 1}",
+                full_address="Lakeside Road, Pokhara",
+                check_in_time="14:00",
+                check_out_time="11:00",
+                room_type="Deluxe",
+                amenities="Wi-Fi, breakfast",
+                display_order=n + 1,
+            )
+            for n in range(max(1, days // 3))
+        )
+        ItineraryActivityPlan.objects.bulk_create(
+            ItineraryActivityPlan(trip=trip, activity_name=f"Activity {n + 1}", location="Pokhara", display_order=n + 1)
+            for n in range(days)
+        )
+        ItineraryCarryItem.objects.bulk_create(
+            ItineraryCarryItem(trip=trip, item_name=f"Item {n + 1}", display_order=n + 1) for n in range(10)
+        )
+        ItineraryDocumentItem.objects.bulk_create(
+            ItineraryDocumentItem(trip=trip, document_name=f"Document {n + 1}", display_order=n + 1) for n in range(4)
+        )
+        return trip
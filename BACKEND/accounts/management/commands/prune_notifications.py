@@ -0,0 +1,54 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from accounts.notification_retention import run_notification_retention
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive read notification recipients older than N days and purge notifications left "
+        "without recipients, in small batches. Schedule daily (e.g. cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Retention window in days (default: NOTIFICATION_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows per batch (default: NOTIFICATION_RETENTION_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches to limit load on the database.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many rows would be archived/purged.",
+        )
+
+    def handle(self, *args, **options):
+        counts = run_notification_retention(
+            days=options["days"],
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            dry_run=options["dry_run"],
+        )
+        prefix = "[dry run] " if options["dry_run"] else ""
+        msg = (
+            f"{prefix}Notification retention done (days={counts['days']}): "
+            f"archived={counts['archived']}, purged={counts['purged']}"
+        )
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,29 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from accounts.agent_ratings import recompute_agent_ratings
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild AgentProfile rating aggregates (average, sum, count, per-star histogram) from AgentReview. "
+        "Only needed for repair; reviews keep them up to date incrementally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--agent",
+            type=int,
+            action="append",
+            dest="agent_ids",
+            help="Agent user id to recompute (repeatable). Default: all agents.",
+        )
+
+    def handle(self, *args, **options):
+        changed = recompute_agent_ratings(agent_ids=options["agent_ids"])
+        msg = f"Agent ratings recomputed: {changed} profile(s) corrected."
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
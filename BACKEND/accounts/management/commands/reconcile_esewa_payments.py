@@ -0,0 +1,32 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from accounts.esewa_reconciliation import RECONCILE_BATCH_SIZE, reconcile_pending_esewa_sessions
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Confirm eSewa payments whose app never called verify: checks pending payment sessions "
+        "against the eSewa status API and creates their bookings. Also runs inside run_scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=RECONCILE_BATCH_SIZE,
+            help=f"Max sessions to check in this run (default {RECONCILE_BATCH_SIZE}).",
+        )
+        parser.add_argument("--workers", type=int, default=None, help="Parallel status checks.")
+
+    def handle(self, *args, **options):
+        counts = reconcile_pending_esewa_sessions(limit=options["limit"], workers=options["workers"])
+        msg = (
+            f"eSewa reconciliation done: checked={counts['checked']}, confirmed={counts['confirmed']}, "
+            f"unverified={counts['unverified']}, errors={counts['errors']}, skipped={counts['skipped']}"
+        )
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
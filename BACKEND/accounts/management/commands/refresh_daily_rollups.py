@@ -0,0 +1,27 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from accounts.daily_rollups import refresh_daily_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the platform and per-agent daily rollups used by the dashboards. Incremental by default "
+        "(days touched since the last run); the scheduler job daily_rollups runs this periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute every day from scratch (e.g. after bookings or reviews were deleted).",
+        )
+
+    def handle(self, *args, **options):
+        days = refresh_daily_rollups(rebuild=options["rebuild"])
+        msg = f"Daily rollups refreshed: {days} day(s) recomputed."
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,52 @@
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.itinerary_pdf_jobs import recover_stale_jobs, run_next_pdf_job
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Render queued itinerary PDF jobs outside the web process (ITINERARY_PDF_RENDER_MODE=worker). "
+        "Several workers can run side by side: each job is claimed by exactly one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue once and exit instead of polling.",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between queue checks when it is empty (default 1).",
+        )
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        rendered = 0
+        while not self._stopping:
+            close_old_connections()
+            recover_stale_jobs(dispatch=False)
+            job = run_next_pdf_job()
+            if job is not None:
+                rendered += 1
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["poll"])
+        msg = f"Itinerary PDF worker stopped: {rendered} job(s) processed."
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
+
+    def _stop(self, *args):
+        self._stopping = True
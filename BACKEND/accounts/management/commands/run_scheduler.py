@@ -0,0 +1,71 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.scheduler import Scheduler, default_jobs, publish_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the periodic background jobs (trip reminders, package expiry, reward awarding, eSewa "
+        "reconciliation) in one long-lived process. Safe to start on several instances: only the "
+        "lock holder runs jobs, the others wait on standby."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every selected job once and exit (still takes the leader lock).",
+        )
+        parser.add_argument(
+            "--only",
+            action="append",
+            default=[],
+            metavar="JOB",
+            help="Run only this job (repeatable). Default: all jobs.",
+        )
+        parser.add_argument(
+            "--tick",
+            type=float,
+            default=1.0,
+            help="Seconds between due-job checks (default 1).",
+        )
+        parser.add_argument(
+            "--standby-retry",
+            type=float,
+            default=15.0,
+            help="Seconds a standby instance waits before retrying the leader lock (default 15).",
+        )
+
+    def handle(self, *args, **options):
+        jobs = default_jobs()
+        if options["only"]:
+            known = {job.name for job in jobs}
+            unknown = sorted(set(options["only"]) - known)
+            if unknown:
+                raise CommandError(f"Unknown job(s): {', '.join(unknown)}. Known: {', '.join(sorted(known))}")
+            jobs = [job for job in jobs if job.name in options["only"]]
+
+        scheduler = Scheduler(jobs, tick=options["tick"], standby_retry=options["standby_retry"])
+
+        if options["once"]:
+            if not scheduler.lock.acquire():
+                raise CommandError("Another scheduler instance holds the leader lock.")
+            try:
+                for job in jobs:
+                    job.run()
+                    self.stdout.write(f"{job.name}: {job.metrics.last_result} ({job.metrics.last_duration:.3f}s)")
+            finally:
+                scheduler.lock.release()
+                publish_metrics(jobs)
+            return
+
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        self.stdout.write(f"Scheduler started with jobs: {', '.join(job.name for job in jobs)}")
+        scheduler.run_forever()
+        self.stdout.write(self.style.SUCCESS("Scheduler stopped."))
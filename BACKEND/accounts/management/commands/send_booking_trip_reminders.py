@@ -2,7 +2,7 @@ import logging
 
 from django.core.management.base import BaseCommand
 
-from accounts.booking_trip_notifications import process_booking_trip_reminders
+from accounts.booking_trip_notifications import process_booking_trip_reminders, schedule_booking_reminders
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +13,17 @@ class Command(BaseCommand):
         "Schedule this every 10–15 minutes (e.g. cron or Windows Task Scheduler)."
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--replan",
+            action="store_true",
+            help="Rebuild the ScheduledReminder table for all bookings before sending (repair).",
+        )
+
     def handle(self, *args, **options):
+        if options["replan"]:
+            planned = schedule_booking_reminders()
+            self.stdout.write(f"Re-planned {planned} scheduled reminder(s).")
         counts = process_booking_trip_reminders()
         msg = (
             f"Trip reminders done: 24h={counts['h24']}, 1h={counts['h1']}, review={counts['review']}"
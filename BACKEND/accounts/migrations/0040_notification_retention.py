@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0039_booking_agent_type_esewapaymentsession_agent_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationRecipientArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_id', models.PositiveBigIntegerField(help_text='Original Notification id (row may have been purged).')),
+                ('notification_type', models.CharField(choices=[('alert', 'Alert'), ('emergency', 'Emergency'), ('rule_violation', 'Rule Violation'), ('info', 'Information'), ('update', 'Update'), ('promotion', 'Promotion'), ('general', 'General'), ('trip_reminder_24h', 'Trip reminder (24h)'), ('trip_reminder_1h', 'Trip reminder (1h)'), ('trip_review_request', 'Trip review request')], default='general', max_length=32)),
+                ('title', models.CharField(max_length=200)),
+                ('sender_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(help_text='When the original recipient row was created.')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Notification Recipient',
+                'verbose_name_plural': 'Archived Notification Recipients',
+                'ordering': ['-delivered_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecipient',
+            index=models.Index(fields=['user', 'is_read'], name='notif_recip_user_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecipient',
+            index=models.Index(fields=['is_read', 'created_at'], name='notif_recip_read_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationrecipientarchive',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecipientarchive',
+            index=models.Index(fields=['user', '-delivered_at'], name='notif_archive_user_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:39
+
+from datetime import datetime, time, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _aware(day, at):
+    return timezone.make_aware(datetime.combine(day, at), timezone.get_current_timezone())
+
+
+def backfill_scheduled_reminders(apps, schema_editor):
+    """Plan reminders for existing confirmed bookings (same rules as booking_trip_notifications)."""
+    Booking = apps.get_model("accounts", "Booking")
+    BookingTripReminder = apps.get_model("accounts", "BookingTripReminder")
+    ScheduledReminder = apps.get_model("accounts", "ScheduledReminder")
+
+    sent = set(BookingTripReminder.objects.values_list("booking_id", "kind"))
+    rows = (
+        Booking.objects.filter(status="confirmed")
+        .values("pk", "package__trip_start_date", "package__trip_start_time", "package__trip_end_date")
+        .order_by("pk")
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        planned = []
+        if row["package__trip_start_date"]:
+            start = _aware(row["package__trip_start_date"], row["package__trip_start_time"] or time(9, 0))
+            planned.append(("h24", start - timedelta(hours=24), start))
+            planned.append(("h1", start - timedelta(hours=1), start))
+        if row["package__trip_end_date"]:
+            planned.append(("review", _aware(row["package__trip_end_date"], time(0, 0)), None))
+        for kind, due_at, expires_at in planned:
+            if (row["pk"], kind) not in sent:
+                batch.append(ScheduledReminder(booking_id=row["pk"], kind=kind, due_at=due_at, expires_at=expires_at))
+        if len(batch) >= 2000:
+            ScheduledReminder.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ScheduledReminder.objects.bulk_create(batch)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0040_notification_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('h24', '24 hours before trip'), ('h1', '1 hour before trip'), ('review', 'Post-trip review prompt')], max_length=16)),
+                ('due_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Do not send at or after this time (trip start for 24h/1h reminders).', null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_reminders', to='accounts.booking')),
+            ],
+            options={
+                'verbose_name': 'Scheduled reminder',
+                'verbose_name_plural': 'Scheduled reminders',
+                'ordering': ['due_at'],
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['due_at'], name='sched_reminder_pending_due_idx')],
+                'unique_together': {('booking', 'kind')},
+            },
+        ),
+        migrations.RunPython(backfill_scheduled_reminders, noop_reverse),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0041_scheduledreminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DealDigestEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('bookmark', 'Bookmarked the package'), ('past_booker', 'Booked with this agent before'), ('country_interest', 'Interested in this country')], max_length=24)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('deal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_entries', to='accounts.deal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deal_digest_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Deal digest entry',
+                'verbose_name_plural': 'Deal digest entries',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['user', 'created_at'], name='deal_digest_pending_idx')],
+                'unique_together': {('user', 'deal')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0042_deal_digest_entry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='esewapaymentsession',
+            index=models.Index(fields=['status', 'created_at'], name='esewa_session_status_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0044_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Max travelers (seats) for this departure. Empty = unlimited.', null=True),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='seats_held',
+            field=models.PositiveIntegerField(default=0, help_text='Seats reserved by eSewa payments in progress (see SeatHold).'),
+        ),
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('active', 'Active'), ('converted', 'Converted to booking'), ('released', 'Released')], default='active', max_length=16)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('package', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to='accounts.package')),
+                ('payment_session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='seat_hold', to='accounts.esewapaymentsession')),
+            ],
+            options={
+                'verbose_name': 'Seat hold',
+                'verbose_name_plural': 'Seat holds',
+                'indexes': [models.Index(condition=models.Q(('status', 'active')), fields=['expires_at'], name='seat_hold_active_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:03
+
+import secrets
+
+from django.db import migrations, models
+
+# Existing bookings hold random 5-digit codes; new codes then start in the 6-digit range
+# (index = size of the 5-digit band, see booking_codes.band_size) so they can never collide.
+FIRST_SIX_DIGIT_INDEX = 50000
+
+
+def create_counter(apps, schema_editor):
+    Booking = apps.get_model("accounts", "Booking")
+    BookingCodeCounter = apps.get_model("accounts", "BookingCodeCounter")
+    start = FIRST_SIX_DIGIT_INDEX if Booking.objects.exists() else 0
+    BookingCodeCounter.objects.update_or_create(
+        pk=1, defaults={"key": secrets.token_hex(32), "next_index": start}
+    )
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE SEQUENCE IF NOT EXISTS accounts_booking_code_seq MINVALUE 0 START WITH {start}"
+        )
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP SEQUENCE IF EXISTS accounts_booking_code_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0045_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingCodeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(editable=False, max_length=64)),
+                ('next_index', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Booking code counter',
+                'verbose_name_plural': 'Booking code counter',
+            },
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='booking_code',
+            field=models.CharField(db_index=True, editable=False, help_text='Public numeric code (5 digits, longer once the 5-digit range is used up). Unique per booking for lookup and filtering.', max_length=8, unique=True),
+        ),
+        migrations.RunPython(create_counter, drop_sequence),
+    ]
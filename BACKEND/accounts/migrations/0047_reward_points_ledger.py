@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_opening_balances(apps, schema_editor):
+    """One OPENING entry per existing balance so every profile starts in sync with its ledger."""
+    UserProfile = apps.get_model("accounts", "UserProfile")
+    RewardPointsEntry = apps.get_model("accounts", "RewardPointsEntry")
+    entries = [
+        RewardPointsEntry(user_id=user_id, kind="opening", points=points, note="Balance before the ledger")
+        for user_id, points in UserProfile.objects.filter(reward_points__gt=0).values_list("user_id", "reward_points")
+    ]
+    RewardPointsEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0046_booking_code_allocator'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RewardPointsEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('opening', 'Opening balance'), ('earned', 'Earned (completed trip)'), ('redeemed', 'Redeemed on booking'), ('restored', 'Restored (booking cancelled)'), ('adjustment', 'Adjustment')], max_length=16)),
+                ('points', models.IntegerField(help_text='Signed change to the balance (negative when points are spent).')),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reward_points_entries', to='accounts.booking')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reward_points_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reward points entry',
+                'verbose_name_plural': 'Reward points ledger',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='reward_entry_user_created_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'earned')), fields=('booking',), name='reward_entry_earned_once')],
+            },
+        ),
+        migrations.RunPython(create_opening_balances, migrations.RunPython.noop),
+    ]
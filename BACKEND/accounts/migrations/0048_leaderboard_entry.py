@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0047_reward_points_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(unique=True)),
+                ('rank', models.PositiveIntegerField()),
+                ('reward_points', models.PositiveIntegerField(default=0)),
+                ('display_name', models.CharField(blank=True, max_length=201)),
+                ('profile_picture', models.CharField(blank=True, help_text='Storage name of the profile picture.', max_length=255)),
+                ('refreshed_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Leaderboard entry',
+                'verbose_name_plural': 'Leaderboard',
+                'ordering': ['position'],
+            },
+        ),
+    ]
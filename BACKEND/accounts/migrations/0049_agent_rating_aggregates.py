@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:14
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    AgentProfile = apps.get_model("accounts", "AgentProfile")
+    AgentReview = apps.get_model("accounts", "AgentReview")
+    stats = AgentReview.objects.values("agent_id").annotate(
+        total=Sum("rating"),
+        count=Count("id"),
+        **{f"stars_{n}": Count("id", filter=Q(rating=n)) for n in range(1, 6)},
+    )
+    for row in stats:
+        AgentProfile.objects.filter(user_id=row["agent_id"]).update(
+            rating=(Decimal(row["total"]) / row["count"]).quantize(Decimal("0.1"), ROUND_HALF_UP),
+            rating_sum=row["total"],
+            rating_count=row["count"],
+            **{f"rating_{n}_count": row[f"stars_{n}"] for n in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0048_leaderboard_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentprofile',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agentprofile',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agentprofile',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agentprofile',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agentprofile',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agentprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agentprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
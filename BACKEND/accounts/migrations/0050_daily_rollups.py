@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0049_agent_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed_until', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Daily rollup watermark',
+                'verbose_name_plural': 'Daily rollup watermark',
+            },
+        ),
+        migrations.CreateModel(
+            name='PlatformDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('new_travelers', models.PositiveIntegerField(default=0)),
+                ('new_packages', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('custom_requests', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Platform daily stats',
+                'verbose_name_plural': 'Platform daily stats',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='AgentDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('confirmed_bookings', models.PositiveIntegerField(default=0)),
+                ('confirmed_travelers', models.PositiveIntegerField(default=0)),
+                ('confirmed_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Agent daily stats',
+                'verbose_name_plural': 'Agent daily stats',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('agent', 'day'), name='agent_daily_stats_agent_day_uniq')],
+            },
+        ),
+    ]
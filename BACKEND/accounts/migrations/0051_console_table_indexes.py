@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0050_daily_rollups'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agentreview',
+            index=models.Index(fields=['created_at', 'id'], name='agent_review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agentreview',
+            index=models.Index(fields=['agent', 'created_at', 'id'], name='agent_review_agent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agentreview',
+            index=models.Index(fields=['rating', 'created_at', 'id'], name='agent_review_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refundrequest',
+            index=models.Index(fields=['created_at', 'id'], name='refund_req_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refundrequest',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='refund_req_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'date_joined', 'id'], name='user_role_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0051_console_table_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItineraryPdfJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('send_to_chat', models.BooleanField(default=False, help_text='Attach the rendered PDF to a new chat message from requested_by when the job finishes.')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('rendering', 'Rendering'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('message', models.ForeignKey(blank=True, help_text='Chat message the PDF was attached to (send_to_chat jobs).', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.chatmessage')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itinerary_pdf_jobs', to=settings.AUTH_USER_MODEL)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='accounts.itinerarytrip')),
+            ],
+            options={
+                'verbose_name': 'Itinerary PDF Job',
+                'verbose_name_plural': 'Itinerary PDF Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='itin_pdf_job_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+
+from django.db import migrations
+
+# Console prefix searches (istartswith) compile to UPPER("col"::text) LIKE UPPER('term%') on
+# PostgreSQL; only an expression index on exactly that, with text_pattern_ops, serves them.
+SEARCH_INDEXES = (
+    ("User", "email", "user_email_prefix_idx"),
+    ("UserProfile", "first_name", "user_profile_first_prefix_idx"),
+    ("UserProfile", "last_name", "user_profile_last_prefix_idx"),
+    ("AgentProfile", "first_name", "agent_profile_first_prefix_idx"),
+    ("AgentProfile", "last_name", "agent_profile_last_prefix_idx"),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    for model_name, column, index_name in SEARCH_INDEXES:
+        table = apps.get_model("accounts", model_name)._meta.db_table
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(index_name)} "
+            f"ON {quote(table)} (UPPER({quote(column)}::text) text_pattern_ops)"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, _, index_name in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0052_itinerary_pdf_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
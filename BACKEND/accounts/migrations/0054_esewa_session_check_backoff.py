@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0053_console_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='esewapaymentsession',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='esewapaymentsession',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='esewapaymentsession',
+            name='status',
+            field=models.CharField(choices=[('initiated', 'Initiated'), ('success_redirected', 'Success Redirected'), ('failed_redirected', 'Failed Redirected'), ('verified', 'Verified'), ('verify_failed', 'Verify Failed'), ('closed', 'Closed'), ('needs_refund', 'Needs Refund')], default='initiated', max_length=32),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:02
+
+from django.db import migrations
+
+# The agent traveler directory also prefix-searches phone numbers (istartswith); same expression
+# index as the console search indexes in 0053.
+INDEX_NAME = "user_profile_phone_prefix_idx"
+
+
+def create_phone_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    table = apps.get_model("accounts", "UserProfile")._meta.db_table
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {quote(INDEX_NAME)} "
+        f"ON {quote(table)} (UPPER({quote('phone_number')}::text) text_pattern_ops)"
+    )
+
+
+def drop_phone_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(INDEX_NAME)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0054_esewa_session_check_backoff'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_phone_index, drop_phone_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:23
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_rewarded_at(apps, schema_editor):
+    # Bookings already credited keep their guard; 0-point ones are marked by the next award run.
+    Booking = apps.get_model("accounts", "Booking")
+    Booking.objects.filter(reward_points_given__gt=0, rewarded_at__isnull=True).update(rewarded_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0055_traveler_phone_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='rewarded_at',
+            field=models.DateTimeField(blank=True, help_text='When the completed-trip reward was processed (also for 0-point bookings); prevents double-award.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='reward_points_given',
+            field=models.PositiveIntegerField(default=0, help_text='Points awarded for this booking (10% of total). Used to deduct on delete.'),
+        ),
+        migrations.RunPython(backfill_rewarded_at, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,8 @@
-import secrets
-
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-
-
-def _random_five_digit_booking_code():
-    """Random 5-character code using digits 0-9 only (digits may repeat)."""
-    return "".join(secrets.choice("0123456789") for _ in range(5))
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 
 
 class Roles(models.TextChoices):
@@ -59,6 +54,12 @@ class User(AbstractUser):
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Admin users console: per-role keyset pages in join order.
+            models.Index(fields=["role", "date_joined", "id"], name="user_role_joined_idx"),
+        ]
+
     def __str__(self):
         return f"{self.email} ({self.role})"
 
@@ -120,6 +121,15 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.email} - Profile"
 
+    def save(self, *args, **kwargs):
+        # reward_points is only changed through accounts.rewards (F() updates recorded in the
+        # RewardPointsEntry ledger); a full save() of a loaded profile must not write back a stale balance.
+        if kwargs.get("update_fields") is None and not self._state.adding and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != "reward_points"
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         if self.first_name and self.last_name:
@@ -142,9 +152,28 @@ class AgentProfile(models.Model):
     location = models.CharField(max_length=200, blank=True, help_text="Agent location")
     is_verified = models.BooleanField(default=False)
     rating = models.DecimalField(max_digits=3, decimal_places=1, default=0.0, help_text="Average rating from travelers (0-5)")
+    # Review aggregates, maintained incrementally by accounts.agent_ratings (F() updates on review writes).
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RATING_AGGREGATE_FIELDS = (
+        "rating",
+        "rating_sum",
+        "rating_count",
+        "rating_1_count",
+        "rating_2_count",
+        "rating_3_count",
+        "rating_4_count",
+        "rating_5_count",
+    )
+
     class Meta:
         verbose_name = "Agent Profile"
         verbose_name_plural = "Agent Profiles"
@@ -152,6 +181,22 @@ class AgentProfile(models.Model):
     def __str__(self):
         return f"{self.user.email} - Agent Profile"
 
+    def save(self, *args, **kwargs):
+        # Rating aggregates are only changed through accounts.agent_ratings; a full save() of a loaded
+        # profile (e.g. profile edit) must not write back stale values over a concurrent review.
+        if kwargs.get("update_fields") is None and not self._state.adding and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.RATING_AGGREGATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def rating_histogram(self):
+        """Review counts per star, highest first: [{"rating": 5, "count": n}, ...]."""
+        return [{"rating": n, "count": getattr(self, f"rating_{n}_count")} for n in range(5, 0, -1)]
+
     @property
     def full_name(self):
         if self.first_name and self.last_name:
@@ -234,6 +279,15 @@ class Package(models.Model):
         default=PackageStatus.ACTIVE
     )
     participants_count = models.PositiveIntegerField(default=0, help_text="Number of people who joined")
+    capacity = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Max travelers (seats) for this departure. Empty = unlimited.",
+    )
+    seats_held = models.PositiveIntegerField(
+        default=0,
+        help_text="Seats reserved by eSewa payments in progress (see SeatHold).",
+    )
     source_custom_package = models.OneToOneField(
         "CustomPackage",
         on_delete=models.SET_NULL,
@@ -262,10 +316,41 @@ class Package(models.Model):
     def __str__(self):
         return f"{self.title} - {self.location}, {self.country}"
 
+    # Fields that drive ScheduledReminder.due_at; changing any of them re-plans reminders.
+    REMINDER_SCHEDULE_FIELDS = ("trip_start_date", "trip_start_time", "trip_end_date")
+    # Seat counters are only changed through accounts.seat_inventory (atomic F() updates). A full
+    # save() of an already loaded package must not write back stale values over concurrent bookings.
+    SEAT_COUNTER_FIELDS = ("participants_count", "seats_held")
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None and not self._state.adding and not kwargs.get("force_insert"):
+            update_fields = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.SEAT_COUNTER_FIELDS
+            ]
+            kwargs["update_fields"] = update_fields
+        previous = None
+        if self.pk and (update_fields is None or set(update_fields) & set(self.REMINDER_SCHEDULE_FIELDS)):
+            previous = Package.objects.filter(pk=self.pk).values_list(*self.REMINDER_SCHEDULE_FIELDS).first()
+        super().save(*args, **kwargs)
+        if previous is not None and previous != tuple(getattr(self, f) for f in self.REMINDER_SCHEDULE_FIELDS):
+            from .booking_trip_notifications import schedule_booking_reminders
+
+            schedule_booking_reminders(package_ids=[self.pk])
+
     @property
     def duration_display(self):
         return f"{self.duration_days} Days / {self.duration_nights} Nights"
 
+    @property
+    def seats_left(self):
+        """Seats still bookable (confirmed and held seats excluded), or None when capacity is unlimited."""
+        if self.capacity is None:
+            return None
+        return max(self.capacity - (self.participants_count or 0) - (self.seats_held or 0), 0)
+
     @property
     def agent_rating(self):
         """Rating from the package's agent (from AgentProfile)"""
@@ -326,6 +411,49 @@ def get_active_deal(package, now=None):
     )
 
 
+class DealAudienceReason(models.TextChoices):
+    BOOKMARK = "bookmark", "Bookmarked the package"
+    PAST_BOOKER = "past_booker", "Booked with this agent before"
+    COUNTRY_INTEREST = "country_interest", "Interested in this country"
+
+
+class DealDigestEntry(models.Model):
+    """
+    A deal queued for a traveler's next digest notification instead of being pushed immediately
+    (weak audience signal, or the traveler already hit the per-user deal notification cap).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="deal_digest_entries",
+    )
+    deal = models.ForeignKey(
+        Deal,
+        on_delete=models.CASCADE,
+        related_name="digest_entries",
+    )
+    reason = models.CharField(max_length=24, choices=DealAudienceReason.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Deal digest entry"
+        verbose_name_plural = "Deal digest entries"
+        ordering = ["created_at"]
+        unique_together = [["user", "deal"]]
+        indexes = [
+            models.Index(
+                fields=["user", "created_at"],
+                name="deal_digest_pending_idx",
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Deal {self.deal_id} -> user {self.user_id} ({self.reason})"
+
+
 class PackageBookmark(models.Model):
     """Traveler-saved packages (bookmarks)."""
     user = models.ForeignKey(
@@ -448,6 +576,23 @@ class PaymentStatus(models.TextChoices):
     REFUNDED = "refunded", "Refunded"
 
 
+class BookingCodeCounter(models.Model):
+    """
+    Single row holding the booking-code permutation key, plus the allocation counter on databases
+    without sequences (PostgreSQL uses the accounts_booking_code_seq sequence). See booking_codes.py.
+    """
+
+    key = models.CharField(max_length=64, editable=False)
+    next_index = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Booking code counter"
+        verbose_name_plural = "Booking code counter"
+
+    def __str__(self):
+        return f"Booking code counter (next index {self.next_index})"
+
+
 class Booking(models.Model):
     """Booking: a traveler books a package"""
     user = models.ForeignKey(
@@ -489,7 +634,12 @@ class Booking(models.Model):
     rewards_awarded = models.BooleanField(default=False, help_text="Whether reward points (10% of total) have been credited for this completed trip")
     reward_points_given = models.PositiveIntegerField(
         default=0,
-        help_text="Points awarded for this booking (10% of total). Used to prevent double-award and to deduct on delete.",
+        help_text="Points awarded for this booking (10% of total). Used to deduct on delete.",
+    )
+    rewarded_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the completed-trip reward was processed (also for 0-point bookings); prevents double-award.",
     )
     reward_points_used = models.PositiveIntegerField(
         default=0,
@@ -506,13 +656,14 @@ class Booking(models.Model):
         help_text="eSewa reference after refund (e.g. ref_id from status API).",
     )
     booking_code = models.CharField(
-        max_length=5,
+        max_length=8,
         unique=True,
         db_index=True,
         editable=False,
-        help_text="Public 5-digit code (0-9, repeatable). Unique per booking for lookup and filtering.",
+        help_text="Public numeric code (5 digits, longer once the 5-digit range is used up). Unique per booking for lookup and filtering.",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = "Booking"
@@ -524,17 +675,165 @@ class Booking(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.booking_code:
-            for _ in range(500):
-                candidate = _random_five_digit_booking_code()
-                qs = Booking.objects.filter(booking_code=candidate)
-                if self.pk:
-                    qs = qs.exclude(pk=self.pk)
-                if not qs.exists():
-                    self.booking_code = candidate
-                    break
-            else:
-                raise RuntimeError("Unable to allocate a unique booking_code; try again.")
+            from .booking_codes import allocate_booking_code
+
+            self.booking_code = allocate_booking_code()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "updated_at" not in update_fields:
+            # Partial saves (e.g. status only) still bump updated_at; the daily rollups find changed bookings by it.
+            kwargs["update_fields"] = [*update_fields, "updated_at"]
+        if self._state.adding:
+            status_changed = True
+        elif update_fields is not None:
+            status_changed = "status" in update_fields
+        else:
+            # Full saves (admin, serializers) re-plan only when the stored status actually differs.
+            status_changed = Booking.objects.filter(pk=self.pk).values_list("status", flat=True).first() != self.status
         super().save(*args, **kwargs)
+        if status_changed:
+            # Confirmed → plan reminders; cancelled → drop pending ones.
+            from .booking_trip_notifications import schedule_booking_reminders
+
+            schedule_booking_reminders(booking_ids=[self.pk])
+
+
+class RewardPointsEntry(models.Model):
+    """
+    Ledger of reward point changes. UserProfile.reward_points is the running balance and always equals
+    the sum of a traveler's entries (see accounts.rewards.reward_balance_discrepancies).
+    """
+
+    class Kind(models.TextChoices):
+        OPENING = "opening", "Opening balance"
+        EARNED = "earned", "Earned (completed trip)"
+        REDEEMED = "redeemed", "Redeemed on booking"
+        RESTORED = "restored", "Restored (booking cancelled)"
+        ADJUSTMENT = "adjustment", "Adjustment"
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="reward_points_entries",
+    )
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="reward_points_entries",
+    )
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    points = models.IntegerField(help_text="Signed change to the balance (negative when points are spent).")
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Reward points entry"
+        verbose_name_plural = "Reward points ledger"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="reward_entry_user_created_idx"),
+        ]
+        constraints = [
+            # A booking earns its trip reward at most once.
+            models.UniqueConstraint(
+                fields=["booking"],
+                condition=models.Q(kind="earned"),
+                name="reward_entry_earned_once",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.points:+d} ({self.kind})"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Materialized traveler leaderboard, rebuilt by accounts.leaderboard.refresh_leaderboard().
+    position is the unique row number (ties broken by profile id); rank is the shared competition rank.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="leaderboard_entry",
+    )
+    position = models.PositiveIntegerField(unique=True)
+    rank = models.PositiveIntegerField()
+    reward_points = models.PositiveIntegerField(default=0)
+    display_name = models.CharField(max_length=201, blank=True)
+    profile_picture = models.CharField(max_length=255, blank=True, help_text="Storage name of the profile picture.")
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Leaderboard entry"
+        verbose_name_plural = "Leaderboard"
+        ordering = ["position"]
+
+    def __str__(self):
+        return f"#{self.rank} {self.display_name} ({self.reward_points} pts)"
+
+
+class DailyRollupWatermark(models.Model):
+    """
+    Single row: source rows created or updated before processed_until are already reflected in
+    PlatformDailyStats / AgentDailyStats (see accounts.daily_rollups).
+    """
+
+    processed_until = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Daily rollup watermark"
+        verbose_name_plural = "Daily rollup watermark"
+
+    def __str__(self):
+        return f"Daily rollups processed until {self.processed_until:%Y-%m-%d %H:%M}"
+
+
+class PlatformDailyStats(models.Model):
+    """Platform-wide activity per local day, maintained by accounts.daily_rollups.refresh_daily_rollups()."""
+
+    day = models.DateField(unique=True)
+    new_travelers = models.PositiveIntegerField(default=0)
+    new_packages = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    custom_requests = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Platform daily stats"
+        verbose_name_plural = "Platform daily stats"
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f"Platform stats {self.day}"
+
+
+class AgentDailyStats(models.Model):
+    """Per-agent activity per local day (bookings by booking day, reviews by review day)."""
+
+    agent = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="daily_stats",
+    )
+    day = models.DateField()
+    bookings = models.PositiveIntegerField(default=0)
+    confirmed_bookings = models.PositiveIntegerField(default=0)
+    confirmed_travelers = models.PositiveIntegerField(default=0)
+    confirmed_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Agent daily stats"
+        verbose_name_plural = "Agent daily stats"
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(fields=["agent", "day"], name="agent_daily_stats_agent_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.agent_id} stats {self.day}"
 
 
 class BookingAdminActionType(models.TextChoices):
@@ -596,12 +895,55 @@ class BookingTripReminder(models.Model):
         return f"Booking {self.booking_id} {self.kind}"
 
 
+class ScheduledReminder(models.Model):
+    """
+    Precomputed trip reminder: when (due_at) each kind should go out for a confirmed booking.
+    Planned when a booking is confirmed and re-planned when its package's trip dates change, so the
+    reminder runner only reads rows with due_at <= now AND sent_at IS NULL.
+    """
+
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.CASCADE,
+        related_name="scheduled_reminders",
+    )
+    kind = models.CharField(max_length=16, choices=BookingTripReminderKind.choices)
+    due_at = models.DateTimeField()
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Do not send at or after this time (trip start for 24h/1h reminders).",
+    )
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Scheduled reminder"
+        verbose_name_plural = "Scheduled reminders"
+        ordering = ["due_at"]
+        unique_together = [["booking", "kind"]]
+        indexes = [
+            models.Index(
+                fields=["due_at"],
+                name="sched_reminder_pending_due_idx",
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Booking {self.booking_id} {self.kind} due {self.due_at}"
+
+
 class EsewaPaymentSessionStatus(models.TextChoices):
     INITIATED = "initiated", "Initiated"
     SUCCESS_REDIRECTED = "success_redirected", "Success Redirected"
     FAILED_REDIRECTED = "failed_redirected", "Failed Redirected"
     VERIFIED = "verified", "Verified"
     VERIFY_FAILED = "verify_failed", "Verify Failed"
+    # Terminal at eSewa (canceled, expired, refunded): no longer checked.
+    CLOSED = "closed", "Closed"
+    # Paid at eSewa but the traveler already had a booking for the package: refund by hand.
+    NEEDS_REFUND = "needs_refund", "Needs Refund"
 
 
 class EsewaPaymentSession(models.Model):
@@ -651,6 +993,9 @@ class EsewaPaymentSession(models.Model):
     payment_reference = models.CharField(max_length=120, blank=True)
     esewa_status = models.CharField(max_length=40, blank=True)
     verification_payload = models.JSONField(default=dict, blank=True)
+    # Reconciliation worker: last status lookup and when the session is due again (backoff).
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    next_check_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -658,11 +1003,95 @@ class EsewaPaymentSession(models.Model):
         verbose_name = "eSewa Payment Session"
         verbose_name_plural = "eSewa Payment Sessions"
         ordering = ["-created_at"]
+        indexes = [
+            # Reconciliation worker scans pending sessions by status and age.
+            models.Index(fields=["status", "created_at"], name="esewa_session_status_idx"),
+        ]
 
     def __str__(self):
         return f"{self.transaction_uuid} ({self.status})"
 
 
+class SeatHold(models.Model):
+    """
+    Seats reserved for an eSewa payment in progress (Package.seats_held). Converted into confirmed
+    participants when the payment is verified, or released when it expires.
+    """
+
+    class HoldStatus(models.TextChoices):
+        ACTIVE = "active", "Active"
+        CONVERTED = "converted", "Converted to booking"
+        RELEASED = "released", "Released"
+
+    package = models.ForeignKey(
+        Package,
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+    )
+    payment_session = models.OneToOneField(
+        EsewaPaymentSession,
+        on_delete=models.CASCADE,
+        related_name="seat_hold",
+    )
+    seats = models.PositiveIntegerField()
+    status = models.CharField(max_length=16, choices=HoldStatus.choices, default=HoldStatus.ACTIVE)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Seat hold"
+        verbose_name_plural = "Seat holds"
+        indexes = [
+            models.Index(
+                fields=["expires_at"],
+                name="seat_hold_active_expiry_idx",
+                condition=models.Q(status="active"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.seats} seat(s) on package {self.package_id} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Client-supplied Idempotency-Key for a write endpoint. The first request stores its fingerprint and
+    (once it succeeds) its response; retries with the same key replay that response instead of
+    creating another booking / payment session / notification.
+    """
+
+    class KeyStatus(models.TextChoices):
+        IN_PROGRESS = "in_progress", "In progress"
+        COMPLETED = "completed", "Completed"
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+    )
+    key = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=16, choices=KeyStatus.choices, default=KeyStatus.IN_PROGRESS)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Idempotency key"
+        verbose_name_plural = "Idempotency keys"
+        unique_together = [["user", "key"]]
+        indexes = [
+            models.Index(fields=["created_at"], name="idempotency_key_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.path} [{self.key}] ({self.status})"
+
+
 class RefundRequestStatus(models.TextChoices):
     PENDING = "pending", "Pending"
     COMPLETED = "completed", "Completed"
@@ -717,6 +1146,11 @@ class RefundRequest(models.Model):
         verbose_name = "Refund Request"
         verbose_name_plural = "Refund Requests"
         ordering = ["-created_at"]
+        indexes = [
+            # Refund consoles: keyset pages by date, optionally within one status.
+            models.Index(fields=["created_at", "id"], name="refund_req_created_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="refund_req_status_idx"),
+        ]
 
     def __str__(self):
         return f"Refund #{self.pk} booking {self.booking_id} ({self.status})"
@@ -746,6 +1180,12 @@ class AgentReview(models.Model):
         verbose_name_plural = "Agent Reviews"
         ordering = ["-created_at"]
         unique_together = ["user", "agent"]  # One review per traveler per agent
+        indexes = [
+            # Admin reviews console: keyset pages by date, optionally within one agent or rating.
+            models.Index(fields=["created_at", "id"], name="agent_review_created_idx"),
+            models.Index(fields=["agent", "created_at", "id"], name="agent_review_agent_idx"),
+            models.Index(fields=["rating", "created_at", "id"], name="agent_review_rating_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.agent.email} ({self.rating}/5)"
@@ -755,28 +1195,28 @@ class AgentReview(models.Model):
             self.rating = 1
         elif self.rating > 5:
             self.rating = 5
-        super().save(*args, **kwargs)
-        self._update_agent_rating()
+        from .agent_ratings import apply_review_change
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = AgentReview.objects.filter(pk=self.pk).values_list("agent_id", "rating").first()
+            super().save(*args, **kwargs)
+            if previous is None:
+                apply_review_change(self.agent_id, new_rating=self.rating)
+            elif previous[0] == self.agent_id:
+                apply_review_change(self.agent_id, old_rating=previous[1], new_rating=self.rating)
+            else:
+                apply_review_change(previous[0], old_rating=previous[1])
+                apply_review_change(self.agent_id, new_rating=self.rating)
 
-    def delete(self, *args, **kwargs):
-        agent_user = self.agent
-        super().delete(*args, **kwargs)
-        AgentReview._update_agent_rating_for(agent_user)
 
-    def _update_agent_rating(self):
-        AgentReview._update_agent_rating_for(self.agent)
+@receiver(post_delete, sender=AgentReview)
+def _remove_deleted_review_from_agent_rating(sender, instance, **kwargs):
+    """Also covers queryset and cascade deletes, which bypass AgentReview.delete()."""
+    from .agent_ratings import apply_review_change
 
-    @staticmethod
-    def _update_agent_rating_for(agent_user):
-        """Update average rating on AgentProfile"""
-        from django.db.models import Avg
-        try:
-            agent_profile = AgentProfile.objects.get(user=agent_user)
-        except AgentProfile.DoesNotExist:
-            return
-        avg_rating = AgentReview.objects.filter(agent=agent_user).aggregate(Avg('rating'))['rating__avg']
-        agent_profile.rating = round(avg_rating, 1) if avg_rating else 0.0
-        agent_profile.save(update_fields=['rating'])
+    apply_review_change(instance.agent_id, old_rating=instance.rating)
 
 
 class AgentReviewAdminActionType(models.TextChoices):
@@ -1141,6 +1581,46 @@ class ItineraryDocumentItem(models.Model):
         return f"{self.trip_id} | {self.document_name}"
 
 
+class ItineraryPdfJob(models.Model):
+    """Off-request render of an itinerary PDF (accounts/itinerary_pdf_jobs.py); optionally sent to the chat when done."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RENDERING = "rendering", "Rendering"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    trip = models.ForeignKey(ItineraryTrip, on_delete=models.CASCADE, related_name="pdf_jobs")
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="itinerary_pdf_jobs")
+    send_to_chat = models.BooleanField(
+        default=False,
+        help_text="Attach the rendered PDF to a new chat message from requested_by when the job finishes.",
+    )
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    message = models.ForeignKey(
+        ChatMessage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Chat message the PDF was attached to (send_to_chat jobs).",
+    )
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Itinerary PDF Job"
+        verbose_name_plural = "Itinerary PDF Jobs"
+        indexes = [models.Index(fields=["status", "created_at"], name="itin_pdf_job_status_idx")]
+
+    def __str__(self):
+        return f"{self.trip_id} | {self.status}"
+
+
 class NotificationType(models.TextChoices):
     ALERT = "alert", "Alert"
     EMERGENCY = "emergency", "Emergency"
@@ -1201,11 +1681,46 @@ class NotificationRecipient(models.Model):
         verbose_name_plural = "Notification Recipients"
         ordering = ["-created_at"]
         unique_together = ["notification", "user"]
+        indexes = [
+            # Unread badge / inbox queries filter by user + is_read.
+            models.Index(fields=["user", "is_read"], name="notif_recip_user_read_idx"),
+            # Retention sweep scans read rows by age.
+            models.Index(fields=["is_read", "created_at"], name="notif_recip_read_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.notification.title} -> {self.user.email}"
 
 
+class NotificationRecipientArchive(models.Model):
+    """
+    Compact copy of a read NotificationRecipient moved out of the hot table by the retention job.
+    Keeps only what is needed to show old inbox history; the Notification itself may be purged later.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="archived_notifications",
+    )
+    notification_id = models.PositiveBigIntegerField(help_text="Original Notification id (row may have been purged).")
+    notification_type = models.CharField(max_length=32, choices=NotificationType.choices, default=NotificationType.GENERAL)
+    title = models.CharField(max_length=200)
+    sender_id = models.PositiveBigIntegerField(null=True, blank=True)
+    delivered_at = models.DateTimeField(help_text="When the original recipient row was created.")
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived Notification Recipient"
+        verbose_name_plural = "Archived Notification Recipients"
+        ordering = ["-delivered_at"]
+        indexes = [
+            models.Index(fields=["user", "-delivered_at"], name="notif_archive_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.title} -> user {self.user_id} (archived)"
+
+
 class ExpoPushToken(models.Model):
     """Expo push token for a user device (traveler/agent app). One row per device token."""
 
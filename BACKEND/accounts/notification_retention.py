@@ -0,0 +1,137 @@
+"""
+Retention for in-app notifications.
+
+Deal broadcasts add one NotificationRecipient row per traveler, so the hot tables grow without limit.
+This module keeps them small:
+- Read recipient rows older than N days are copied to NotificationRecipientArchive and removed.
+- Notifications left without any recipient (and older than the same cutoff) are purged.
+
+Work is done in small primary-key batches, each in its own short transaction, so the inbox and
+unread-count queries never wait behind one long table-wide delete.
+
+Run periodically via: python manage.py prune_notifications
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationRecipient, NotificationRecipientArchive
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _retention_days(days=None) -> int:
+    if days is None:
+        days = getattr(settings, "NOTIFICATION_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+    return max(int(days), 1)
+
+
+def _batch_size(batch_size=None) -> int:
+    if batch_size is None:
+        batch_size = getattr(settings, "NOTIFICATION_RETENTION_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    return max(int(batch_size), 1)
+
+
+def archive_read_recipients(cutoff, batch_size: int, pause: float = 0.0, dry_run: bool = False) -> int:
+    """
+    Move read recipient rows created before ``cutoff`` into the archive table.
+    Returns the number of rows archived (or that would be archived when ``dry_run``).
+    """
+    base_qs = NotificationRecipient.objects.filter(is_read=True, created_at__lt=cutoff)
+    if dry_run:
+        return base_qs.count()
+
+    archived = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            # Lock the batch: a row cannot be flipped back to unread between being read here, deleted
+            # and archived, so exactly the rows removed are archived.
+            rows = list(
+                base_qs.filter(pk__gt=last_pk)
+                .select_related("notification")
+                .select_for_update(of=("self",))
+                .order_by("pk")
+                .only(
+                    "pk",
+                    "user_id",
+                    "created_at",
+                    "notification__id",
+                    "notification__title",
+                    "notification__notification_type",
+                    "notification__sender_id",
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            NotificationRecipient.objects.filter(pk__in=[r.pk for r in rows], is_read=True).delete()
+            NotificationRecipientArchive.objects.bulk_create(
+                [
+                    NotificationRecipientArchive(
+                        user_id=r.user_id,
+                        notification_id=r.notification_id,
+                        notification_type=r.notification.notification_type,
+                        title=r.notification.title,
+                        sender_id=r.notification.sender_id,
+                        delivered_at=r.created_at,
+                    )
+                    for r in rows
+                ]
+            )
+        archived += len(rows)
+        last_pk = rows[-1].pk
+        if pause:
+            time.sleep(pause)
+    return archived
+
+
+def purge_orphan_notifications(cutoff, batch_size: int, pause: float = 0.0, dry_run: bool = False) -> int:
+    """
+    Delete notifications created before ``cutoff`` that no longer have any recipient rows.
+    Returns the number of notifications deleted (or that would be deleted when ``dry_run``).
+    """
+    base_qs = Notification.objects.filter(created_at__lt=cutoff, recipients__isnull=True)
+    if dry_run:
+        return base_qs.count()
+
+    purged = 0
+    last_pk = 0
+    while True:
+        ids = list(base_qs.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            # Orphan condition re-applied inside the delete in case a recipient was added meanwhile.
+            deleted, _ = Notification.objects.filter(pk__in=ids, recipients__isnull=True).delete()
+        purged += deleted
+        last_pk = ids[-1]
+        if pause:
+            time.sleep(pause)
+    return purged
+
+
+def run_notification_retention(days=None, batch_size=None, pause: float = 0.0, dry_run: bool = False) -> dict:
+    """Archive old read recipients, then purge notifications left without recipients. Returns counts."""
+    days = _retention_days(days)
+    batch_size = _batch_size(batch_size)
+    cutoff = timezone.now() - timedelta(days=days)
+
+    archived = archive_read_recipients(cutoff, batch_size, pause=pause, dry_run=dry_run)
+    purged = purge_orphan_notifications(cutoff, batch_size, pause=pause, dry_run=dry_run)
+    logger.info(
+        "Notification retention (days=%s, dry_run=%s): archived=%s purged=%s",
+        days,
+        dry_run,
+        archived,
+        purged,
+    )
+    return {"archived": archived, "purged": purged, "days": days}
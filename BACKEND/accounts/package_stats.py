@@ -0,0 +1,67 @@
+"""
+Per-package booking statistics as correlated subqueries.
+
+Annotating Count(distinct=True) / Sum / Max over a join to bookings multiplies every package row by its
+bookings and then needs DISTINCT sorts to undo it. Each statistic here is a separate scalar subquery
+(SELECT COUNT(*) FROM booking WHERE package_id = outer.id AND ...) served by the booking package index,
+so the outer package query keeps one row per package and can be paginated with LIMIT/OFFSET.
+
+Those subqueries run once per returned row, so they belong on a page of packages, not on the whole
+filtered set: package_totals() computes the list header over any number of packages with two
+set-based aggregates instead.
+"""
+from __future__ import annotations
+
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Booking, BookingStatus, PackageStatus, PaymentStatus
+
+
+def _booking_subquery(aggregate, output_field=None, **filters):
+    bookings = Booking.objects.filter(package=OuterRef("pk"), **filters).order_by().values("package")
+    return Subquery(bookings.annotate(value=aggregate).values("value"), output_field=output_field)
+
+
+def _booking_count(**filters):
+    return Coalesce(_booking_subquery(Count("id"), IntegerField(), **filters), Value(0))
+
+
+def with_booking_stats(queryset):
+    """
+    Annotate packages with confirmed_bookings_count, cancelled_bookings_count, refund_pending_count,
+    joined_travelers_count (confirmed seats; participants_count when there are no confirmed bookings)
+    and last_booking_at.
+    """
+    return queryset.annotate(
+        confirmed_bookings_count=_booking_count(status=BookingStatus.CONFIRMED),
+        cancelled_bookings_count=_booking_count(status=BookingStatus.CANCELLED),
+        refund_pending_count=_booking_count(payment_status=PaymentStatus.REFUND_PENDING),
+        joined_travelers_count=Coalesce(
+            _booking_subquery(Sum("traveler_count"), IntegerField(), status=BookingStatus.CONFIRMED),
+            F("participants_count"),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        last_booking_at=_booking_subquery(Max("created_at")),
+    )
+
+
+def package_totals(queryset) -> dict:
+    """
+    Header totals for a filtered package queryset: active, completed, draft, agents,
+    confirmed_bookings and joined_travelers (same rule as joined_travelers_count, summed).
+    """
+    confirmed = Booking.objects.filter(package__in=queryset.values("pk"), status=BookingStatus.CONFIRMED)
+    booking_totals = confirmed.aggregate(bookings=Count("id"), seats=Sum("traveler_count"))
+    totals = queryset.order_by().aggregate(
+        active=Count("id", filter=Q(status=PackageStatus.ACTIVE)),
+        completed=Count("id", filter=Q(status=PackageStatus.COMPLETED)),
+        draft=Count("id", filter=Q(status=PackageStatus.DRAFT)),
+        agents=Count("agent", distinct=True),
+        unbooked_participants=Sum("participants_count", filter=~Q(pk__in=confirmed.values("package"))),
+    )
+    unbooked = totals.pop("unbooked_participants") or 0
+    totals["confirmed_bookings"] = booking_totals["bookings"]
+    totals["joined_travelers"] = (booking_totals["seats"] or 0) + unbooked
+    return totals
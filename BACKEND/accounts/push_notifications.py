@@ -41,24 +41,24 @@ def send_expo_push_for_notification(notification, recipient_user_ids):
         )
         return
 
-    title = (notification.title or "TRIPLINK")[:200]
-    body = (notification.message or "")[:1000]
-    notif_id = str(notification.id)
-
-    messages = [
-        {
-            "to": t,
-            "title": title,
-            "body": body,
-            "sound": "default",
-            "data": {
-                "type": "triplink_notification",
-                "notification_id": notif_id,
-            },
-        }
-        for t in tokens
-    ]
+    _post_expo_messages([_expo_message(t, notification) for t in tokens])
 
+
+def _expo_message(token, notification):
+    return {
+        "to": token,
+        "title": (notification.title or "TRIPLINK")[:200],
+        "body": (notification.message or "")[:1000],
+        "sound": "default",
+        "data": {
+            "type": "triplink_notification",
+            "notification_id": str(notification.id),
+        },
+    }
+
+
+def _post_expo_messages(messages):
+    """POST messages to Expo in chunks of CHUNK_SIZE; failures are logged, never raised."""
     for i in range(0, len(messages), CHUNK_SIZE):
         chunk = messages[i : i + CHUNK_SIZE]
         try:
@@ -84,41 +84,34 @@ def send_expo_push_for_notification(notification, recipient_user_ids):
             logger.exception("Expo push failed unexpectedly")
 
 
-def create_and_send_deal_notification(deal):
+def send_expo_push_batch(items):
     """
-    Create an in-app notification for a newly created deal and send push to all travelers.
-
-    :param deal: Deal model instance (must have package and agent populated)
-    """
-    from django.db import transaction
-
-    from .models import Notification, NotificationRecipient, Roles, User
+    Send pushes for many notifications at once.
 
-    package = deal.package
-    agent = deal.agent
-    valid_until_str = deal.valid_until.strftime("%b %d, %Y") if deal.valid_until else ""
+    One token lookup for all recipients, then messages from every notification are packed into
+    shared Expo requests (CHUNK_SIZE per request) instead of one request series per notification.
 
-    title = f"Hot Deal: {package.title}"
-    message = f"{deal.discount_percent}% off! Book before {valid_until_str}."
+    :param items: iterable of (notification, recipient_user_ids) pairs
+    """
+    from .models import ExpoPushToken
 
-    recipients = User.objects.filter(role=Roles.TRAVELER)
-    if not recipients.exists():
-        logger.info("No travelers to notify for deal %s", deal.id)
+    items = [(n, {int(uid) for uid in ids if uid is not None}) for n, ids in items]
+    all_ids = set().union(*(ids for _, ids in items)) if items else set()
+    if not all_ids:
         return
 
-    with transaction.atomic():
-        notification = Notification.objects.create(
-            title=title,
-            message=message,
-            notification_type="promotion",
-            sender=agent,
-        )
-        NotificationRecipient.objects.bulk_create(
-            [NotificationRecipient(notification=notification, user=u) for u in recipients]
-        )
+    tokens_by_user = {}
+    for user_id, token in ExpoPushToken.objects.filter(user_id__in=all_ids).values_list("user_id", "token"):
+        tokens_by_user.setdefault(user_id, []).append(token)
+    if not tokens_by_user:
+        logger.info("Expo push batch skipped: no device tokens for %s recipient(s).", len(all_ids))
+        return
 
-    recipient_ids = list(recipients.values_list("id", flat=True))
-    send_expo_push_for_notification(notification, recipient_ids)
+    messages = []
+    for notification, user_ids in items:
+        tokens = {t for uid in user_ids for t in tokens_by_user.get(uid, ())}
+        messages.extend(_expo_message(t, notification) for t in sorted(tokens))
+    _post_expo_messages(messages)
 
 
 def _agent_display_name(agent):
@@ -0,0 +1,151 @@
+"""
+Reward points for completed trips (10% of booking total, 1 point = 1 NPR).
+
+Every balance change goes through adjust_reward_points(): it writes a RewardPointsEntry and applies
+the same signed amount to UserProfile.reward_points with an F() update, so the balance is auditable
+(it always equals the sum of the traveler's ledger entries) and concurrent changes cannot lose points.
+
+Trip rewards are credited in batches by award_completed_trip_rewards() (scheduler job
+"reward_awarding"), not on profile reads.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .booking_trip_notifications import mark_overdue_packages_completed
+from .models import Booking, BookingStatus, PackageStatus, RewardPointsEntry, UserProfile
+
+logger = logging.getLogger(__name__)
+
+AWARD_BATCH_SIZE = 500
+
+
+def reward_points_for_booking(booking: Booking) -> int:
+    amount = float(booking.total_amount or 0)
+    if amount <= 0:
+        amount = float(booking.price_per_person_snapshot or 0) * (booking.traveler_count or 1)
+    return int(amount * 0.10)  # 10% of booking total
+
+
+def _apply_to_balances(totals: dict) -> None:
+    """Add per-user point totals to UserProfile.reward_points (one F() UPDATE per user)."""
+    if not totals:
+        return
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in totals],
+        ignore_conflicts=True,
+    )
+    now = timezone.now()
+    for user_id, points in totals.items():
+        UserProfile.objects.filter(user_id=user_id).update(
+            reward_points=F("reward_points") + points,
+            updated_at=now,
+        )
+
+
+def adjust_reward_points(user_id, points: int, kind, booking=None, note: str = ""):
+    """
+    Record a signed balance change in the ledger and apply it; returns the entry (None for 0 points).
+    Callers spending points must have checked the balance (under the profile row lock) first.
+    """
+    if not points:
+        return None
+    with transaction.atomic():
+        entry = RewardPointsEntry.objects.create(
+            user_id=user_id, booking=booking, kind=kind, points=points, note=note[:255]
+        )
+        _apply_to_balances({user_id: points})
+    return entry
+
+
+def award_completed_trip_rewards(user=None, batch_size: int = AWARD_BATCH_SIZE) -> int:
+    """
+    Credit points for confirmed bookings on completed packages that have not been rewarded yet.
+    Platform-wide when ``user`` is None. Returns the number of bookings rewarded.
+
+    Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent runs work on different
+    bookings; bookings are marked with bulk_update, ledger entries are bulk-created, and balances get one
+    F() increment per traveler. rewarded_at is the per-booking guard (even if an admin unchecks
+    rewards_awarded); it is also set on bookings worth 0 points so they are not selected again. The
+    ledger allows one EARNED entry per booking.
+    """
+    mark_overdue_packages_completed()
+    unrewarded = Booking.objects.filter(
+        status=BookingStatus.CONFIRMED,
+        rewarded_at__isnull=True,
+        package__status=PackageStatus.COMPLETED,
+    )
+    if user is not None:
+        unrewarded = unrewarded.filter(user=user)
+
+    rewarded = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                unrewarded.select_for_update(skip_locked=True, of=("self",))
+                .only(
+                    "pk",
+                    "user_id",
+                    "total_amount",
+                    "price_per_person_snapshot",
+                    "traveler_count",
+                    "rewards_awarded",
+                    "reward_points_given",
+                )
+                .order_by("pk")[:batch_size]
+            )
+            if not batch:
+                break
+            entries = []
+            totals = defaultdict(int)
+            now = timezone.now()
+            for booking in batch:
+                booking.rewarded_at = now
+                points = reward_points_for_booking(booking)
+                if points <= 0:
+                    continue  # nothing to credit (free booking); rewarded_at still takes it out of the queue
+                booking.rewards_awarded = True
+                booking.reward_points_given = points
+                entries.append(
+                    RewardPointsEntry(
+                        user_id=booking.user_id,
+                        booking_id=booking.pk,
+                        kind=RewardPointsEntry.Kind.EARNED,
+                        points=points,
+                    )
+                )
+                totals[booking.user_id] += points
+            Booking.objects.bulk_update(batch, ["rewarded_at", "rewards_awarded", "reward_points_given"])
+            RewardPointsEntry.objects.bulk_create(entries)
+            _apply_to_balances(totals)
+        rewarded += len(entries)
+        if len(batch) < batch_size:
+            break
+    if rewarded:
+        logger.info("Awarded trip reward points for %s booking(s).", rewarded)
+    return rewarded
+
+
+def reward_balance_discrepancies():
+    """Profiles whose reward_points differ from their ledger sum: list of (user_id, balance, ledger_sum)."""
+    ledger_sum = (
+        RewardPointsEntry.objects.filter(user_id=OuterRef("user_id"))
+        .values("user_id")
+        .annotate(total=Sum("points"))
+        .values("total")
+    )
+    rows = (
+        UserProfile.objects.annotate(
+            ledger_total=Coalesce(Subquery(ledger_sum, output_field=IntegerField()), Value(0))
+        )
+        .exclude(reward_points=F("ledger_total"))
+        .values_list("user_id", "reward_points", "ledger_total")
+        .order_by("user_id")
+    )
+    return list(rows)
@@ -0,0 +1,359 @@
+"""
+In-process periodic job runner used by ``python manage.py run_scheduler``.
+
+Replaces external cron for the background jobs:
+- trip_reminders          process_booking_trip_reminders (every minute)
+- package_expiry          mark_overdue_packages_completed
+- reward_awarding         award_completed_trip_rewards (platform-wide)
+- payment_reconciliation  reconcile_pending_esewa_sessions
+- deal_digest             send_deal_digests
+- idempotency_cleanup     purge_expired_idempotency_keys
+- seat_hold_expiry        release_expired_holds
+- leaderboard_refresh     refresh_leaderboard
+- daily_rollups           refresh_daily_rollups
+
+Only one instance runs jobs at a time (leader election): on PostgreSQL a session-level advisory
+lock held on a dedicated DB connection of the scheduler, elsewhere (SQLite dev) an exclusive lock on a local
+file. Standby instances keep retrying and take over when the leader's connection/process goes away.
+Each job gets random jitter on its interval and per-job timing metrics that are logged after every
+run and kept in the cache for inspection.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import random
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LOCK_NAME = "triplink.run_scheduler"
+METRICS_CACHE_KEY = "scheduler_job_metrics"
+
+
+def _advisory_lock_key(name: str) -> int:
+    """Stable signed 64-bit key for pg_try_advisory_lock."""
+    digest = hashlib.sha256(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class PostgresAdvisoryLock:
+    """
+    Session-level advisory lock held on a dedicated connection (released if that connection drops).
+
+    The connection is created outside Django's connection handler, so the close_old_connections()
+    calls between jobs (CONN_MAX_AGE) never close it and never drop the lock with it.
+    """
+
+    def __init__(self, name: str = SCHEDULER_LOCK_NAME, alias: str = DEFAULT_DB_ALIAS):
+        self.key = _advisory_lock_key(name)
+        self.alias = alias
+        self._conn = None
+        self._held = False
+
+    def _cursor(self):
+        if self._conn is None:
+            self._conn = connections.create_connection(self.alias)
+        return self._conn.cursor()
+
+    def _reset(self) -> None:
+        """Drop the lock connection; closing the session releases any advisory lock it held."""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._held = False
+
+    def acquire(self) -> bool:
+        if self.is_held():
+            return True
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [self.key])
+                self._held = bool(cursor.fetchone()[0])
+        except Exception:
+            logger.exception("Scheduler: could not take advisory lock.")
+            self._reset()
+        return self._held
+
+    def is_held(self) -> bool:
+        """Re-check on the server: a dropped/reset connection silently loses the lock."""
+        if not self._held:
+            return False
+        try:
+            with self._cursor() as cursor:
+                # A bigint key is stored as classid (high 32 bits) / objid (low 32 bits), objsubid 1;
+                # the shifted value is a signed bigint, like the key itself.
+                cursor.execute(
+                    "SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid() "
+                    "AND granted AND objsubid = 1 AND ((classid::bigint << 32) | objid::bigint) = %s",
+                    [self.key],
+                )
+                self._held = cursor.fetchone() is not None
+        except Exception:
+            logger.exception("Scheduler: could not check advisory lock; assuming it was lost.")
+            self._reset()
+        return self._held
+
+    def release(self) -> None:
+        if self._held:
+            try:
+                with self._cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", [self.key])
+            except Exception:
+                logger.warning("Scheduler: advisory unlock failed (connection already closed?).")
+        self._reset()
+
+
+class FileLock:
+    """Exclusive non-blocking lock on a local file (single-host fallback, e.g. SQLite in development)."""
+
+    def __init__(self, path=None):
+        self.path = str(
+            path
+            or getattr(settings, "SCHEDULER_LOCK_FILE", "")
+            or os.path.join(tempfile.gettempdir(), "triplink-run-scheduler.lock")
+        )
+        self._fh = None
+
+    def acquire(self) -> bool:
+        if self._fh is not None:
+            return True
+        fh = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(str(os.getpid()))
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def is_held(self) -> bool:
+        return self._fh is not None
+
+    def release(self) -> None:
+        if self._fh is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+
+def leader_lock():
+    """Advisory lock on PostgreSQL, file lock otherwise."""
+    if connection.vendor == "postgresql":
+        return PostgresAdvisoryLock()
+    return FileLock()
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+    last_started_at: float = 0.0
+    last_result: str = ""
+
+    @property
+    def avg_duration(self) -> float:
+        return self.total_duration / self.runs if self.runs else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_duration": round(self.last_duration, 4),
+            "avg_duration": round(self.avg_duration, 4),
+            "max_duration": round(self.max_duration, 4),
+            "last_started_at": self.last_started_at,
+            "last_result": self.last_result,
+        }
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    func: object
+    interval: float
+    jitter: float = 0.0
+    next_run: float = 0.0
+    metrics: JobMetrics = field(default_factory=JobMetrics)
+
+    def schedule_next(self, now: float) -> None:
+        self.next_run = now + self.interval + random.uniform(0, self.jitter)
+
+    def run(self) -> None:
+        started = time.monotonic()
+        self.metrics.last_started_at = time.time()
+        try:
+            result = self.func()
+        except Exception:
+            self.metrics.failures += 1
+            self.metrics.last_result = "error"
+            logger.exception("Scheduler job %s failed", self.name)
+        else:
+            self.metrics.last_result = str(result)[:500]
+        finally:
+            duration = time.monotonic() - started
+            self.metrics.runs += 1
+            self.metrics.last_duration = duration
+            self.metrics.total_duration += duration
+            self.metrics.max_duration = max(self.metrics.max_duration, duration)
+            logger.info(
+                "Scheduler job %s finished in %.3fs (avg %.3fs, max %.3fs, failures %s): %s",
+                self.name,
+                duration,
+                self.metrics.avg_duration,
+                self.metrics.max_duration,
+                self.metrics.failures,
+                self.metrics.last_result,
+            )
+
+
+def _job_interval(name: str, default: float) -> float:
+    overrides = getattr(settings, "SCHEDULER_JOB_INTERVALS", {}) or {}
+    return float(overrides.get(name, default))
+
+
+def default_jobs() -> list[ScheduledJob]:
+    from .booking_trip_notifications import mark_overdue_packages_completed, process_booking_trip_reminders
+    from .daily_rollups import refresh_daily_rollups
+    from .deal_notifications import send_deal_digests
+    from .idempotency import purge_expired_idempotency_keys
+    from .itinerary_pdf_jobs import recover_stale_jobs
+    from .leaderboard import refresh_leaderboard
+    from .esewa_reconciliation import reconcile_pending_esewa_sessions
+    from .rewards import award_completed_trip_rewards
+    from .seat_inventory import release_expired_holds
+
+    return [
+        ScheduledJob("trip_reminders", process_booking_trip_reminders, _job_interval("trip_reminders", 60), jitter=5),
+        ScheduledJob("package_expiry", mark_overdue_packages_completed, _job_interval("package_expiry", 15 * 60), jitter=60),
+        ScheduledJob("reward_awarding", award_completed_trip_rewards, _job_interval("reward_awarding", 30 * 60), jitter=120),
+        ScheduledJob(
+            "payment_reconciliation",
+            reconcile_pending_esewa_sessions,
+            _job_interval("payment_reconciliation", 2 * 60),
+            jitter=15,
+        ),
+        ScheduledJob("deal_digest", send_deal_digests, _job_interval("deal_digest", 15 * 60), jitter=60),
+        ScheduledJob(
+            "idempotency_cleanup",
+            purge_expired_idempotency_keys,
+            _job_interval("idempotency_cleanup", 60 * 60),
+            jitter=120,
+        ),
+        ScheduledJob("seat_hold_expiry", release_expired_holds, _job_interval("seat_hold_expiry", 60), jitter=5),
+        ScheduledJob(
+            "leaderboard_refresh",
+            refresh_leaderboard,
+            _job_interval("leaderboard_refresh", 5 * 60),
+            jitter=30,
+        ),
+        ScheduledJob("daily_rollups", refresh_daily_rollups, _job_interval("daily_rollups", 10 * 60), jitter=60),
+        ScheduledJob(
+            "itinerary_pdf_recovery",
+            recover_stale_jobs,
+            _job_interval("itinerary_pdf_recovery", 2 * 60),
+            jitter=15,
+        ),
+    ]
+
+
+def publish_metrics(jobs) -> None:
+    cache.set(METRICS_CACHE_KEY, {job.name: job.metrics.as_dict() for job in jobs}, timeout=None)
+
+
+class Scheduler:
+    """Runs due jobs sequentially (jobs never overlap) while this process holds the leader lock."""
+
+    def __init__(self, jobs, lock=None, tick: float = 1.0, standby_retry: float = 15.0):
+        self.jobs = list(jobs)
+        self.lock = lock or leader_lock()
+        self.tick = tick
+        self.standby_retry = standby_retry
+        self._stopping = False
+
+    def stop(self, *args) -> None:
+        self._stopping = True
+
+    def run_due_jobs(self, now=None) -> int:
+        now = time.monotonic() if now is None else now
+        ran = 0
+        for job in self.jobs:
+            if self._stopping:
+                break
+            if now < job.next_run:
+                continue
+            close_old_connections()
+            if not self.lock.is_held():
+                # Another instance may already be running jobs; let run_forever() re-acquire or stand by.
+                logger.warning("Scheduler: leader lock lost before job %s; stepping down.", job.name)
+                break
+            job.run()
+            job.schedule_next(time.monotonic())
+            ran += 1
+        if ran:
+            publish_metrics(self.jobs)
+        return ran
+
+    def run_forever(self) -> None:
+        was_leader = False
+        try:
+            while not self._stopping:
+                if not self.lock.acquire():
+                    if was_leader:
+                        logger.warning("Scheduler: lost leadership; switching to standby.")
+                    was_leader = False
+                    self._sleep(self.standby_retry)
+                    continue
+                if not was_leader:
+                    logger.info("Scheduler: acquired leadership; running %s job(s).", len(self.jobs))
+                    # Spread first runs so a failover does not fire every job at once.
+                    start = time.monotonic()
+                    for job in self.jobs:
+                        job.next_run = start + random.uniform(0, job.jitter)
+                    was_leader = True
+                self.run_due_jobs()
+                self._sleep(self.tick)
+        finally:
+            self.lock.release()
+            publish_metrics(self.jobs)
+
+    def _sleep(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while not self._stopping and time.monotonic() < deadline:
+            time.sleep(min(0.5, deadline - time.monotonic()))
@@ -0,0 +1,158 @@
+"""
+Seat inventory for packages.
+
+Package.participants_count (confirmed travelers) and Package.seats_held (eSewa payments in progress)
+are only changed here, each with a single conditional UPDATE ... SET col = col + n WHERE there is
+room, so concurrent bookings cannot oversell or lose increments and no table or row lock is held
+beyond that statement. capacity = NULL means unlimited (the previous behaviour).
+
+Flow:
+- direct / reward-points-only booking: reserve_seats()
+- eSewa initiate: hold_seats() creates a SeatHold that expires after SEAT_HOLD_MINUTES
+- eSewa verified: convert_hold() turns the held seats into participants
+- cancellation: release_seats()
+- release_expired_holds() (scheduler) frees seats of abandoned payments
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Package, SeatHold
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOLD_MINUTES = 30
+EXPIRY_BATCH_SIZE = 500
+
+
+class SeatsUnavailable(Exception):
+    """Not enough seats left on the package."""
+
+    def __init__(self, seats_left):
+        self.seats_left = seats_left
+        super().__init__(
+            "This trip is sold out." if not seats_left else f"Only {seats_left} seat(s) left on this trip."
+        )
+
+
+def _hold_duration() -> timedelta:
+    return timedelta(minutes=float(getattr(settings, "SEAT_HOLD_MINUTES", DEFAULT_HOLD_MINUTES)))
+
+
+def _room_for(seats: int) -> Q:
+    return Q(capacity__isnull=True) | Q(capacity__gte=F("participants_count") + F("seats_held") + seats)
+
+
+def _unavailable(package_id) -> SeatsUnavailable:
+    package = Package.objects.filter(pk=package_id).only("capacity", "participants_count", "seats_held").first()
+    return SeatsUnavailable(package.seats_left if package else 0)
+
+
+def reserve_seats(package_id, seats: int) -> None:
+    """Add confirmed participants if capacity allows. Raises SeatsUnavailable."""
+    updated = Package.objects.filter(_room_for(seats), pk=package_id).update(
+        participants_count=F("participants_count") + seats
+    )
+    if not updated:
+        raise _unavailable(package_id)
+
+
+def release_seats(package_id, seats: int) -> None:
+    """Remove confirmed participants (booking cancelled)."""
+    Package.objects.filter(pk=package_id).update(participants_count=Greatest(F("participants_count") - seats, 0))
+
+
+def hold_seats(payment_session, seats: int) -> SeatHold:
+    """Hold seats for an eSewa payment session. Call inside the session's transaction. Raises SeatsUnavailable."""
+    updated = Package.objects.filter(_room_for(seats), pk=payment_session.package_id).update(
+        seats_held=F("seats_held") + seats
+    )
+    if not updated:
+        raise _unavailable(payment_session.package_id)
+    return SeatHold.objects.create(
+        package_id=payment_session.package_id,
+        payment_session=payment_session,
+        seats=seats,
+        expires_at=timezone.now() + _hold_duration(),
+    )
+
+
+def _close_hold(hold_id, new_status) -> bool:
+    """Flip an active hold to ``new_status``; False when another process already closed it."""
+    return bool(
+        SeatHold.objects.filter(pk=hold_id, status=SeatHold.HoldStatus.ACTIVE).update(
+            status=new_status,
+            updated_at=timezone.now(),
+        )
+    )
+
+
+def convert_hold(payment_session, seats: int) -> None:
+    """
+    Confirm ``seats`` participants for a verified payment session, consuming its hold.
+    Call inside the booking transaction. When the hold has already expired the seats are re-reserved;
+    if the trip filled up meanwhile the booking is still honoured (payment was captured) and logged.
+    """
+    hold = SeatHold.objects.filter(payment_session=payment_session).only("pk", "seats").first()
+    if hold is not None and _close_hold(hold.pk, SeatHold.HoldStatus.CONVERTED):
+        Package.objects.filter(pk=payment_session.package_id).update(
+            seats_held=Greatest(F("seats_held") - hold.seats, 0),
+            participants_count=F("participants_count") + seats,
+        )
+        return
+    try:
+        reserve_seats(payment_session.package_id, seats)
+    except SeatsUnavailable:
+        logger.warning(
+            "Package %s overbooked by %s seat(s): eSewa session %s was paid after its seat hold expired.",
+            payment_session.package_id,
+            seats,
+            payment_session.transaction_uuid,
+        )
+        Package.objects.filter(pk=payment_session.package_id).update(participants_count=F("participants_count") + seats)
+
+
+def release_hold(payment_session) -> bool:
+    """Give back the seats of an unpaid session (failure callback). Returns True when a hold was released."""
+    hold = SeatHold.objects.filter(payment_session=payment_session).only("pk", "seats", "package_id").first()
+    if hold is None:
+        return False
+    with transaction.atomic():
+        if not _close_hold(hold.pk, SeatHold.HoldStatus.RELEASED):
+            return False
+        Package.objects.filter(pk=hold.package_id).update(seats_held=Greatest(F("seats_held") - hold.seats, 0))
+    return True
+
+
+def release_expired_holds(now=None) -> int:
+    """Release holds past their expiry in small batches. Returns the number of holds released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        holds = list(
+            SeatHold.objects.filter(status=SeatHold.HoldStatus.ACTIVE, expires_at__lte=now)
+            .order_by("expires_at")
+            .values("pk", "package_id", "seats")[:EXPIRY_BATCH_SIZE]
+        )
+        if not holds:
+            break
+        for hold in holds:
+            with transaction.atomic():
+                if not _close_hold(hold["pk"], SeatHold.HoldStatus.RELEASED):
+                    continue
+                Package.objects.filter(pk=hold["package_id"]).update(
+                    seats_held=Greatest(F("seats_held") - hold["seats"], 0)
+                )
+            released += 1
+        if len(holds) < EXPIRY_BATCH_SIZE:
+            break
+    if released:
+        logger.info("Released %s expired seat hold(s).", released)
+    return released
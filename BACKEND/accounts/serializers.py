@@ -4,11 +4,14 @@ from decimal import Decimal, ROUND_HALF_UP
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .booking_trip_notifications import SYSTEM_NOTIFICATION_EMAIL
 from .models import (
     UserProfile,
+    LeaderboardEntry,
     AgentProfile,
     Package,
     PackageFeature,
@@ -38,6 +41,8 @@ from .models import (
     traveler_may_book_package,
     mark_custom_package_completed_if_booked,
 )
+from .seat_inventory import SeatsUnavailable, reserve_seats
+from .agent_public_profile import REVIEWS_PAGE_SIZE, agent_reviews
 from .booking_cancellation import cancel_traveler_booking
 
 User = get_user_model()
@@ -200,6 +205,25 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """Lightweight leaderboard row (no contact details or refund QR)."""
+    id = serializers.IntegerField(source='user_id', read_only=True)
+    full_name = serializers.CharField(source='display_name', read_only=True)
+    profile_picture_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['id', 'rank', 'position', 'full_name', 'profile_picture_url', 'reward_points']
+        read_only_fields = fields
+
+    def get_profile_picture_url(self, obj):
+        if not obj.profile_picture:
+            return None
+        url = UserProfile._meta.get_field('profile_picture').storage.url(obj.profile_picture)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
 class AgentProfileSerializer(serializers.ModelSerializer):
     """Serializer for Agent Profile - simplified fields with picture"""
     full_name = serializers.ReadOnlyField()
@@ -362,7 +386,8 @@ class PackageSerializer(serializers.ModelSerializer):
             'price_per_person', 'duration_days', 'duration_nights', 'duration_display',
             'trip_start_date', 'trip_end_date',
             'main_image', 'main_image_url', 'features', 'status',
-            'agent_rating', 'participants_count', 'participants_preview', 'agent_name', 'user_has_booked', 'is_bookmarked',
+            'agent_rating', 'participants_count', 'capacity', 'seats_left',
+            'participants_preview', 'agent_name', 'user_has_booked', 'is_bookmarked',
             'has_active_deal', 'deal_discount_percent', 'original_price', 'deal_price',
             'created_at', 'updated_at'
         ]
@@ -525,10 +550,13 @@ class BookingSerializer(serializers.ModelSerializer):
         validated_data['total_amount'] = total_amount
         validated_data['payment_method'] = PaymentMethod.DIRECT
         validated_data['payment_status'] = PaymentStatus.PAID
-        booking = super().create(validated_data)
-        package.participants_count = (package.participants_count or 0) + traveler_count
-        package.save(update_fields=['participants_count'])
-        mark_custom_package_completed_if_booked(package)
+        with transaction.atomic():
+            try:
+                reserve_seats(package.pk, traveler_count)
+            except SeatsUnavailable as exc:
+                raise serializers.ValidationError({'traveler_count': str(exc)})
+            booking = super().create(validated_data)
+            mark_custom_package_completed_if_booked(package)
         return booking
 
     def validate_status(self, value):
@@ -700,9 +728,12 @@ class PublicAgentDetailSerializer(serializers.ModelSerializer):
     agent_id = serializers.SerializerMethodField()
     rating = serializers.DecimalField(max_digits=3, decimal_places=1, read_only=True)
     reviews = serializers.SerializerMethodField()
-    reviews_count = serializers.SerializerMethodField()
-    total_packages_created = serializers.SerializerMethodField()
-    total_bookings_handled = serializers.SerializerMethodField()
+    reviews_count = serializers.IntegerField(source='rating_count', read_only=True)
+    rating_histogram = serializers.ReadOnlyField()
+    # Annotated by accounts.agent_public_profile.public_agent_profiles().
+    total_packages_created = serializers.IntegerField(read_only=True)
+    total_bookings_handled = serializers.IntegerField(read_only=True)
+    reviews_next = serializers.SerializerMethodField()
 
     class Meta:
         model = AgentProfile
@@ -717,9 +748,11 @@ class PublicAgentDetailSerializer(serializers.ModelSerializer):
             'is_verified',
             'rating',
             'reviews_count',
+            'rating_histogram',
             'total_packages_created',
             'total_bookings_handled',
             'reviews',
+            'reviews_next',
         ]
 
     def get_profile_picture_url(self, obj):
@@ -734,20 +767,16 @@ class PublicAgentDetailSerializer(serializers.ModelSerializer):
         return obj.user_id
 
     def get_reviews(self, obj):
-        reviews = AgentReview.objects.filter(agent=obj.user).order_by('-created_at')[:10]
+        reviews = agent_reviews(obj.user_id)[:REVIEWS_PAGE_SIZE]
         return AgentReviewSerializer(reviews, many=True, context=self.context).data
 
-    def get_reviews_count(self, obj):
-        return AgentReview.objects.filter(agent=obj.user).count()
-
-    def get_total_packages_created(self, obj):
-        return Package.objects.filter(agent=obj.user).count()
-
-    def get_total_bookings_handled(self, obj):
-        return Booking.objects.filter(
-            package__agent=obj.user,
-            status=BookingStatus.CONFIRMED,
-        ).count()
+    def get_reviews_next(self, obj):
+        """Link to the second page of the paginated reviews list, when there is one."""
+        if obj.rating_count <= REVIEWS_PAGE_SIZE:
+            return None
+        url = f"{reverse('agent_review_list_create', args=[obj.user_id])}?page=2"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 
 class PackageDetailSerializer(serializers.ModelSerializer):
@@ -773,7 +802,7 @@ class PackageDetailSerializer(serializers.ModelSerializer):
             'price_per_person', 'duration_days', 'duration_nights', 'duration_display',
             'trip_start_date', 'trip_end_date',
             'main_image', 'main_image_url', 'features', 'status',
-            'agent_rating', 'participants_count',
+            'agent_rating', 'participants_count', 'capacity', 'seats_left',
             'user_has_booked',
             'has_active_deal', 'deal_discount_percent', 'original_price', 'deal_price',
             'agent', 'participants',
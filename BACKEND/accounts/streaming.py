@@ -0,0 +1,60 @@
+"""
+Streaming responses that stay streamed under ASGI.
+
+Production runs under daphne (start.sh). There, Django's StreamingHttpResponse and FileResponse
+consume a synchronous iterator with sync_to_async(list) before the first byte goes out, so a
+"streamed" export or file is built completely in memory (and a slow generator holds the client
+with no response at all). The classes here pull one chunk at a time through sync_to_async instead;
+it is thread-sensitive, so ORM reads inside the generator run on the same sync thread as the view.
+Under WSGI they behave exactly like their Django counterparts.
+
+ZipSink is the non-seekable zipfile target shared by the ZIP-based exports.
+"""
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, StreamingHttpResponse
+
+_END = object()
+
+
+class _ChunkedAsyncIterationMixin:
+    async def __aiter__(self):
+        if self.is_async:
+            async for part in super().__aiter__():
+                yield part
+            return
+        iterator = iter(self.streaming_content)
+        next_chunk = sync_to_async(next)
+        while True:
+            part = await next_chunk(iterator, _END)
+            if part is _END:
+                return
+            yield part
+
+
+class StreamingResponse(_ChunkedAsyncIterationMixin, StreamingHttpResponse):
+    """StreamingHttpResponse over a sync generator that is also streamed chunk by chunk under ASGI."""
+
+
+class StreamingFileResponse(_ChunkedAsyncIterationMixin, FileResponse):
+    """FileResponse that is also read block by block under ASGI (not loaded whole)."""
+
+
+class ZipSink:
+    """Non-seekable sink for zipfile: collects written bytes until the generator drains them."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
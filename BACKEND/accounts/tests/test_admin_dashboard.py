@@ -0,0 +1,91 @@
+"""Tests for the single-pass, cached admin dashboard metrics snapshot."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.admin_metrics import build_admin_dashboard_snapshot
+from accounts.models import (
+    AgentProfile,
+    Booking,
+    BookingStatus,
+    CustomPackage,
+    Package,
+    PackageStatus,
+    Roles,
+    User,
+)
+
+
+# The template pulls static assets; tests run without collectstatic, so skip the manifest lookup.
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class AdminDashboardSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(email="admin_dash@test.com", password="testpass123", role=Roles.ADMIN)
+        self.agent = User.objects.create_user(email="agent_dash@test.com", password="testpass123", role=Roles.AGENT)
+        AgentProfile.objects.create(user=self.agent, first_name="Asha")
+        self.package = Package.objects.create(
+            agent=self.agent,
+            title="Annapurna Circuit",
+            location="Manang",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("250.00"),
+            status=PackageStatus.ACTIVE,
+            trip_end_date=date.today() + timedelta(days=30),
+        )
+        self.travelers = [
+            User.objects.create_user(email=f"traveler_dash{i}@test.com", password="testpass123", role=Roles.TRAVELER)
+            for i in range(3)
+        ]
+        Booking.objects.create(user=self.travelers[0], package=self.package, status=BookingStatus.CONFIRMED)
+        Booking.objects.create(user=self.travelers[1], package=self.package, status=BookingStatus.CONFIRMED)
+        Booking.objects.create(user=self.travelers[2], package=self.package, status=BookingStatus.CANCELLED)
+        CustomPackage.objects.create(
+            user=self.travelers[0],
+            title="Custom",
+            location="Pokhara",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("90.00"),
+        )
+        self.client.force_login(self.admin)
+        self.url = reverse("admin_dashboard")
+
+    def test_snapshot_counts(self):
+        snapshot = build_admin_dashboard_snapshot()
+        stats = snapshot["stats"]
+        self.assertEqual(stats["total_users"], 5)
+        self.assertEqual(stats["travelers"], 3)
+        self.assertEqual(stats["agents"], 1)
+        self.assertEqual(stats["bookings"], 3)
+        self.assertEqual(stats["confirmed_bookings"], 2)
+        self.assertEqual(stats["cancelled_bookings"], 1)
+        self.assertEqual(stats["estimated_revenue"], Decimal("500.00"))
+        self.assertEqual(stats["custom_open"], 1)
+        self.assertEqual(snapshot["monthly_trends"]["bookings"], [0, 0, 0, 0, 0, 3])
+        self.assertEqual(snapshot["monthly_trends"]["travelers"][-1], 3)
+        self.assertEqual(snapshot["momentum"]["bookings_this_month"], 3)
+        self.assertEqual(snapshot["top_agents"][0]["confirmed_bookings"], 2)
+        self.assertEqual(snapshot["top_destinations"][0]["country"], "Nepal")
+
+    def test_cached_until_refreshed(self):
+        self.assertEqual(self.client.get(self.url).context["stats"]["bookings"], 3)
+        Booking.objects.filter(user=self.travelers[2]).delete()
+        self.assertEqual(self.client.get(self.url).context["stats"]["bookings"], 3)
+
+        res = self.client.post(self.url)
+        self.assertRedirects(res, self.url, fetch_redirect_response=False)
+        self.assertEqual(self.client.get(self.url).context["stats"]["bookings"], 2)
+
+    def test_non_admin_is_redirected(self):
+        self.client.force_login(self.agent)
+        self.assertRedirects(self.client.get(self.url), reverse("login"), fetch_redirect_response=False)
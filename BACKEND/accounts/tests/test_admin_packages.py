@@ -0,0 +1,108 @@
+"""Tests for the subquery-annotated, paginated admin packages page."""
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import (
+    AgentProfile,
+    Booking,
+    BookingStatus,
+    Package,
+    PackageStatus,
+    PaymentStatus,
+    Roles,
+    User,
+)
+from accounts.package_stats import package_totals, with_booking_stats
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class AdminPackagesViewTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin_pkgs@test.com", password="testpass123", role=Roles.ADMIN)
+        self.agent = User.objects.create_user(email="agent_pkgs@test.com", password="testpass123", role=Roles.AGENT)
+        AgentProfile.objects.create(user=self.agent, first_name="Asha")
+        self.busy = self._package("Everest Base Camp", "Nepal")
+        self.quiet = self._package("Tiger's Nest", " Bhutan ")
+        self.completed = self._package("Old Trip", "Nepal ", status=PackageStatus.COMPLETED)
+        travelers = [
+            User.objects.create_user(email=f"traveler_pkgs{i}@test.com", password="testpass123", role=Roles.TRAVELER)
+            for i in range(3)
+        ]
+        Booking.objects.create(user=travelers[0], package=self.busy, traveler_count=2)
+        Booking.objects.create(user=travelers[1], package=self.busy, traveler_count=3)
+        Booking.objects.create(
+            user=travelers[2],
+            package=self.busy,
+            status=BookingStatus.CANCELLED,
+            payment_status=PaymentStatus.REFUND_PENDING,
+        )
+        Booking.objects.create(user=travelers[0], package=self.completed, traveler_count=1)
+        # Seat counters as seat_inventory leaves them; quiet has travelers but no confirmed bookings.
+        Package.objects.filter(pk=self.busy.pk).update(participants_count=5)
+        Package.objects.filter(pk=self.quiet.pk).update(participants_count=4)
+        Package.objects.filter(pk=self.completed.pk).update(participants_count=1)
+        self.client.force_login(self.admin)
+
+    def _package(self, title, country, status=PackageStatus.ACTIVE):
+        return Package.objects.create(
+            agent=self.agent,
+            title=title,
+            location="Somewhere",
+            country=country,
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=status,
+            trip_end_date=date.today() + timedelta(days=15),
+        )
+
+    def test_booking_stats_are_per_package_without_join_fanout(self):
+        stats = {p.pk: p for p in with_booking_stats(Package.objects.all())}
+        busy = stats[self.busy.pk]
+        self.assertEqual(
+            (busy.confirmed_bookings_count, busy.cancelled_bookings_count, busy.refund_pending_count),
+            (2, 1, 1),
+        )
+        self.assertEqual(busy.joined_travelers_count, 5)
+        self.assertIsNotNone(busy.last_booking_at)
+        # No confirmed bookings: joined falls back to participants_count.
+        self.assertEqual(stats[self.quiet.pk].joined_travelers_count, 4)
+        self.assertEqual(stats[self.quiet.pk].confirmed_bookings_count, 0)
+
+    def test_package_totals_use_two_set_based_queries(self):
+        with self.assertNumQueries(2):
+            totals = package_totals(Package.objects.filter(country__icontains="nepal"))
+        self.assertEqual(
+            totals,
+            {"active": 1, "completed": 1, "draft": 0, "agents": 1, "confirmed_bookings": 3, "joined_travelers": 6},
+        )
+
+    def test_list_metrics_countries_and_sidebars(self):
+        res = self.client.get(reverse("admin_packages"), {"sort": "joined_high"})
+
+        self.assertEqual([p["title"] for p in res.context["packages"]], ["Everest Base Camp", "Tiger's Nest"])
+        self.assertEqual(res.context["total_packages"], 2)
+        metrics = res.context["package_metrics"]
+        self.assertEqual((metrics["active"], metrics["agents"]), (2, 1))
+        self.assertEqual((metrics["joined_travelers"], metrics["confirmed_bookings"]), (9, 2))
+        self.assertEqual(res.context["filter_options"]["countries"], ["Bhutan", "Nepal"])
+        self.assertEqual([p["title"] for p in res.context["needs_attention_packages"]], ["Everest Base Camp"])
+        self.assertEqual([p["title"] for p in res.context["completed_packages"]], ["Old Trip"])
+
+    def test_pagination_keeps_filters(self):
+        with mock.patch("accounts.views.ADMIN_PACKAGES_PAGE_SIZE", 1):
+            res = self.client.get(reverse("admin_packages"), {"status": "active", "page": 2})
+
+        self.assertEqual(res.context["page_obj"].number, 2)
+        self.assertEqual(res.context["page_obj"].paginator.num_pages, 2)
+        self.assertEqual([p["title"] for p in res.context["packages"]], ["Everest Base Camp"])
+        self.assertEqual(res.context["page_query"], "status=active")
+        self.assertContains(res, "?status=active&amp;page=1")
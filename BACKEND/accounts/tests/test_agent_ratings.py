@@ -0,0 +1,73 @@
+"""Tests for incremental agent rating aggregates and their repair command."""
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from accounts.models import AgentProfile, AgentReview, Roles, User
+
+
+class AgentRatingAggregateTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(email="agent_rating@test.com", password="testpass123", role=Roles.AGENT)
+        self.profile = AgentProfile.objects.create(user=self.agent)
+        self.travelers = [
+            User.objects.create_user(email=f"traveler_rating{i}@test.com", password="testpass123", role=Roles.TRAVELER)
+            for i in range(3)
+        ]
+
+    def _profile(self):
+        return AgentProfile.objects.get(pk=self.profile.pk)
+
+    def test_create_update_and_delete_adjust_aggregates(self):
+        reviews = [
+            AgentReview.objects.create(user=traveler, agent=self.agent, rating=rating)
+            for traveler, rating in zip(self.travelers, [5, 4, 4])
+        ]
+        profile = self._profile()
+        self.assertEqual((profile.rating_sum, profile.rating_count), (13, 3))
+        self.assertEqual(profile.rating, Decimal("4.3"))
+        self.assertEqual(profile.rating_histogram[0], {"rating": 5, "count": 1})
+        self.assertEqual(profile.rating_4_count, 2)
+
+        reviews[1].rating = 1
+        reviews[1].save()
+        profile = self._profile()
+        self.assertEqual((profile.rating_sum, profile.rating_count), (10, 3))
+        self.assertEqual((profile.rating_4_count, profile.rating_1_count), (1, 1))
+
+        AgentReview.objects.filter(pk=reviews[0].pk).delete()
+        profile = self._profile()
+        self.assertEqual((profile.rating_sum, profile.rating_count, profile.rating_5_count), (5, 2, 0))
+        self.assertEqual(profile.rating, Decimal("2.5"))
+
+    def test_profile_edit_does_not_overwrite_aggregates(self):
+        stale = self._profile()
+        AgentReview.objects.create(user=self.travelers[0], agent=self.agent, rating=5)
+
+        stale.location = "Kathmandu"
+        stale.save()
+
+        self.assertEqual(self._profile().rating_count, 1)
+
+    def test_recompute_command_repairs_drift(self):
+        AgentReview.objects.create(user=self.travelers[0], agent=self.agent, rating=3)
+        AgentProfile.objects.filter(pk=self.profile.pk).update(rating_sum=40, rating_count=9, rating=Decimal("4.4"))
+
+        out = StringIO()
+        call_command("recompute_agent_ratings", stdout=out)
+
+        profile = self._profile()
+        self.assertIn("1 profile(s) corrected", out.getvalue())
+        self.assertEqual((profile.rating_sum, profile.rating_count, profile.rating_3_count), (3, 1, 1))
+        self.assertEqual(profile.rating, Decimal("3.0"))
+
+    def test_public_agent_detail_exposes_histogram(self):
+        AgentReview.objects.create(user=self.travelers[0], agent=self.agent, rating=4)
+
+        res = self.client.get(f"/api/auth/agents/{self.agent.pk}/profile/")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["reviews_count"], 1)
+        self.assertEqual(res.json()["rating_histogram"][1], {"rating": 4, "count": 1})
@@ -0,0 +1,123 @@
+"""Tests for the agent-scoped, keyset-paginated traveler directory."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.agent_travelers import related_travelers, travelers_page, with_agent_stats
+from accounts.models import (
+    AgentProfile,
+    AgentReview,
+    Booking,
+    ChatRoom,
+    CustomPackage,
+    Package,
+    PackageStatus,
+    Roles,
+    User,
+    UserProfile,
+)
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class AgentTravelersTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(email="agent_dir@test.com", password="testpass123", role=Roles.AGENT)
+        other_agent = User.objects.create_user(email="agent_dir2@test.com", password="testpass123", role=Roles.AGENT)
+        AgentProfile.objects.create(user=self.agent, first_name="Asha")
+        package = self._package(self.agent)
+        other_package = self._package(other_agent)
+
+        self.booker = self._traveler("booker", "Maya")
+        self.chatter = self._traveler("chatter", "Nima")
+        self.requester = self._traveler("requester", "Pasang")
+        self.stranger = self._traveler("stranger", "Sita")
+        Booking.objects.create(user=self.booker, package=package)
+        Booking.objects.create(user=self.booker, package=package)
+        Booking.objects.create(user=self.booker, package=other_package)
+        Booking.objects.create(user=self.stranger, package=other_package)
+        AgentReview.objects.create(user=self.booker, agent=self.agent, rating=5)
+        ChatRoom.objects.create(traveler=self.chatter, agent=self.agent)
+        ChatRoom.objects.create(traveler=self.stranger, agent=other_agent)
+        CustomPackage.objects.create(
+            user=self.requester,
+            title="Custom",
+            location="Pokhara",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("80.00"),
+            claimed_by=self.agent,
+            status=CustomPackage.CustomPackageStatus.CLAIMED,
+        )
+        self.client.force_login(self.agent)
+
+    def _package(self, agent):
+        return Package.objects.create(
+            agent=agent,
+            title="Trip",
+            location="Kaski",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=PackageStatus.ACTIVE,
+            trip_end_date=date.today() + timedelta(days=20),
+        )
+
+    def _traveler(self, handle, first_name):
+        user = User.objects.create_user(email=f"{handle}_dir@test.com", password="testpass123", role=Roles.TRAVELER)
+        UserProfile.objects.create(user=user, first_name=first_name)
+        return user
+
+    def test_directory_is_scoped_with_per_agent_stats(self):
+        res = self.client.get(reverse("agent_travelers"))
+
+        rows = {item["user"].pk: item["stats"] for item in res.context["travelers"]}
+        self.assertEqual(set(rows), {self.booker.pk, self.chatter.pk, self.requester.pk})
+        self.assertEqual(
+            rows[self.booker.pk],
+            {"bookings_count": 2, "custom_packages_count": 0, "reviews_written_count": 1, "chats_count": 0},
+        )
+        self.assertEqual(rows[self.chatter.pk]["chats_count"], 1)
+        self.assertEqual(rows[self.requester.pk]["custom_packages_count"], 1)
+        self.assertNotContains(res, "stranger_dir@test.com")
+
+    def test_search_matches_name_and_email(self):
+        res = self.client.get(reverse("agent_travelers"), {"q": "nima"})
+        self.assertEqual([item["user"] for item in res.context["travelers"]], [self.chatter])
+
+        res = self.client.get(reverse("agent_travelers"), {"q": "REQUESTER_"})
+        self.assertEqual([item["user"] for item in res.context["travelers"]], [self.requester])
+
+        # Prefix search (index-backed): a fragment from the middle of a value does not match.
+        res = self.client.get(reverse("agent_travelers"), {"q": "ima"})
+        self.assertEqual(res.context["travelers"], [])
+
+        res = self.client.get(reverse("agent_travelers"), {"q": "stranger"})
+        self.assertEqual(res.context["travelers"], [])
+
+    def test_keyset_pages_walk_forward_and_back(self):
+        # Same date_joined for two travelers: the id tiebreak keeps pages disjoint.
+        joined = timezone.now() - timedelta(days=1)
+        User.objects.filter(pk__in=[self.booker.pk, self.chatter.pk]).update(date_joined=joined)
+        travelers = with_agent_stats(related_travelers(self.agent), self.agent)
+
+        first, next_cursor, prev_cursor = travelers_page(travelers, page_size=2)
+        self.assertIsNone(prev_cursor)
+        second, last_cursor, back_cursor = travelers_page(travelers, after=next_cursor, page_size=2)
+        self.assertIsNone(last_cursor)
+        self.assertEqual(len(first) + len(second), 3)
+        self.assertFalse({u.pk for u in first} & {u.pk for u in second})
+
+        back, _, none_before = travelers_page(travelers, before=back_cursor, page_size=2)
+        self.assertEqual([u.pk for u in back], [u.pk for u in first])
+        self.assertIsNone(none_before)
+
+        res = self.client.get(reverse("agent_travelers"), {"after": "not-a-cursor"})
+        self.assertEqual(len(res.context["travelers"]), 3)
@@ -0,0 +1,57 @@
+"""Tests for the booking code allocator (keyed permutation of a counter)."""
+from decimal import Decimal
+
+from django.test import TestCase
+
+from accounts.booking_codes import (
+    MIN_CODE_LENGTH,
+    allocate_booking_code,
+    band_size,
+    code_for_index,
+    first_index_of_length,
+    permute,
+)
+from accounts.models import Booking, BookingCodeCounter, Package, PackageStatus, Roles, User
+
+KEY = b"test-key"
+
+
+class BookingCodeTests(TestCase):
+    def test_permutation_is_a_bijection(self):
+        outputs = {permute(offset, 3, KEY) for offset in range(1000)}
+        self.assertEqual(outputs, set(range(1000)))
+
+    def test_codes_are_unique_and_widen_after_threshold(self):
+        first_six = first_index_of_length(MIN_CODE_LENGTH + 1)
+        self.assertEqual(first_six, band_size(MIN_CODE_LENGTH))
+
+        five = {code_for_index(i, KEY) for i in range(first_six - 2000, first_six)}
+        six = {code_for_index(i, KEY) for i in range(first_six, first_six + 2000)}
+
+        self.assertEqual(len(five), 2000)
+        self.assertEqual(len(six), 2000)
+        self.assertTrue(all(len(code) == 5 for code in five))
+        self.assertTrue(all(len(code) == 6 for code in six))
+
+    def test_bookings_get_sequential_allocations(self):
+        agent = User.objects.create_user(email="agent_codes@test.com", password="testpass123", role=Roles.AGENT)
+        traveler = User.objects.create_user(
+            email="traveler_codes@test.com", password="testpass123", role=Roles.TRAVELER
+        )
+        package = Package.objects.create(
+            agent=agent,
+            title="Code Trip",
+            location="Kathmandu",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("10.00"),
+            status=PackageStatus.ACTIVE,
+        )
+        key = BookingCodeCounter.objects.get(pk=1).key.encode("ascii")
+        start = BookingCodeCounter.objects.get(pk=1).next_index
+
+        bookings = [Booking.objects.create(user=traveler, package=package) for _ in range(3)]
+
+        self.assertEqual([b.booking_code for b in bookings], [code_for_index(start + i, key) for i in range(3)])
+        self.assertNotEqual(allocate_booking_code(), bookings[-1].booking_code)
+        self.assertEqual(BookingCodeCounter.objects.get(pk=1).next_index, start + 4)
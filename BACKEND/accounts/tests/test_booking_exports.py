@@ -0,0 +1,141 @@
+"""Tests for the streaming CSV / XLSX booking exports."""
+import csv
+import io
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from xml.etree import ElementTree
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import (
+    AgentProfile,
+    Booking,
+    BookingStatus,
+    Package,
+    PackageStatus,
+    PaymentMethod,
+    PaymentStatus,
+    Roles,
+    User,
+    UserProfile,
+)
+from accounts.streaming import StreamingResponse
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _content(response):
+    return b"".join(response.streaming_content)
+
+
+class BookingExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin_export@test.com", password="testpass123", role=Roles.ADMIN)
+        self.agent = User.objects.create_user(email="agent_export@test.com", password="testpass123", role=Roles.AGENT)
+        self.other_agent = User.objects.create_user(email="agent_other@test.com", password="testpass123", role=Roles.AGENT)
+        AgentProfile.objects.create(user=self.agent, first_name="Asha")
+        self.package = self._package(self.agent, "Mardi Himal")
+        other_package = self._package(self.other_agent, "Poon Hill")
+        traveler = User.objects.create_user(email="traveler_export@test.com", password="testpass123", role=Roles.TRAVELER)
+        UserProfile.objects.create(user=traveler, first_name="Maya")
+        self.paid = Booking.objects.create(
+            user=traveler,
+            package=self.package,
+            traveler_count=2,
+            price_per_person_snapshot=Decimal("90.00"),
+            total_amount=Decimal("180.00"),
+            reward_points_used=30,
+            payment_method=PaymentMethod.ESEWA,
+        )
+        self.refunded = Booking.objects.create(
+            user=traveler,
+            package=self.package,
+            status=BookingStatus.CANCELLED,
+            payment_status=PaymentStatus.REFUNDED,
+            total_amount=Decimal("100.00"),
+        )
+        Booking.objects.create(user=traveler, package=other_package, total_amount=Decimal("100.00"))
+
+    def _package(self, agent, title):
+        return Package.objects.create(
+            agent=agent,
+            title=title,
+            location="Kaski",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=PackageStatus.ACTIVE,
+            trip_end_date=date.today() + timedelta(days=20),
+        )
+
+    def test_admin_csv_applies_filters_and_includes_refund_breakdown(self):
+        self.client.force_login(self.admin)
+        res = self.client.get(reverse("admin_bookings_export"), {"package": self.package.pk, "status": "confirmed"})
+
+        self.assertTrue(res.streaming)
+        self.assertIn("attachment;", res["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(_content(res).decode("utf-8-sig"))))
+        self.assertEqual([row["Booking code"] for row in rows], [self.paid.booking_code])
+        row = rows[0]
+        self.assertEqual(row["Traveler name"], "Maya")
+        self.assertEqual(row["Agent name"], "Asha")
+        self.assertEqual(row["List price per person"], "100.00")
+        self.assertEqual(row["Deal savings"], "20.00")
+        self.assertEqual(row["Amount paid via eSewa"], "150.00")
+
+    def test_agent_export_is_scoped_and_filters_payment_status(self):
+        self.client.force_login(self.agent)
+        url = reverse("agent_bookings_export")
+
+        rows = list(csv.DictReader(io.StringIO(_content(self.client.get(url)).decode("utf-8-sig"))))
+        self.assertEqual({row["Package"] for row in rows}, {"Mardi Himal"})
+        self.assertEqual(len(rows), 2)
+
+        res = self.client.get(url, {"payment_status": PaymentStatus.REFUNDED})
+        rows = list(csv.DictReader(io.StringIO(_content(res).decode("utf-8-sig"))))
+        self.assertEqual([row["Booking code"] for row in rows], [self.refunded.booking_code])
+
+    def test_xlsx_export_is_a_readable_workbook(self):
+        self.client.force_login(self.admin)
+        res = self.client.get(reverse("admin_bookings_export"), {"format": "xlsx"})
+
+        self.assertTrue(res["Content-Disposition"].endswith('.xlsx"'))
+        archive = zipfile.ZipFile(io.BytesIO(_content(res)))
+        self.assertIn("xl/workbook.xml", archive.namelist())
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+        rows = sheet.findall(f"{SHEET_NS}sheetData/{SHEET_NS}row")
+        self.assertEqual(len(rows), 4)  # header + 3 bookings
+        header = [cell.findtext(f"{SHEET_NS}is/{SHEET_NS}t") for cell in rows[0]]
+        self.assertEqual(header[0], "Booking code")
+
+    def test_csv_neutralises_formula_cells(self):
+        UserProfile.objects.filter(user=self.paid.user).update(first_name='=HYPERLINK("http://x","y")')
+        self.client.force_login(self.agent)
+        rows = list(csv.DictReader(io.StringIO(_content(self.client.get(reverse("agent_bookings_export"))).decode("utf-8-sig"))))
+        self.assertEqual(rows[0]["Traveler name"], '\'=HYPERLINK("http://x","y")')
+
+    def test_asgi_iteration_pulls_one_chunk_at_a_time(self):
+        pulled = []
+
+        def rows():
+            for i in range(3):
+                pulled.append(i)
+                yield str(i)
+
+        async def first_chunk(response):
+            parts = response.__aiter__()
+            part = await parts.__anext__()
+            await parts.aclose()
+            return part
+
+        self.assertEqual(async_to_sync(first_chunk)(StreamingResponse(rows())), b"0")
+        self.assertEqual(pulled, [0])
+
+    def test_export_requires_matching_role(self):
+        self.client.force_login(self.agent)
+        self.assertRedirects(
+            self.client.get(reverse("admin_bookings_export")), reverse("login"), fetch_redirect_response=False
+        )
@@ -0,0 +1,173 @@
+"""Tests for the set-based trip reminder engine (24h / 1h reminders and post-trip review prompts)."""
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.booking_trip_notifications import process_booking_trip_reminders
+from accounts.models import (
+    AgentReview,
+    Booking,
+    BookingStatus,
+    BookingTripReminder,
+    BookingTripReminderKind,
+    Notification,
+    NotificationRecipient,
+    NotificationType,
+    Package,
+    PackageStatus,
+    Roles,
+    ScheduledReminder,
+    User,
+)
+
+
+class BookingTripReminderTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(
+            email="agent_reminders@test.com",
+            password="testpass123",
+            role=Roles.AGENT,
+        )
+        self.travelers = [
+            User.objects.create_user(
+                email=f"traveler_reminders{i}@test.com",
+                password="testpass123",
+                role=Roles.TRAVELER,
+            )
+            for i in range(3)
+        ]
+
+    def _package(self, start_dt, end_date=None, status=PackageStatus.ACTIVE):
+        local = timezone.localtime(start_dt)
+        return Package.objects.create(
+            agent=self.agent,
+            title="Reminder Trip",
+            location="Pokhara",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            trip_start_date=local.date(),
+            trip_start_time=local.time().replace(second=0, microsecond=0),
+            trip_end_date=end_date or local.date() + timedelta(days=2),
+            status=status,
+        )
+
+    def _book(self, package, traveler, status=BookingStatus.CONFIRMED):
+        return Booking.objects.create(user=traveler, package=package, status=status)
+
+    def test_h24_reminder_shares_one_notification_per_package(self):
+        package = self._package(timezone.now() + timedelta(hours=20))
+        for traveler in self.travelers:
+            self._book(package, traveler)
+
+        counts = process_booking_trip_reminders()
+
+        self.assertEqual(counts, {"h24": 3, "h1": 0, "review": 0})
+        notifications = Notification.objects.filter(notification_type=NotificationType.TRIP_REMINDER_24H)
+        self.assertEqual(notifications.count(), 1)
+        self.assertEqual(NotificationRecipient.objects.filter(notification=notifications.first()).count(), 3)
+
+    def test_second_run_is_idempotent(self):
+        package = self._package(timezone.now() + timedelta(minutes=30))
+        self._book(package, self.travelers[0])
+
+        first = process_booking_trip_reminders()
+        second = process_booking_trip_reminders()
+
+        self.assertEqual(first, {"h24": 1, "h1": 1, "review": 0})
+        self.assertEqual(second, {"h24": 0, "h1": 0, "review": 0})
+        self.assertEqual(BookingTripReminder.objects.count(), 2)
+
+    def test_far_future_and_cancelled_bookings_are_skipped(self):
+        far = self._package(timezone.now() + timedelta(days=5))
+        soon = self._package(timezone.now() + timedelta(hours=5))
+        self._book(far, self.travelers[0])
+        self._book(soon, self.travelers[1], status=BookingStatus.CANCELLED)
+
+        counts = process_booking_trip_reminders()
+
+        self.assertEqual(counts["h24"], 0)
+        self.assertFalse(BookingTripReminder.objects.exists())
+
+    def test_review_prompt_once_per_traveler_and_agent(self):
+        past = timezone.now() - timedelta(days=6)
+        first = self._package(past, end_date=date.today() - timedelta(days=1))
+        second = self._package(past, end_date=date.today() - timedelta(days=2))
+        self._book(first, self.travelers[0])
+        self._book(second, self.travelers[0])
+        self._book(first, self.travelers[1])
+        AgentReview.objects.create(user=self.travelers[1], agent=self.agent, rating=5)
+
+        counts = process_booking_trip_reminders()
+        again = process_booking_trip_reminders()
+
+        self.assertEqual(counts["review"], 1)
+        self.assertEqual(again["review"], 0)
+        reminder = BookingTripReminder.objects.get(kind=BookingTripReminderKind.REVIEW)
+        self.assertEqual(reminder.booking.user, self.travelers[0])
+
+    def test_confirmed_booking_is_planned_and_cancel_drops_pending(self):
+        package = self._package(timezone.now() + timedelta(days=5))
+        booking = self._book(package, self.travelers[0])
+
+        kinds = set(ScheduledReminder.objects.filter(booking=booking).values_list("kind", flat=True))
+        self.assertEqual(kinds, {BookingTripReminderKind.H24, BookingTripReminderKind.H1, BookingTripReminderKind.REVIEW})
+
+        # A full save without a status change leaves the plan alone; one with a change re-plans.
+        planned = list(ScheduledReminder.objects.filter(booking=booking).values_list("pk", flat=True))
+        booking.traveler_count = 2
+        with mock.patch("accounts.booking_trip_notifications.schedule_booking_reminders") as schedule:
+            booking.save()
+        schedule.assert_not_called()
+        booking.status = BookingStatus.CANCELLED
+        booking.save()
+        self.assertFalse(ScheduledReminder.objects.filter(pk__in=planned).exists())
+
+        booking.status = BookingStatus.CONFIRMED
+        booking.save(update_fields=["status"])
+        self.assertEqual(ScheduledReminder.objects.filter(booking=booking).count(), 3)
+        booking.status = BookingStatus.CANCELLED
+        booking.save(update_fields=["status"])
+        self.assertFalse(ScheduledReminder.objects.filter(booking=booking).exists())
+
+    def test_package_date_change_replans_due_at(self):
+        package = self._package(timezone.now() + timedelta(days=5))
+        booking = self._book(package, self.travelers[0])
+        self.assertEqual(process_booking_trip_reminders()["h24"], 0)
+
+        package.trip_start_date = timezone.localdate() + timedelta(days=1)
+        package.trip_start_time = None
+        package.save()
+
+        h24 = ScheduledReminder.objects.get(booking=booking, kind=BookingTripReminderKind.H24)
+        self.assertEqual(timezone.localtime(h24.expires_at).date(), package.trip_start_date)
+        self.assertIsNone(h24.sent_at)
+
+    def test_sent_rows_are_marked_and_not_replanned(self):
+        package = self._package(timezone.now() + timedelta(hours=20))
+        booking = self._book(package, self.travelers[0])
+
+        process_booking_trip_reminders()
+        h24 = ScheduledReminder.objects.get(booking=booking, kind=BookingTripReminderKind.H24)
+        self.assertIsNotNone(h24.sent_at)
+
+        package.trip_start_time = None
+        package.save()
+        self.assertEqual(
+            ScheduledReminder.objects.filter(booking=booking, kind=BookingTripReminderKind.H24).count(), 1
+        )
+        self.assertEqual(process_booking_trip_reminders()["h24"], 0)
+
+    def test_management_command_reports_counts(self):
+        package = self._package(timezone.now() + timedelta(hours=3))
+        self._book(package, self.travelers[0])
+        out = StringIO()
+
+        call_command("send_booking_trip_reminders", stdout=out)
+
+        self.assertIn("24h=1", out.getvalue())
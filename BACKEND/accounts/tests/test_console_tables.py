@@ -0,0 +1,116 @@
+"""Tests for the shared keyset-paginated console tables (admin users, reviews, refunds)."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.console_tables import estimate_count, keyset_page
+from accounts.models import (
+    AgentReview,
+    Booking,
+    BookingStatus,
+    Package,
+    PackageStatus,
+    RefundRequest,
+    RefundRequestStatus,
+    Roles,
+    User,
+)
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class ConsoleTableTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin_tables@test.com", password="testpass123", role=Roles.ADMIN)
+        self.agent = User.objects.create_user(email="agent_tables@test.com", password="testpass123", role=Roles.AGENT)
+        self.package = Package.objects.create(
+            agent=self.agent,
+            title="Annapurna Circuit",
+            location="Manang",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=PackageStatus.ACTIVE,
+            trip_end_date=date.today() + timedelta(days=20),
+        )
+        self.travelers = [
+            User.objects.create_user(email=f"traveler_tables{i}@test.com", password="testpass123", role=Roles.TRAVELER)
+            for i in range(5)
+        ]
+        self.client.force_login(self.admin)
+
+    def _refund(self, traveler, status=RefundRequestStatus.PENDING, amount="100.00"):
+        booking = Booking.objects.create(user=traveler, package=self.package, status=BookingStatus.CANCELLED)
+        return RefundRequest.objects.create(
+            booking=booking,
+            traveler=traveler,
+            package=self.package,
+            status=status,
+            total_amount=Decimal(amount),
+            traveler_email=traveler.email,
+            package_title=self.package.title,
+        )
+
+    def test_keyset_walks_mixed_direction_ordering_with_ties(self):
+        for traveler, rating in zip(self.travelers, (3, 5, 3, 1, 3)):
+            AgentReview.objects.create(user=traveler, agent=self.agent, rating=rating)
+        ordering = ("rating", "-created_at", "-id")
+        expected = list(AgentReview.objects.order_by(*ordering).values_list("pk", flat=True))
+
+        seen, cursor, pages = [], None, []
+        while True:
+            rows, cursor, prev_cursor = keyset_page(AgentReview.objects.all(), ordering, after=cursor, page_size=2)
+            seen += [r.pk for r in rows]
+            pages.append((rows, prev_cursor))
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+        prev_cursor = pages[-1][1]
+        back, _, _ = keyset_page(AgentReview.objects.all(), ordering, before=prev_cursor, page_size=2)
+        self.assertEqual(back, pages[-2][0])
+
+    def test_estimate_count_caps_exact_counting(self):
+        self.assertEqual(estimate_count(User.objects.filter(role=Roles.TRAVELER), limit=10), (5, False))
+        self.assertEqual(estimate_count(User.objects.filter(role=Roles.TRAVELER), limit=3), (3, True))
+
+    def test_refunds_filter_search_and_page(self):
+        pending = [self._refund(t) for t in self.travelers[:3]]
+        done = self._refund(self.travelers[3], status=RefundRequestStatus.COMPLETED, amount="900.00")
+
+        res = self.client.get(reverse("admin_refunds"), {"status": "pending"})
+        self.assertEqual({rr.pk for rr in res.context["refund_requests"]}, {rr.pk for rr in pending})
+        self.assertEqual(res.context["refund_table"].total, 3)
+
+        res = self.client.get(reverse("admin_refunds"), {"q": done.booking.booking_code})
+        self.assertEqual(list(res.context["refund_requests"]), [done])
+
+        res = self.client.get(reverse("admin_refunds"), {"sort": "amount"})
+        self.assertEqual(res.context["refund_requests"][0], done)
+
+    def test_user_tables_keep_separate_state(self):
+        res = self.client.get(reverse("admin_users"), {"t_q": "traveler_tables3", "a_sort": "email"})
+
+        self.assertEqual([item["user"] for item in res.context["travelers"]], [self.travelers[3]])
+        self.assertEqual([item["user"] for item in res.context["agents"]], [self.agent])
+        self.assertEqual(res.context["agent_table"].sort, "email")
+        # The agents toolbar carries the travelers search along as a hidden field.
+        self.assertIn(("t_q", "traveler_tables3"), res.context["agent_table"].hidden_params)
+
+    def test_reviews_table_filters_and_totals(self):
+        for traveler, rating in zip(self.travelers, (5, 4, 2, 2, 1)):
+            AgentReview.objects.create(user=traveler, agent=self.agent, rating=rating)
+
+        res = self.client.get(reverse("admin_reviews"), {"rating": "2", "agent": str(self.agent.pk)})
+        self.assertEqual(res.context["review_stats"]["reviews_count"], 2)
+        self.assertEqual({r["rating"] for r in res.context["recent_reviews"]}, {2})
+
+        res = self.client.get(reverse("admin_reviews"), {"sort": "lowest"})
+        self.assertEqual([r["rating"] for r in res.context["recent_reviews"]], [1, 2, 2, 4, 5])
+        self.assertAlmostEqual(res.context["review_stats"]["avg_rating"], 2.8)
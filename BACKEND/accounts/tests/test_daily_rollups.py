@@ -0,0 +1,112 @@
+"""Tests for the incremental platform / per-agent daily rollups behind the dashboards."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.daily_rollups import refresh_daily_rollups
+from accounts.models import (
+    AgentDailyStats,
+    AgentProfile,
+    AgentReview,
+    Booking,
+    BookingStatus,
+    Package,
+    PackageStatus,
+    PlatformDailyStats,
+    Roles,
+    User,
+)
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.agent = User.objects.create_user(email="agent_rollup@test.com", password="testpass123", role=Roles.AGENT)
+        AgentProfile.objects.create(user=self.agent, first_name="Asha")
+        self.package = Package.objects.create(
+            agent=self.agent,
+            title="Langtang Trek",
+            location="Langtang",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=PackageStatus.ACTIVE,
+            trip_end_date=date.today() + timedelta(days=30),
+        )
+        self.travelers = [
+            User.objects.create_user(email=f"traveler_rollup{i}@test.com", password="testpass123", role=Roles.TRAVELER)
+            for i in range(3)
+        ]
+        self.confirmed = Booking.objects.create(
+            user=self.travelers[0],
+            package=self.package,
+            traveler_count=2,
+            total_amount=Decimal("200.00"),
+        )
+        Booking.objects.create(
+            user=self.travelers[1],
+            package=self.package,
+            status=BookingStatus.CANCELLED,
+            total_amount=Decimal("100.00"),
+        )
+        AgentReview.objects.create(user=self.travelers[0], agent=self.agent, rating=4)
+        self.today = timezone.localdate()
+
+    def test_first_run_builds_every_day(self):
+        self.assertEqual(refresh_daily_rollups(), 1)
+
+        platform = PlatformDailyStats.objects.get(day=self.today)
+        self.assertEqual(
+            (platform.new_travelers, platform.new_packages, platform.bookings, platform.custom_requests),
+            (3, 1, 2, 0),
+        )
+        agent = AgentDailyStats.objects.get(agent=self.agent, day=self.today)
+        self.assertEqual(agent.bookings, 2)
+        self.assertEqual(agent.confirmed_bookings, 1)
+        self.assertEqual(agent.confirmed_travelers, 2)
+        self.assertEqual(agent.confirmed_revenue, Decimal("200.00"))
+        self.assertEqual((agent.reviews, agent.rating_sum), (1, 4))
+
+    def test_incremental_run_recomputes_only_touched_days(self):
+        old_day = self.today - timedelta(days=40)
+        old_booking = Booking.objects.create(
+            user=self.travelers[2],
+            package=self.package,
+            total_amount=Decimal("50.00"),
+        )
+        old_created = timezone.now() - timedelta(days=40)
+        Booking.objects.filter(pk=old_booking.pk).update(created_at=old_created, updated_at=old_created)
+        refresh_daily_rollups()
+        self.assertEqual(AgentDailyStats.objects.get(agent=self.agent, day=old_day).confirmed_bookings, 1)
+
+        # A status-only save moves updated_at, so the old booking day is picked up again.
+        old_booking.status = BookingStatus.CANCELLED
+        old_booking.save(update_fields=["status"])
+        refresh_daily_rollups()
+
+        old_stats = AgentDailyStats.objects.get(agent=self.agent, day=old_day)
+        self.assertEqual((old_stats.bookings, old_stats.confirmed_bookings), (1, 0))
+        self.assertEqual(old_stats.confirmed_revenue, Decimal("0"))
+        self.assertEqual(AgentDailyStats.objects.get(agent=self.agent, day=self.today).confirmed_bookings, 1)
+
+    @override_settings(
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+        }
+    )
+    def test_agent_dashboard_reads_rollups(self):
+        self.client.force_login(self.agent)
+        res = self.client.get(reverse("agent_dashboard"))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context["momentum"]["bookings_this_month"], 2)
+        self.assertEqual(res.context["momentum"]["revenue_this_month"], Decimal("200.00"))
+        self.assertEqual(res.context["stats"]["reviews_this_month"], 1)
+        self.assertEqual(res.context["monthly_booking_bars"][-1]["value"], 1)
+        self.assertEqual(res.context["monthly_booking_bars"][-1]["travelers"], 2)
+        self.assertEqual(res.context["monthly_review_bars"][-1]["avg_rating"], 4.0)
@@ -0,0 +1,126 @@
+"""Tests for audience-targeted deal notifications, frequency caps and digests."""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.deal_notifications import (
+    create_and_send_deal_notification,
+    resolve_deal_audience,
+    send_deal_digests,
+)
+from accounts.models import (
+    Booking,
+    BookingStatus,
+    Deal,
+    DealAudienceReason,
+    DealDigestEntry,
+    NotificationRecipient,
+    NotificationType,
+    Package,
+    PackageBookmark,
+    Roles,
+    User,
+)
+
+
+class DealNotificationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin_deals@test.com", password="testpass123", role=Roles.ADMIN)
+        self.agent = User.objects.create_user(email="agent_deals@test.com", password="testpass123", role=Roles.AGENT)
+        self.other_agent = User.objects.create_user(
+            email="agent2_deals@test.com", password="testpass123", role=Roles.AGENT
+        )
+        self.bookmarker, self.past_booker, self.country_fan, self.stranger, self.already_booked = [
+            User.objects.create_user(email=f"traveler_deals{i}@test.com", password="testpass123", role=Roles.TRAVELER)
+            for i in range(5)
+        ]
+        self.package = self._package(self.agent, "Annapurna", "Nepal")
+        old_package = self._package(self.agent, "Old Trip", "India")
+        other_nepal = self._package(self.other_agent, "Everest", "Nepal")
+        other_peru = self._package(self.other_agent, "Machu Picchu", "Peru")
+
+        PackageBookmark.objects.create(user=self.bookmarker, package=self.package)
+        Booking.objects.create(user=self.past_booker, package=old_package, status=BookingStatus.CONFIRMED)
+        PackageBookmark.objects.create(user=self.country_fan, package=other_nepal)
+        PackageBookmark.objects.create(user=self.stranger, package=other_peru)
+        Booking.objects.create(user=self.already_booked, package=self.package, status=BookingStatus.CONFIRMED)
+
+    def _package(self, agent, title, country):
+        return Package.objects.create(
+            agent=agent,
+            title=title,
+            location=title,
+            country=country,
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+        )
+
+    def _deal(self, package=None, percent=20):
+        now = timezone.now()
+        return Deal.objects.create(
+            package=package or self.package,
+            agent=self.agent,
+            discount_percent=percent,
+            valid_from=now,
+            valid_until=now + timedelta(days=7),
+        )
+
+    def _promotions(self, user):
+        return NotificationRecipient.objects.filter(
+            user=user, notification__notification_type=NotificationType.PROMOTION
+        ).count()
+
+    def test_audience_uses_strongest_signal_and_skips_unrelated_and_existing_bookers(self):
+        audience = resolve_deal_audience(self._deal())
+
+        self.assertEqual(
+            audience,
+            {
+                self.bookmarker.pk: DealAudienceReason.BOOKMARK,
+                self.past_booker.pk: DealAudienceReason.PAST_BOOKER,
+                self.country_fan.pk: DealAudienceReason.COUNTRY_INTEREST,
+            },
+        )
+
+    def test_strong_signals_notified_now_country_interest_queued(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            counts = create_and_send_deal_notification(self._deal())
+
+        self.assertEqual(counts, {"notified": 2, "queued": 1})
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._promotions(self.bookmarker), 1)
+        self.assertEqual(self._promotions(self.past_booker), 1)
+        self.assertEqual(self._promotions(self.country_fan), 0)
+        self.assertEqual(self._promotions(self.stranger), 0)
+        self.assertTrue(DealDigestEntry.objects.filter(user=self.country_fan, sent_at__isnull=True).exists())
+
+    @override_settings(DEAL_NOTIFICATION_CAP=1)
+    def test_capped_traveler_is_moved_to_digest(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            create_and_send_deal_notification(self._deal())
+            second = self._package(self.agent, "Langtang", "Nepal")
+            PackageBookmark.objects.create(user=self.bookmarker, package=second)
+            create_and_send_deal_notification(self._deal(package=second))
+
+        self.assertEqual(self._promotions(self.bookmarker), 1)
+        self.assertEqual(self._promotions(self.past_booker), 1)
+        # Booked the first package, so a past booker for the agent's second one; still under the cap.
+        self.assertEqual(self._promotions(self.already_booked), 1)
+        self.assertTrue(DealDigestEntry.objects.filter(user=self.bookmarker, reason=DealAudienceReason.BOOKMARK).exists())
+
+    def test_digest_combines_queued_deals_into_one_notification(self):
+        deals = [self._deal(percent=10), self._deal(package=self._package(self.agent, "Mustang", "Nepal"), percent=30)]
+        for deal in deals:
+            DealDigestEntry.objects.create(user=self.country_fan, deal=deal, reason=DealAudienceReason.COUNTRY_INTEREST)
+
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertEqual(send_deal_digests(), {"digests": 0, "deals": 0})
+            counts = send_deal_digests(now=timezone.now() + timedelta(hours=13))
+
+        self.assertEqual(counts, {"digests": 1, "deals": 2})
+        rec = NotificationRecipient.objects.select_related("notification").get(user=self.country_fan)
+        self.assertEqual(rec.notification.title, "2 new deals picked for you")
+        self.assertTrue(rec.notification.message.startswith("Mustang: 30% off"))
+        self.assertFalse(DealDigestEntry.objects.filter(sent_at__isnull=True).exists())
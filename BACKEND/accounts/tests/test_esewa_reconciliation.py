@@ -0,0 +1,219 @@
+"""Tests for the eSewa reconciliation worker against a local eSewa status API stub."""
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts import esewa_reconciliation
+from accounts.esewa_reconciliation import CircuitBreaker, reconcile_pending_esewa_sessions
+from accounts.models import (
+    Booking,
+    EsewaPaymentSession,
+    EsewaPaymentSessionStatus,
+    Package,
+    PackageStatus,
+    Roles,
+    User,
+    UserProfile,
+)
+
+
+class _EsewaStubHandler(BaseHTTPRequestHandler):
+    # transaction_uuid -> (http status, eSewa status)
+    responses = {}
+    calls = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        uuid = query.get("transaction_uuid", [""])[0]
+        self.calls.append(uuid)
+        http_status, esewa_status = self.responses.get(uuid, (200, "NOT_FOUND"))
+        body = json.dumps(
+            {
+                "product_code": query.get("product_code", [""])[0],
+                "transaction_uuid": uuid,
+                "total_amount": query.get("total_amount", [""])[0],
+                "status": esewa_status,
+                "ref_id": f"REF-{uuid}" if esewa_status == "COMPLETE" else None,
+            }
+        ).encode("utf-8")
+        self.send_response(http_status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class EsewaReconciliationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _EsewaStubHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.status_url = f"http://127.0.0.1:{cls.server.server_address[1]}/api/epay/transaction/status/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _EsewaStubHandler.responses = {}
+        _EsewaStubHandler.calls = []
+        settings_override = override_settings(ESEWA_STATUS_URL=self.status_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        breaker_patch = mock.patch.object(esewa_reconciliation, "_breaker", CircuitBreaker(threshold=2, reset_after=60))
+        breaker_patch.start()
+        self.addCleanup(breaker_patch.stop)
+
+        self.agent = User.objects.create_user(email="agent_reconcile@test.com", password="testpass123", role=Roles.AGENT)
+        self.traveler = User.objects.create_user(
+            email="traveler_reconcile@test.com", password="testpass123", role=Roles.TRAVELER
+        )
+        self.profile = UserProfile.objects.create(user=self.traveler, reward_points=50)
+        self.packages = [
+            Package.objects.create(
+                agent=self.agent,
+                title=f"Reconcile Trip {i}",
+                location="Pokhara",
+                country="Nepal",
+                description="Desc",
+                price_per_person=Decimal("100.00"),
+                status=PackageStatus.ACTIVE,
+            )
+            for i in range(3)
+        ]
+
+    def _session(self, uuid, package, age=timedelta(minutes=10), reward_points_used=0):
+        session = EsewaPaymentSession.objects.create(
+            user=self.traveler,
+            package=package,
+            transaction_uuid=uuid,
+            traveler_count=2,
+            price_per_person_snapshot=Decimal("100.00"),
+            total_amount=Decimal("200.00"),
+            payable_amount=Decimal("200.00") - reward_points_used,
+            reward_points_used=reward_points_used,
+            status=EsewaPaymentSessionStatus.INITIATED,
+        )
+        EsewaPaymentSession.objects.filter(pk=session.pk).update(created_at=timezone.now() - age)
+        return session
+
+    def test_completed_sessions_are_confirmed_and_pending_left_alone(self):
+        _EsewaStubHandler.responses = {"txn-paid": (200, "COMPLETE"), "txn-pending": (200, "PENDING")}
+        paid = self._session("txn-paid", self.packages[0], reward_points_used=20)
+        pending = self._session("txn-pending", self.packages[1])
+        fresh = self._session("txn-fresh", self.packages[2], age=timedelta(seconds=10))
+
+        counts = reconcile_pending_esewa_sessions()
+
+        self.assertEqual(counts["checked"], 2)
+        self.assertEqual(counts["confirmed"], 1)
+        self.assertNotIn("txn-fresh", _EsewaStubHandler.calls)
+        paid.refresh_from_db()
+        self.assertEqual(paid.status, EsewaPaymentSessionStatus.VERIFIED)
+        self.assertEqual(paid.payment_reference, "REF-txn-paid")
+        self.assertEqual(paid.booking.traveler_count, 2)
+        self.packages[0].refresh_from_db()
+        self.assertEqual(self.packages[0].participants_count, 2)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.reward_points, 30)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, EsewaPaymentSessionStatus.INITIATED)
+        fresh.refresh_from_db()
+        self.assertIsNone(fresh.booking_id)
+
+        # A second run (or a late verify call) must not create a second booking or deduct again.
+        self.assertEqual(reconcile_pending_esewa_sessions()["confirmed"], 0)
+        self.assertEqual(Booking.objects.filter(package=self.packages[0]).count(), 1)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.reward_points, 30)
+
+    def test_verify_after_reconcile_is_served_without_calling_esewa(self):
+        _EsewaStubHandler.responses = {"txn-paid": (200, "COMPLETE")}
+        self._session("txn-paid", self.packages[0])
+        reconcile_pending_esewa_sessions()
+        calls_before = len(_EsewaStubHandler.calls)
+
+        client = APIClient()
+        client.force_authenticate(self.traveler)
+        res = client.post("/api/auth/payments/esewa/verify/", {"transaction_uuid": "txn-paid"}, format="json")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.data["already_verified"])
+        self.assertEqual(len(_EsewaStubHandler.calls), calls_before)
+
+    def test_open_circuit_skips_calls_until_reset(self):
+        _EsewaStubHandler.responses = {f"txn-down-{i}": (503, "") for i in range(3)}
+        for i, package in enumerate(self.packages):
+            self._session(f"txn-down-{i}", package)
+
+        first = reconcile_pending_esewa_sessions(workers=1)
+        self.assertEqual(first["errors"], 2)
+        self.assertEqual(first["skipped"], 1)
+        self.assertEqual(len(_EsewaStubHandler.calls), 2)
+
+        # The two that failed are backed off; the one skipped by the open circuit is still due.
+        second = reconcile_pending_esewa_sessions()
+        self.assertEqual(second["skipped"], 1)
+        self.assertEqual(len(_EsewaStubHandler.calls), 2)
+
+    def test_settled_sessions_leave_the_queue_and_pending_ones_back_off(self):
+        _EsewaStubHandler.responses = {
+            "txn-canceled": (200, "CANCELED"),
+            "txn-pending": (200, "PENDING"),
+            "txn-twice": (200, "COMPLETE"),
+        }
+        canceled = self._session("txn-canceled", self.packages[0])
+        pending = self._session("txn-pending", self.packages[1], age=timedelta(hours=2))
+        Booking.objects.create(user=self.traveler, package=self.packages[2])
+        twice = self._session("txn-twice", self.packages[2])
+
+        with self.assertLogs("accounts.esewa_reconciliation", level="WARNING"):
+            counts = reconcile_pending_esewa_sessions()
+
+        self.assertEqual((counts["checked"], counts["unverified"], counts["refund"]), (3, 1, 1))
+        canceled.refresh_from_db()
+        self.assertEqual(canceled.status, EsewaPaymentSessionStatus.CLOSED)
+        twice.refresh_from_db()
+        self.assertEqual(twice.status, EsewaPaymentSessionStatus.NEEDS_REFUND)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, EsewaPaymentSessionStatus.INITIATED)
+        self.assertAlmostEqual(
+            pending.next_check_at - pending.last_checked_at, timedelta(minutes=30), delta=timedelta(seconds=5)
+        )
+
+        # Nothing is due: settled sessions are out of the queue, the pending one is backed off.
+        self.assertEqual(reconcile_pending_esewa_sessions()["checked"], 0)
+        self.assertEqual(len(_EsewaStubHandler.calls), 3)
+
+        # Due again: the least recently checked session goes first.
+        EsewaPaymentSession.objects.filter(pk=pending.pk).update(next_check_at=timezone.now())
+        self._session("txn-fresh", self.packages[0])
+        reconcile_pending_esewa_sessions(limit=1)
+        self.assertEqual(_EsewaStubHandler.calls[-1], "txn-fresh")
+
+
+class CircuitBreakerTests(TestCase):
+    def test_half_open_allows_single_trial(self):
+        breaker = CircuitBreaker(threshold=1, reset_after=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow())
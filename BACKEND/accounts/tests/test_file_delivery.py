@@ -0,0 +1,92 @@
+"""Tests for streamed storage responses: ranges, conditional requests and front-server offload."""
+import shutil
+import tempfile
+from datetime import date
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import ChatRoom, ItineraryTrip, Roles, User
+
+
+class FileDeliveryTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        self.body = bytes(range(256)) * 400
+        self.name = default_storage.save("chat_attachments/room_1/big.bin", ContentFile(self.body))
+        self.url = f"/media/{self.name}"
+
+    def test_full_and_partial_content(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertEqual(int(res["Content-Length"]), len(self.body))
+        self.assertEqual(b"".join(res.streaming_content), self.body)
+
+        res = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res["Content-Range"], f"bytes 100-199/{len(self.body)}")
+        self.assertEqual(b"".join(res.streaming_content), self.body[100:200])
+
+        res = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(res.streaming_content), self.body[-10:])
+
+        res = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.body)}-")
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res["Content-Range"], f"bytes */{len(self.body)}")
+
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, 404)
+
+        empty = default_storage.save("chat_attachments/room_1/empty.bin", ContentFile(b""))
+        res = self.client.get(f"/media/{empty}", HTTP_RANGE="bytes=-10")
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res["Content-Range"], "bytes */0")
+
+    def test_conditional_requests(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MATCH='"stale"').status_code, 412)
+
+        # A range against an outdated validator returns the whole (changed) file.
+        res = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(res.status_code, 200)
+        res = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(res.status_code, 206)
+
+    def test_offload_to_front_server(self):
+        with override_settings(FILE_DELIVERY_OFFLOAD="x-accel-redirect", FILE_DELIVERY_ACCEL_PREFIX="/internal/"):
+            res = self.client.get(self.url)
+        self.assertEqual(res["X-Accel-Redirect"], f"/internal/{self.name}")
+        self.assertEqual(res.content, b"")
+
+        with override_settings(FILE_DELIVERY_OFFLOAD="x-sendfile"):
+            res = self.client.get(self.url)
+        self.assertEqual(res["X-Sendfile"], default_storage.path(self.name))
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="inline")
+    def test_itinerary_preview_revalidates_by_content_hash(self):
+        agent = User.objects.create_user(email="agent_files@test.com", password="testpass123", role=Roles.AGENT)
+        traveler = User.objects.create_user(email="traveler_files@test.com", password="testpass123", role=Roles.TRAVELER)
+        room = ChatRoom.objects.create(traveler=traveler, agent=agent)
+        trip = ItineraryTrip.objects.create(room=room, created_by=agent, start_date=date(2026, 11, 1))
+        client = APIClient()
+        client.force_authenticate(traveler)
+        url = reverse("chat_itinerary_trip_pdf", args=[room.pk, trip.pk])
+
+        res = client.get(url)
+        self.assertEqual(res["Content-Type"], "application/pdf")
+        self.assertEqual(res["Cache-Control"], "private, no-cache")
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=res["ETag"]).status_code, 304)
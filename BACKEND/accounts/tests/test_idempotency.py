@@ -0,0 +1,124 @@
+"""Tests for Idempotency-Key handling on payment initiation and notification send."""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.idempotency import purge_expired_idempotency_keys
+from accounts.models import (
+    Booking,
+    EsewaPaymentSession,
+    IdempotencyKey,
+    Notification,
+    Package,
+    PackageStatus,
+    RewardPointsEntry,
+    Roles,
+    User,
+    UserProfile,
+)
+from accounts.rewards import adjust_reward_points
+
+INITIATE_URL = "/api/auth/payments/esewa/initiate/"
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(email="agent_idem@test.com", password="testpass123", role=Roles.AGENT)
+        self.traveler = User.objects.create_user(
+            email="traveler_idem@test.com", password="testpass123", role=Roles.TRAVELER
+        )
+        self.profile = UserProfile.objects.create(user=self.traveler, reward_points=0)
+        self.package = Package.objects.create(
+            agent=self.agent,
+            title="Idempotent Trip",
+            location="Pokhara",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=PackageStatus.ACTIVE,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.traveler)
+
+    def _initiate(self, key, traveler_count=1, points=0):
+        return self.client.post(
+            INITIATE_URL,
+            {"package_id": self.package.pk, "traveler_count": traveler_count, "reward_points_to_use": points},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_stored_payment_session(self):
+        first = self._initiate("key-1")
+        retry = self._initiate("key-1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["transaction_uuid"], first.data["transaction_uuid"])
+        self.assertEqual(EsewaPaymentSession.objects.count(), 1)
+
+    def test_without_key_every_request_runs(self):
+        self.client.post(INITIATE_URL, {"package_id": self.package.pk}, format="json")
+        self.client.post(INITIATE_URL, {"package_id": self.package.pk}, format="json")
+        self.assertEqual(EsewaPaymentSession.objects.count(), 2)
+
+    def test_key_reused_with_different_body_is_rejected(self):
+        self._initiate("key-2", traveler_count=1)
+        res = self._initiate("key-2", traveler_count=3)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(EsewaPaymentSession.objects.count(), 1)
+
+    def test_key_in_progress_returns_409(self):
+        self._initiate("key-3")
+        IdempotencyKey.objects.filter(key="key-3").update(status=IdempotencyKey.KeyStatus.IN_PROGRESS)
+
+        res = self._initiate("key-3")
+
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.data["code"], "idempotency_in_progress")
+        self.assertEqual(res["Retry-After"], "1")
+
+    def test_error_response_releases_key(self):
+        res = self.client.post(
+            INITIATE_URL, {"package_id": 999999}, format="json", HTTP_IDEMPOTENCY_KEY="key-4"
+        )
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(IdempotencyKey.objects.filter(key="key-4").exists())
+
+    def test_reward_points_only_booking_is_not_duplicated(self):
+        adjust_reward_points(self.traveler.pk, 500, RewardPointsEntry.Kind.ADJUSTMENT)
+        self.profile.refresh_from_db()
+
+        first = self._initiate("key-5", points=100)
+        retry = self._initiate("key-5", points=100)
+
+        self.assertTrue(first.data["zero_payment"])
+        self.assertEqual(retry.data["booking"]["id"], first.data["booking"]["id"])
+        self.assertEqual(Booking.objects.filter(user=self.traveler).count(), 1)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.reward_points, 400)
+
+    def test_notification_send_is_not_duplicated(self):
+        admin = User.objects.create_user(email="admin_idem@test.com", password="testpass123", role=Roles.ADMIN)
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        body = {"title": "Hello", "message": "World", "target_type": "all_travelers"}
+
+        first = client.post("/api/auth/notifications/", body, format="json", HTTP_IDEMPOTENCY_KEY="send-1")
+        retry = client.post("/api/auth/notifications/", body, format="json", HTTP_IDEMPOTENCY_KEY="send-1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_expired_keys_are_purged(self):
+        self._initiate("key-6")
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(purge_expired_idempotency_keys(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,105 @@
+"""Tests for the streamed ZIP export of itinerary PDFs."""
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import itinerary_pdf
+from accounts.itinerary_pdf_cache import get_itinerary_pdf
+from accounts.itinerary_pdf_jobs import run_next_pdf_job
+from accounts.models import Booking, ChatRoom, ItineraryTrip, Package, PackageStatus, Roles, User
+
+
+@override_settings(ITINERARY_PDF_RENDER_MODE="inline")
+class ItineraryExportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.agent = User.objects.create_user(email="agent_export@test.com", password="testpass123", role=Roles.AGENT)
+        self.package = Package.objects.create(
+            agent=self.agent,
+            title="Everest Base Camp",
+            location="Solukhumbu",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=PackageStatus.ACTIVE,
+            trip_end_date=date.today() + timedelta(days=30),
+        )
+        self.trips = []
+        for i in range(3):
+            traveler = User.objects.create_user(
+                email=f"traveler_export{i}@test.com", password="testpass123", role=Roles.TRAVELER
+            )
+            room = ChatRoom.objects.create(traveler=traveler, agent=self.agent)
+            booking = Booking.objects.create(user=traveler, package=self.package) if i < 2 else None
+            self.trips.append(
+                ItineraryTrip.objects.create(
+                    room=room, created_by=self.agent, start_date=date(2026, 12, 1), days_count=2, booking=booking
+                )
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.agent)
+
+    def _archive(self, res):
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "application/zip")
+        return zipfile.ZipFile(BytesIO(b"".join(res.streaming_content)))
+
+    def test_package_export_streams_every_booked_trip_reusing_cached_renders(self):
+        cached = get_itinerary_pdf(self.trips[0])
+        with mock.patch.object(itinerary_pdf, "build_itinerary_pdf", wraps=itinerary_pdf.build_itinerary_pdf) as build:
+            archive = self._archive(self.client.get(reverse("chat_itinerary_export"), {"package": self.package.pk}))
+
+        self.assertEqual(build.call_count, 1)
+        names = archive.namelist()
+        self.assertEqual(len(names), 2)
+        self.assertTrue(names[0].startswith(self.trips[0].booking.booking_code))
+        self.assertEqual(archive.read(names[0]), cached)
+        self.assertTrue(archive.read(names[1]).startswith(b"%PDF"))
+
+    def test_room_scope_and_agent_ownership(self):
+        room = self.trips[2].room
+        archive = self._archive(self.client.get(reverse("chat_itinerary_export"), {"room": room.pk}))
+        self.assertEqual(len(archive.namelist()), 1)
+
+        other = User.objects.create_user(email="agent_export2@test.com", password="testpass123", role=Roles.AGENT)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(reverse("chat_itinerary_export"), {"room": room.pk}).status_code, 404)
+        self.assertEqual(self.client.get(reverse("chat_itinerary_export")).status_code, 400)
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="worker")
+    def test_pending_renders_answer_202_and_failures_are_listed_as_missing(self):
+        get_itinerary_pdf(self.trips[0])
+        url = reverse("chat_itinerary_export")
+        res = self.client.get(url, {"package": self.package.pk})
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual((res.data["ready"], res.data["pending"]), (1, 1))
+        self.assertEqual(res.data["jobs"][0]["trip_id"], self.trips[1].pk)
+        self.assertIn("Retry-After", res)
+        # Asking again while it renders reuses the job.
+        self.assertEqual(self.client.get(url, {"package": self.package.pk}).data["jobs"][0]["job_id"], res.data["jobs"][0]["job_id"])
+
+        with mock.patch.object(itinerary_pdf, "build_itinerary_pdf", side_effect=RuntimeError("boom")):
+            with self.assertLogs("accounts.itinerary_pdf_jobs", level="ERROR"):
+                run_next_pdf_job()
+        archive = self._archive(self.client.get(url, {"package": self.package.pk}))
+        self.assertEqual(len([n for n in archive.namelist() if n.endswith(".pdf")]), 1)
+        self.assertIn(f"trip{self.trips[1].pk}.pdf", archive.read("MISSING.txt").decode())
@@ -0,0 +1,29 @@
+"""Tests for the per-process reportlab assets and the itinerary PDF benchmark command."""
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from PIL import Image as PILImage
+
+from accounts import itinerary_pdf
+
+
+class ItineraryPdfAssetTests(TestCase):
+    def test_styles_and_logo_are_built_once(self):
+        self.assertIs(itinerary_pdf._styles(), itinerary_pdf._styles())
+        asset = itinerary_pdf._logo_asset()
+        if asset is None:
+            self.skipTest("Logo asset not available in this checkout.")
+        self.assertIs(asset, itinerary_pdf._logo_asset())
+
+        png, width, height = asset
+        with PILImage.open(BytesIO(png)) as im:
+            self.assertLessEqual(im.size[0], itinerary_pdf.LOGO_DPI * itinerary_pdf.LOGO_WIDTH / 72)
+            self.assertAlmostEqual(width / height, im.size[0] / im.size[1], places=2)
+
+    def test_benchmark_command_renders_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_itinerary_pdf", days="1,2", repeat=1, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(any(line.split()[:1] == ["2"] for line in lines))
+        self.assertFalse(itinerary_pdf.ItineraryTrip.objects.exists())
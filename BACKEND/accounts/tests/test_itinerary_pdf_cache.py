@@ -0,0 +1,84 @@
+"""Tests for the content-hashed itinerary PDF render cache."""
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import itinerary_pdf
+from accounts.itinerary_pdf_cache import CACHE_DIR, get_itinerary_pdf, trip_content_hash
+from accounts.models import ChatRoom, ItineraryHotelStay, ItineraryTrip, ItineraryTripProfile, Roles, User
+
+
+class ItineraryPdfCacheTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.agent = User.objects.create_user(email="agent_pdf@test.com", password="testpass123", role=Roles.AGENT)
+        self.traveler = User.objects.create_user(email="traveler_pdf@test.com", password="testpass123", role=Roles.TRAVELER)
+        self.room = ChatRoom.objects.create(traveler=self.traveler, agent=self.agent)
+        self.trip = ItineraryTrip.objects.create(
+            room=self.room, created_by=self.agent, start_date=date(2026, 11, 1), days_count=3, nights_count=2
+        )
+        ItineraryTripProfile.objects.create(trip=self.trip, traveler_full_names="Maya Gurung")
+        self.hotel = ItineraryHotelStay.objects.create(trip=self.trip, hotel_name="Lakeside Inn")
+        self.client = APIClient()
+
+    def _cached_files(self):
+        try:
+            return default_storage.listdir(f"{CACHE_DIR}/trip_{self.trip.pk}")[1]
+        except FileNotFoundError:
+            return []
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="inline")
+    def test_repeat_previews_are_served_from_storage(self):
+        self.client.force_authenticate(self.traveler)
+        url = reverse("chat_itinerary_trip_pdf", args=[self.room.pk, self.trip.pk])
+        with mock.patch.object(itinerary_pdf, "build_itinerary_pdf", wraps=itinerary_pdf.build_itinerary_pdf) as build:
+            first = self.client.get(url)
+            second = self.client.get(url)
+
+        self.assertEqual(build.call_count, 1)
+        first_body, second_body = b"".join(first.streaming_content), b"".join(second.streaming_content)
+        self.assertTrue(first_body.startswith(b"%PDF"))
+        self.assertEqual(first_body, second_body)
+        self.assertEqual(self._cached_files(), [f"{trip_content_hash(self.trip)}.pdf"])
+
+    def test_hash_covers_child_rows_and_child_writes_invalidate(self):
+        get_itinerary_pdf(self.trip)
+        before = trip_content_hash(self.trip)
+
+        self.client.force_authenticate(self.agent)
+        url = reverse("chat_itinerary_trip_hotel_detail", args=[self.room.pk, self.trip.pk, self.hotel.pk])
+        res = self.client.patch(url, {"room_type": "Deluxe"}, format="json")
+        self.assertEqual(res.status_code, 200)
+
+        self.assertEqual(self._cached_files(), [])
+        self.assertNotEqual(trip_content_hash(self.trip), before)
+
+        get_itinerary_pdf(self.trip)
+        self.client.delete(url)
+        self.assertEqual(self._cached_files(), [])
+
+    def test_profile_change_produces_a_new_render(self):
+        get_itinerary_pdf(self.trip)
+        ItineraryTripProfile.objects.filter(trip=self.trip).update(traveler_full_names="Nima Sherpa")
+        with mock.patch.object(itinerary_pdf, "build_itinerary_pdf", wraps=itinerary_pdf.build_itinerary_pdf) as build:
+            get_itinerary_pdf(self.trip)
+        self.assertEqual(build.call_count, 1)
+        # The superseded render is pruned when the new one is stored.
+        self.assertEqual(len(self._cached_files()), 1)
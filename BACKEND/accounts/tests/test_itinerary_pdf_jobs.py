@@ -0,0 +1,168 @@
+"""Tests for queued (off-request) itinerary PDF rendering and the send-to-chat job flow."""
+import shutil
+import tempfile
+from concurrent.futures import Future
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts import itinerary_pdf, itinerary_pdf_jobs
+from accounts.itinerary_pdf_cache import get_itinerary_pdf
+from accounts.itinerary_pdf_jobs import run_next_pdf_job
+from accounts.models import ChatMessage, ChatRoom, ItineraryPdfJob, ItineraryTrip, Roles, User
+
+
+class ItineraryPdfJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storage_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        self.agent = User.objects.create_user(email="agent_jobs@test.com", password="testpass123", role=Roles.AGENT)
+        self.traveler = User.objects.create_user(email="traveler_jobs@test.com", password="testpass123", role=Roles.TRAVELER)
+        self.room = ChatRoom.objects.create(traveler=self.traveler, agent=self.agent)
+        self.trip = ItineraryTrip.objects.create(
+            room=self.room, created_by=self.agent, start_date=date(2026, 11, 1), days_count=3, nights_count=2
+        )
+        self.client = APIClient()
+
+    def _status(self, job_id):
+        return self.client.get(reverse("chat_itinerary_trip_pdf_job", args=[self.room.pk, self.trip.pk, job_id]))
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="inline")
+    def test_send_queues_a_job_that_attaches_the_pdf_when_done(self):
+        self.client.force_authenticate(self.agent)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            res = self.client.post(reverse("chat_itinerary_trip_send", args=[self.room.pk, self.trip.pk]))
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.data["status"], ItineraryPdfJob.Status.QUEUED)
+        self.assertFalse(ChatMessage.objects.filter(room=self.room).exists())
+
+        for callback in callbacks:
+            callback()
+        res = self._status(res.data["job_id"])
+        self.assertEqual(res.data["status"], ItineraryPdfJob.Status.DONE)
+        msg = ChatMessage.objects.get(room=self.room)
+        self.assertEqual(res.data["message_id"], msg.pk)
+        self.assertTrue(msg.attachment.name.endswith(".pdf"))
+        self.assertIsNotNone(res.data["attachment_url"])
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="worker")
+    def test_rerun_send_job_does_not_post_a_second_message(self):
+        self.client.force_authenticate(self.agent)
+        job_id = self.client.post(reverse("chat_itinerary_trip_send", args=[self.room.pk, self.trip.pk])).data["job_id"]
+        run_next_pdf_job()
+        # e.g. requeued as stale while the first run was still finishing
+        ItineraryPdfJob.objects.filter(pk=job_id).update(status=ItineraryPdfJob.Status.QUEUED)
+        run_next_pdf_job()
+        self.assertEqual(ChatMessage.objects.filter(room=self.room).count(), 1)
+        self.assertEqual(ItineraryPdfJob.objects.get(pk=job_id).message_id, ChatMessage.objects.get(room=self.room).pk)
+
+        self.client.force_authenticate(self.traveler)
+        self.assertEqual(self.client.post(reverse("chat_itinerary_trip_send", args=[self.room.pk, self.trip.pk])).status_code, 403)
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="worker")
+    def test_uncached_preview_is_queued_instead_of_rendered(self):
+        self.client.force_authenticate(self.traveler)
+        url = reverse("chat_itinerary_trip_pdf", args=[self.room.pk, self.trip.pk])
+        with mock.patch.object(itinerary_pdf, "build_itinerary_pdf") as build:
+            page = self.client.get(url, HTTP_ACCEPT="text/html,application/xhtml+xml")
+            api = self.client.get(url, HTTP_ACCEPT="application/json")
+        build.assert_not_called()
+        self.assertEqual(page.status_code, 202)
+        self.assertIn(b'http-equiv="refresh"', page.content)
+        self.assertEqual(api.status_code, 202)
+        self.assertEqual(ItineraryPdfJob.objects.filter(trip=self.trip).count(), 1)
+
+        run_next_pdf_job()
+        res = self.client.get(url)
+        self.assertTrue(b"".join(res.streaming_content).startswith(b"%PDF"))
+
+    def test_cached_pdf_is_sent_without_queueing(self):
+        get_itinerary_pdf(self.trip)
+        self.client.force_authenticate(self.agent)
+        with mock.patch.object(itinerary_pdf, "build_itinerary_pdf") as build:
+            res = self.client.post(reverse("chat_itinerary_trip_send", args=[self.room.pk, self.trip.pk]))
+        build.assert_not_called()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["message_id"], ChatMessage.objects.get(room=self.room).pk)
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="worker")
+    def test_preview_jobs_are_shared_and_drained_by_the_worker(self):
+        self.client.force_authenticate(self.traveler)
+        url = reverse("chat_itinerary_trip_pdf_jobs", args=[self.room.pk, self.trip.pk])
+        first = self.client.post(url)
+        second = self.client.post(url)
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.data["job_id"], second.data["job_id"])
+        self.assertIsNone(first.data["pdf_url"])
+
+        self.assertEqual(run_next_pdf_job().pk, first.data["job_id"])
+        self.assertIsNone(run_next_pdf_job())
+        res = self._status(first.data["job_id"])
+        self.assertEqual(res.data["status"], ItineraryPdfJob.Status.DONE)
+        pdf = self.client.get(res.data["pdf_url"])
+        self.assertTrue(b"".join(pdf.streaming_content).startswith(b"%PDF"))
+
+        outsider = User.objects.create_user(email="outsider_jobs@test.com", password="testpass123", role=Roles.TRAVELER)
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self._status(first.data["job_id"]).status_code, 403)
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="worker", ITINERARY_PDF_JOB_STALE_SECONDS=60)
+    def test_stale_and_crashed_jobs_are_recovered(self):
+        long_ago = timezone.now() - timedelta(minutes=5)
+        stuck = ItineraryPdfJob.objects.create(
+            trip=self.trip, requested_by=self.agent, status=ItineraryPdfJob.Status.RENDERING, started_at=long_ago, attempts=1
+        )
+        spent = ItineraryPdfJob.objects.create(
+            trip=self.trip, requested_by=self.agent, status=ItineraryPdfJob.Status.RENDERING, started_at=long_ago, attempts=3
+        )
+        self.client.force_authenticate(self.agent)
+        self.assertEqual(self._status(stuck.pk).data["status"], ItineraryPdfJob.Status.QUEUED)
+        self.assertEqual(self._status(spent.pk).data["status"], ItineraryPdfJob.Status.FAILED)
+
+        crashed = Future()
+        crashed.set_exception(RuntimeError("worker died"))
+        executor = mock.Mock()
+        ItineraryPdfJob.objects.filter(pk=stuck.pk).update(status=ItineraryPdfJob.Status.RENDERING)
+        with self.assertLogs("accounts.itinerary_pdf_jobs", level="ERROR"):
+            itinerary_pdf_jobs._pool_job_finished(stuck.pk, executor, crashed)
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.status, ItineraryPdfJob.Status.FAILED)
+        executor.shutdown.assert_called_once()
+
+    @override_settings(ITINERARY_PDF_RENDER_MODE="worker", ITINERARY_PDF_JOB_STALE_SECONDS=60)
+    def test_preview_url_does_not_wait_on_a_stale_job(self):
+        long_ago = timezone.now() - timedelta(minutes=5)
+        stuck = ItineraryPdfJob.objects.create(
+            trip=self.trip, requested_by=self.agent, status=ItineraryPdfJob.Status.RENDERING, started_at=long_ago, attempts=1
+        )
+        self.client.force_authenticate(self.traveler)
+        url = reverse("chat_itinerary_trip_pdf", args=[self.room.pk, self.trip.pk])
+
+        res = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.data["job_id"], stuck.pk)
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.status, ItineraryPdfJob.Status.QUEUED)
+
+        # Out of attempts: failed, and a fresh job takes its place.
+        ItineraryPdfJob.objects.filter(pk=stuck.pk).update(
+            status=ItineraryPdfJob.Status.RENDERING, started_at=long_ago, attempts=3
+        )
+        res = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertNotEqual(res.data["job_id"], stuck.pk)
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.status, ItineraryPdfJob.Status.FAILED)
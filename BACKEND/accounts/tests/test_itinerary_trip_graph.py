@@ -0,0 +1,130 @@
+"""Tests for the whole-trip itinerary endpoint (single GET, bulk PUT/PATCH of the child collections)."""
+from datetime import date
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import (
+    ChatRoom,
+    ItineraryCarryItem,
+    ItineraryHotelStay,
+    ItineraryItem,
+    ItineraryTransportSegment,
+    ItineraryTrip,
+    ItineraryTripProfile,
+    Roles,
+    User,
+)
+
+
+class ItineraryTripGraphTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(email="agent_graph@test.com", password="testpass123", role=Roles.AGENT)
+        self.traveler = User.objects.create_user(email="traveler_graph@test.com", password="testpass123", role=Roles.TRAVELER)
+        self.room = ChatRoom.objects.create(traveler=self.traveler, agent=self.agent)
+        self.trip = ItineraryTrip.objects.create(
+            room=self.room, created_by=self.agent, start_date=date(2026, 11, 1), days_count=3, nights_count=2
+        )
+        ItineraryTripProfile.objects.create(trip=self.trip, package_name="Pokhara getaway")
+        self.hotel = ItineraryHotelStay.objects.create(trip=self.trip, hotel_name="Lakeside Inn")
+        self.old_hotel = ItineraryHotelStay.objects.create(trip=self.trip, hotel_name="Old Inn", display_order=2)
+        self.carry = ItineraryCarryItem.objects.create(trip=self.trip, item_name="Jacket")
+        for day in (1, 2, 3):
+            ItineraryItem.objects.create(
+                room=self.room, trip=self.trip, created_by=self.agent, day_number=day,
+                travel_date=date(2026, 11, day), activity=f"Day {day}",
+            )
+        self.url = reverse("chat_itinerary_trip_graph", args=[self.room.pk, self.trip.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.agent)
+
+    def test_get_returns_the_whole_trip_in_a_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as first:
+            res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["profile"]["package_name"], "Pokhara getaway")
+        self.assertEqual([h["hotel_name"] for h in res.data["hotels"]], ["Lakeside Inn", "Old Inn"])
+        self.assertEqual([i["activity"] for i in res.data["items"]], ["Day 1", "Day 2", "Day 3"])
+        self.assertEqual(res.data["transport"], [])
+
+        for day in (4, 5):
+            ItineraryItem.objects.create(
+                room=self.room, trip=self.trip, created_by=self.agent, day_number=day,
+                travel_date=date(2026, 11, day), activity=f"Day {day}",
+            )
+            ItineraryCarryItem.objects.create(trip=self.trip, item_name=f"Item {day}")
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(self.url)
+        self.assertEqual(len(first), len(second))
+
+    @mock.patch("accounts.itinerary_trip_graph.invalidate_itinerary_pdf")
+    def test_put_upserts_and_replaces_the_collections_it_sends(self, invalidate):
+        res = self.client.put(
+            self.url,
+            {
+                "profile": {"package_name": "Pokhara & Bandipur"},
+                "hotels": [
+                    {"id": self.hotel.pk, "hotel_name": "Lakeside Resort", "display_order": 1},
+                    {"hotel_name": "Bandipur Homestay", "display_order": 2},
+                ],
+                "transport": [{"segment_type": "main_travel", "transport_type": "bus"}],
+            },
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual([h["hotel_name"] for h in res.data["hotels"]], ["Lakeside Resort", "Bandipur Homestay"])
+        self.assertFalse(ItineraryHotelStay.objects.filter(pk=self.old_hotel.pk).exists())
+        self.assertEqual(ItineraryTransportSegment.objects.get(trip=self.trip).transport_type, "bus")
+        self.assertEqual(res.data["profile"]["package_name"], "Pokhara & Bandipur")
+        # collections not in the body are left alone
+        self.assertEqual(len(res.data["items"]), 3)
+        self.assertEqual(len(res.data["carry_items"]), 1)
+        invalidate.assert_called_once_with(self.trip.pk)
+
+    def test_patch_upserts_without_deleting_and_invalid_documents_write_nothing(self):
+        item = self.trip.items.get(day_number=2)
+        res = self.client.patch(
+            self.url,
+            {
+                "items": [
+                    {"id": item.pk, "activity": "Sarangkot sunrise"},
+                    {"day_number": 3, "is_night": True, "travel_date": "2026-11-03",
+                     "time_label": "7:00 PM", "activity": "Lakeside dinner"},
+                ],
+                "carry_items": [{"id": self.carry.pk, "category": "Clothing"}],
+            },
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200, res.data)
+        item.refresh_from_db()
+        self.assertEqual(item.activity, "Sarangkot sunrise")
+        created = self.trip.items.get(is_night=True)
+        self.assertEqual((created.room_id, created.created_by_id), (self.room.pk, self.agent.pk))
+        self.assertEqual(self.trip.items.count(), 4)
+        self.carry.refresh_from_db()
+        self.assertEqual((self.carry.category, self.carry.item_name), ("Clothing", "Jacket"))
+
+        other_trip = ItineraryTrip.objects.create(room=self.room, created_by=self.agent, start_date=date(2026, 12, 1))
+        foreign = ItineraryHotelStay.objects.create(trip=other_trip, hotel_name="Elsewhere")
+        res = self.client.patch(
+            self.url,
+            {
+                "carry_items": [{"item_name": "Torch"}],
+                "hotels": [{"id": foreign.pk, "hotel_name": "Hijacked"}, {"hotel_name": ""}],
+            },
+            format="json",
+        )
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("id", res.data["hotels"][0])
+        self.assertIn("hotel_name", res.data["hotels"][1])
+        self.assertFalse(ItineraryCarryItem.objects.filter(item_name="Torch").exists())
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.hotel_name, "Elsewhere")
+
+        self.client.force_authenticate(self.traveler)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.patch(self.url, {"carry_items": []}, format="json").status_code, 403)
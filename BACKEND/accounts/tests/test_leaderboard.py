@@ -0,0 +1,62 @@
+"""Tests for the materialized leaderboard and the rank lookup endpoint."""
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.leaderboard import refresh_leaderboard
+from accounts.models import LeaderboardEntry, Roles, User, UserProfile
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.travelers = []
+        for i, points in enumerate([50, 300, 300, 10, 0, 120]):
+            user = User.objects.create_user(
+                email=f"traveler_lb{i}@test.com", password="testpass123", role=Roles.TRAVELER
+            )
+            UserProfile.objects.create(user=user, first_name=f"T{i}", reward_points=points)
+            self.travelers.append(user)
+        User.objects.create_user(email="agent_lb@test.com", password="testpass123", role=Roles.AGENT)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.travelers[0])
+
+    def test_refresh_assigns_competition_ranks(self):
+        self.assertEqual(refresh_leaderboard(), 6)
+
+        rows = list(LeaderboardEntry.objects.values_list("user_id", "rank", "position"))
+        t = [u.pk for u in self.travelers]
+        self.assertEqual(
+            rows,
+            [(t[1], 1, 1), (t[2], 1, 2), (t[5], 3, 3), (t[0], 4, 4), (t[3], 5, 5), (t[4], 6, 6)],
+        )
+
+    def test_list_is_paginated_with_light_rows(self):
+        res = self.client.get("/api/auth/leaderboard/", {"page_size": 2})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["count"], 6)
+        self.assertEqual([row["id"] for row in res.data["results"]], [self.travelers[1].pk, self.travelers[2].pk])
+        self.assertNotIn("email", res.data["results"][0])
+        self.assertNotIn("refund_qr_url", res.data["results"][0])
+
+    def test_me_returns_rank_and_neighbours(self):
+        refresh_leaderboard()
+
+        res = self.client.get("/api/auth/leaderboard/me/", {"neighbours": 1})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["rank"], 4)
+        self.assertEqual(res.data["total"], 6)
+        self.assertEqual(
+            [row["id"] for row in res.data["neighbours"]],
+            [self.travelers[5].pk, self.travelers[0].pk, self.travelers[3].pk],
+        )
+
+    def test_me_for_unranked_user(self):
+        refresh_leaderboard()
+        newcomer = User.objects.create_user(email="new_lb@test.com", password="testpass123", role=Roles.TRAVELER)
+        self.client.force_authenticate(user=newcomer)
+
+        res = self.client.get("/api/auth/leaderboard/me/")
+
+        self.assertIsNone(res.data["rank"])
+        self.assertEqual(res.data["neighbours"], [])
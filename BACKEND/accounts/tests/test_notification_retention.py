@@ -0,0 +1,87 @@
+"""Tests for notification retention: archiving read recipients and purging orphaned notifications."""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import (
+    Notification,
+    NotificationRecipient,
+    NotificationRecipientArchive,
+    NotificationType,
+    Roles,
+    User,
+)
+from accounts.notification_retention import run_notification_retention
+
+
+class NotificationRetentionTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email="admin_retention@test.com",
+            password="testpass123",
+            role=Roles.ADMIN,
+        )
+        self.travelers = [
+            User.objects.create_user(
+                email=f"traveler_retention{i}@test.com",
+                password="testpass123",
+                role=Roles.TRAVELER,
+            )
+            for i in range(3)
+        ]
+        self.old = timezone.now() - timedelta(days=120)
+
+    def _notify(self, title, created_at, read_flags):
+        notification = Notification.objects.create(
+            title=title,
+            message="Body",
+            notification_type=NotificationType.PROMOTION,
+            sender=self.admin,
+        )
+        Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        for user, is_read in zip(self.travelers, read_flags):
+            rec = NotificationRecipient.objects.create(notification=notification, user=user, is_read=is_read)
+            NotificationRecipient.objects.filter(pk=rec.pk).update(created_at=created_at)
+        return notification
+
+    def test_old_read_rows_are_archived_and_unread_rows_kept(self):
+        notification = self._notify("Old deal", self.old, [True, True, False])
+
+        counts = run_notification_retention(days=90, batch_size=1)
+
+        self.assertEqual(counts["archived"], 2)
+        self.assertEqual(counts["purged"], 0)
+        self.assertEqual(NotificationRecipient.objects.filter(notification=notification).count(), 1)
+        archived = NotificationRecipientArchive.objects.filter(notification_id=notification.pk)
+        self.assertEqual(archived.count(), 2)
+        self.assertEqual(archived.first().title, "Old deal")
+        self.assertEqual(archived.first().notification_type, NotificationType.PROMOTION)
+
+    def test_fully_read_old_notification_is_purged(self):
+        notification = self._notify("All read", self.old, [True, True, True])
+
+        counts = run_notification_retention(days=90, batch_size=2)
+
+        self.assertEqual(counts["archived"], 3)
+        self.assertEqual(counts["purged"], 1)
+        self.assertFalse(Notification.objects.filter(pk=notification.pk).exists())
+        self.assertEqual(NotificationRecipientArchive.objects.filter(notification_id=notification.pk).count(), 3)
+
+    def test_recent_rows_are_untouched(self):
+        notification = self._notify("Fresh", timezone.now(), [True, True, True])
+
+        counts = run_notification_retention(days=90)
+
+        self.assertEqual(counts, {"archived": 0, "purged": 0, "days": 90})
+        self.assertEqual(NotificationRecipient.objects.filter(notification=notification).count(), 3)
+
+    def test_dry_run_changes_nothing(self):
+        self._notify("Old deal", self.old, [True, True, True])
+
+        call_command("prune_notifications", "--days", "90", "--dry-run", stdout=StringIO())
+
+        self.assertEqual(NotificationRecipient.objects.count(), 3)
+        self.assertFalse(NotificationRecipientArchive.objects.exists())
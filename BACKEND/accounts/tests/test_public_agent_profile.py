@@ -0,0 +1,77 @@
+"""Tests for the annotated, cached public agent profile endpoint."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.models import (
+    AgentProfile,
+    AgentReview,
+    Booking,
+    BookingStatus,
+    Package,
+    PackageStatus,
+    Roles,
+    User,
+    UserProfile,
+)
+
+
+class PublicAgentProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.agent = User.objects.create_user(email="agent_public@test.com", password="testpass123", role=Roles.AGENT)
+        AgentProfile.objects.create(user=self.agent, first_name="Asha")
+        self.package = Package.objects.create(
+            agent=self.agent,
+            title="Everest View",
+            location="Solukhumbu",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=PackageStatus.COMPLETED,
+            trip_end_date=date.today() - timedelta(days=3),
+        )
+        self.travelers = []
+        for i in range(12):
+            traveler = User.objects.create_user(
+                email=f"traveler_public{i}@test.com", password="testpass123", role=Roles.TRAVELER
+            )
+            UserProfile.objects.create(user=traveler, first_name=f"Reviewer{i}")
+            Booking.objects.create(user=traveler, package=self.package, status=BookingStatus.CONFIRMED)
+            self.travelers.append(traveler)
+        for traveler in self.travelers[:11]:
+            AgentReview.objects.create(user=traveler, agent=self.agent, rating=5, comment="Great")
+        self.url = f"/api/auth/agents/{self.agent.pk}/profile/"
+
+    def test_profile_counts_and_first_review_page(self):
+        with self.assertNumQueries(2):
+            res = self.client.get(self.url)
+
+        data = res.json()
+        self.assertEqual(data["total_packages_created"], 1)
+        self.assertEqual(data["total_bookings_handled"], 12)
+        self.assertEqual(data["reviews_count"], 11)
+        self.assertEqual(len(data["reviews"]), 10)
+        self.assertTrue(data["reviews"][0]["reviewer_name"].startswith("Reviewer"))
+        self.assertTrue(data["reviews_next"].endswith(f"/api/auth/agents/{self.agent.pk}/reviews/?page=2"))
+
+        page2 = self.client.get(data["reviews_next"]).json()
+        self.assertEqual(page2["count"], 11)
+        self.assertEqual(len(page2["results"]), 1)
+
+    def test_cached_until_a_related_write(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        AgentReview.objects.create(user=self.travelers[11], agent=self.agent, rating=1)
+
+        self.assertEqual(self.client.get(self.url).json()["reviews_count"], 12)
+
+        Booking.objects.filter(user=self.travelers[0]).first().delete()
+        self.assertEqual(self.client.get(self.url).json()["total_bookings_handled"], 11)
+
+    def test_unknown_agent_is_404(self):
+        self.assertEqual(self.client.get("/api/auth/agents/999999/profile/").status_code, 404)
@@ -0,0 +1,97 @@
+"""Tests for the reward points ledger and the batch awarding job."""
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import (
+    Booking,
+    BookingStatus,
+    Package,
+    PackageStatus,
+    RewardPointsEntry,
+    Roles,
+    User,
+    UserProfile,
+)
+from accounts.rewards import award_completed_trip_rewards, reward_balance_discrepancies
+
+
+class RewardLedgerTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(email="agent_rewards@test.com", password="testpass123", role=Roles.AGENT)
+        self.travelers = [
+            User.objects.create_user(email=f"traveler_rewards{i}@test.com", password="testpass123", role=Roles.TRAVELER)
+            for i in range(2)
+        ]
+        self.package = Package.objects.create(
+            agent=self.agent,
+            title="Finished Trip",
+            location="Pokhara",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("1000.00"),
+            status=PackageStatus.ACTIVE,
+            trip_end_date=date.today() - timedelta(days=1),
+        )
+        self.bookings = [
+            Booking.objects.create(
+                user=traveler,
+                package=self.package,
+                status=BookingStatus.CONFIRMED,
+                total_amount=Decimal("1000.00"),
+            )
+            for traveler in self.travelers
+        ]
+
+    def test_batch_job_credits_every_traveler_once(self):
+        self.assertEqual(award_completed_trip_rewards(batch_size=1), 2)
+        self.assertEqual(award_completed_trip_rewards(), 0)
+
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.status, PackageStatus.COMPLETED)
+        for traveler in self.travelers:
+            self.assertEqual(UserProfile.objects.get(user=traveler).reward_points, 100)
+        self.assertEqual(RewardPointsEntry.objects.filter(kind=RewardPointsEntry.Kind.EARNED).count(), 2)
+        self.assertTrue(all(b.rewards_awarded for b in Booking.objects.filter(pk__in=[b.pk for b in self.bookings])))
+        self.assertEqual(reward_balance_discrepancies(), [])
+
+    def test_zero_point_bookings_are_processed_once(self):
+        Booking.objects.filter(pk=self.bookings[0].pk).update(total_amount=0, price_per_person_snapshot=0)
+        self.assertEqual(award_completed_trip_rewards(), 1)
+
+        free = Booking.objects.get(pk=self.bookings[0].pk)
+        self.assertIsNotNone(free.rewarded_at)
+        self.assertEqual(free.reward_points_given, 0)
+        with mock.patch("accounts.rewards.reward_points_for_booking") as points_for:
+            self.assertEqual(award_completed_trip_rewards(), 0)
+        points_for.assert_not_called()
+
+    def test_profile_get_is_read_only(self):
+        client = APIClient()
+        client.force_authenticate(user=self.travelers[0])
+
+        res = client.get("/api/auth/profile/")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["reward_points"], 0)
+        self.assertFalse(RewardPointsEntry.objects.exists())
+
+    def test_profile_save_does_not_overwrite_balance(self):
+        profile = UserProfile.objects.create(user=self.travelers[0])
+        award_completed_trip_rewards()
+
+        profile.location = "Kathmandu"
+        profile.save()
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.location, "Kathmandu")
+        self.assertEqual(profile.reward_points, 100)
+
+    def test_discrepancies_report_untracked_changes(self):
+        award_completed_trip_rewards()
+        UserProfile.objects.filter(user=self.travelers[0]).update(reward_points=5)
+
+        self.assertEqual(reward_balance_discrepancies(), [(self.travelers[0].pk, 5, 100)])
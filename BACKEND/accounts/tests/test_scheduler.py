@@ -0,0 +1,100 @@
+"""Tests for the run_scheduler job runner: leader lock, job metrics and the --once command."""
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from accounts.scheduler import FileLock, ScheduledJob, Scheduler
+
+
+class _NoopLock:
+    def acquire(self):
+        return True
+
+    def is_held(self):
+        return True
+
+    def release(self):
+        pass
+
+
+class FileLockTests(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "scheduler.lock")
+
+    def test_second_holder_is_refused_until_release(self):
+        leader = FileLock(self.path)
+        standby = FileLock(self.path)
+        self.assertTrue(leader.acquire())
+        self.assertFalse(standby.acquire())
+        leader.release()
+        self.assertTrue(standby.acquire())
+        standby.release()
+
+
+class SchedulerTests(TestCase):
+    def test_due_jobs_run_and_failures_are_counted(self):
+        calls = []
+
+        def ok():
+            calls.append("ok")
+            return {"done": 1}
+
+        def boom():
+            raise ValueError("boom")
+
+        jobs = [ScheduledJob("ok", ok, interval=60), ScheduledJob("boom", boom, interval=60)]
+        scheduler = Scheduler(jobs, lock=_NoopLock())
+
+        self.assertEqual(scheduler.run_due_jobs(now=0), 2)
+        self.assertEqual(calls, ["ok"])
+        self.assertEqual(jobs[0].metrics.runs, 1)
+        self.assertEqual(jobs[0].metrics.last_result, "{'done': 1}")
+        self.assertEqual(jobs[1].metrics.failures, 1)
+        # Not due again until the interval has passed.
+        self.assertEqual(scheduler.run_due_jobs(), 0)
+
+    def test_jobs_are_skipped_once_the_lock_is_lost(self):
+        calls = []
+        lock = _NoopLock()
+        lock.is_held = lambda: False
+        scheduler = Scheduler([ScheduledJob("j", lambda: calls.append(1), interval=60)], lock=lock)
+        self.assertEqual(scheduler.run_due_jobs(now=0), 0)
+        self.assertEqual(calls, [])
+
+    def test_next_run_includes_jitter_within_bounds(self):
+        job = ScheduledJob("j", lambda: None, interval=60, jitter=5)
+        job.schedule_next(100)
+        self.assertGreaterEqual(job.next_run, 160)
+        self.assertLessEqual(job.next_run, 165)
+
+
+class RunSchedulerCommandTests(TestCase):
+    def setUp(self):
+        self.lock_path = os.path.join(tempfile.mkdtemp(), "scheduler.lock")
+
+    def test_once_runs_selected_jobs(self):
+        out = StringIO()
+        with override_settings(SCHEDULER_LOCK_FILE=self.lock_path):
+            call_command("run_scheduler", "--once", "--only", "trip_reminders", "--only", "reward_awarding", stdout=out)
+        output = out.getvalue()
+        self.assertIn("trip_reminders:", output)
+        self.assertIn("reward_awarding: 0", output)
+        self.assertNotIn("payment_reconciliation", output)
+
+    def test_once_refuses_when_another_instance_leads(self):
+        leader = FileLock(self.lock_path)
+        self.assertTrue(leader.acquire())
+        try:
+            with override_settings(SCHEDULER_LOCK_FILE=self.lock_path):
+                with self.assertRaises(CommandError):
+                    call_command("run_scheduler", "--once", "--only", "package_expiry", stdout=StringIO())
+        finally:
+            leader.release()
+
+    def test_unknown_job_is_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command("run_scheduler", "--once", "--only", "nope", stdout=StringIO())
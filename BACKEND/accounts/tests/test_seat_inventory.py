@@ -0,0 +1,135 @@
+"""Tests for package seat capacity, eSewa seat holds and their expiry."""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.esewa_reconciliation import confirm_esewa_session
+from accounts.models import (
+    Booking,
+    BookingStatus,
+    EsewaPaymentSession,
+    Package,
+    PackageStatus,
+    PaymentStatus,
+    Roles,
+    SeatHold,
+    User,
+)
+from accounts.seat_inventory import release_expired_holds
+
+INITIATE_URL = "/api/auth/payments/esewa/initiate/"
+
+
+class SeatInventoryTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(email="agent_seats@test.com", password="testpass123", role=Roles.AGENT)
+        self.travelers = [
+            User.objects.create_user(email=f"traveler_seats{i}@test.com", password="testpass123", role=Roles.TRAVELER)
+            for i in range(3)
+        ]
+        self.package = Package.objects.create(
+            agent=self.agent,
+            title="Small Group Trek",
+            location="Mustang",
+            country="Nepal",
+            description="Desc",
+            price_per_person=Decimal("100.00"),
+            status=PackageStatus.ACTIVE,
+            capacity=3,
+        )
+
+    def _client(self, traveler):
+        client = APIClient()
+        client.force_authenticate(user=traveler)
+        return client
+
+    def _initiate(self, traveler, count):
+        return self._client(traveler).post(
+            INITIATE_URL, {"package_id": self.package.pk, "traveler_count": count}, format="json"
+        )
+
+    def test_hold_blocks_seats_until_released(self):
+        first = self._initiate(self.travelers[0], 2)
+        self.assertEqual(first.status_code, 201)
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.seats_held, 2)
+        self.assertEqual(self.package.seats_left, 1)
+
+        second = self._initiate(self.travelers[1], 2)
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(second.data["seats_left"], 1)
+        self.assertEqual(EsewaPaymentSession.objects.count(), 1)
+
+        SeatHold.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(release_expired_holds(), 1)
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.seats_held, 0)
+        self.assertEqual(self._initiate(self.travelers[1], 2).status_code, 201)
+
+    def test_verified_payment_converts_hold_into_participants(self):
+        res = self._initiate(self.travelers[0], 2)
+        session = EsewaPaymentSession.objects.get(transaction_uuid=res.data["transaction_uuid"])
+
+        confirm_esewa_session(session.pk, {"status": "COMPLETE", "ref_id": "REF1"})
+
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.participants_count, 2)
+        self.assertEqual(self.package.seats_held, 0)
+        self.assertEqual(SeatHold.objects.get().status, SeatHold.HoldStatus.CONVERTED)
+        # Converted holds are not released again by the expiry job.
+        SeatHold.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(release_expired_holds(), 0)
+
+    def test_direct_booking_respects_capacity_and_cancel_frees_seats(self):
+        ok = self._client(self.travelers[0]).post(
+            "/api/auth/bookings/", {"package_id": self.package.pk, "traveler_count": 3}, format="json"
+        )
+        self.assertEqual(ok.status_code, 201)
+
+        full = self._client(self.travelers[1]).post(
+            "/api/auth/bookings/", {"package_id": self.package.pk, "traveler_count": 1}, format="json"
+        )
+        self.assertEqual(full.status_code, 400)
+        self.assertIn("sold out", str(full.data["traveler_count"]))
+
+        # Unpaid bookings cancel without the manual refund queue.
+        Booking.objects.filter(pk=ok.data["id"]).update(payment_status=PaymentStatus.PENDING)
+        cancel = self._client(self.travelers[0]).patch(
+            f"/api/auth/bookings/{ok.data['id']}/", {"status": "cancelled"}, format="json"
+        )
+        self.assertEqual(cancel.status_code, 200)
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.participants_count, 0)
+
+    def test_admin_force_cancel_frees_seats_once(self):
+        booking = self._client(self.travelers[0]).post(
+            "/api/auth/bookings/", {"package_id": self.package.pk, "traveler_count": 2}, format="json"
+        )
+        self._client(self.travelers[1]).post(
+            "/api/auth/bookings/", {"package_id": self.package.pk, "traveler_count": 1}, format="json"
+        )
+        admin = User.objects.create_user(email="admin_seats@test.com", password="testpass123", role=Roles.ADMIN)
+        self.client.force_login(admin)
+        for _ in range(2):
+            self.client.post(
+                reverse("admin_bookings"),
+                {"admin_action": "force_cancel", "booking_id": booking.data["id"], "reason": "Operator closed"},
+            )
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.participants_count, 1)
+        self.assertEqual(Booking.objects.get(pk=booking.data["id"]).status, BookingStatus.CANCELLED)
+
+    def test_full_save_does_not_overwrite_seat_counters(self):
+        stale = Package.objects.get(pk=self.package.pk)
+        Package.objects.filter(pk=self.package.pk).update(participants_count=2)
+
+        stale.title = "Renamed"
+        stale.save()
+
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.title, "Renamed")
+        self.assertEqual(self.package.participants_count, 2)
@@ -10,6 +10,7 @@ from .views import (
     TravelerSignupOtpRequestView,
     TravelerSignupOtpVerifyView,
     LeaderboardView,
+    LeaderboardMeView,
     TravelerGoogleLoginView,
     ProfileView,
     UserProfileView,
@@ -41,6 +42,7 @@ from .views import (
     ChatItineraryDetailView,
     ChatRoomBookingLookupView,
     ChatItineraryTripCreateView,
+    ChatItineraryTripGraphView,
     ChatItineraryTripProfileView,
     ChatItineraryTripTransportListCreateView,
     ChatItineraryTripTransportDetailView,
@@ -53,7 +55,10 @@ from .views import (
     ChatItineraryTripDocumentListCreateView,
     ChatItineraryTripDocumentDetailView,
     ChatItineraryTripPdfView,
+    ChatItineraryTripPdfJobCreateView,
+    ChatItineraryTripPdfJobView,
     ChatItineraryTripSendView,
+    ChatItineraryExportView,
     NotificationListCreateView,
     NotificationUnreadCountView,
     NotificationMarkReadView,
@@ -85,6 +90,7 @@ urlpatterns = [
     # Profile endpoints
     path("profile/", ProfileView.as_view(), name="profile"),
     path("leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
+    path("leaderboard/me/", LeaderboardMeView.as_view(), name="leaderboard_me"),
     path("profile/user/", UserProfileView.as_view(), name="user_profile"),
     path("profile/agent/", AgentProfileView.as_view(), name="agent_profile"),
     # Package endpoints
@@ -125,6 +131,7 @@ urlpatterns = [
     path("chat/rooms/<int:room_id>/itinerary/", ChatItineraryListCreateView.as_view(), name="chat_itinerary_list_create"),
     path("chat/rooms/<int:room_id>/itinerary/<int:pk>/", ChatItineraryDetailView.as_view(), name="chat_itinerary_detail"),
     path("chat/rooms/<int:room_id>/itinerary-trip/", ChatItineraryTripCreateView.as_view(), name="chat_itinerary_trip_create"),
+    path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/", ChatItineraryTripGraphView.as_view(), name="chat_itinerary_trip_graph"),
     path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/profile/", ChatItineraryTripProfileView.as_view(), name="chat_itinerary_trip_profile"),
     path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/transport/", ChatItineraryTripTransportListCreateView.as_view(), name="chat_itinerary_trip_transport_list_create"),
     path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/transport/<int:pk>/", ChatItineraryTripTransportDetailView.as_view(), name="chat_itinerary_trip_transport_detail"),
@@ -137,7 +144,10 @@ urlpatterns = [
     path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/documents/", ChatItineraryTripDocumentListCreateView.as_view(), name="chat_itinerary_trip_document_list_create"),
     path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/documents/<int:pk>/", ChatItineraryTripDocumentDetailView.as_view(), name="chat_itinerary_trip_document_detail"),
     path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/pdf/", ChatItineraryTripPdfView.as_view(), name="chat_itinerary_trip_pdf"),
+    path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/pdf/jobs/", ChatItineraryTripPdfJobCreateView.as_view(), name="chat_itinerary_trip_pdf_jobs"),
+    path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/pdf/jobs/<int:job_id>/", ChatItineraryTripPdfJobView.as_view(), name="chat_itinerary_trip_pdf_job"),
     path("chat/rooms/<int:room_id>/itinerary-trip/<int:trip_id>/send/", ChatItineraryTripSendView.as_view(), name="chat_itinerary_trip_send"),
+    path("chat/itinerary-export/", ChatItineraryExportView.as_view(), name="chat_itinerary_export"),
     path("chat/unread-count/", ChatUnreadCountView.as_view(), name="chat_unread_count"),
     path("chat/rooms/<int:room_id>/mark-read/", ChatRoomMarkReadView.as_view(), name="chat_room_mark_read"),
     path("chat/rooms/<int:room_id>/messages/<int:message_id>/", ChatMessageDeleteView.as_view(), name="chat_message_delete"),
@@ -6,20 +6,18 @@ import json
 import os
 import time
 import uuid
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 from datetime import datetime, date, timedelta
 from zoneinfo import ZoneInfo
-from urllib.error import URLError, HTTPError
-from urllib.parse import urlencode
-from urllib.request import urlopen
 from django.conf import settings
 from django.contrib.auth import authenticate, login, logout, get_user_model, update_session_auth_hash
 from django.core.cache import cache
 from django.contrib import messages
 from django.core.files.base import ContentFile
+from django.core.paginator import Paginator
 from django.db import transaction
 from django.db.models import Q, Count, Sum, Avg, Max
-from django.db.models.functions import TruncMonth
+from django.db.models.functions import Lower, Trim, TruncMonth
 from django.http import HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
@@ -27,6 +25,7 @@ from django.utils import timezone
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 from rest_framework import generics, permissions, response, status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -37,6 +36,7 @@ from .mail_utils import generate_otp, send_otp_email, send_agent_credentials_ema
 from .models import (
     Roles,
     UserProfile,
+    AgentDailyStats,
     AgentProfile,
     Package,
     PackageFeature,
@@ -61,6 +61,7 @@ from .models import (
     ChatMessage,
     ItineraryTrip,
     ItineraryItem,
+    ItineraryPdfJob,
     ItineraryTripProfile,
     ItineraryTransportSegment,
     ItineraryHotelStay,
@@ -73,6 +74,8 @@ from .models import (
     ExpoPushToken,
     RefundRequest,
     RefundRequestStatus,
+    RewardPointsEntry,
+    LeaderboardEntry,
     mark_custom_package_completed_if_booked,
     traveler_may_book_package,
 )
@@ -84,6 +87,7 @@ from .serializers import (
     ChangePasswordSerializer,
     UserSerializer,
     UserProfileSerializer,
+    LeaderboardEntrySerializer,
     AgentProfileSerializer,
     PublicAgentDetailSerializer,
     PackageSerializer,
@@ -105,9 +109,54 @@ from .serializers import (
     NotificationCreateSerializer,
     ExpoPushTokenRegisterSerializer,
 )
+from .rewards import adjust_reward_points
+from .esewa_reconciliation import (
+    EsewaAlreadyBooked,
+    _esewa_product_code,
+    _money,
+    _money_str,
+    _verify_esewa_transaction,
+    confirm_esewa_session,
+    mark_esewa_session_needs_refund,
+    mark_esewa_session_unverified,
+)
+from .deal_notifications import create_and_send_deal_notification
+from .idempotency import idempotent
+from .seat_inventory import SeatsUnavailable, hold_seats, release_hold, reserve_seats
+from .agent_public_profile import (
+    REVIEWS_PAGE_SIZE,
+    agent_reviews,
+    get_cached_public_profile,
+    public_agent_profiles,
+    set_cached_public_profile,
+)
+from .leaderboard import DEFAULT_NEIGHBOURS, ensure_leaderboard, leaderboard_position
+from .booking_cancellation import force_cancel_booking
+from .booking_codes import MAX_CODE_LENGTH, is_complete_code
+from .booking_exports import apply_booking_filters, streaming_booking_export
+from .package_stats import package_totals, with_booking_stats
+from .file_delivery import serve_storage_file
+from .itinerary_exports import (
+    MAX_EXPORT_TRIPS,
+    RETRY_AFTER_SECONDS,
+    export_trips,
+    prepare_export,
+    streaming_itinerary_export,
+)
+from .itinerary_pdf_cache import invalidate_itinerary_pdf, is_itinerary_pdf_cached, itinerary_pdf_name
+from .itinerary_pdf_jobs import job_payload, recover_stale_jobs, render_mode, submit_pdf_job
+from .itinerary_trip_graph import apply_trip_graph, load_trip_graph, serialize_trip_graph
+from .console_tables import ChoiceFilter, ConsoleTable, SortOption, related_count
+from .agent_travelers import related_travelers, search_travelers, travelers_page, with_agent_stats
+from .daily_rollups import AGENT_COLUMNS, ensure_daily_rollups, monthly_totals
+from .admin_metrics import (
+    get_admin_dashboard_snapshot,
+    pct_change as _pct_change,
+    safe_pct as _safe_pct,
+    shift_month as _shift_month,
+)
 from .push_notifications import (
     send_expo_push_for_notification,
-    create_and_send_deal_notification,
     create_private_offer_published_notification,
 )
 
@@ -115,14 +164,6 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-def _money(value):
-    return Decimal(str(value or "0")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-
-def _money_str(value):
-    return format(_money(value), ".2f")
-
-
 def _normalize_booking_agent_type(raw_value):
     value = str(raw_value or "").strip().lower()
     if value == BookingAgentType.GUIDE:
@@ -163,8 +204,13 @@ def _parse_trip_start_time_optional(raw_value):
     return None
 
 
-def _esewa_product_code():
-    return getattr(settings, "ESEWA_PRODUCT_CODE", "EPAYTEST")
+def _parse_capacity_optional(raw_value):
+    """Seat capacity from the package form; empty, invalid or < 1 → None (unlimited)."""
+    try:
+        value = int(str(raw_value or "").strip())
+    except ValueError:
+        return None
+    return value if value >= 1 else None
 
 
 def _esewa_secret_key():
@@ -176,10 +222,6 @@ def _esewa_form_url():
     return getattr(settings, "ESEWA_FORM_URL", "https://rc-epay.esewa.com.np/api/epay/main/v2/form")
 
 
-def _esewa_status_url():
-    return getattr(settings, "ESEWA_STATUS_URL", "https://rc.esewa.com.np/api/epay/transaction/status/")
-
-
 def _esewa_signature(total_amount, transaction_uuid, product_code):
     message = f"total_amount={_money_str(total_amount)},transaction_uuid={transaction_uuid},product_code={product_code}"
     digest = hmac.new(
@@ -213,30 +255,6 @@ def _build_esewa_form_fields(request, payment_session):
     }
 
 
-def _verify_esewa_transaction(payment_session):
-    query = urlencode(
-        {
-            "product_code": payment_session.product_code or _esewa_product_code(),
-            # Must match the amount sent to eSewa when initiating the payment
-            "total_amount": _money_str(payment_session.payable_amount or payment_session.total_amount),
-            "transaction_uuid": payment_session.transaction_uuid,
-        }
-    )
-    url = f"{_esewa_status_url()}?{query}"
-    try:
-        with urlopen(url, timeout=15) as res:
-            raw = res.read().decode("utf-8")
-    except (HTTPError, URLError, TimeoutError) as exc:
-        raise RuntimeError(f"Unable to verify eSewa payment right now: {exc}") from exc
-
-    try:
-        payload = json.loads(raw)
-    except json.JSONDecodeError as exc:
-        raise RuntimeError("Invalid response received from eSewa verification API.") from exc
-
-    return payload
-
-
 def _booking_payment_summary_html(title, message, color="#1f6b2a"):
     safe_title = str(title)
     safe_message = str(message)
@@ -561,26 +579,6 @@ def login_view(request):
     
     return render(request, 'login.html')
 
-def _shift_month(month_start, delta):
-    """Shift a first-of-month date by delta months."""
-    month_index = (month_start.year * 12 + month_start.month - 1) + delta
-    year = month_index // 12
-    month = month_index % 12 + 1
-    return month_start.replace(year=year, month=month, day=1)
-
-
-def _safe_pct(numerator, denominator):
-    if not denominator:
-        return 0.0
-    return round((numerator / denominator) * 100, 1)
-
-
-def _pct_change(current, previous):
-    if previous == 0:
-        return 100.0 if current > 0 else 0.0
-    return round(((current - previous) / previous) * 100, 1)
-
-
 def _month_key(value):
     if not value:
         return ""
@@ -590,325 +588,73 @@ def _month_key(value):
 
 
 def admin_dashboard_view(request):
-    """Admin dashboard with actionable platform metrics and visual data."""
+    """Admin dashboard with actionable platform metrics and visual data (cached snapshot, POST refreshes it)."""
     if not request.user.is_authenticated or request.user.role != Roles.ADMIN:
         messages.error(request, 'Access denied. Admin access required.')
         return redirect('login')
 
-    now = timezone.now()
-    today = timezone.localdate()
-    current_month_start = today.replace(day=1)
-    previous_month_start = _shift_month(current_month_start, -1)
-    next_month_start = _shift_month(current_month_start, 1)
-    month_starts = [_shift_month(current_month_start, offset) for offset in range(-5, 1)]
-    month_labels = [m.strftime("%b %Y") for m in month_starts]
-    month_keys = [m.strftime("%Y-%m") for m in month_starts]
-    start_window = month_starts[0]
-
-    total_users = User.objects.count()
-    total_admins = User.objects.filter(role=Roles.ADMIN).count()
-    total_travelers = User.objects.filter(role=Roles.TRAVELER).count()
-    total_agents = User.objects.filter(role=Roles.AGENT).count()
-
-    avg_agent_rating = AgentProfile.objects.filter(user__role=Roles.AGENT).aggregate(avg=Avg("rating"))["avg"] or 0
-
-    total_packages = Package.objects.count()
-    active_packages = Package.objects.filter(status=PackageStatus.ACTIVE).count()
-    completed_packages = Package.objects.filter(status=PackageStatus.COMPLETED).count()
-    draft_packages = Package.objects.filter(status=PackageStatus.DRAFT).count()
-
-    total_bookings = Booking.objects.count()
-    confirmed_bookings = Booking.objects.filter(status=BookingStatus.CONFIRMED).count()
-    cancelled_bookings = Booking.objects.filter(status=BookingStatus.CANCELLED).count()
-
-    total_custom_packages = CustomPackage.objects.count()
-    custom_open = CustomPackage.objects.filter(status=CustomPackage.CustomPackageStatus.OPEN).count()
-    custom_claimed = CustomPackage.objects.filter(status=CustomPackage.CustomPackageStatus.CLAIMED).count()
-    custom_completed = CustomPackage.objects.filter(status=CustomPackage.CustomPackageStatus.COMPLETED).count()
-    custom_cancelled = CustomPackage.objects.filter(status=CustomPackage.CustomPackageStatus.CANCELLED).count()
-
-    total_chat_rooms = ChatRoom.objects.count()
-    total_messages = ChatMessage.objects.count()
-    messages_last_30_days = ChatMessage.objects.filter(created_at__gte=now - timedelta(days=30)).count()
-
-    estimated_revenue = (
-        Booking.objects.filter(status=BookingStatus.CONFIRMED)
-        .aggregate(total=Sum("package__price_per_person"))
-        .get("total")
-        or 0
-    )
-
-    travelers_this_month = User.objects.filter(
-        role=Roles.TRAVELER,
-        date_joined__gte=current_month_start,
-        date_joined__lt=next_month_start,
-    ).count()
-    travelers_last_month = User.objects.filter(
-        role=Roles.TRAVELER,
-        date_joined__gte=previous_month_start,
-        date_joined__lt=current_month_start,
-    ).count()
-    bookings_this_month = Booking.objects.filter(
-        created_at__gte=current_month_start,
-        created_at__lt=next_month_start,
-    ).count()
-    bookings_last_month = Booking.objects.filter(
-        created_at__gte=previous_month_start,
-        created_at__lt=current_month_start,
-    ).count()
-    packages_this_month = Package.objects.filter(
-        created_at__gte=current_month_start,
-        created_at__lt=next_month_start,
-    ).count()
-    packages_last_month = Package.objects.filter(
-        created_at__gte=previous_month_start,
-        created_at__lt=current_month_start,
-    ).count()
-
-    traveler_growth_qs = (
-        User.objects.filter(role=Roles.TRAVELER, date_joined__date__gte=start_window)
-        .annotate(month=TruncMonth("date_joined"))
-        .values("month")
-        .annotate(count=Count("id"))
-        .order_by("month")
-    )
-    booking_growth_qs = (
-        Booking.objects.filter(created_at__date__gte=start_window)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(count=Count("id"))
-        .order_by("month")
-    )
-    package_growth_qs = (
-        Package.objects.filter(created_at__date__gte=start_window)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(count=Count("id"))
-        .order_by("month")
-    )
-    custom_growth_qs = (
-        CustomPackage.objects.filter(created_at__date__gte=start_window)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(count=Count("id"))
-        .order_by("month")
-    )
+    if request.method == "POST":
+        get_admin_dashboard_snapshot(refresh=True)
+        messages.success(request, "Dashboard metrics refreshed.")
+        return redirect("admin_dashboard")
 
-    traveler_growth_map = {_month_key(item["month"]): item["count"] for item in traveler_growth_qs}
-    booking_growth_map = {_month_key(item["month"]): item["count"] for item in booking_growth_qs}
-    package_growth_map = {_month_key(item["month"]): item["count"] for item in package_growth_qs}
-    custom_growth_map = {_month_key(item["month"]): item["count"] for item in custom_growth_qs}
-
-    monthly_trends = {
-        "labels": month_labels,
-        "travelers": [traveler_growth_map.get(key, 0) for key in month_keys],
-        "bookings": [booking_growth_map.get(key, 0) for key in month_keys],
-        "packages": [package_growth_map.get(key, 0) for key in month_keys],
-        "custom_requests": [custom_growth_map.get(key, 0) for key in month_keys],
+    context = {
+        **get_admin_dashboard_snapshot(),
+        "user": request.user,
+        "active_nav": "dashboard",
     }
+    return render(request, "admin_dashboard.html", context)
 
-    top_agents_qs = (
-        User.objects.filter(role=Roles.AGENT)
-        .select_related("agent_profile")
-        .annotate(
-            confirmed_bookings=Count(
-                "packages__bookings",
-                filter=Q(packages__bookings__status=BookingStatus.CONFIRMED),
-                distinct=True,
-            ),
-            active_packages=Count(
-                "packages",
-                filter=Q(packages__status=PackageStatus.ACTIVE),
-                distinct=True,
-            ),
-            estimated_revenue=Sum(
-                "packages__price_per_person",
-                filter=Q(packages__bookings__status=BookingStatus.CONFIRMED),
-            ),
-        )
-        .order_by("-confirmed_bookings", "-estimated_revenue", "email")[:5]
-    )
-    top_agents = []
-    for agent in top_agents_qs:
-        try:
-            profile = agent.agent_profile
-            display_name = profile.full_name
-            rating = float(profile.rating)
-        except AgentProfile.DoesNotExist:
-            display_name = agent.email.split("@")[0]
-            rating = 0.0
-        top_agents.append(
-            {
-                "name": display_name,
-                "email": agent.email,
-                "confirmed_bookings": agent.confirmed_bookings or 0,
-                "active_packages": agent.active_packages or 0,
-                "estimated_revenue": agent.estimated_revenue or 0,
-                "rating": rating,
-            }
-        )
-
-    top_destinations_rows = list(
-        Booking.objects.filter(status=BookingStatus.CONFIRMED)
-        .values("package__country")
-        .annotate(bookings=Count("id"))
-        .order_by("-bookings", "package__country")[:6]
-    )
-    max_destination_bookings = max((row["bookings"] for row in top_destinations_rows), default=0)
-    top_destinations = [
-        {
-            "country": row["package__country"] or "Unknown",
-            "bookings": row["bookings"],
-            "percent_of_top": _safe_pct(row["bookings"], max_destination_bookings),
-        }
-        for row in top_destinations_rows
-    ]
-
-    recent_signups_qs = (
-        User.objects.exclude(role=Roles.ADMIN)
-        .order_by("-date_joined")[:8]
-    )
-    recent_signups = [
-        {
-            "email": user.email,
-            "role": user.get_role_display(),
-            "joined_at": user.date_joined,
-        }
-        for user in recent_signups_qs
-    ]
-
-    package_status = [
-        {
-            "label": "Active",
-            "count": active_packages,
-            "percent": _safe_pct(active_packages, total_packages),
-            "css_class": "status-active",
-        },
-        {
-            "label": "Completed",
-            "count": completed_packages,
-            "percent": _safe_pct(completed_packages, total_packages),
-            "css_class": "status-completed",
-        },
-        {
-            "label": "Draft",
-            "count": draft_packages,
-            "percent": _safe_pct(draft_packages, total_packages),
-            "css_class": "status-draft",
-        },
-    ]
-
-    custom_status = [
-        {
-            "label": "Open",
-            "count": custom_open,
-            "percent": _safe_pct(custom_open, total_custom_packages),
-            "css_class": "status-open",
-        },
-        {
-            "label": "Claimed",
-            "count": custom_claimed,
-            "percent": _safe_pct(custom_claimed, total_custom_packages),
-            "css_class": "status-claimed",
-        },
-        {
-            "label": "Completed",
-            "count": custom_completed,
-            "percent": _safe_pct(custom_completed, total_custom_packages),
-            "css_class": "status-finished",
-        },
-        {
-            "label": "Cancelled",
-            "count": custom_cancelled,
-            "percent": _safe_pct(custom_cancelled, total_custom_packages),
-            "css_class": "status-cancelled",
-        },
-    ]
 
-    booking_status = [
-        {
-            "label": "Confirmed",
-            "count": confirmed_bookings,
-            "percent": _safe_pct(confirmed_bookings, total_bookings),
-            "css_class": "status-confirmed",
-        },
-        {
-            "label": "Cancelled",
-            "count": cancelled_bookings,
-            "percent": _safe_pct(cancelled_bookings, total_bookings),
-            "css_class": "status-cancelled",
-        },
-    ]
+ADMIN_PACKAGES_PAGE_SIZE = 24
+ADMIN_PACKAGES_SIDEBAR_SIZE = 5
 
-    booking_confirmed_pct = _safe_pct(confirmed_bookings, total_bookings)
-    if total_bookings:
-        booking_donut = (
-            f"conic-gradient(#166534 0% {booking_confirmed_pct}%, "
-            f"#dc2626 {booking_confirmed_pct}% 100%)"
-        )
-    else:
-        booking_donut = "conic-gradient(#cbd5e1 0% 100%)"
 
-    insights = []
-    booking_growth_delta = _pct_change(bookings_this_month, bookings_last_month)
-    if booking_growth_delta > 0:
-        insights.append(f"Bookings are up {booking_growth_delta}% versus last month.")
-    elif booking_growth_delta < 0:
-        insights.append(f"Bookings are down {abs(booking_growth_delta)}% versus last month.")
-    else:
-        insights.append("Bookings are flat compared to last month.")
+def _admin_package_card(package):
+    """Template row for a package annotated by package_stats.with_booking_stats()."""
+    try:
+        agent_profile = package.agent.agent_profile
+        agent_name = agent_profile.full_name
+        agent_location = agent_profile.location
+    except AgentProfile.DoesNotExist:
+        agent_name = package.agent.email.split("@")[0]
+        agent_location = ""
+    return {
+        "id": package.id,
+        "title": package.title,
+        "location": package.location,
+        "country": package.country,
+        "description": package.description,
+        "main_image_url": package.main_image.url if package.main_image else "",
+        "feature_names": [f.name for f in package.features.all()[:4]],
+        "price_per_person": package.price_per_person,
+        "duration_days": package.duration_days,
+        "duration_nights": package.duration_nights,
+        "trip_start_date": package.trip_start_date,
+        "trip_end_date": package.trip_end_date,
+        "status": package.get_status_display(),
+        "status_key": package.status,
+        "participants_count": package.participants_count or 0,
+        "joined_travelers_count": package.joined_travelers_count,
+        "confirmed_bookings_count": package.confirmed_bookings_count,
+        "cancelled_bookings_count": package.cancelled_bookings_count,
+        "refund_pending_count": package.refund_pending_count,
+        "last_booking_at": package.last_booking_at,
+        "agent_name": agent_name,
+        "agent_email": package.agent.email,
+        "agent_location": agent_location,
+        "agent_rating": package.agent_rating,
+        "created_at": package.created_at,
+        "updated_at": package.updated_at,
+    }
 
-    if top_destinations:
-        insights.append(
-            f"Highest demand destination is {top_destinations[0]['country']} with {top_destinations[0]['bookings']} confirmed bookings."
-        )
 
-    context = {
-        "user": request.user,
-        "stats": {
-            "total_users": total_users,
-            "total_admins": total_admins,
-            "travelers": total_travelers,
-            "agents": total_agents,
-            "packages": total_packages,
-            "bookings": total_bookings,
-            "confirmed_bookings": confirmed_bookings,
-            "cancelled_bookings": cancelled_bookings,
-            "custom_packages": total_custom_packages,
-            "custom_open": custom_open,
-            "custom_claimed": custom_claimed,
-            "custom_completed": custom_completed,
-            "custom_cancelled": custom_cancelled,
-            "chat_rooms": total_chat_rooms,
-            "messages": total_messages,
-            "messages_last_30_days": messages_last_30_days,
-            "estimated_revenue": estimated_revenue,
-            "avg_agent_rating": round(float(avg_agent_rating), 1) if avg_agent_rating else 0.0,
-            "booking_conversion_rate": _safe_pct(confirmed_bookings, total_travelers),
-            "booking_cancellation_rate": _safe_pct(cancelled_bookings, total_bookings),
-            "custom_resolution_rate": _safe_pct(custom_completed, total_custom_packages),
-            "avg_bookings_per_agent": round(confirmed_bookings / total_agents, 1) if total_agents else 0.0,
-        },
-        "momentum": {
-            "travelers_this_month": travelers_this_month,
-            "travelers_change_pct": _pct_change(travelers_this_month, travelers_last_month),
-            "bookings_this_month": bookings_this_month,
-            "bookings_change_pct": booking_growth_delta,
-            "packages_this_month": packages_this_month,
-            "packages_change_pct": _pct_change(packages_this_month, packages_last_month),
-        },
-        "monthly_trends": monthly_trends,
-        "top_agents": top_agents,
-        "top_destinations": top_destinations,
-        "recent_signups": recent_signups,
-        "package_status": package_status,
-        "custom_status": custom_status,
-        "booking_status": booking_status,
-        "booking_donut": booking_donut,
-        "insights": insights,
-        "active_nav": "dashboard",
-    }
-    return render(request, "admin_dashboard.html", context)
+def _admin_packages_with_stats(queryset):
+    return (
+        with_booking_stats(queryset)
+        .select_related("agent", "agent__agent_profile")
+        .prefetch_related("features")
+    )
 
 
 def admin_packages_view(request):
@@ -928,38 +674,13 @@ def admin_packages_view(request):
         "updated": "-updated_at",
         "price_high": "-price_per_person",
         "price_low": "price_per_person",
-        "joined_high": "-joined_travelers_count",
+        # Seat counter kept by seat_inventory (confirmed travelers): a column, not a per-row subquery.
+        "joined_high": "-participants_count",
     }
     if selected_sort not in sort_map:
         selected_sort = "newest"
 
-    base_packages_qs = (
-        Package.objects.select_related("agent", "agent__agent_profile")
-        .prefetch_related("features")
-        .annotate(
-            confirmed_bookings_count=Count(
-                "bookings",
-                filter=Q(bookings__status=BookingStatus.CONFIRMED),
-                distinct=True,
-            ),
-            cancelled_bookings_count=Count(
-                "bookings",
-                filter=Q(bookings__status=BookingStatus.CANCELLED),
-                distinct=True,
-            ),
-            refund_pending_count=Count(
-                "bookings",
-                filter=Q(bookings__payment_status=PaymentStatus.REFUND_PENDING),
-                distinct=True,
-            ),
-            joined_travelers_count=Sum(
-                "bookings__traveler_count",
-                filter=Q(bookings__status=BookingStatus.CONFIRMED),
-            ),
-            last_booking_at=Max("bookings__created_at"),
-        )
-    )
-    packages_qs = base_packages_qs
+    packages_qs = Package.objects.all()
     if search_query:
         packages_qs = packages_qs.filter(
             Q(title__icontains=search_query)
@@ -985,139 +706,69 @@ def admin_packages_view(request):
     if selected_country:
         packages_qs = packages_qs.filter(country__iexact=selected_country)
 
-    packages_qs = packages_qs.order_by(sort_map[selected_sort])
-
-    available_countries = sorted(
-        {
-            (country or "").strip()
-            for country in base_packages_qs.values_list("country", flat=True)
-            if (country or "").strip()
-        },
-        key=lambda item: item.lower(),
+    metrics = package_totals(packages_qs)
+
+    page_qs = _admin_packages_with_stats(packages_qs).order_by(sort_map[selected_sort], "-id")
+    paginator = Paginator(page_qs, ADMIN_PACKAGES_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    packages = [_admin_package_card(package) for package in page_obj]
+    page_query = request.GET.copy()
+    page_query.pop("page", None)
+
+    available_countries = list(
+        Package.objects.annotate(country_name=Trim("country"))
+        .exclude(country_name="")
+        .order_by(Lower("country_name"))
+        .values_list("country_name", flat=True)
+        .distinct()
     )
 
-    packages = []
-    total_joined_travelers = 0
-    total_confirmed_bookings = 0
-    unique_agent_ids = set()
-    status_counts = {
-        PackageStatus.ACTIVE: 0,
-        PackageStatus.COMPLETED: 0,
-        PackageStatus.DRAFT: 0,
-    }
-    for package in packages_qs:
-        try:
-            agent_profile = package.agent.agent_profile
-            agent_name = agent_profile.full_name
-            agent_location = agent_profile.location
-        except AgentProfile.DoesNotExist:
-            agent_name = package.agent.email.split("@")[0]
-            agent_location = ""
-
-        joined_travelers_count = package.joined_travelers_count
-        if joined_travelers_count is None:
-            joined_travelers_count = package.participants_count or 0
-
-        total_joined_travelers += int(joined_travelers_count or 0)
-        total_confirmed_bookings += int(package.confirmed_bookings_count or 0)
-        unique_agent_ids.add(package.agent_id)
-        if package.status in status_counts:
-            status_counts[package.status] += 1
-
-        packages.append({
-            "id": package.id,
-            "title": package.title,
-            "location": package.location,
-            "country": package.country,
-            "description": package.description,
-            "main_image_url": package.main_image.url if package.main_image else "",
-            "feature_names": [f.name for f in package.features.all()[:4]],
-            "price_per_person": package.price_per_person,
-            "duration_days": package.duration_days,
-            "duration_nights": package.duration_nights,
-            "trip_start_date": package.trip_start_date,
-            "trip_end_date": package.trip_end_date,
-            "status": package.get_status_display(),
-            "status_key": package.status,
-            "participants_count": package.participants_count or 0,
-            "joined_travelers_count": joined_travelers_count,
-            "confirmed_bookings_count": package.confirmed_bookings_count or 0,
-            "cancelled_bookings_count": package.cancelled_bookings_count or 0,
-            "refund_pending_count": package.refund_pending_count or 0,
-            "last_booking_at": package.last_booking_at,
-            "agent_name": agent_name,
-            "agent_email": package.agent.email,
-            "agent_location": agent_location,
-            "agent_rating": package.agent_rating,
-            "created_at": package.created_at,
-            "updated_at": package.updated_at,
-        })
-
-    all_packages = []
-    for package in base_packages_qs.order_by("-created_at"):
-        try:
-            agent_profile = package.agent.agent_profile
-            agent_name = agent_profile.full_name
-            agent_location = agent_profile.location
-        except AgentProfile.DoesNotExist:
-            agent_name = package.agent.email.split("@")[0]
-            agent_location = ""
-
-        joined_travelers_count = package.joined_travelers_count
-        if joined_travelers_count is None:
-            joined_travelers_count = package.participants_count or 0
-
-        all_packages.append({
-            "id": package.id,
-            "title": package.title,
-            "location": package.location,
-            "country": package.country,
-            "description": package.description,
-            "main_image_url": package.main_image.url if package.main_image else "",
-            "feature_names": [f.name for f in package.features.all()[:4]],
-            "price_per_person": package.price_per_person,
-            "duration_days": package.duration_days,
-            "duration_nights": package.duration_nights,
-            "trip_start_date": package.trip_start_date,
-            "trip_end_date": package.trip_end_date,
-            "status": package.get_status_display(),
-            "status_key": package.status,
-            "participants_count": package.participants_count or 0,
-            "joined_travelers_count": joined_travelers_count,
-            "confirmed_bookings_count": package.confirmed_bookings_count or 0,
-            "cancelled_bookings_count": package.cancelled_bookings_count or 0,
-            "refund_pending_count": package.refund_pending_count or 0,
-            "last_booking_at": package.last_booking_at,
-            "agent_name": agent_name,
-            "agent_email": package.agent.email,
-            "agent_location": agent_location,
-            "agent_rating": package.agent_rating,
-            "created_at": package.created_at,
-            "updated_at": package.updated_at,
-        })
+    needs_attention_packages = [
+        _admin_package_card(package)
+        for package in _admin_packages_with_stats(
+            Package.objects.filter(
+                pk__in=Booking.objects.filter(
+                    Q(status=BookingStatus.CANCELLED) | Q(payment_status=PaymentStatus.REFUND_PENDING)
+                ).values("package")
+            )
+        ).order_by("-refund_pending_count", "-cancelled_bookings_count", "-confirmed_bookings_count", "-id")[
+            :ADMIN_PACKAGES_SIDEBAR_SIZE
+        ]
+    ]
 
-    recent_packages = sorted(all_packages, key=lambda p: p["created_at"], reverse=True)[:5]
-    needs_attention_packages = sorted(
-        [p for p in all_packages if (p["refund_pending_count"] > 0 or p["cancelled_bookings_count"] > 0)],
-        key=lambda p: (
-            -(p["refund_pending_count"] or 0),
-            -(p["cancelled_bookings_count"] or 0),
-            -(p["confirmed_bookings_count"] or 0),
-        ),
-    )[:5]
+    # Top completed packages: rank from confirmed bookings, topped up with completed packages that have none.
+    top_completed_ids = list(
+        Booking.objects.filter(status=BookingStatus.CONFIRMED, package__status=PackageStatus.COMPLETED)
+        .values("package")
+        .annotate(bookings_count=Count("id"), seats=Sum("traveler_count"))
+        .order_by("-bookings_count", "-seats", "package")
+        .values_list("package", flat=True)[:ADMIN_PACKAGES_SIDEBAR_SIZE]
+    )
+    if len(top_completed_ids) < ADMIN_PACKAGES_SIDEBAR_SIZE:
+        top_completed_ids += list(
+            Package.objects.filter(status=PackageStatus.COMPLETED)
+            .exclude(pk__in=top_completed_ids)
+            .exclude(bookings__status=BookingStatus.CONFIRMED)
+            .order_by("-participants_count", "-id")
+            .values_list("pk", flat=True)[:ADMIN_PACKAGES_SIDEBAR_SIZE - len(top_completed_ids)]
+        )
     completed_packages = sorted(
-        [p for p in all_packages if p["status_key"] == PackageStatus.COMPLETED],
-        key=lambda p: (-(p["confirmed_bookings_count"] or 0), -(p["joined_travelers_count"] or 0)),
-    )[:5]
+        (
+            _admin_package_card(package)
+            for package in _admin_packages_with_stats(Package.objects.filter(pk__in=top_completed_ids))
+        ),
+        key=lambda p: (-p["confirmed_bookings_count"], -p["joined_travelers_count"]),
+    )
     display_name = request.user.email.split("@")[0]
 
     context = {
         'user': request.user,
         'packages': packages,
-        'recent_packages': recent_packages,
+        'page_obj': page_obj,
+        'page_query': page_query.urlencode(),
         'needs_attention_packages': needs_attention_packages,
         'completed_packages': completed_packages,
-        'total_packages': len(packages),
+        'total_packages': paginator.count,
         'search_query': search_query,
         'filters': {
             'status': selected_status,
@@ -1129,12 +780,12 @@ def admin_packages_view(request):
         },
         'display_name': display_name,
         'package_metrics': {
-            'active': status_counts[PackageStatus.ACTIVE],
-            'completed': status_counts[PackageStatus.COMPLETED],
-            'draft': status_counts[PackageStatus.DRAFT],
-            'agents': len(unique_agent_ids),
-            'joined_travelers': total_joined_travelers,
-            'confirmed_bookings': total_confirmed_bookings,
+            'active': metrics['active'],
+            'completed': metrics['completed'],
+            'draft': metrics['draft'],
+            'agents': metrics['agents'],
+            'joined_travelers': metrics['joined_travelers'],
+            'confirmed_bookings': metrics['confirmed_bookings'],
         },
         'active_nav': 'packages',
     }
@@ -1227,6 +878,45 @@ def admin_package_detail_view(request, package_id):
     return render(request, 'admin_package_detail.html', context)
 
 
+def _user_search(profile_relation):
+    """
+    Prefix match on email or profile first / last name. On PostgreSQL each term is served by the
+    UPPER(col) text_pattern_ops expression indexes from migration 0053 (istartswith compiles to
+    UPPER(col::text) LIKE UPPER('term%')).
+    """
+    def search(queryset, term):
+        return queryset.filter(
+            Q(email__istartswith=term)
+            | Q(**{f"{profile_relation}__first_name__istartswith": term})
+            | Q(**{f"{profile_relation}__last_name__istartswith": term})
+        )
+    return search
+
+
+_USER_SORTS = {
+    "newest": SortOption("Newest first", ("-date_joined", "-id")),
+    "oldest": SortOption("Oldest first", ("date_joined", "id")),
+    "email": SortOption("Email A-Z", ("email", "id")),
+}
+_USER_STATUS_FILTER = ChoiceFilter(
+    "status", "Statuses", "is_active", (("active", "Active"), ("banned", "Banned")), cast=lambda v: v == "active"
+)
+ADMIN_TRAVELERS_TABLE = ConsoleTable(
+    sorts=_USER_SORTS,
+    filters=(_USER_STATUS_FILTER,),
+    search=_user_search("user_profile"),
+    search_placeholder="Email or name starts with",
+    prefix="t_",
+)
+ADMIN_AGENTS_TABLE = ConsoleTable(
+    sorts=_USER_SORTS,
+    filters=(_USER_STATUS_FILTER,),
+    search=_user_search("agent_profile"),
+    search_placeholder="Email or name starts with",
+    prefix="a_",
+)
+
+
 def admin_users_view(request):
     """Admin view to list all travelers and agents"""
     if not request.user.is_authenticated or request.user.role != Roles.ADMIN:
@@ -1354,19 +1044,19 @@ def admin_users_view(request):
             messages.error(request, 'Unsupported user action.')
             return redirect('admin_users')
 
-    traveler_users = (
+    traveler_table = ADMIN_TRAVELERS_TABLE.page(
         User.objects.filter(role=Roles.TRAVELER)
         .select_related('user_profile')
         .annotate(
-            bookings_count=Count('bookings', distinct=True),
-            custom_packages_count=Count('custom_packages', distinct=True),
-            reviews_written_count=Count('agent_reviews', distinct=True),
-            traveler_chats_count=Count('chat_rooms_as_traveler', distinct=True),
-        )
-        .order_by('-date_joined')
+            bookings_count=related_count(Booking.objects.all(), 'user'),
+            custom_packages_count=related_count(CustomPackage.objects.all(), 'user'),
+            reviews_written_count=related_count(AgentReview.objects.all(), 'user'),
+            traveler_chats_count=related_count(ChatRoom.objects.all(), 'traveler'),
+        ),
+        request.GET,
     )
     travelers = []
-    for u in traveler_users:
+    for u in traveler_table.rows:
         try:
             profile = u.user_profile
         except UserProfile.DoesNotExist:
@@ -1375,26 +1065,26 @@ def admin_users_view(request):
             'user': u,
             'profile': profile,
             'stats': {
-                'bookings_count': getattr(u, 'bookings_count', 0),
-                'custom_packages_count': getattr(u, 'custom_packages_count', 0),
-                'reviews_written_count': getattr(u, 'reviews_written_count', 0),
-                'chats_count': getattr(u, 'traveler_chats_count', 0),
+                'bookings_count': u.bookings_count,
+                'custom_packages_count': u.custom_packages_count,
+                'reviews_written_count': u.reviews_written_count,
+                'chats_count': u.traveler_chats_count,
             },
         })
 
-    agent_users = (
+    agent_table = ADMIN_AGENTS_TABLE.page(
         User.objects.filter(role=Roles.AGENT)
         .select_related('agent_profile')
         .annotate(
-            packages_count=Count('packages', distinct=True),
-            reviews_received_count=Count('reviews_received', distinct=True),
-            claimed_custom_packages_count=Count('claimed_custom_packages', distinct=True),
-            agent_chats_count=Count('chat_rooms_as_agent', distinct=True),
-        )
-        .order_by('-date_joined')
+            packages_count=related_count(Package.objects.all(), 'agent'),
+            reviews_received_count=related_count(AgentReview.objects.all(), 'agent'),
+            claimed_custom_packages_count=related_count(CustomPackage.objects.all(), 'claimed_by'),
+            agent_chats_count=related_count(ChatRoom.objects.all(), 'agent'),
+        ),
+        request.GET,
     )
     agents = []
-    for u in agent_users:
+    for u in agent_table.rows:
         try:
             profile = u.agent_profile
         except AgentProfile.DoesNotExist:
@@ -1403,10 +1093,10 @@ def admin_users_view(request):
             'user': u,
             'profile': profile,
             'stats': {
-                'packages_count': getattr(u, 'packages_count', 0),
-                'reviews_received_count': getattr(u, 'reviews_received_count', 0),
-                'claimed_custom_packages_count': getattr(u, 'claimed_custom_packages_count', 0),
-                'chats_count': getattr(u, 'agent_chats_count', 0),
+                'packages_count': u.packages_count,
+                'reviews_received_count': u.reviews_received_count,
+                'claimed_custom_packages_count': u.claimed_custom_packages_count,
+                'chats_count': u.agent_chats_count,
             },
         })
 
@@ -1414,6 +1104,8 @@ def admin_users_view(request):
         'user': request.user,
         'travelers': travelers,
         'agents': agents,
+        'traveler_table': traveler_table,
+        'agent_table': agent_table,
         'create_agent_form': create_agent_form,
         'active_nav': 'users',
     }
@@ -1509,11 +1201,9 @@ def admin_bookings_view(request):
             if not reason:
                 messages.error(request, "Cancellation reason is required.")
                 return redirect("admin_bookings")
-            if booking.status == BookingStatus.CANCELLED:
+            if force_cancel_booking(booking) is None:
                 messages.info(request, "Booking is already cancelled.")
                 return redirect("admin_bookings")
-            booking.status = BookingStatus.CANCELLED
-            booking.save(update_fields=["status"])
             BookingAdminActionLog.objects.create(
                 booking=booking,
                 admin=request.user,
@@ -1540,42 +1230,14 @@ def admin_bookings_view(request):
         messages.error(request, "Unsupported admin action.")
         return redirect("admin_bookings")
 
-    queryset = (
+    queryset, filters = apply_booking_filters(
         Booking.objects.select_related("package", "package__agent", "user")
         .prefetch_related("admin_action_logs", "admin_action_logs__admin")
-        .order_by("-created_at")
+        .order_by("-created_at"),
+        request.GET,
+        allow_agent_filter=True,
     )
 
-    status_filter = request.GET.get("status", "").strip()
-    if status_filter and status_filter in dict(BookingStatus.choices):
-        queryset = queryset.filter(status=status_filter)
-
-    payment_status_filter = request.GET.get("payment_status", "").strip()
-    if payment_status_filter and payment_status_filter in dict(PaymentStatus.choices):
-        queryset = queryset.filter(payment_status=payment_status_filter)
-
-    package_id_filter = request.GET.get("package", "").strip()
-    if package_id_filter:
-        try:
-            queryset = queryset.filter(package_id=int(package_id_filter))
-        except ValueError:
-            package_id_filter = ""
-
-    agent_id_filter = request.GET.get("agent", "").strip()
-    if agent_id_filter:
-        try:
-            queryset = queryset.filter(package__agent_id=int(agent_id_filter))
-        except ValueError:
-            agent_id_filter = ""
-
-    booking_code_filter = request.GET.get("booking_code", "").strip()
-    if booking_code_filter:
-        digits_only = "".join(c for c in booking_code_filter if c.isdigit())
-        if len(digits_only) == 5:
-            queryset = queryset.filter(booking_code=digits_only)
-        elif digits_only:
-            queryset = queryset.filter(booking_code__startswith=digits_only)
-
     bookings_with_profiles = []
     for booking in queryset:
         try:
@@ -1614,11 +1276,8 @@ def admin_bookings_view(request):
         "confirmed_count": confirmed_count,
         "cancelled_count": cancelled_count,
         "total_travelers": total_travelers,
-        "status_filter": status_filter,
-        "payment_status_filter": payment_status_filter,
-        "package_id_filter": package_id_filter,
-        "agent_id_filter": agent_id_filter,
-        "booking_code_filter": booking_code_filter,
+        **filters,
+        "export_query": request.GET.urlencode(),
         "booking_status_choices": BookingStatus.choices,
         "payment_status_choices": PaymentStatus.choices,
         "active_nav": "bookings",
@@ -1626,6 +1285,45 @@ def admin_bookings_view(request):
     return render(request, "admin_bookings.html", context)
 
 
+def admin_bookings_export_view(request):
+    """Stream the filtered admin booking list (same filters as the page) as CSV, or XLSX with ?format=xlsx."""
+    if not request.user.is_authenticated or request.user.role != Roles.ADMIN:
+        messages.error(request, "Access denied. Admin access required.")
+        return redirect("login")
+
+    queryset, _ = apply_booking_filters(Booking.objects.all(), request.GET, allow_agent_filter=True)
+    return streaming_booking_export(queryset, request.GET.get("format", "csv"), "bookings")
+
+
+def _review_search(queryset, term):
+    """Prefix match on reviewer / agent email or name (same columns and indexes as _user_search)."""
+    return queryset.filter(
+        Q(user__email__istartswith=term)
+        | Q(agent__email__istartswith=term)
+        | Q(user__user_profile__first_name__istartswith=term)
+        | Q(user__user_profile__last_name__istartswith=term)
+        | Q(agent__agent_profile__first_name__istartswith=term)
+        | Q(agent__agent_profile__last_name__istartswith=term)
+    )
+
+
+ADMIN_REVIEWS_TABLE = ConsoleTable(
+    sorts={
+        "newest": SortOption("Newest first", ("-created_at", "-id")),
+        "oldest": SortOption("Oldest first", ("created_at", "id")),
+        "lowest": SortOption("Lowest rating first", ("rating", "-created_at", "-id")),
+        "highest": SortOption("Highest rating first", ("-rating", "-created_at", "-id")),
+    },
+    filters=(
+        ChoiceFilter("agent", "Agents", "agent_id", cast=int),
+        ChoiceFilter("rating", "Ratings", "rating", tuple((n, f"{n} star") for n in range(1, 6)), cast=int),
+    ),
+    search=_review_search,
+    search_placeholder="Traveler or agent email / name",
+    page_size=20,
+)
+
+
 def admin_reviews_view(request):
     """Admin reviews page: platform-wide review monitoring with moderation controls."""
     if not request.user.is_authenticated or request.user.role != Roles.ADMIN:
@@ -1696,45 +1394,28 @@ def admin_reviews_view(request):
     month_keys = [m.strftime("%Y-%m") for m in month_starts]
     start_window = month_starts[0]
 
-    reviews_qs = AgentReview.objects.select_related("user", "agent", "user__user_profile", "agent__agent_profile")
-
-    selected_agent = (request.GET.get("agent") or "").strip()
-    selected_rating = (request.GET.get("rating") or "").strip()
-    search_query = (request.GET.get("q") or "").strip()
-    if selected_agent:
-        try:
-            reviews_qs = reviews_qs.filter(agent_id=int(selected_agent))
-        except ValueError:
-            selected_agent = ""
-    if selected_rating:
-        try:
-            rating_int = int(selected_rating)
-            if 1 <= rating_int <= 5:
-                reviews_qs = reviews_qs.filter(rating=rating_int)
-            else:
-                selected_rating = ""
-        except ValueError:
-            selected_rating = ""
-    if search_query:
-        reviews_qs = reviews_qs.filter(
-            Q(comment__icontains=search_query)
-            | Q(user__email__icontains=search_query)
-            | Q(agent__email__icontains=search_query)
-            | Q(user__user_profile__first_name__icontains=search_query)
-            | Q(user__user_profile__last_name__icontains=search_query)
-            | Q(agent__agent_profile__first_name__icontains=search_query)
-            | Q(agent__agent_profile__last_name__icontains=search_query)
-        )
+    agent_choices = list(
+        User.objects.filter(role=Roles.AGENT)
+        .select_related("agent_profile")
+        .order_by("email")
+    )
+    reviews_qs, table_state = ADMIN_REVIEWS_TABLE.apply(
+        AgentReview.objects.select_related("user", "agent", "user__user_profile", "agent__agent_profile"),
+        request.GET,
+        choices={"agent": [(a.id, a.email) for a in agent_choices]},
+    )
 
-    total_reviews = reviews_qs.count()
-    avg_rating = float(reviews_qs.aggregate(avg=Avg("rating")).get("avg") or 0)
+    review_rating_rows = list(reviews_qs.values("rating").annotate(count=Count("id")).order_by("-rating"))
+    review_rating_map = {int(row["rating"]): row["count"] for row in review_rating_rows}
+    total_reviews = sum(review_rating_map.values())
+    avg_rating = (
+        sum(rating * count for rating, count in review_rating_map.items()) / total_reviews if total_reviews else 0.0
+    )
     reviews_this_month = reviews_qs.filter(created_at__gte=current_month_start, created_at__lt=next_month_start).count()
     reviews_last_month = reviews_qs.filter(created_at__gte=previous_month_start, created_at__lt=current_month_start).count()
     reviews_change_pct = _pct_change(reviews_this_month, reviews_last_month)
     low_rating_count = reviews_qs.filter(rating__lte=3, created_at__gte=now - timedelta(days=30)).count()
 
-    review_rating_rows = list(reviews_qs.values("rating").annotate(count=Count("id")).order_by("-rating"))
-    review_rating_map = {int(row["rating"]): row["count"] for row in review_rating_rows}
     review_breakdown = [
         {
             "rating": rating,
@@ -1767,7 +1448,8 @@ def admin_reviews_view(request):
         for i in range(len(month_labels))
     ]
 
-    recent_reviews_qs = reviews_qs.order_by("-created_at")[:20]
+    review_table = ADMIN_REVIEWS_TABLE.paginate(reviews_qs, table_state, request.GET, total=total_reviews)
+    recent_reviews_qs = review_table.rows
     review_ids = [r.id for r in recent_reviews_qs]
     logs_map = {}
     for log in AgentReviewAdminActionLog.objects.filter(review_id__in=review_ids).select_related("admin").order_by("-created_at"):
@@ -1802,11 +1484,6 @@ def admin_reviews_view(request):
             }
         )
 
-    agent_choices = list(
-        User.objects.filter(role=Roles.AGENT)
-        .select_related("agent_profile")
-        .order_by("email")
-    )
     top_agents_rows = (
         reviews_qs.values("agent", "agent__email", "agent__agent_profile__first_name", "agent__agent_profile__last_name")
         .annotate(avg_rating=Avg("rating"), reviews_count=Count("id"))
@@ -1843,10 +1520,11 @@ def admin_reviews_view(request):
         "monthly_review_bars": monthly_review_bars,
         "recent_reviews": recent_reviews,
         "top_agents": top_agents,
+        "review_table": review_table,
         "agent_choices": agent_choices,
-        "selected_agent": selected_agent,
-        "selected_rating": selected_rating,
-        "search_query": search_query,
+        "selected_agent": table_state["filters"]["agent"],
+        "selected_rating": table_state["filters"]["rating"],
+        "search_query": table_state["search"],
         "star_slots": [1, 2, 3, 4, 5],
     }
     return render(request, "admin_reviews.html", context)
@@ -2006,10 +1684,16 @@ def agent_deals_view(request):
                     valid_until=valid_until,
                 )
                 try:
-                    create_and_send_deal_notification(deal)
+                    counts = create_and_send_deal_notification(deal)
                 except Exception as e:
                     logger.exception("Failed to send deal notification: %s", e)
-                messages.success(request, 'Deal created and notification sent to all travelers.')
+                    messages.success(request, 'Deal created.')
+                else:
+                    messages.success(
+                        request,
+                        f"Deal created. Notified {counts['notified']} interested traveler(s); "
+                        f"{counts['queued']} more will see it in their deal digest.",
+                    )
                 return redirect('agent_deals')
 
         for e in errors:
@@ -2042,12 +1726,8 @@ def agent_dashboard_view(request):
     now = timezone.now()
     today = timezone.localdate()
     current_month_start = today.replace(day=1)
-    previous_month_start = _shift_month(current_month_start, -1)
-    next_month_start = _shift_month(current_month_start, 1)
     month_starts = [_shift_month(current_month_start, offset) for offset in range(-5, 1)]
     month_labels = [m.strftime("%b") for m in month_starts]
-    month_keys = [m.strftime("%Y-%m") for m in month_starts]
-    start_window = month_starts[0]
 
     agent_profile, _ = AgentProfile.objects.get_or_create(user=request.user)
     display_name = agent_profile.full_name or request.user.email.split("@")[0]
@@ -2079,33 +1759,19 @@ def agent_dashboard_view(request):
     estimated_revenue = confirmed_bookings_qs.aggregate(total=Sum("total_amount")).get("total") or 0
     avg_booking_value = (estimated_revenue / confirmed_bookings) if confirmed_bookings else 0
 
-    bookings_this_month = bookings_qs.filter(
-        created_at__gte=current_month_start,
-        created_at__lt=next_month_start,
-    ).count()
-    bookings_last_month = bookings_qs.filter(
-        created_at__gte=previous_month_start,
-        created_at__lt=current_month_start,
-    ).count()
-    revenue_this_month = confirmed_bookings_qs.filter(
-        created_at__gte=current_month_start,
-        created_at__lt=next_month_start,
-    ).aggregate(total=Sum("total_amount")).get("total") or 0
-    revenue_last_month = confirmed_bookings_qs.filter(
-        created_at__gte=previous_month_start,
-        created_at__lt=current_month_start,
-    ).aggregate(total=Sum("total_amount")).get("total") or 0
+    # Six-month series and this/last-month momentum come from the per-agent daily rollup.
+    ensure_daily_rollups()
+    monthly = monthly_totals(
+        AgentDailyStats.objects.filter(agent=request.user),
+        [(m, _shift_month(m, 1)) for m in month_starts],
+        AGENT_COLUMNS,
+    )
+    bookings_last_month, bookings_this_month = monthly["bookings"][-2:]
+    revenue_last_month, revenue_this_month = monthly["confirmed_revenue"][-2:]
 
-    reviews_count = reviews_qs.count()
+    reviews_count = agent_profile.rating_count
     avg_rating = float(agent_profile.rating or 0)
-    reviews_this_month = reviews_qs.filter(
-        created_at__gte=current_month_start,
-        created_at__lt=next_month_start,
-    ).count()
-    reviews_last_month = reviews_qs.filter(
-        created_at__gte=previous_month_start,
-        created_at__lt=current_month_start,
-    ).count()
+    reviews_last_month, reviews_this_month = monthly["reviews"][-2:]
     reviews_change_pct = _pct_change(reviews_this_month, reviews_last_month)
     low_rating_reviews_30d_qs = reviews_qs.filter(
         rating__lte=3,
@@ -2161,51 +1827,24 @@ def agent_dashboard_view(request):
         },
     ]
 
-    review_rating_rows = list(
-        reviews_qs.values("rating").annotate(count=Count("id")).order_by("-rating")
-    )
-    review_rating_map = {int(row["rating"]): row["count"] for row in review_rating_rows}
     review_breakdown = [
         {
-            "label": f"{rating} star",
-            "rating": rating,
-            "count": review_rating_map.get(rating, 0),
-            "percent": _safe_pct(review_rating_map.get(rating, 0), reviews_count),
+            "label": f"{row['rating']} star",
+            "rating": row["rating"],
+            "count": row["count"],
+            "percent": _safe_pct(row["count"], reviews_count),
         }
-        for rating in range(5, 0, -1)
+        for row in agent_profile.rating_histogram
     ]
 
-    booking_trend_qs = (
-        confirmed_bookings_qs.filter(created_at__date__gte=start_window)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(count=Count("id"), travelers=Sum("traveler_count"))
-        .order_by("month")
-    )
-    revenue_trend_qs = (
-        confirmed_bookings_qs.filter(created_at__date__gte=start_window)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(total=Sum("total_amount"))
-        .order_by("month")
-    )
-    booking_trend_map = {_month_key(row["month"]): row for row in booking_trend_qs}
-    revenue_trend_map = {_month_key(row["month"]): (row.get("total") or 0) for row in revenue_trend_qs}
-
-    monthly_booking_values = [int((booking_trend_map.get(key) or {}).get("count", 0) or 0) for key in month_keys]
-    monthly_traveler_values = [int((booking_trend_map.get(key) or {}).get("travelers", 0) or 0) for key in month_keys]
-    monthly_revenue_values = [float(revenue_trend_map.get(key, 0) or 0) for key in month_keys]
-
-    review_trend_qs = (
-        reviews_qs.filter(created_at__date__gte=start_window)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(count=Count("id"), avg_rating=Avg("rating"))
-        .order_by("month")
-    )
-    review_trend_map = {_month_key(row["month"]): row for row in review_trend_qs}
-    monthly_review_count_values = [int((review_trend_map.get(key) or {}).get("count", 0) or 0) for key in month_keys]
-    monthly_review_avg_values = [float((review_trend_map.get(key) or {}).get("avg_rating", 0) or 0) for key in month_keys]
+    monthly_booking_values = [int(value) for value in monthly["confirmed_bookings"]]
+    monthly_traveler_values = [int(value) for value in monthly["confirmed_travelers"]]
+    monthly_revenue_values = [float(value) for value in monthly["confirmed_revenue"]]
+    monthly_review_count_values = [int(value) for value in monthly["reviews"]]
+    monthly_review_avg_values = [
+        (rating_sum / count) if count else 0.0
+        for rating_sum, count in zip(monthly["rating_sum"], monthly["reviews"])
+    ]
 
     max_bookings_bar = max(monthly_booking_values, default=0)
     max_revenue_bar = max(monthly_revenue_values, default=0)
@@ -2500,7 +2139,7 @@ def agent_reviews_view(request):
     display_name = agent_profile.full_name or request.user.email.split("@")[0]
     reviews_qs = AgentReview.objects.filter(agent=request.user)
 
-    reviews_count = reviews_qs.count()
+    reviews_count = agent_profile.rating_count
     avg_rating = float(agent_profile.rating or 0)
     reviews_this_month = reviews_qs.filter(
         created_at__gte=current_month_start,
@@ -2518,17 +2157,13 @@ def agent_reviews_view(request):
     )
     low_rating_reviews_30d_count = low_rating_reviews_30d_qs.count()
 
-    review_rating_rows = list(
-        reviews_qs.values("rating").annotate(count=Count("id")).order_by("-rating")
-    )
-    review_rating_map = {int(row["rating"]): row["count"] for row in review_rating_rows}
     review_breakdown = [
         {
-            "rating": rating,
-            "count": review_rating_map.get(rating, 0),
-            "percent": _safe_pct(review_rating_map.get(rating, 0), reviews_count),
+            "rating": row["rating"],
+            "count": row["count"],
+            "percent": _safe_pct(row["count"], reviews_count),
         }
-        for rating in range(5, 0, -1)
+        for row in agent_profile.rating_histogram
     ]
 
     review_trend_qs = (
@@ -2710,24 +2345,24 @@ def agent_settings_view(request):
 
 
 def agent_travelers_view(request):
-    """View to list all travelers for the agent"""
+    """View to list the travelers this agent works with (bookings, chats, claimed custom requests)"""
     if not request.user.is_authenticated or request.user.role != Roles.AGENT:
         messages.error(request, 'Access denied. Agent access required.')
         return redirect('login')
 
-    traveler_users = (
-        User.objects.filter(role=Roles.TRAVELER)
-        .select_related("user_profile")
-        .annotate(
-            bookings_count=Count("bookings", distinct=True),
-            custom_packages_count=Count("custom_packages", distinct=True),
-            reviews_written_count=Count("agent_reviews", distinct=True),
-            traveler_chats_count=Count("chat_rooms_as_traveler", distinct=True),
-        )
-        .order_by("-date_joined")
+    search_query = request.GET.get("q", "").strip()
+    traveler_users = search_travelers(related_travelers(request.user), search_query)
+    traveler_users = with_agent_stats(traveler_users.select_related("user_profile"), request.user)
+    page_users, next_cursor, prev_cursor = travelers_page(
+        traveler_users,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
     )
+    page_query = request.GET.copy()
+    page_query.pop("after", None)
+    page_query.pop("before", None)
     travelers = []
-    for u in traveler_users:
+    for u in page_users:
         try:
             profile = u.user_profile
         except UserProfile.DoesNotExist:
@@ -2738,10 +2373,10 @@ def agent_travelers_view(request):
                 "user": u,
                 "profile": profile,
                 "stats": {
-                    "bookings_count": getattr(u, "bookings_count", 0) or 0,
-                    "custom_packages_count": getattr(u, "custom_packages_count", 0) or 0,
-                    "reviews_written_count": getattr(u, "reviews_written_count", 0) or 0,
-                    "chats_count": getattr(u, "traveler_chats_count", 0) or 0,
+                    "bookings_count": u.bookings_count,
+                    "custom_packages_count": u.custom_packages_count,
+                    "reviews_written_count": u.reviews_written_count,
+                    "chats_count": u.traveler_chats_count,
                 },
             }
         )
@@ -2756,6 +2391,10 @@ def agent_travelers_view(request):
         'user': request.user,
         'display_name': display_name,
         'travelers': travelers,
+        'search_query': search_query,
+        'page_query': page_query.urlencode(),
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
         'active_nav': 'travelers',
     }
     return render(request, 'agent_travelers.html', context)
@@ -2772,6 +2411,32 @@ def _notify_traveler_manual_refund(traveler, sender, title, message):
     send_expo_push_for_notification(notification, [traveler.id])
 
 
+def _refund_search(queryset, term):
+    """Booking code (exact when complete, prefix otherwise) or traveler email / name / package prefix."""
+    digits_only = "".join(c for c in term if c.isdigit())
+    if digits_only and digits_only == term.replace(" ", "").replace("-", ""):
+        if is_complete_code(digits_only):
+            return queryset.filter(booking__booking_code=digits_only)
+        return queryset.filter(booking__booking_code__startswith=digits_only)
+    return queryset.filter(
+        Q(traveler_email__istartswith=term)
+        | Q(traveler_name__istartswith=term)
+        | Q(package_title__istartswith=term)
+    )
+
+
+REFUNDS_TABLE = ConsoleTable(
+    sorts={
+        "newest": SortOption("Newest first", ("-created_at", "-id")),
+        "oldest": SortOption("Oldest first", ("created_at", "id")),
+        "amount": SortOption("Largest amount first", ("-total_amount", "-id")),
+    },
+    filters=(ChoiceFilter("status", "Statuses", "status", tuple(RefundRequestStatus.choices)),),
+    search=_refund_search,
+    search_placeholder="Booking code, traveler or package",
+)
+
+
 def admin_refunds_view(request):
     """Admin dashboard: list manual refund requests; Complete / Cancel with traveler notifications."""
     if not request.user.is_authenticated or request.user.role != Roles.ADMIN:
@@ -2818,7 +2483,7 @@ def admin_refunds_view(request):
                 messages.success(request, "Refund request cancelled. Traveler notified.")
         return redirect("admin_refunds")
 
-    refund_requests = (
+    refund_table = REFUNDS_TABLE.page(
         RefundRequest.objects.select_related(
             "traveler",
             "package",
@@ -2826,10 +2491,12 @@ def admin_refunds_view(request):
             "booking",
             "booking__esewa_payment_session",
             "resolved_by",
-        ).order_by("-created_at")[:500]
+        ),
+        request.GET,
     )
     context = {
-        "refund_requests": refund_requests,
+        "refund_requests": refund_table.rows,
+        "refund_table": refund_table,
         "active_nav": "refunds",
     }
     return render(request, "admin_refunds.html", context)
@@ -2883,20 +2550,20 @@ def agent_refunds_view(request):
                 messages.success(request, "Refund request cancelled. Traveler notified.")
         return redirect("agent_refunds")
 
-    refund_requests = (
-        RefundRequest.objects.filter(package__agent=agent)
-        .select_related(
+    refund_table = REFUNDS_TABLE.page(
+        RefundRequest.objects.filter(package__agent=agent).select_related(
             "traveler",
             "package",
             "package__agent",
             "booking",
             "booking__esewa_payment_session",
             "resolved_by",
-        )
-        .order_by("-created_at")[:500]
+        ),
+        request.GET,
     )
     context = {
-        "refund_requests": refund_requests,
+        "refund_requests": refund_table.rows,
+        "refund_table": refund_table,
         "active_nav": "refunds",
     }
     return render(request, "agent_refunds.html", context)
@@ -2908,32 +2575,14 @@ def agent_bookings_view(request):
         messages.error(request, 'Access denied. Agent access required.')
         return redirect('login')
 
-    queryset = (
+    # Filters (shared with the export so downloads match the list)
+    queryset, filters = apply_booking_filters(
         Booking.objects.filter(package__agent=request.user)
         .select_related('package', 'user')
-        .order_by('-created_at')
+        .order_by('-created_at'),
+        request.GET,
     )
 
-    # Filters
-    status_filter = request.GET.get('status', '').strip()
-    if status_filter and status_filter in dict(BookingStatus.choices):
-        queryset = queryset.filter(status=status_filter)
-    package_id_filter = request.GET.get('package', '').strip()
-    if package_id_filter:
-        try:
-            pid = int(package_id_filter)
-            queryset = queryset.filter(package_id=pid)
-        except ValueError:
-            pass
-
-    booking_code_filter = request.GET.get('booking_code', '').strip()
-    if booking_code_filter:
-        digits_only = ''.join(c for c in booking_code_filter if c.isdigit())
-        if len(digits_only) == 5:
-            queryset = queryset.filter(booking_code=digits_only)
-        elif digits_only:
-            queryset = queryset.filter(booking_code__startswith=digits_only)
-
     # Build list with profile for each booking's user
     bookings_with_profile = []
     for booking in queryset:
@@ -2969,15 +2618,25 @@ def agent_bookings_view(request):
         'total_count': total_count,
         'confirmed_count': confirmed_count,
         'cancelled_count': cancelled_count,
-        'status_filter': status_filter,
-        'package_id_filter': package_id_filter,
-        'booking_code_filter': booking_code_filter,
+        **filters,
+        'export_query': request.GET.urlencode(),
         'booking_status_choices': BookingStatus.choices,
+        'payment_status_choices': PaymentStatus.choices,
         'active_nav': 'bookings',
     }
     return render(request, 'agent_bookings.html', context)
 
 
+def agent_bookings_export_view(request):
+    """Stream the agent's filtered bookings (same filters as the page) as CSV, or XLSX with ?format=xlsx."""
+    if not request.user.is_authenticated or request.user.role != Roles.AGENT:
+        messages.error(request, 'Access denied. Agent access required.')
+        return redirect('login')
+
+    queryset, _ = apply_booking_filters(Booking.objects.filter(package__agent=request.user), request.GET)
+    return streaming_booking_export(queryset, request.GET.get('format', 'csv'), 'my-bookings')
+
+
 def agent_booking_detail_view(request, booking_id):
     """Single booking detail for the signed-in agent (only bookings on their packages)."""
     if not request.user.is_authenticated or request.user.role != Roles.AGENT:
@@ -3265,32 +2924,6 @@ def agent_reset_password_view(request):
 
 
 # Profile Management Views
-def ensure_rewards_awarded_for_user(user):
-    """For travelers: award points (10% of booking total) for confirmed bookings on completed packages that haven't been rewarded yet."""
-    if user.role != Roles.TRAVELER:
-        return
-    # Mark overdue packages as completed first (so we don't miss rewards for packages that haven't been loaded recently)
-    _mark_overdue_packages_completed()
-    # Use reward_points_given as source of truth - prevents double-award even if admin unchecks rewards_awarded
-    unrewarded = Booking.objects.filter(
-        user=user,
-        status=BookingStatus.CONFIRMED,
-        reward_points_given=0,
-        package__status=PackageStatus.COMPLETED,
-    ).select_related("user__user_profile")
-    for booking in unrewarded:
-        amount = float(booking.total_amount or 0)
-        if amount <= 0:
-            amount = float(booking.price_per_person_snapshot or 0) * (booking.traveler_count or 1)
-        points = int(amount * 0.10)  # 10% of booking total
-        profile = booking.user.user_profile
-        profile.reward_points = (profile.reward_points or 0) + points
-        profile.save(update_fields=["reward_points", "updated_at"])
-        booking.rewards_awarded = True
-        booking.reward_points_given = points
-        booking.save(update_fields=["rewards_awarded", "reward_points_given"])
-
-
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """View for retrieving and updating user (traveler) profile"""
     serializer_class = UserProfileSerializer
@@ -3301,10 +2934,6 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         profile, created = UserProfile.objects.get_or_create(user=self.request.user)
         return profile
 
-    def retrieve(self, request, *args, **kwargs):
-        ensure_rewards_awarded_for_user(request.user)
-        return super().retrieve(request, *args, **kwargs)
-
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
@@ -3327,22 +2956,45 @@ class AgentProfileView(generics.RetrieveUpdateAPIView):
         return context
 
 
+class LeaderboardPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
 class LeaderboardView(generics.ListAPIView):
-    """List travelers ordered by reward points descending (highest first)."""
+    """Travelers ranked by reward points (highest first), paginated. Served from the materialized leaderboard."""
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = UserProfileSerializer
+    serializer_class = LeaderboardEntrySerializer
+    pagination_class = LeaderboardPagination
 
     def get_queryset(self):
-        return (
-            UserProfile.objects.filter(user__role=Roles.TRAVELER)
-            .select_related("user")
-            .order_by("-reward_points", "id")
-        )
+        ensure_leaderboard()
+        return LeaderboardEntry.objects.order_by("position")
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["request"] = self.request
-        return context
+
+class LeaderboardMeView(generics.GenericAPIView):
+    """GET: the caller's leaderboard rank plus ?neighbours=N entries above and below (default 2, max 10)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        ensure_leaderboard()
+        try:
+            neighbours = int(request.query_params.get("neighbours", DEFAULT_NEIGHBOURS))
+        except (TypeError, ValueError):
+            neighbours = DEFAULT_NEIGHBOURS
+        entry, nearby, total = leaderboard_position(request.user, neighbours)
+        context = {"request": request}
+        return response.Response(
+            {
+                "rank": entry.rank if entry else None,
+                "position": entry.position if entry else None,
+                "reward_points": entry.reward_points if entry else None,
+                "total": total,
+                "refreshed_at": entry.refreshed_at if entry else None,
+                "neighbours": LeaderboardEntrySerializer(nearby, many=True, context=context).data,
+            }
+        )
 
 
 class ProfileView(generics.RetrieveUpdateAPIView):
@@ -3350,11 +3002,6 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
-    def retrieve(self, request, *args, **kwargs):
-        if request.user.role == Roles.TRAVELER:
-            ensure_rewards_awarded_for_user(request.user)
-        return super().retrieve(request, *args, **kwargs)
-
     def get_serializer_class(self):
         if self.request.user.role == Roles.AGENT:
             return AgentProfileSerializer
@@ -3647,6 +3294,7 @@ def agent_add_package_view(request):
                 trip_start_date=trip_start,
                 trip_end_date=trip_end,
                 trip_start_time=_parse_trip_start_time_optional(request.POST.get("trip_start_time")),
+                capacity=_parse_capacity_optional(request.POST.get("capacity")),
                 status=request.POST.get('status', PackageStatus.ACTIVE)
             )
             
@@ -3735,6 +3383,7 @@ def agent_edit_package_view(request, package_id):
             else:
                 package.trip_end_date = None
             package.trip_start_time = _parse_trip_start_time_optional(request.POST.get("trip_start_time"))
+            package.capacity = _parse_capacity_optional(request.POST.get("capacity"))
             # Handle image upload
             if 'main_image' in request.FILES:
                 package.main_image = request.FILES['main_image']
@@ -4017,9 +3666,16 @@ class TravelerBookmarkDeleteView(generics.GenericAPIView):
         )
 
 
+class AgentReviewPagination(PageNumberPagination):
+    page_size = REVIEWS_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+
 class AgentReviewListCreateView(generics.ListCreateAPIView):
-    """API view to list agent reviews and create a new review (travelers only, after completing a trip)"""
+    """API view to list agent reviews (paginated) and create a new review (travelers only, after completing a trip)"""
     serializer_class = AgentReviewSerializer
+    pagination_class = AgentReviewPagination
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -4027,8 +3683,7 @@ class AgentReviewListCreateView(generics.ListCreateAPIView):
         return [permissions.AllowAny()]
 
     def get_queryset(self):
-        agent_id = self.kwargs.get('agent_id')
-        return AgentReview.objects.filter(agent_id=agent_id).order_by('-created_at')
+        return agent_reviews(self.kwargs.get('agent_id'))
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -4048,20 +3703,31 @@ class AgentReviewListCreateView(generics.ListCreateAPIView):
 
 
 class PublicAgentDetailView(generics.RetrieveAPIView):
-    """Public traveler-facing agent profile details (profile, stats, recent reviews)."""
+    """Public traveler-facing agent profile details (profile, stats, first page of reviews). Cached per agent."""
     serializer_class = PublicAgentDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_url_kwarg = 'agent_id'
 
     def get_queryset(self):
-        return AgentProfile.objects.select_related('user').filter(user__role=Roles.AGENT)
+        return public_agent_profiles().filter(user__role=Roles.AGENT)
 
     def get_object(self):
         agent_id = self.kwargs.get(self.lookup_url_kwarg)
-        agent_user = get_object_or_404(User.objects.filter(role=Roles.AGENT), id=agent_id)
-        profile, _ = AgentProfile.objects.get_or_create(user=agent_user)
+        profile = self.get_queryset().filter(user_id=agent_id).first()
+        if profile is None:
+            agent_user = get_object_or_404(User.objects.filter(role=Roles.AGENT), id=agent_id)
+            AgentProfile.objects.get_or_create(user=agent_user)
+            profile = self.get_queryset().get(user=agent_user)
         return profile
 
+    def retrieve(self, request, *args, **kwargs):
+        agent_id = self.kwargs.get(self.lookup_url_kwarg)
+        data = get_cached_public_profile(agent_id)
+        if data is None:
+            data = dict(self.get_serializer(self.get_object()).data)
+            set_cached_public_profile(agent_id, data)
+        return response.Response(data)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
@@ -4086,6 +3752,10 @@ class BookingListCreateView(generics.ListCreateAPIView):
         context['request'] = self.request
         return context
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
 
 class BookingDetailView(generics.RetrieveUpdateAPIView):
     """
@@ -4102,6 +3772,7 @@ class BookingDetailView(generics.RetrieveUpdateAPIView):
 class EsewaPaymentInitiateView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated, IsTraveler]
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         package_id = request.data.get("package_id")
         traveler_count_raw = request.data.get("traveler_count", 1)
@@ -4199,15 +3870,22 @@ class EsewaPaymentInitiateView(generics.GenericAPIView):
                     .select_related("user")
                     .get(pk=profile.pk)
                 )
+                # Re-check under the profile lock: a concurrent retry may have booked already.
+                if Booking.objects.filter(user=request.user, package=package, status=BookingStatus.CONFIRMED).exists():
+                    return response.Response(
+                        {"detail": "You have already booked this package."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
                 current_points = int(profile.reward_points or 0)
                 if current_points < reward_points_to_use:
                     return response.Response(
                         {"detail": "Not enough reward points."},
                         status=status.HTTP_400_BAD_REQUEST,
                     )
-
-                profile.reward_points = current_points - reward_points_to_use
-                profile.save(update_fields=["reward_points", "updated_at"])
+                try:
+                    reserve_seats(package.pk, traveler_count)
+                except SeatsUnavailable as exc:
+                    return response.Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
 
                 booking = Booking.objects.create(
                     user=request.user,
@@ -4223,9 +3901,9 @@ class EsewaPaymentInitiateView(generics.GenericAPIView):
                     transaction_uuid="",
                     reward_points_used=reward_points_to_use,
                 )
-
-                package.participants_count = (package.participants_count or 0) + booking.traveler_count
-                package.save(update_fields=["participants_count"])
+                adjust_reward_points(
+                    request.user.pk, -reward_points_to_use, RewardPointsEntry.Kind.REDEEMED, booking=booking
+                )
                 mark_custom_package_completed_if_booked(package)
 
             serialized = BookingSerializer(booking, context={"request": request})
@@ -4233,25 +3911,34 @@ class EsewaPaymentInitiateView(generics.GenericAPIView):
                 {
                     "zero_payment": True,
                     "reward_points_used": reward_points_to_use,
-                    "remaining_reward_points": profile.reward_points,
+                    "remaining_reward_points": current_points - reward_points_to_use,
                     "booking": serialized.data,
                 },
                 status=status.HTTP_201_CREATED,
             )
 
-        payment_session = EsewaPaymentSession.objects.create(
-            user=request.user,
-            package=package,
-            transaction_uuid=str(uuid.uuid4()),
-            traveler_count=traveler_count,
-            agent_type=agent_type,
-            price_per_person_snapshot=price_per_person,
-            total_amount=total_amount,
-            payable_amount=payable_amount,
-            reward_points_used=reward_points_to_use,
-            product_code=_esewa_product_code(),
-            status=EsewaPaymentSessionStatus.INITIATED,
-        )
+        try:
+            with transaction.atomic():
+                payment_session = EsewaPaymentSession.objects.create(
+                    user=request.user,
+                    package=package,
+                    transaction_uuid=str(uuid.uuid4()),
+                    traveler_count=traveler_count,
+                    agent_type=agent_type,
+                    price_per_person_snapshot=price_per_person,
+                    total_amount=total_amount,
+                    payable_amount=payable_amount,
+                    reward_points_used=reward_points_to_use,
+                    product_code=_esewa_product_code(),
+                    status=EsewaPaymentSessionStatus.INITIATED,
+                )
+                # Seats stay reserved while the traveler pays; released automatically if abandoned.
+                seat_hold = hold_seats(payment_session, traveler_count)
+        except SeatsUnavailable as exc:
+            return response.Response(
+                {"detail": str(exc), "seats_left": exc.seats_left},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         checkout_url = request.build_absolute_uri(
             reverse("esewa_payment_checkout", kwargs={"transaction_uuid": payment_session.transaction_uuid})
@@ -4270,6 +3957,7 @@ class EsewaPaymentInitiateView(generics.GenericAPIView):
                 "payable_amount": _money_str(payable_amount),
                 "reward_points_used": reward_points_to_use,
                 "available_reward_points": available_points,
+                "seats_held_until": seat_hold.expires_at,
                 "checkout_url": checkout_url,
                 "esewa_form_url": _esewa_form_url(),
                 "esewa_fields": esewa_fields,
@@ -4377,6 +4065,9 @@ class EsewaPaymentFailureCallbackView(generics.GenericAPIView):
                 status=EsewaPaymentSessionStatus.FAILED_REDIRECTED,
                 esewa_status="FAILED",
             )
+            payment_session = EsewaPaymentSession.objects.filter(transaction_uuid=txn, booking__isnull=True).first()
+            if payment_session is not None:
+                release_hold(payment_session)
         return HttpResponse(
             _booking_payment_summary_html("Payment Failed", "eSewa reported a failed or cancelled payment.", "#b91c1c"),
         )
@@ -4387,6 +4078,7 @@ class EsewaPaymentFailureCallbackView(generics.GenericAPIView):
 class EsewaPaymentVerifyView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated, IsTraveler]
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         transaction_uuid = (request.data.get("transaction_uuid") or "").strip()
         if not transaction_uuid:
@@ -4424,15 +4116,8 @@ class EsewaPaymentVerifyView(generics.GenericAPIView):
             return response.Response({"detail": str(exc)}, status=status.HTTP_502_BAD_GATEWAY)
 
         esewa_status_value = str(verification_payload.get("status") or "").upper()
-        ref_id = str(verification_payload.get("ref_id") or verification_payload.get("transaction_code") or "").strip()
-
-        payment_session.verification_payload = verification_payload if isinstance(verification_payload, dict) else {}
-        payment_session.esewa_status = esewa_status_value
-        payment_session.payment_reference = ref_id
-
         if esewa_status_value != "COMPLETE":
-            payment_session.status = EsewaPaymentSessionStatus.VERIFY_FAILED
-            payment_session.save(update_fields=["verification_payload", "esewa_status", "payment_reference", "status", "updated_at"])
+            esewa_status_value = mark_esewa_session_unverified(payment_session, verification_payload)
             return response.Response(
                 {
                     "verified": False,
@@ -4443,84 +4128,22 @@ class EsewaPaymentVerifyView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        with transaction.atomic():
-            payment_session = EsewaPaymentSession.objects.select_for_update().select_related("package").get(
-                pk=payment_session.pk
-            )
-            if payment_session.booking_id:
-                booking = payment_session.booking
-            else:
-                if Booking.objects.filter(
-                    user=request.user,
-                    package=payment_session.package,
-                    status=BookingStatus.CONFIRMED,
-                ).exists():
-                    return response.Response(
-                        {"detail": "You have already booked this package."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                booking = Booking.objects.create(
-                    user=request.user,
-                    package=payment_session.package,
-                    status=BookingStatus.CONFIRMED,
-                    traveler_count=max(int(payment_session.traveler_count or 1), 1),
-                    agent_type=payment_session.agent_type or BookingAgentType.REGULAR,
-                    price_per_person_snapshot=payment_session.price_per_person_snapshot,
-                    total_amount=payment_session.total_amount,
-                    payment_method=PaymentMethod.ESEWA,
-                    payment_status=PaymentStatus.PAID,
-                    payment_reference=ref_id,
-                    transaction_uuid=payment_session.transaction_uuid,
-                )
-
-                package = payment_session.package
-                package.participants_count = (package.participants_count or 0) + booking.traveler_count
-                package.save(update_fields=["participants_count"])
-                mark_custom_package_completed_if_booked(package)
-
-                payment_session.booking = booking
-
-            # Deduct any reward points used for this payment session (only once, on successful verification)
-            reward_points_used = int(payment_session.reward_points_used or 0)
-            remaining_reward_points = None
-            if reward_points_used > 0:
-                profile = getattr(request.user, "user_profile", None)
-                if profile is not None:
-                    current_points = int(getattr(profile, "reward_points", 0) or 0)
-                    new_balance = max(0, current_points - reward_points_used)
-                    if new_balance != current_points:
-                        profile.reward_points = new_balance
-                        profile.save(update_fields=["reward_points", "updated_at"])
-                    remaining_reward_points = new_balance
-
-                if getattr(booking, "reward_points_used", 0) != reward_points_used:
-                    booking.reward_points_used = reward_points_used
-                    booking.save(update_fields=["reward_points_used"])
-
-            payment_session.verification_payload = verification_payload if isinstance(verification_payload, dict) else {}
-            payment_session.esewa_status = esewa_status_value
-            payment_session.payment_reference = ref_id
-            payment_session.status = EsewaPaymentSessionStatus.VERIFIED
-            payment_session.save(
-                update_fields=[
-                    "booking",
-                    "verification_payload",
-                    "esewa_status",
-                    "payment_reference",
-                    "status",
-                    "updated_at",
-                ]
+        try:
+            payment_session, booking, remaining_reward_points, created = confirm_esewa_session(
+                payment_session.pk, verification_payload
             )
+        except EsewaAlreadyBooked as exc:
+            mark_esewa_session_needs_refund(payment_session, verification_payload)
+            return response.Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         serialized = BookingSerializer(booking, context={"request": request})
         return response.Response(
             {
                 "verified": True,
-                "already_verified": False,
-                "esewa_status": esewa_status_value,
+                "already_verified": not created,
+                "esewa_status": payment_session.esewa_status or esewa_status_value,
                 "transaction_uuid": payment_session.transaction_uuid,
-                "payment_reference": ref_id,
+                "payment_reference": payment_session.payment_reference,
                 "reward_points_used": int(payment_session.reward_points_used or 0),
                 "remaining_reward_points": remaining_reward_points,
                 "booking": serialized.data,
@@ -4673,6 +4296,7 @@ class CustomPackagePublishView(generics.GenericAPIView):
 
     permission_classes = [permissions.IsAuthenticated, IsAgent]
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         pk = kwargs.get("pk")
         try:
@@ -5027,17 +4651,21 @@ class ChatItineraryDetailView(generics.RetrieveUpdateDestroyAPIView):
         if self.request.user != item.room.agent or self.request.user.role != Roles.AGENT:
             raise permissions.PermissionDenied("Only the agent can update itinerary items for this room.")
         serializer.save()
+        if item.trip_id:
+            invalidate_itinerary_pdf(item.trip_id)
 
     def perform_destroy(self, instance):
         if self.request.user != instance.room.agent or self.request.user.role != Roles.AGENT:
             raise permissions.PermissionDenied("Only the agent can delete itinerary items for this room.")
         instance.delete()
+        if instance.trip_id:
+            invalidate_itinerary_pdf(instance.trip_id)
 
 
 def _normalize_booking_code(raw):
     if raw is None:
         return ""
-    return "".join(c for c in str(raw) if c.isdigit())[:5]
+    return "".join(c for c in str(raw) if c.isdigit())[:MAX_CODE_LENGTH]
 
 
 def _booking_payment_amounts_for_profile(booking):
@@ -5055,7 +4683,7 @@ def _booking_payment_amounts_for_profile(booking):
 
 
 class ChatRoomBookingLookupView(generics.GenericAPIView):
-    """GET: Resolve a 5-digit booking code for the room's traveler (agent-only). Prefills itinerary details."""
+    """GET: Resolve a booking code for the room's traveler (agent-only). Prefills itinerary details."""
 
     permission_classes = [permissions.IsAuthenticated]
 
@@ -5064,8 +4692,8 @@ class ChatRoomBookingLookupView(generics.GenericAPIView):
         if request.user != room.agent or request.user.role != Roles.AGENT:
             raise permissions.PermissionDenied("Only the agent can look up bookings for this room.")
         code = _normalize_booking_code(request.query_params.get("code"))
-        if len(code) != 5:
-            return response.Response({"detail": "Enter a 5-digit booking ID."}, status=status.HTTP_400_BAD_REQUEST)
+        if not is_complete_code(code):
+            return response.Response({"detail": "Enter a valid booking ID."}, status=status.HTTP_400_BAD_REQUEST)
         booking = (
             Booking.objects.filter(booking_code=code, user=room.traveler)
             .select_related("package", "user", "user__user_profile")
@@ -5139,8 +4767,8 @@ class ChatItineraryTripCreateView(generics.GenericAPIView):
                 return response.Response({"booking_id": "Invalid booking for this traveler."}, status=status.HTTP_400_BAD_REQUEST)
         elif booking_code_raw:
             code = _normalize_booking_code(booking_code_raw)
-            if len(code) != 5:
-                return response.Response({"booking_code": "Enter a 5-digit booking ID."}, status=status.HTTP_400_BAD_REQUEST)
+            if not is_complete_code(code):
+                return response.Response({"booking_code": "Enter a valid booking ID."}, status=status.HTTP_400_BAD_REQUEST)
             booking = Booking.objects.filter(booking_code=code, user=room.traveler).first()
             if not booking:
                 return response.Response(
@@ -5227,13 +4855,37 @@ class _ChatTripAccessMixin:
         trip_id = self.kwargs.get("trip_id")
         room = get_object_or_404(ChatRoom, pk=room_id)
         if self.request.user not in (room.traveler, room.agent):
-            raise permissions.PermissionDenied("Access denied.")
+            raise PermissionDenied("Access denied.")
         trip = get_object_or_404(ItineraryTrip, pk=trip_id, room=room)
         return room, trip
 
     def _agent_guard(self, room):
         if self.request.user != room.agent or self.request.user.role != Roles.AGENT:
-            raise permissions.PermissionDenied("Only the agent can modify itinerary trip details.")
+            raise PermissionDenied("Only the agent can modify itinerary trip details.")
+
+
+class ChatItineraryTripGraphView(_ChatTripAccessMixin, generics.GenericAPIView):
+    """
+    GET the whole trip (profile and every child collection) in one response; PUT/PATCH write it
+    back in one transaction. See itinerary_trip_graph for the body shape and PUT vs PATCH semantics.
+    """
+
+    def get(self, request, room_id, trip_id):
+        _, trip = self._get_room_trip()
+        graph = load_trip_graph(trip.pk)
+        return response.Response(serialize_trip_graph(graph, self.get_serializer_context()))
+
+    def put(self, request, room_id, trip_id):
+        return self._write(replace=True)
+
+    def patch(self, request, room_id, trip_id):
+        return self._write(replace=False)
+
+    def _write(self, replace):
+        room, trip = self._get_room_trip()
+        self._agent_guard(room)
+        graph = apply_trip_graph(trip, self.request.data, user=self.request.user, room=room, replace=replace)
+        return response.Response(serialize_trip_graph(graph, self.get_serializer_context()))
 
 
 class ChatItineraryTripProfileView(_ChatTripAccessMixin, generics.GenericAPIView):
@@ -5251,6 +4903,7 @@ class ChatItineraryTripProfileView(_ChatTripAccessMixin, generics.GenericAPIView
         serializer = self.get_serializer(profile, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        invalidate_itinerary_pdf(trip.pk)
         return response.Response(serializer.data)
 
 
@@ -5272,6 +4925,7 @@ class _TripChildListCreateView(_ChatTripAccessMixin, generics.ListCreateAPIView)
         room, trip = self._get_room_trip()
         self._agent_guard(room)
         serializer.save(trip=trip)
+        invalidate_itinerary_pdf(trip.pk)
 
 
 class _TripChildDetailView(_ChatTripAccessMixin, generics.RetrieveUpdateDestroyAPIView):
@@ -5290,14 +4944,16 @@ class _TripChildDetailView(_ChatTripAccessMixin, generics.RetrieveUpdateDestroyA
         return ctx
 
     def perform_update(self, serializer):
-        room, _ = self._get_room_trip()
+        room, trip = self._get_room_trip()
         self._agent_guard(room)
         serializer.save()
+        invalidate_itinerary_pdf(trip.pk)
 
     def perform_destroy(self, instance):
-        room, _ = self._get_room_trip()
+        room, trip = self._get_room_trip()
         self._agent_guard(room)
         instance.delete()
+        invalidate_itinerary_pdf(trip.pk)
 
 
 class ChatItineraryTripTransportListCreateView(_TripChildListCreateView):
@@ -5351,7 +5007,10 @@ class ChatItineraryTripDocumentDetailView(_TripChildDetailView):
 
 
 class ChatItineraryTripPdfView(generics.GenericAPIView):
-    """GET: Stream itinerary PDF for preview (Check itinerary). Room participants only. Supports ?access=JWT for mobile."""
+    """
+    GET: Stream itinerary PDF for preview (Check itinerary). Room participants only. Supports ?access=JWT for mobile.
+    A PDF not rendered yet is queued as a job and answered with 202 (a page that refreshes until it is ready).
+    """
 
     permission_classes = [permissions.AllowAny]  # Auth checked manually to support token-in-query
 
@@ -5371,53 +5030,150 @@ class ChatItineraryTripPdfView(generics.GenericAPIView):
             return response.Response({"detail": "Authentication required."}, status=status.HTTP_401_UNAUTHORIZED)
         room = get_object_or_404(ChatRoom, pk=room_id)
         if user not in (room.traveler, room.agent):
-            raise permissions.PermissionDenied("Access denied.")
+            raise PermissionDenied("Access denied.")
         trip = get_object_or_404(ItineraryTrip, pk=trip_id, room=room)
-        from .itinerary_pdf import build_itinerary_pdf
+        if render_mode() != "inline" and not is_itinerary_pdf_cached(trip):
+            # Not rendered yet: queue it instead of running reportlab on this request.
+            return self._rendering_response(request, submit_pdf_job(trip, user))
+        name = itinerary_pdf_name(trip)
+        # The stored name is the content hash, which makes a strong ETag for revalidation.
+        return serve_storage_file(
+            request,
+            name,
+            content_type="application/pdf",
+            filename="itinerary.pdf",
+            etag=f'"{os.path.splitext(os.path.basename(name))[0]}"',
+            cache_control="private, no-cache",
+        )
 
-        buf = build_itinerary_pdf(trip)
-        resp = HttpResponse(buf.getvalue(), content_type="application/pdf")
-        resp["Content-Disposition"] = 'inline; filename="itinerary.pdf"'
-        return resp
+    def _rendering_response(self, request, job):
+        """202 while the PDF renders: a self-refreshing page for browsers (the app opens this URL directly), the job JSON otherwise."""
+        if "text/html" not in request.META.get("HTTP_ACCEPT", ""):
+            return response.Response(job_payload(job, request.build_absolute_uri), status=status.HTTP_202_ACCEPTED)
+        html = """
+        <!doctype html>
+        <html>
+          <head>
+            <meta charset="utf-8" />
+            <meta name="viewport" content="width=device-width, initial-scale=1" />
+            <meta http-equiv="refresh" content="2" />
+            <title>Preparing itinerary</title>
+          </head>
+          <body style="font-family:Arial,sans-serif;background:#f4f6f8;padding:32px;">
+            <div style="max-width:560px;margin:0 auto;background:#fff;border:1px solid #e5e7eb;border-radius:14px;padding:24px;">
+              <h2 style="margin:0 0 8px;color:#166534;">Preparing your itinerary</h2>
+              <p style="margin:0;color:#4b5563;">The PDF is being generated. This page will open it automatically in a few seconds.</p>
+            </div>
+          </body>
+        </html>
+        """
+        res = HttpResponse(html, status=status.HTTP_202_ACCEPTED)
+        res["Cache-Control"] = "no-store"
+        return res
 
 
-class ChatItineraryTripSendView(generics.GenericAPIView):
-    """POST: Generate PDF, attach to new chat message, send to traveler (agent-only)."""
+class ChatItineraryTripPdfJobCreateView(generics.GenericAPIView):
+    """POST: Queue an off-request render of the itinerary PDF (room participants). Poll the returned status_url."""
 
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, room_id, trip_id):
         room = get_object_or_404(ChatRoom, pk=room_id)
-        if request.user != room.agent or request.user.role != Roles.AGENT:
-            raise permissions.PermissionDenied("Only the agent can send itinerary for this room.")
+        if request.user not in (room.traveler, room.agent):
+            raise PermissionDenied("Access denied.")
         trip = get_object_or_404(ItineraryTrip, pk=trip_id, room=room)
-        from .itinerary_pdf import build_itinerary_pdf
-
-        custom_pkg_for_thread = (
-            CustomPackage.objects.filter(user=room.traveler, claimed_by=room.agent)
-            .exclude(status=CustomPackage.CustomPackageStatus.CANCELLED)
-            .order_by("-updated_at")
-            .first()
+        job = submit_pdf_job(trip, request.user)
+        return response.Response(
+            job_payload(job, request.build_absolute_uri),
+            status=status.HTTP_200_OK if job.status == ItineraryPdfJob.Status.DONE else status.HTTP_202_ACCEPTED,
         )
 
-        buf = build_itinerary_pdf(trip)
-        pdf_content = buf.getvalue()
-        filename = f"itinerary_{trip.start_date}_{trip.days_count}d{trip.nights_count}n.pdf"
-        msg = ChatMessage.objects.create(
-            room=room,
-            sender=request.user,
-            text=f"Your trip itinerary ({trip.start_date}, {trip.days_count} Days / {trip.nights_count} Nights) is attached.",
-            custom_package=custom_pkg_for_thread,
+
+class ChatItineraryTripPdfJobView(generics.GenericAPIView):
+    """GET: Status of an itinerary PDF job; pdf_url (and attachment_url for sends) once it is done."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, room_id, trip_id, job_id):
+        room = get_object_or_404(ChatRoom, pk=room_id)
+        if request.user not in (room.traveler, room.agent):
+            raise PermissionDenied("Access denied.")
+        job = get_object_or_404(
+            ItineraryPdfJob.objects.select_related("trip", "message"), pk=job_id, trip_id=trip_id, trip__room=room
         )
-        msg.attachment.save(filename, ContentFile(pdf_content), save=True)
-        room.updated_at = msg.created_at
-        room.save(update_fields=["updated_at"])
+        if job.status in (ItineraryPdfJob.Status.QUEUED, ItineraryPdfJob.Status.RENDERING):
+            recover_stale_jobs(ItineraryPdfJob.objects.filter(pk=job.pk))
+            job.refresh_from_db()
+        return response.Response(job_payload(job, request.build_absolute_uri), status=status.HTTP_200_OK)
+
+
+class ChatItineraryExportView(generics.GenericAPIView):
+    """
+    GET: ZIP of itinerary PDFs (agent-only). Scope with ?room=<id> (every trip in one of the agent's
+    chat rooms) or ?package=<id> (every trip linked to a booking of it). While PDFs are still being
+    rendered: 202 with the pending jobs and Retry-After; repeat the request to get the ZIP.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != Roles.AGENT:
+            raise PermissionDenied("Only agents can export itineraries.")
+        room_id = request.query_params.get("room")
+        package_id = request.query_params.get("package")
+        trips = ItineraryTrip.objects.filter(room__agent=request.user)
+        if room_id and str(room_id).isdigit():
+            room = get_object_or_404(ChatRoom, pk=room_id, agent=request.user)
+            trips, prefix = trips.filter(room=room), f"itineraries-room-{room.pk}"
+        elif package_id and str(package_id).isdigit():
+            package = get_object_or_404(Package, pk=package_id, agent=request.user)
+            trips, prefix = trips.filter(booking__package=package), f"itineraries-package-{package.pk}"
+        else:
+            return response.Response(
+                {"detail": "Pass ?room=<id> or ?package=<id>."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        trips = list(export_trips(trips)[: MAX_EXPORT_TRIPS + 1])
+        if not trips:
+            return response.Response({"detail": "No itineraries to export."}, status=status.HTTP_404_NOT_FOUND)
+        if len(trips) > MAX_EXPORT_TRIPS:
+            return response.Response(
+                {"detail": f"At most {MAX_EXPORT_TRIPS} itineraries can be exported at once."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        ready, missing, pending = prepare_export(trips, request.user)
+        if pending:
+            return response.Response(
+                {
+                    "detail": "Itineraries are being rendered; retry the export shortly.",
+                    "ready": len(ready),
+                    "missing": len(missing),
+                    "pending": len(pending),
+                    "jobs": [job_payload(job, request.build_absolute_uri) for job in pending],
+                },
+                status=status.HTTP_202_ACCEPTED,
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        return streaming_itinerary_export(ready, missing, prefix)
+
+
+class ChatItineraryTripSendView(generics.GenericAPIView):
+    """
+    POST: Generate the itinerary PDF and attach it to a new chat message to the traveler (agent-only).
+    Rendering is queued (see itinerary_pdf_jobs): 202 with a job to poll, or 200 with message_id and
+    attachment_url straight away when the PDF was already rendered.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, room_id, trip_id):
+        room = get_object_or_404(ChatRoom, pk=room_id)
+        if request.user != room.agent or request.user.role != Roles.AGENT:
+            raise PermissionDenied("Only the agent can send itinerary for this room.")
+        trip = get_object_or_404(ItineraryTrip, pk=trip_id, room=room)
+        job = submit_pdf_job(trip, request.user, send_to_chat=True)
         return response.Response(
-            {
-                "message_id": msg.id,
-                "attachment_url": request.build_absolute_uri(msg.attachment.url) if msg.attachment else None,
-            },
-            status=status.HTTP_200_OK,
+            job_payload(job, request.build_absolute_uri),
+            status=status.HTTP_200_OK if job.status == ItineraryPdfJob.Status.DONE else status.HTTP_202_ACCEPTED,
         )
 
 
@@ -5442,6 +5198,7 @@ class NotificationListCreateView(generics.ListCreateAPIView):
             recipients__user=user
         ).select_related("sender").distinct().order_by("-created_at")
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         user = request.user
         if user.role not in (Roles.ADMIN, Roles.AGENT):
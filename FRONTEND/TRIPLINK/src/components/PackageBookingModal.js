@@ -12,7 +12,7 @@ import {
 import { Ionicons } from "@expo/vector-icons";
 import { WebView } from "react-native-webview";
 import { useLanguage } from "../context/LanguageContext";
-import { initiateEsewaPayment, verifyEsewaPayment } from "../utils/api";
+import { initiateEsewaPayment, newIdempotencyKey, verifyEsewaPayment } from "../utils/api";
 import { useAppAlert } from "./AppAlertProvider";
 
 const formatPrice = (price) => {
@@ -79,6 +79,8 @@ const PackageBookingModal = ({
   const [esewaWebViewVisible, setEsewaWebViewVisible] = useState(false);
   const [esewaWebViewLoading, setEsewaWebViewLoading] = useState(false);
   const paymentCallbackHandledRef = useRef(false);
+  // One Idempotency-Key per payment start; kept while the user retries the same request.
+  const initiateAttemptRef = useRef({ signature: null, key: null });
   const [rewardPointsInput, setRewardPointsInput] = useState("");
   const [agentType, setAgentType] = useState("regular");
 
@@ -94,6 +96,7 @@ const PackageBookingModal = ({
     setEsewaWebViewVisible(false);
     setEsewaWebViewLoading(false);
     paymentCallbackHandledRef.current = false;
+    initiateAttemptRef.current = { signature: null, key: null };
   }, [visible, packageId]);
 
   const baseUnitPrice =
@@ -127,6 +130,11 @@ const PackageBookingModal = ({
       return;
     }
 
+    const signature = JSON.stringify([packageId, travelerCount, normalizedRewardPointsToUse, agentType]);
+    if (initiateAttemptRef.current.signature !== signature) {
+      initiateAttemptRef.current = { signature, key: newIdempotencyKey() };
+    }
+
     try {
       setInitiatingPayment(true);
       const { data } = await initiateEsewaPayment(
@@ -134,7 +142,8 @@ const PackageBookingModal = ({
         travelerCount,
         session.access,
         normalizedRewardPointsToUse,
-        agentType
+        agentType,
+        initiateAttemptRef.current.key
       );
       if (data?.zero_payment) {
         onBook?.(data || null);
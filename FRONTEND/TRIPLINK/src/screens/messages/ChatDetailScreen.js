@@ -34,6 +34,7 @@ import {
   deleteChatItineraryItem,
   createChatItineraryTrip,
   sendChatItineraryTrip,
+  waitForChatItineraryPdfJob,
   getChatItineraryPdfUrl,
   clearChatMessages,
   deleteChatMessage,
@@ -392,6 +393,7 @@ const ChatDetailScreen = ({
   const [itineraryTimePickerVisible, setItineraryTimePickerVisible] = useState(false);
   const scrollRef = useRef(null);
   const wsRef = useRef(null);
+  const loadMessagesRef = useRef(null);
 
   const accessToken = session?.access;
   const isAgent = session?.user?.role === "agent";
@@ -412,6 +414,7 @@ const ChatDetailScreen = ({
       setLoading(false);
     }
   }, [roomId, accessToken]);
+  loadMessagesRef.current = loadMessages;
 
   const loadItinerary = useCallback(async () => {
     if (!roomId || !accessToken) return;
@@ -476,6 +479,8 @@ const ChatDetailScreen = ({
             }
             return [...prev, newMsg];
           });
+        } else if (data.type === "itinerary_pdf_job" && data.message_id) {
+          loadMessagesRef.current?.(false);
         }
       } catch (_) {}
     };
@@ -947,7 +952,9 @@ const ChatDetailScreen = ({
     if (!tripId) return;
     setSavingItinerary(true);
     try {
-      await sendChatItineraryTrip(roomId, tripId, accessToken);
+      const { data: job } = await sendChatItineraryTrip(roomId, tripId, accessToken);
+      // 202: the PDF is rendered in the background; the message exists once the job is done.
+      await waitForChatItineraryPdfJob(roomId, tripId, job, accessToken);
       setShowItineraryModal(false);
       resetItineraryForm();
       await loadMessages(false);
@@ -39,7 +39,7 @@ const LeaderboardScreen = ({ session, onBack = () => {} }) => {
     if (!silent) setLoading(true);
     try {
       const { data } = await getLeaderboard(session.access);
-      const arr = Array.isArray(data) ? data : [];
+      const arr = Array.isArray(data) ? data : Array.isArray(data?.results) ? data.results : [];
       setList(arr);
     } catch (err) {
       setList([]);
@@ -1,5 +1,31 @@
+import * as Crypto from "expo-crypto";
 import { API_BASE } from "../config";
 
+// Write endpoints decorated with @idempotent on the server dedupe requests that share this header.
+const IDEMPOTENCY_HEADER = "Idempotency-Key";
+// Retries for requests that carry an idempotency key (network failure or 409 "still in progress").
+const IDEMPOTENT_RETRY_DELAYS_MS = [800, 2000];
+// The only 409 worth retrying: the first request with the same key is still running. Other 409s
+// (sold out, already claimed) are answers, and the server has already released the key for them.
+const IDEMPOTENCY_IN_PROGRESS_CODE = "idempotency_in_progress";
+
+const isIdempotencyInProgress = async (response) => {
+  if (response.status !== 409) return false;
+  try {
+    const body = await response.clone().json();
+    return body?.code === IDEMPOTENCY_IN_PROGRESS_CODE;
+  } catch (_) {
+    return false;
+  }
+};
+
+/**
+ * New key for one logical write (a booking, an eSewa initiate). Reuse it for every retry of that
+ * action so the server replays the first result instead of creating another row.
+ * @returns {string}
+ */
+export const newIdempotencyKey = () => Crypto.randomUUID();
+
 /**
  * Read response body as JSON. If the server returns HTML or plain text (502 page, Django error),
  * avoids "JSON Parse error: Unexpected character" and surfaces a short readable message.
@@ -62,20 +88,35 @@ export const refreshAccessToken = async (refreshToken) => {
 /**
  * Make an authenticated API request. On 401, tries to refresh token and retry once.
  * @param {string} endpoint - API endpoint (e.g., '/api/auth/profile/')
- * @param {object} options - Fetch options
+ * @param {object} options - Fetch options, plus optional idempotencyKey (sent as Idempotency-Key; the request is then retried on network errors and while the server reports the key in progress)
  * @param {string} accessToken - JWT access token
  * @returns {Promise<Response>}
  */
 export const apiRequest = async (endpoint, options = {}, accessToken = null) => {
+  const { idempotencyKey, ...fetchOptions } = options;
   const doRequest = async (token) => {
     const url = `${API_BASE}${endpoint}`;
     const headers = {
       "Content-Type": "application/json",
-      ...options.headers,
+      ...fetchOptions.headers,
     };
     if (token) headers.Authorization = `Bearer ${token}`;
-    const config = { ...options, headers };
-    const response = await fetch(url, config);
+    if (idempotencyKey) headers[IDEMPOTENCY_HEADER] = idempotencyKey;
+    const config = { ...fetchOptions, headers };
+    let response;
+    for (let attempt = 0; ; attempt += 1) {
+      const canRetry = Boolean(idempotencyKey) && attempt < IDEMPOTENT_RETRY_DELAYS_MS.length;
+      try {
+        response = await fetch(url, config);
+      } catch (networkError) {
+        // Safe to resend: the key makes the server replay (or finish) the first attempt.
+        if (!canRetry) throw networkError;
+        await new Promise((resolve) => setTimeout(resolve, IDEMPOTENT_RETRY_DELAYS_MS[attempt]));
+        continue;
+      }
+      if (!canRetry || !(await isIdempotencyInProgress(response))) break;
+      await new Promise((resolve) => setTimeout(resolve, IDEMPOTENT_RETRY_DELAYS_MS[attempt]));
+    }
     let data;
     try {
       data = await response.json();
@@ -208,9 +249,9 @@ export const getProfile = async (accessToken) => {
 };
 
 /**
- * Get leaderboard: travelers ordered by reward points (highest first)
+ * Get leaderboard: travelers ordered by reward points (highest first), first page of 50
  * @param {string} accessToken - JWT access token
- * @returns {Promise<{ data: Array }>}
+ * @returns {Promise<{ data: { count: number, next: string|null, results: Array } }>}
  */
 export const getLeaderboard = async (accessToken) => {
   return apiRequest("/api/auth/leaderboard/", { method: "GET" }, accessToken);
@@ -314,15 +355,17 @@ export const getPackageById = async (packageId, accessToken = null) => {
  * Create a booking for the current user (traveler)
  * @param {number|string} packageId - Package ID to book
  * @param {string} accessToken - JWT access token
+ * @param {string} idempotencyKey - Same key for every retry of this booking (see newIdempotencyKey)
  * @returns {Promise<object>}
  */
-export const createBooking = async (packageId, accessToken) => {
+export const createBooking = async (packageId, accessToken, idempotencyKey = newIdempotencyKey()) => {
   const id = typeof packageId === "string" ? parseInt(packageId, 10) : packageId;
   return apiRequest(
     "/api/auth/bookings/",
     {
       method: "POST",
       body: JSON.stringify({ package_id: id }),
+      idempotencyKey,
     },
     accessToken
   );
@@ -335,6 +378,7 @@ export const createBooking = async (packageId, accessToken) => {
  * @param {string} accessToken
  * @param {number} rewardPointsToUse
  * @param {"regular"|"guide"} agentType
+ * @param {string} idempotencyKey - Same key for every retry of this payment start (see newIdempotencyKey)
  * @returns {Promise<object>}
  */
 export const initiateEsewaPayment = async (
@@ -342,7 +386,8 @@ export const initiateEsewaPayment = async (
   travelerCount,
   accessToken,
   rewardPointsToUse = 0,
-  agentType = "regular"
+  agentType = "regular",
+  idempotencyKey = newIdempotencyKey()
 ) => {
   const id = typeof packageId === "string" ? parseInt(packageId, 10) : packageId;
   return apiRequest(
@@ -355,6 +400,7 @@ export const initiateEsewaPayment = async (
         reward_points_to_use: rewardPointsToUse,
         agent_type: agentType,
       }),
+      idempotencyKey,
     },
     accessToken
   );
@@ -761,6 +807,42 @@ export const sendChatItineraryTrip = async (roomId, tripId, accessToken) => {
   return apiRequest(`/api/auth/chat/rooms/${room}/itinerary-trip/${trip}/send/`, { method: "POST" }, accessToken);
 };
 
+/**
+ * Status of a queued itinerary PDF job (send or preview)
+ * @param {number|string} roomId
+ * @param {number|string} tripId
+ * @param {number|string} jobId
+ * @param {string} accessToken
+ */
+export const getChatItineraryPdfJob = async (roomId, tripId, jobId, accessToken) => {
+  const room = typeof roomId === "string" ? roomId : String(roomId);
+  const trip = typeof tripId === "string" ? tripId : String(tripId);
+  const job = typeof jobId === "string" ? jobId : String(jobId);
+  return apiRequest(`/api/auth/chat/rooms/${room}/itinerary-trip/${trip}/pdf/jobs/${job}/`, { method: "GET" }, accessToken);
+};
+
+/**
+ * Poll an itinerary PDF job until it is done; resolves with the finished job, throws if it failed or timed out.
+ * @param {number|string} roomId
+ * @param {number|string} tripId
+ * @param {{ job_id: number, status: string, error?: string }} job - body of the send/submit response
+ * @param {string} accessToken
+ * @param {{ intervalMs?: number, timeoutMs?: number }} options
+ */
+export const waitForChatItineraryPdfJob = async (roomId, tripId, job, accessToken, options = {}) => {
+  const { intervalMs = 1500, timeoutMs = 120000 } = options;
+  const deadline = Date.now() + timeoutMs;
+  let current = job;
+  while (current.status === "queued" || current.status === "rendering") {
+    if (Date.now() > deadline) throw new Error("The itinerary PDF is taking too long. Please try again.");
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    const { data } = await getChatItineraryPdfJob(roomId, tripId, current.job_id, accessToken);
+    current = data;
+  }
+  if (current.status !== "done") throw new Error(current.error || "Could not render the itinerary PDF.");
+  return current;
+};
+
 /** Returns PDF URL for Check itinerary (supports ?access=token for mobile) */
 export const getChatItineraryPdfUrl = (roomId, tripId, accessToken) => {
   const room = typeof roomId === "string" ? roomId : String(roomId);